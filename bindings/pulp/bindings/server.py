@@ -1,8 +1,12 @@
+from threading import RLock
 from types import NoneType
 import base64
+import errno
+import httplib
 import locale
 import logging
 import os
+import socket
 import urllib
 try:
     import oauth2 as oauth
@@ -19,6 +23,17 @@ from pulp.common.constants import DEFAULT_CA_PATH
 from pulp.common.util import ensure_utf_8, encode_unicode
 
 
+# Maximum number of idle connections kept open to the server for reuse.
+MAX_IDLE_CONNECTIONS = 10
+
+# Methods a request may be retried with after it has been sent, because sending them twice has the
+# same effect as sending them once.
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'))
+
+# Errors a reused connection fails with when the server has closed it while it was idle.
+STALE_CONNECTION_ERRNOS = (errno.ECONNRESET, errno.EPIPE, errno.ECONNABORTED)
+
+
 class PulpConnection(object):
     """
     Stub for invoking methods against the Pulp server. By default, the
@@ -99,8 +114,9 @@ class PulpConnection(object):
         return self._request('POST', path, body=body, ensure_encoding=ensure_encoding,
                              log_request_body=log_request_body, ignore_prefix=ignore_prefix)
 
-    def PUT(self, path, body, ensure_encoding=True, log_request_body=True, ignore_prefix=False):
-        return self._request('PUT', path, body=body, ensure_encoding=ensure_encoding,
+    def PUT(self, path, body, ensure_encoding=True, log_request_body=True, ignore_prefix=False,
+            queries=()):
+        return self._request('PUT', path, queries, body=body, ensure_encoding=ensure_encoding,
                              log_request_body=log_request_body, ignore_prefix=ignore_prefix)
 
     # protected request utilities ---------------------------------------------
@@ -254,6 +270,11 @@ class HTTPSServerWrapper(object):
     This abstraction is used to simplify mocking. In this implementation, the
     intricacies (read: ugliness) of invoking and getting the response from
     the HTTPConnection class are hidden in favor of a simpler API to mock.
+
+    The SSL context is built once and rebuilt only when the settings it depends
+    on change. Connections are kept alive and reused by later requests. A single
+    instance may be used by multiple threads at once; each request has exclusive
+    use of its connection.
     """
 
     def __init__(self, pulp_connection):
@@ -263,11 +284,17 @@ class HTTPSServerWrapper(object):
         """
         self.pulp_connection = pulp_connection
 
+        self._lock = RLock()
+        self._ssl_context = None
+        self._ssl_context_key = None
+        self._idle_connections = []
+
     def request(self, method, url, body):
         """
         Make the request against the Pulp server, returning a tuple of (status_code, respose_body).
-        This method creates a new connection each time since HTTPSConnection has problems
-        reusing a connection for multiple calls (as claimed by a prior comment in this module).
+        An idle connection is reused when available. If a reused connection turns out to have
+        been closed by the server, the request is retried once on a new connection, unless it
+        may have reached the server and is not idempotent.
 
         :param method: The HTTP method to be used for the request (GET, POST, etc.)
         :type  method: str
@@ -283,34 +310,10 @@ class HTTPSServerWrapper(object):
         """
         headers = dict(self.pulp_connection.headers)  # copy so we don't affect the calling method
 
-        # Despite the confusing name, 'sslv23' configures m2crypto to use any available protocol in
-        # the underlying openssl implementation.
-        ssl_context = SSL.Context('sslv23')
-        # This restricts the protocols we are willing to do by configuring m2 not to do SSLv2.0 or
-        # SSLv3.0. EL 5 does not have support for TLS > v1.0, so we have to leave support for
-        # TLSv1.0 enabled.
-        ssl_context.set_options(m2.SSL_OP_NO_SSLv2 | m2.SSL_OP_NO_SSLv3)
-
-        if self.pulp_connection.verify_ssl:
-            ssl_context.set_verify(SSL.verify_peer, depth=100)
-            # We need to stat the ca_path to see if it exists (error if it doesn't), and if so
-            # whether it is a file or a directory. m2crypto has different directives depending on
-            # which type it is.
-            if os.path.isfile(self.pulp_connection.ca_path):
-                ssl_context.load_verify_locations(cafile=self.pulp_connection.ca_path)
-            elif os.path.isdir(self.pulp_connection.ca_path):
-                ssl_context.load_verify_locations(capath=self.pulp_connection.ca_path)
-            else:
-                # If it's not a file and it's not a directory, it's not a valid setting
-                raise exceptions.MissingCAPathException(self.pulp_connection.ca_path)
-        ssl_context.set_session_timeout(self.pulp_connection.timeout)
-
         if self.pulp_connection.username and self.pulp_connection.password:
             raw = ':'.join((self.pulp_connection.username, self.pulp_connection.password))
             encoded = base64.encodestring(raw)[:-1]
             headers['Authorization'] = 'Basic ' + encoded
-        elif self.pulp_connection.cert_filename:
-            ssl_context.load_cert(self.pulp_connection.cert_filename)
 
         # oauth configuration. This block is only True if oauth is not None, so it won't run on RHEL
         # 5.
@@ -331,14 +334,24 @@ class HTTPSServerWrapper(object):
             headers.update(oauth_header)
             headers['pulp-user'] = self.pulp_connection.oauth_user
 
-        connection = httpslib.HTTPSConnection(
-            self.pulp_connection.host, self.pulp_connection.port, ssl_context=ssl_context)
+        key, ssl_context, connection, reused = self._get_connection()
 
         try:
-            # Request against the server
-            connection.request(method, url, body=body, headers=headers)
-            response = connection.getresponse()
+            sent = False
+            try:
+                connection.request(method, url, body=body, headers=headers)
+                sent = True
+                response = connection.getresponse()
+            except (socket.error, httplib.HTTPException, SSL.SSLError), err:
+                if not (reused and self._can_retry(method, err, sent)):
+                    raise
+                # The server closed the idle connection; retry on a new one.
+                connection.close()
+                connection = self._new_connection(ssl_context)
+                connection.request(method, url, body=body, headers=headers)
+                response = connection.getresponse()
         except SSL.SSLError, err:
+            connection.close()
             # Translate stale login certificate to an auth exception
             if 'sslv3 alert certificate expired' == str(err):
                 raise exceptions.ClientCertificateExpiredException(
@@ -347,12 +360,167 @@ class HTTPSServerWrapper(object):
                 raise exceptions.CertificateVerificationException()
             else:
                 raise exceptions.ConnectionException(None, str(err), None)
+        except Exception:
+            connection.close()
+            raise
 
         # Attempt to deserialize the body (should pass unless the server is busted)
         response_body = response.read()
 
+        if getattr(response, 'will_close', True):
+            connection.close()
+        else:
+            self._release_connection(key, connection)
+
         try:
             response_body = json.loads(response_body)
         except:
             pass
         return response.status, response_body
+
+    def close(self):
+        """
+        Close all idle connections to the server.
+        """
+        with self._lock:
+            idle, self._idle_connections = self._idle_connections, []
+        for connection in idle:
+            connection.close()
+
+    @staticmethod
+    def _can_retry(method, error, sent):
+        """
+        Determine whether a request that failed on a reused connection may be sent again on a
+        new one. Only failures caused by the server having closed the idle connection are
+        retried. Once the request has been sent, the server may have acted on it, so it is only
+        retried if sending it twice is harmless.
+
+        :param method: The HTTP method of the request
+        :type  method: str
+        :param error:  The error the request failed with
+        :type  error:  Exception
+        :param sent:   Whether the request had been sent when it failed
+        :type  sent:   bool
+        :return:       True if the request may be retried
+        :rtype:        bool
+        """
+        if isinstance(error, httplib.BadStatusLine):
+            stale = True
+        elif isinstance(error, socket.error):
+            # timeouts and other errors may come from a server that is still processing the request
+            stale = error.errno in STALE_CONNECTION_ERRNOS
+        elif isinstance(error, SSL.SSLError):
+            stale = not sent
+        else:
+            stale = False
+        return stale and (not sent or method.upper() in IDEMPOTENT_METHODS)
+
+    def _get_connection(self):
+        """
+        Get a connection to the server, reusing an idle one when available.
+
+        :return: A 4-tuple of the key and SSL context the connection was made with, the
+                 connection and whether it is being reused.
+        :rtype:  tuple
+        """
+        with self._lock:
+            key, ssl_context = self._get_ssl_context()
+            if self._idle_connections:
+                return key, ssl_context, self._idle_connections.pop(), True
+        return key, ssl_context, self._new_connection(ssl_context), False
+
+    def _new_connection(self, ssl_context):
+        """
+        Open a new connection to the server.
+
+        :param ssl_context: the SSL context to use for the connection
+        :type  ssl_context: M2Crypto.SSL.Context
+        :return:            a new connection
+        :rtype:             M2Crypto.httpslib.HTTPSConnection
+        """
+        return httpslib.HTTPSConnection(
+            self.pulp_connection.host, self.pulp_connection.port, ssl_context=ssl_context)
+
+    def _release_connection(self, key, connection):
+        """
+        Return a connection to the idle pool once its response has been read. Connections made
+        with an SSL context that has since been replaced are closed instead.
+
+        :param key:        the SSL context key returned by _get_connection()
+        :type  key:        tuple
+        :param connection: the connection to release
+        :type  connection: M2Crypto.httpslib.HTTPSConnection
+        """
+        with self._lock:
+            if key == self._ssl_context_key and \
+                    len(self._idle_connections) < MAX_IDLE_CONNECTIONS:
+                self._idle_connections.append(connection)
+                return
+        connection.close()
+
+    def _get_ssl_context(self):
+        """
+        Get the SSL context, building it when the settings it depends on have changed since it was
+        last built. Idle connections made with a replaced context are closed. Must be called with
+        the lock held.
+
+        :return: A 2-tuple of the key of the current SSL context and the context itself.
+        :rtype:  tuple
+        """
+        key = self._build_ssl_context_key()
+        if self._ssl_context is None or key != self._ssl_context_key:
+            self._ssl_context = self._build_ssl_context()
+            self._ssl_context_key = key
+            self.close()
+        return key, self._ssl_context
+
+    def _build_ssl_context_key(self):
+        """
+        :return: the settings the SSL context depends on
+        :rtype:  tuple
+        """
+        cert_filename = None
+        cert_mtime = None
+        if not (self.pulp_connection.username and self.pulp_connection.password):
+            cert_filename = self.pulp_connection.cert_filename
+        if cert_filename:
+            try:
+                cert_mtime = os.path.getmtime(cert_filename)
+            except OSError:
+                pass
+        return (self.pulp_connection.host, self.pulp_connection.port,
+                self.pulp_connection.verify_ssl, self.pulp_connection.ca_path,
+                self.pulp_connection.timeout, cert_filename, cert_mtime)
+
+    def _build_ssl_context(self):
+        """
+        :return: a new SSL context configured for the pulp connection
+        :rtype:  M2Crypto.SSL.Context
+        """
+        # Despite the confusing name, 'sslv23' configures m2crypto to use any available protocol in
+        # the underlying openssl implementation.
+        ssl_context = SSL.Context('sslv23')
+        # This restricts the protocols we are willing to do by configuring m2 not to do SSLv2.0 or
+        # SSLv3.0. EL 5 does not have support for TLS > v1.0, so we have to leave support for
+        # TLSv1.0 enabled.
+        ssl_context.set_options(m2.SSL_OP_NO_SSLv2 | m2.SSL_OP_NO_SSLv3)
+
+        if self.pulp_connection.verify_ssl:
+            ssl_context.set_verify(SSL.verify_peer, depth=100)
+            # We need to stat the ca_path to see if it exists (error if it doesn't), and if so
+            # whether it is a file or a directory. m2crypto has different directives depending on
+            # which type it is.
+            if os.path.isfile(self.pulp_connection.ca_path):
+                ssl_context.load_verify_locations(cafile=self.pulp_connection.ca_path)
+            elif os.path.isdir(self.pulp_connection.ca_path):
+                ssl_context.load_verify_locations(capath=self.pulp_connection.ca_path)
+            else:
+                # If it's not a file and it's not a directory, it's not a valid setting
+                raise exceptions.MissingCAPathException(self.pulp_connection.ca_path)
+        ssl_context.set_session_timeout(self.pulp_connection.timeout)
+
+        if not (self.pulp_connection.username and self.pulp_connection.password) and \
+                self.pulp_connection.cert_filename:
+            ssl_context.load_cert(self.pulp_connection.cert_filename)
+
+        return ssl_context
@@ -43,6 +43,37 @@ class TasksAPI(PulpAPI):
         response.response_body = Task(response.response_body)
         return response
 
+    def get_tasks(self, task_ids, states=None, timeout=None):
+        """
+        Retrieves the status of many tasks in a single request. If a timeout is given, the
+        server waits until the state of any of the tasks differs from the one given for it in
+        states, or until the timeout passes, before responding.
+
+        :param task_ids:    IDs of the tasks to retrieve
+        :type  task_ids:    list
+        :param states:      mapping of task ID to the state last seen by the caller; tasks not
+                            included are compared with their state when the request is received
+        :type  states:      dict
+        :param timeout:     maximum number of seconds the server may wait for a state change
+        :type  timeout:     float
+        :return:            response with a dict holding the list of Task objects that were
+                            found, in the order of task_ids, under 'tasks' and the IDs of the
+                            tasks that do not exist under 'missing_task_ids'
+        :rtype:             Response
+
+        :raise NotFoundException: if the server does not support retrieving many tasks at once
+        """
+        path = '/v2/tasks/actions/status/'
+        body = {'task_ids': list(task_ids)}
+        if states:
+            body['states'] = states
+        if timeout:
+            body['timeout'] = timeout
+        response = self.server.POST(path, body)
+
+        response.response_body['tasks'] = [Task(doc) for doc in response.response_body['tasks']]
+        return response
+
     def get_all_tasks(self, tags=()):
         """
         Retrieves all tasks in the system. If tags are specified, only tasks
@@ -9,14 +9,24 @@ class UploadAPI(PulpAPI):
     def __init__(self, pulp_connection):
         super(UploadAPI, self).__init__(pulp_connection)
 
-    def initialize_upload(self):
+    def initialize_upload(self, size=None):
         url = '/v2/content/uploads/'
-        return self.server.POST(url)
+        body = None
+        if size is not None:
+            body = {'size': size}
+        return self.server.POST(url, body)
 
-    def upload_segment(self, upload_id, offset, data):
+    def upload_segment(self, upload_id, offset, data, checksum=None):
         url = '/v2/content/uploads/%s/%s/' % (upload_id, offset)
+        queries = ()
+        if checksum:
+            queries = {'checksum': checksum}
         return self.server.PUT(url, data, ensure_encoding=False,
-                               log_request_body=False)
+                               log_request_body=False, queries=queries)
+
+    def find_existing_units(self, units):
+        url = '/v2/content/actions/find_existing_units/'
+        return self.server.POST(url, {'units': units})
 
     def list_all_uploads(self):
         url = '/v2/content/uploads/'
@@ -27,7 +37,7 @@ class UploadAPI(PulpAPI):
         return self.server.DELETE(url)
 
     def import_upload(self, upload_id, repo_id, unit_type_id, unit_key, unit_metadata,
-                      override_config=None):
+                      override_config=None, unit_id=None):
         url = '/v2/repositories/%s/actions/import_upload/' % repo_id
         body = {
             'upload_id': upload_id,
@@ -36,4 +46,6 @@ class UploadAPI(PulpAPI):
             'unit_metadata': unit_metadata,
             'override_config': override_config,
         }
+        if unit_id is not None:
+            body['unit_id'] = unit_id
         return self.server.POST(url, body)
@@ -1,8 +1,11 @@
 """
 This module contains tests for the pulp.bindings.server module.
 """
+import errno
+import httplib
 import locale
 import logging
+import socket
 import unittest
 
 from M2Crypto import m2, SSL
@@ -172,6 +175,140 @@ class TestHTTPSServerWrapper(unittest.TestCase):
         load_verify_locations.assert_called_once_with(cafile=ca_path)
 
 
+@mock.patch('pulp.bindings.server.SSL.Context')
+@mock.patch('pulp.bindings.server.httpslib.HTTPSConnection')
+class TestHTTPSServerWrapperConnectionPool(unittest.TestCase):
+    """
+    This class contains tests for the reuse of SSL contexts and connections by the
+    HTTPSServerWrapper class.
+    """
+
+    def setUp(self):
+        self.conn = server.PulpConnection('host', verify_ssl=False)
+        self.wrapper = server.HTTPSServerWrapper(self.conn)
+
+    @staticmethod
+    def _response(will_close=False):
+        response = mock.Mock(status=200, will_close=will_close)
+        response.read.return_value = '{}'
+        return response
+
+    def test_request_reuses_connection(self, HTTPSConnection, Context):
+        connection = HTTPSConnection.return_value
+        connection.getresponse.return_value = self._response()
+
+        self.wrapper.request('GET', '/awesome/api/', '')
+        status, body = self.wrapper.request('GET', '/awesome/api/', '')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, {})
+        self.assertEqual(Context.call_count, 1)
+        HTTPSConnection.assert_called_once_with('host', 443, ssl_context=Context.return_value)
+        self.assertEqual(connection.request.call_count, 2)
+        self.assertFalse(connection.close.called)
+
+    def test_request_will_close(self, HTTPSConnection, Context):
+        connection = HTTPSConnection.return_value
+        connection.getresponse.return_value = self._response(will_close=True)
+
+        self.wrapper.request('GET', '/awesome/api/', '')
+        self.wrapper.request('GET', '/awesome/api/', '')
+
+        self.assertEqual(HTTPSConnection.call_count, 2)
+        self.assertEqual(connection.close.call_count, 2)
+
+    def _stale_and_fresh(self, HTTPSConnection):
+        stale = mock.Mock()
+        stale.getresponse.return_value = self._response()
+        fresh = mock.Mock()
+        fresh.getresponse.return_value = self._response()
+        HTTPSConnection.side_effect = [stale, fresh]
+        self.wrapper.request('GET', '/awesome/api/', '')
+        return stale, fresh
+
+    def test_request_retries_stale_connection(self, HTTPSConnection, Context):
+        stale, fresh = self._stale_and_fresh(HTTPSConnection)
+        stale.getresponse.side_effect = socket.error(errno.ECONNRESET, 'reset')
+
+        status, body = self.wrapper.request('PUT', '/awesome/api/', 'body')
+
+        self.assertEqual(status, 200)
+        stale.close.assert_called_once_with()
+        fresh.request.assert_called_once_with('PUT', '/awesome/api/', body='body',
+                                              headers=mock.ANY)
+
+    def test_request_retries_post_not_sent(self, HTTPSConnection, Context):
+        stale, fresh = self._stale_and_fresh(HTTPSConnection)
+        stale.request.side_effect = socket.error(errno.EPIPE, 'broken pipe')
+
+        status, body = self.wrapper.request('POST', '/awesome/api/', 'body')
+
+        self.assertEqual(status, 200)
+        fresh.request.assert_called_once_with('POST', '/awesome/api/', body='body',
+                                              headers=mock.ANY)
+
+    def test_request_sent_post_not_retried(self, HTTPSConnection, Context):
+        stale, fresh = self._stale_and_fresh(HTTPSConnection)
+        stale.getresponse.side_effect = httplib.BadStatusLine('')
+
+        self.assertRaises(httplib.BadStatusLine, self.wrapper.request,
+                          'POST', '/awesome/api/', 'body')
+
+        stale.close.assert_called_once_with()
+        self.assertFalse(fresh.request.called)
+
+    def test_request_timeout_not_retried(self, HTTPSConnection, Context):
+        stale, fresh = self._stale_and_fresh(HTTPSConnection)
+        stale.getresponse.side_effect = socket.timeout('timed out')
+
+        self.assertRaises(socket.timeout, self.wrapper.request, 'GET', '/awesome/api/', '')
+
+        self.assertFalse(fresh.request.called)
+
+    def test_request_new_connection_not_retried(self, HTTPSConnection, Context):
+        connection = HTTPSConnection.return_value
+        connection.getresponse.side_effect = socket.error('refused')
+
+        self.assertRaises(socket.error, self.wrapper.request, 'GET', '/awesome/api/', '')
+
+        self.assertEqual(HTTPSConnection.call_count, 1)
+        connection.close.assert_called_once_with()
+
+    def test_request_ssl_error_translated(self, HTTPSConnection, Context):
+        connection = HTTPSConnection.return_value
+        connection.request.side_effect = SSL.SSLError('certificate verify failed')
+
+        self.assertRaises(exceptions.CertificateVerificationException, self.wrapper.request,
+                          'GET', '/awesome/api/', '')
+        connection.close.assert_called_once_with()
+
+    def test_request_rebuilds_ssl_context(self, HTTPSConnection, Context):
+        first = mock.Mock()
+        first.getresponse.return_value = self._response()
+        second = mock.Mock()
+        second.getresponse.return_value = self._response()
+        HTTPSConnection.side_effect = [first, second]
+
+        self.wrapper.request('GET', '/awesome/api/', '')
+        self.conn.timeout = 10
+        self.wrapper.request('GET', '/awesome/api/', '')
+
+        self.assertEqual(Context.call_count, 2)
+        first.close.assert_called_once_with()
+        self.assertEqual(second.request.call_count, 1)
+
+    def test_close(self, HTTPSConnection, Context):
+        connection = HTTPSConnection.return_value
+        connection.getresponse.return_value = self._response()
+        self.wrapper.request('GET', '/awesome/api/', '')
+
+        self.wrapper.close()
+
+        connection.close.assert_called_once_with()
+        self.wrapper.request('GET', '/awesome/api/', '')
+        self.assertEqual(HTTPSConnection.call_count, 2)
+
+
 class TestPulpConnection(unittest.TestCase):
     """
     This class contains tests for the PulpConnection object.
@@ -76,6 +76,39 @@ class TestGetAllTasks(unittest.TestCase):
             self.assertTrue(isinstance(task, responses.Task))
 
 
+class TestGetTasks(unittest.TestCase):
+    def setUp(self):
+        self.server = mock.MagicMock()
+        self.api = tasks.TasksAPI(self.server)
+
+        self.server.POST.return_value.response_body = {'tasks': copy.deepcopy(TASKS),
+                                                       'missing_task_ids': ['missing']}
+
+    def test_request(self):
+        task_ids = [t['task_id'] for t in TASKS]
+        self.api.get_tasks(task_ids)
+
+        self.server.POST.assert_called_once_with('/v2/tasks/actions/status/',
+                                                 {'task_ids': task_ids})
+
+    def test_long_poll(self):
+        task_ids = [TASKS[0]['task_id']]
+        states = {TASKS[0]['task_id']: 'running'}
+        self.api.get_tasks(task_ids, states=states, timeout=5)
+
+        body = {'task_ids': task_ids, 'states': states, 'timeout': 5}
+        self.server.POST.assert_called_once_with('/v2/tasks/actions/status/', body)
+
+    def test_return_type(self):
+        ret = self.api.get_tasks([t['task_id'] for t in TASKS] + ['missing']).response_body
+
+        # the order requested is kept
+        self.assertEqual([task.task_id for task in ret['tasks']], [t['task_id'] for t in TASKS])
+        for task in ret['tasks']:
+            self.assertTrue(isinstance(task, responses.Task))
+        self.assertEqual(ret['missing_task_ids'], ['missing'])
+
+
 class TestPurgeTasks(unittest.TestCase):
     def setUp(self):
         self.server = mock.MagicMock()
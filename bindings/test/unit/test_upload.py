@@ -38,3 +38,42 @@ class TestUploadAPI(unittest.TestCase):
         self.api.server.POST.assert_called_once_with('/v2/repositories/%s/actions/import_upload/'
                                                      % 'repo_id', expected_body)
         self.assertEqual(ret, self.api.server.POST.return_value)
+
+    def test_initialize_upload_with_size(self):
+        ret = self.api.initialize_upload(size=1024)
+
+        self.api.server.POST.assert_called_once_with('/v2/content/uploads/', {'size': 1024})
+        self.assertEqual(ret, self.api.server.POST.return_value)
+
+    def test_upload_segment_with_checksum(self):
+        ret = self.api.upload_segment('upload_id', 10, 'data', checksum='abc')
+
+        self.api.server.PUT.assert_called_once_with('/v2/content/uploads/upload_id/10/', 'data',
+                                                    ensure_encoding=False,
+                                                    log_request_body=False,
+                                                    queries={'checksum': 'abc'})
+        self.assertEqual(ret, self.api.server.PUT.return_value)
+
+    def test_find_existing_units(self):
+        units = [{'type_id': 'type_id', 'unit_key': {'name': 'foo'}}]
+        ret = self.api.find_existing_units(units)
+
+        self.api.server.POST.assert_called_once_with('/v2/content/actions/find_existing_units/',
+                                                     {'units': units})
+        self.assertEqual(ret, self.api.server.POST.return_value)
+
+    def test_import_upload_existing_unit(self):
+        ret = self.api.import_upload('upload_id', 'repo_id', 'unit_type_id', unit_key={},
+                                     unit_metadata={}, unit_id='unit_id')
+        expected_body = {
+            'upload_id': 'upload_id',
+            'unit_type_id': 'unit_type_id',
+            'unit_key': {},
+            'unit_metadata': {},
+            'override_config': None,
+            'unit_id': 'unit_id',
+        }
+
+        self.api.server.POST.assert_called_once_with('/v2/repositories/%s/actions/import_upload/'
+                                                     % 'repo_id', expected_body)
+        self.assertEqual(ret, self.api.server.POST.return_value)
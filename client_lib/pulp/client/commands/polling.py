@@ -6,6 +6,7 @@ import time
 from gettext import gettext as _
 
 from pulp.client.extensions.extensions import PulpCliCommand, PulpCliFlag
+from pulp.bindings.exceptions import NotFoundException
 from pulp.bindings.responses import Task
 
 # Returned from the poll command if one or more of the tasks in the given list
@@ -29,6 +30,12 @@ class PollingCommand(PulpCliCommand):
     Subclasses should override the rendering methods as appropriate to display
     custom messages based on the task state or progress.
 
+    All of the tasks being tracked are polled together in a single request. The server holds
+    each request until one of the tasks changes state or poll_frequency_in_seconds passes, so
+    state changes are displayed as soon as they happen while the progress of running tasks is
+    still refreshed at that frequency. Against a server without the batched task status call,
+    each task is fetched on its own every poll_frequency_in_seconds instead.
+
     If the poll_frequency_in_seconds is not specified, it will be loaded from
     the configuration under output -> poll_frequency_in_seconds.
 
@@ -46,7 +53,8 @@ class PollingCommand(PulpCliCommand):
         :type  method: function
         :param context: client context
         :type  context: pulp.client.extensions.core.ClientContext
-        :param poll_frequency_in_seconds: time between polling calls to the server
+        :param poll_frequency_in_seconds: maximum time the server waits for a task state change
+                                          before answering a polling call
         :type  poll_frequency_in_seconds: float
         """
         PulpCliCommand.__init__(self, name, description, method)
@@ -64,6 +72,15 @@ class PollingCommand(PulpCliCommand):
         # list of tasks we already know about
         self.known_tasks = set()
 
+        # latest report received for each task being tracked, keyed by task ID
+        self.latest_tasks = {}
+
+        # IDs of tracked tasks the server no longer has, e.g. because they were reaped
+        self.missing_tasks = set()
+
+        # whether the server supports retrieving many tasks in a single request
+        self.batch_polling = True
+
     def poll(self, task_list, user_input):
         """
         Entry point to begin polling on the tasks in the given list. Each task will be polled
@@ -117,7 +134,12 @@ class PollingCommand(PulpCliCommand):
             completed_task_list = []
 
             for task in task_list:
-                task = self._poll_task(task)
+                self.latest_tasks.setdefault(task.task_id, task)
+
+            for task in task_list:
+                # The task may have progressed, or even completed, while an earlier one in
+                # the list was being followed.
+                task = self._poll_task(self.latest_tasks[task.task_id])
 
                 # If there are more than one tasks to poll, we need to display a divider so
                 # the user knows which task is being followed.
@@ -125,7 +147,9 @@ class PollingCommand(PulpCliCommand):
                     self.task_header(task)
 
                 # Look for new tasks that we need to start polling for
-                task_list.extend(self._get_tasks_to_poll(task))
+                for spawned_task in self._get_tasks_to_poll(task):
+                    self.latest_tasks.setdefault(spawned_task.task_id, spawned_task)
+                    task_list.append(spawned_task)
 
                 completed_task_list.append(task)
 
@@ -210,10 +234,7 @@ class PollingCommand(PulpCliCommand):
                     first_run = False
                 self.progress(task, running_spinner)
 
-            time.sleep(self.poll_frequency_in_seconds)
-
-            response = self.context.server.tasks.get_task(task.task_id)
-            task = response.response_body
+            task = self._refresh_tasks(task)
 
         # One final call to update the progress with the end state. It's possible the run state
         # was never hit in the loop above, so we check for first_run again for the missing blank
@@ -225,6 +246,53 @@ class PollingCommand(PulpCliCommand):
 
         return task
 
+    def _refresh_tasks(self, task):
+        """
+        Retrieves the latest reports for the given task and every other incomplete task being
+        tracked in a single request. The server waits up to the poll frequency for any of them
+        to change state before responding.
+
+        Other tasks the server reports as missing are no longer polled. If the given task is
+        missing, or the server does not support retrieving many tasks at once, the given task is
+        fetched on its own.
+
+        :param task: task currently being followed
+        :type  task: pulp.bindings.responses.Task
+
+        :return: the latest report for the given task
+        :rtype:  pulp.bindings.responses.Task
+
+        :raise NotFoundException: if the given task does not exist
+        """
+        self.latest_tasks[task.task_id] = task
+        if self.batch_polling:
+            skipped = self.missing_tasks | set([task.task_id])
+            pending = [task] + [t for t in self.latest_tasks.values()
+                                if t.task_id not in skipped and not t.is_completed()]
+
+            task_ids = [t.task_id for t in pending]
+            states = dict((t.task_id, t.state) for t in pending)
+            try:
+                response = self.context.server.tasks.get_tasks(
+                    task_ids, states=states, timeout=self.poll_frequency_in_seconds)
+            except NotFoundException:
+                # A server older than the batched task status call
+                self.batch_polling = False
+            else:
+                for latest in response.response_body['tasks']:
+                    self.latest_tasks[latest.task_id] = latest
+                self.missing_tasks.update(response.response_body['missing_task_ids'])
+                if task.task_id not in self.missing_tasks:
+                    return self.latest_tasks[task.task_id]
+
+        if not self.batch_polling:
+            time.sleep(self.poll_frequency_in_seconds)
+
+        # A missing task is reported the same way as when it is polled on its own
+        latest = self.context.server.tasks.get_task(task.task_id).response_body
+        self.latest_tasks[latest.task_id] = latest
+        return latest
+
     def task_header(self, task):
         """
         Displays information to the user to indicate which task is about to be tracked.
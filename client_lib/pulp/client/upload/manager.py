@@ -5,16 +5,27 @@ download, uploading a file in multiple chunks instead of a single call, and
 client-side tracking of upload requests on the server.
 """
 
+from Queue import Queue, Empty
+from threading import Event, Thread
 import copy
 import errno
+import hashlib
 import os
 import pickle
+import sys
+import time
 
+from pulp.bindings.exceptions import BadRequestException, NotFoundException
 from pulp.common.lock import LockFile
 
 
 DEFAULT_CHUNKSIZE = 1048576  # 1 MB per upload call
 
+DEFAULT_THREADS = 1  # number of chunks uploaded concurrently
+
+# Minimum number of seconds between saves of the tracker file while uploading.
+SAVE_INTERVAL = 1
+
 
 class ManagerUninitializedException(Exception):
     """
@@ -59,7 +70,9 @@ class UploadManager(object):
     initially, is to be used in a CLI where there will only be a single thread
     per process. As such, there are no in memory locks. The tracker files per
     upload will carry some state information to prevent two processes from
-    concurrently modifying the same tracker.
+    concurrently modifying the same tracker. Chunks of a single upload may be
+    sent to the server by several threads at once, but only the calling thread
+    updates the tracker.
 
     Likewise, the working directory contents are only read once and cached. This
     will be a problem if we expect an instance to be long running (i.e. the
@@ -71,7 +84,8 @@ class UploadManager(object):
     on disk state files.
     """
 
-    def __init__(self, upload_working_dir, bindings, chunk_size=DEFAULT_CHUNKSIZE):
+    def __init__(self, upload_working_dir, bindings, chunk_size=DEFAULT_CHUNKSIZE,
+                 threads=DEFAULT_THREADS):
         """
         @param upload_working_dir: directory in which to store client-side files
                to track upload requests; if it doesn't exist it will be created
@@ -84,10 +98,14 @@ class UploadManager(object):
         @param chunk_size: size in bytes of data to upload on each call to the
                server
         @type  chunk_size: int
+
+        @param threads: number of chunks to upload to the server concurrently
+        @type  threads: int
         """
         self.upload_working_dir = upload_working_dir
         self.bindings = bindings
         self.chunk_size = chunk_size
+        self.threads = max(1, threads)
 
         # Internal state
         self.tracker_files = {}
@@ -111,7 +129,8 @@ class UploadManager(object):
         upload_working_dir = os.path.join(context.config['filesystem']['upload_working_dir'],
                                           'default')
         upload_working_dir = os.path.expanduser(upload_working_dir)
-        return cls(upload_working_dir, context.server)
+        threads = int(context.config.get('server', {}).get('upload_threads', DEFAULT_THREADS))
+        return cls(upload_working_dir, context.server, threads=threads)
 
     def initialize(self):
         """
@@ -153,7 +172,13 @@ class UploadManager(object):
         if not os.path.exists(self.upload_working_dir):
             os.makedirs(self.upload_working_dir)
 
-        response = self.bindings.uploads.initialize_upload().response_body
+        # Let the server allocate the file up front so chunks can be written
+        # in any order.
+        size = None
+        if filename and os.path.exists(filename):
+            size = os.path.getsize(filename)
+
+        response = self.bindings.uploads.initialize_upload(size=size).response_body
 
         upload_id = response['upload_id']
         location = response['_href']
@@ -184,13 +209,19 @@ class UploadManager(object):
         Begins or resumes the upload process for the given upload request.
         This call will not return until the upload is complete. The other
         expected exit point is a KeyboardError to kill the process. The
-        client-side on disk tracker files will store the current offset and
-        resume the upload from where it left off on the next call to this method.
+        client-side on disk tracker files will store which chunks have been
+        uploaded and resume the upload with the remaining chunks on the next
+        call to this method.
+
+        Chunks are uploaded by up to the configured number of threads at once,
+        each chunk carrying its checksum so the server can verify it. If the
+        server already stores a unit with the same key, no bits are uploaded and
+        the stored unit is associated with the repository on import instead.
 
         The callback_func is used to get feedback on the upload process. After
         each successful upload segment call to the server, this function
-        will be invoked with the new offset in the file and the file size
-        (intended to be fed into a progress indicator). As this is called
+        will be invoked with the number of bytes uploaded so far and the file
+        size (intended to be fed into a progress indicator). As this is called
         after each upload segment call, the granularity at which it is called
         depends on the chunk_size value for this instance.
 
@@ -235,22 +266,21 @@ class UploadManager(object):
 
             source_file_size = os.path.getsize(tracker_file.source_filename)
 
-            f = open(tracker_file.source_filename, 'r')
-            while True:
-                # Load the chunk to upload
-                f.seek(tracker_file.offset)
-                data = f.read(self.chunk_size)
-                if not data:
-                    break
-
-                # Server request
-                self.bindings.uploads.upload_segment(upload_id, tracker_file.offset, data)
+            unit_id = getattr(tracker_file, 'unit_id', None) or self._existing_unit_id(tracker_file)
+            if unit_id:
+                tracker_file.unit_id = unit_id
+                tracker_file.is_finished_uploading = True
+                if callback_func:
+                    callback_func(source_file_size, source_file_size)
+                return
 
-                # Status update and callback notification
-                tracker_file.offset = min(tracker_file.offset + self.chunk_size, source_file_size)
-                tracker_file.save()
+            # Trackers saved by an earlier version or with a different chunk
+            # size only carry the offset, which is converted to chunks here.
+            if getattr(tracker_file, 'chunks', None) is None or \
+                    tracker_file.chunk_size != self.chunk_size:
+                tracker_file.reset_chunks(source_file_size, self.chunk_size)
 
-                callback_func(tracker_file.offset, source_file_size)
+            self._upload_chunks(tracker_file, source_file_size, callback_func)
 
             tracker_file.is_finished_uploading = True
         finally:
@@ -259,6 +289,133 @@ class UploadManager(object):
             tracker_file.is_running = False
             tracker_file.save()
 
+    def _existing_unit_id(self, tracker_file):
+        """
+        Asks the server whether it already stores the unit being uploaded. A
+        stored unit is associated without invoking the importer, so it is not
+        looked up when there is unit metadata or configuration for the importer.
+
+        @param tracker_file: tracker for the upload request
+        @type  tracker_file: UploadTracker
+
+        @return: ID of the stored unit; None if the server does not store it
+                 or cannot look it up
+        @rtype:  str
+        """
+        if not tracker_file.unit_type_id or not tracker_file.unit_key:
+            return None
+        if tracker_file.unit_metadata or tracker_file.override_config:
+            return None
+
+        unit = {'type_id': tracker_file.unit_type_id, 'unit_key': tracker_file.unit_key}
+        try:
+            response = self.bindings.uploads.find_existing_units([unit])
+        except (BadRequestException, NotFoundException):
+            # Unknown unit type or a server that does not support the lookup
+            return None
+        return response.response_body[0]
+
+    def _upload_chunks(self, tracker_file, source_file_size, callback_func):
+        """
+        Uploads the chunks not yet marked as completed in the tracker using a
+        pool of threads. The tracker is only updated by the calling thread and
+        is saved to disk at most once every SAVE_INTERVAL seconds.
+
+        @param tracker_file: tracker for the upload request
+        @type  tracker_file: UploadTracker
+
+        @param source_file_size: size in bytes of the file being uploaded
+        @type  source_file_size: int
+
+        @param callback_func: optional method to be called after each upload
+               call to the server
+        @type  callback_func: func
+        """
+        pending = tracker_file.pending_chunks()
+        uploaded = source_file_size - sum(
+            min(self.chunk_size, source_file_size - i * self.chunk_size) for i in pending)
+
+        queue = Queue()
+        for index in pending:
+            queue.put(index)
+        finished = Queue()
+        stopped = Event()
+
+        for n in range(min(self.threads, len(pending))):
+            thread = Thread(target=self._upload_worker,
+                            args=(tracker_file.upload_id, tracker_file.source_filename,
+                                  queue, finished, stopped))
+            thread.setDaemon(True)
+            thread.start()
+
+        last_saved = time.time()
+        try:
+            remaining = len(pending)
+            while remaining:
+                # Waiting with a timeout keeps the wait interruptible.
+                try:
+                    index, length, exc_info = finished.get(timeout=SAVE_INTERVAL)
+                except Empty:
+                    continue
+                if exc_info:
+                    raise exc_info[0], exc_info[1], exc_info[2]
+                remaining -= 1
+
+                # Status update and callback notification
+                tracker_file.complete_chunk(index, source_file_size)
+                uploaded += length
+                if time.time() - last_saved >= SAVE_INTERVAL:
+                    tracker_file.save()
+                    last_saved = time.time()
+
+                if callback_func:
+                    callback_func(uploaded, source_file_size)
+        finally:
+            # Outstanding chunks are abandoned and picked up on resume.
+            stopped.set()
+
+    def _upload_worker(self, upload_id, source_filename, queue, finished, stopped):
+        """
+        Uploads chunks read from the queue until it is empty or the upload
+        is stopped. The outcome of each chunk is put on the finished queue as
+        a tuple of (index, length, exc_info).
+
+        @param upload_id: identifies the upload request
+        @type  upload_id: str
+
+        @param source_filename: path to the file being uploaded
+        @type  source_filename: str
+
+        @param queue: indexes of the chunks to upload
+        @type  queue: Queue.Queue
+
+        @param finished: receives the outcome of each chunk
+        @type  finished: Queue.Queue
+
+        @param stopped: set when the upload has been stopped
+        @type  stopped: threading.Event
+        """
+        f = open(source_filename, 'r')
+        try:
+            while not stopped.is_set():
+                try:
+                    index = queue.get_nowait()
+                except Empty:
+                    break
+                try:
+                    offset = index * self.chunk_size
+                    f.seek(offset)
+                    data = f.read(self.chunk_size)
+                    checksum = hashlib.sha256(data).hexdigest()
+                    self.bindings.uploads.upload_segment(upload_id, offset, data,
+                                                         checksum=checksum)
+                    finished.put((index, len(data), None))
+                except Exception:
+                    finished.put((index, 0, sys.exc_info()))
+                    break
+        finally:
+            f.close()
+
     def import_upload(self, upload_id):
         """
         Once the file is finished uploading, this call will request the server
@@ -283,7 +440,8 @@ class UploadManager(object):
 
         response = self.bindings.uploads.import_upload(
             upload_id, tracker.repo_id, tracker.unit_type_id, tracker.unit_key,
-            tracker.unit_metadata, tracker.override_config)
+            tracker.unit_metadata, tracker.override_config,
+            unit_id=getattr(tracker, 'unit_id', None))
 
         return response
 
@@ -397,8 +555,12 @@ class UploadTracker(object):
         # Upload call information
         self.upload_id = None
         self.location = None  # URL to the upload request on the server
-        self.offset = None  # start of next chunk to upload
+        self.offset = None  # end of the leading run of uploaded chunks
         self.source_filename = None  # path on disk to the file to upload
+        self.chunk_size = None  # size in bytes of the chunks tracked in the bitmap
+        self.chunk_count = 0
+        self.chunks = None  # bitmap of uploaded chunks
+        self.unit_id = None  # ID of the unit if already stored on the server
 
         # Import call information
         self.repo_id = None
@@ -436,6 +598,59 @@ class UploadTracker(object):
     def delete(self):
         os.remove(self.filename)
 
+    def reset_chunks(self, file_size, chunk_size):
+        """
+        Starts tracking uploaded chunks of the given size. Chunks that lie
+        entirely below the current offset are marked as uploaded.
+
+        @param file_size: size in bytes of the file being uploaded
+        @type  file_size: int
+
+        @param chunk_size: size in bytes of each chunk
+        @type  chunk_size: int
+        """
+        self.chunk_size = chunk_size
+        self.chunk_count = (file_size + chunk_size - 1) // chunk_size
+        self.chunks = bytearray((self.chunk_count + 7) // 8)
+
+        offset = self.offset or 0
+        if offset >= file_size:
+            completed = self.chunk_count
+        else:
+            completed = offset // chunk_size
+        for index in range(completed):
+            self.chunks[index // 8] |= 1 << (index % 8)
+        self.offset = min(completed * chunk_size, file_size)
+
+    def is_chunk_complete(self, index):
+        """
+        @return: true if the chunk at the given index has been uploaded
+        @rtype:  bool
+        """
+        return bool(self.chunks[index // 8] & (1 << (index % 8)))
+
+    def complete_chunk(self, index, file_size):
+        """
+        Marks the chunk at the given index as uploaded and advances the offset
+        past the leading run of uploaded chunks.
+
+        @param index: index of the uploaded chunk
+        @type  index: int
+
+        @param file_size: size in bytes of the file being uploaded
+        @type  file_size: int
+        """
+        self.chunks[index // 8] |= 1 << (index % 8)
+        while self.offset < file_size and self.is_chunk_complete(self.offset // self.chunk_size):
+            self.offset = min(self.offset + self.chunk_size, file_size)
+
+    def pending_chunks(self):
+        """
+        @return: indexes of the chunks that have not been uploaded
+        @rtype:  list
+        """
+        return [i for i in range(self.chunk_count) if not self.is_chunk_complete(i)]
+
     @classmethod
     def load(cls, filename):
         """
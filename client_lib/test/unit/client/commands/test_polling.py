@@ -1,5 +1,6 @@
 import mock
 
+from pulp.bindings.exceptions import NotFoundException
 from pulp.bindings.responses import (
     Task, STATE_WAITING, STATE_CANCELED, STATE_ERROR, STATE_FINISHED,
     STATE_RUNNING, STATE_SKIPPED, STATE_ACCEPTED)
@@ -29,20 +30,20 @@ class PollingCommandTests(base.PulpClientTests):
         # Verify
         self.assertEqual(.5, command.poll_frequency_in_seconds)  # from defaults
 
-    @mock.patch('time.sleep')
-    def test_poll_single_task(self, mock_sleep):
+    def test_poll_single_task(self):
         """
         Task Count: 1
         Statuses: None; normal progression of waiting to running to completed
         Result: Success
 
-        This test verifies the sleep and progress callback calls, which will be omitted
+        This test verifies the polling and progress callback calls, which will be omitted
         in most other tests cases where appropriate.
         """
 
         # Setup
         sim = TaskSimulator()
         sim.install(self.bindings)
+        sim.get_tasks = mock.MagicMock(wraps=sim.get_tasks)
 
         task_id = '123'
         state_progression = [STATE_WAITING,
@@ -66,8 +67,8 @@ class PollingCommandTests(base.PulpClientTests):
         expected_tags = ['abort', 'delayed-spinner', 'delayed-spinner', 'succeeded']
         self.assertEqual(self.prompt.get_write_tags(), expected_tags)
 
-        self.assertEqual(4, mock_sleep.call_count)  # 2 for waiting, 2 for running
-        self.assertEqual(mock_sleep.call_args_list[0][0][0], 0)  # frequency passed to sleep
+        self.assertEqual(4, sim.get_tasks.call_count)  # 2 for waiting, 2 for running
+        sim.get_tasks.assert_any_call(['123'], states={'123': STATE_WAITING}, timeout=0)
 
         self.assertEqual(3, mock_progress_call.call_count)  # 2 running, 1 final
 
@@ -209,6 +210,109 @@ class PollingCommandTests(base.PulpClientTests):
         for i in range(0, 3):
             self.assertEqual(STATE_FINISHED, completed_tasks[i].state)
 
+    def test_poll_task_list_batched(self):
+        """
+        Task Count: 2
+        Statuses: the second task completes while the first one is followed
+        Result: All Success, with every incomplete task polled in each request
+        """
+
+        # Setup
+        sim = TaskSimulator()
+        sim.install(self.bindings)
+        sim.get_tasks = mock.MagicMock(wraps=sim.get_tasks)
+
+        sim.add_task_states('1', [STATE_WAITING, STATE_RUNNING, STATE_RUNNING, STATE_FINISHED])
+        sim.add_task_states('2', [STATE_WAITING, STATE_FINISHED])
+
+        # Test
+        task_list = sim.get_all_tasks().response_body
+        completed_tasks = self.command.poll(task_list, {})
+
+        # Verify
+        self.assertEqual(3, sim.get_tasks.call_count)
+        first_ids = sim.get_tasks.call_args_list[0][0][0]
+        self.assertEqual(['1', '2'], first_ids)
+        for call in sim.get_tasks.call_args_list[1:]:
+            self.assertEqual(['1'], call[0][0])
+
+        self.assertEqual(['1', '2'], [t.task_id for t in completed_tasks])
+        for task in completed_tasks:
+            self.assertEqual(STATE_FINISHED, task.state)
+
+    def test_poll_task_missing_sibling(self):
+        """
+        Task Count: 1, with another incomplete task tracked
+        Statuses: the other task no longer exists on the server
+        Result: Success, with the missing task no longer polled
+        """
+
+        # Setup
+        sim = TaskSimulator()
+        sim.install(self.bindings)
+        sim.get_tasks = mock.MagicMock(wraps=sim.get_tasks)
+
+        sim.add_task_states('1', [STATE_WAITING, STATE_RUNNING, STATE_FINISHED])
+        self.command.latest_tasks['2'] = Task({'task_id': '2', 'state': STATE_RUNNING})
+
+        # Test
+        task_list = sim.get_all_tasks().response_body
+        completed_tasks = self.command.poll(task_list, {})
+
+        # Verify
+        self.assertEqual(2, sim.get_tasks.call_count)
+        self.assertEqual(['1', '2'], sim.get_tasks.call_args_list[0][0][0])
+        self.assertEqual(['1'], sim.get_tasks.call_args_list[1][0][0])
+        self.assertEqual(set(['2']), self.command.missing_tasks)
+
+        self.assertEqual(1, len(completed_tasks))
+        self.assertEqual(STATE_FINISHED, completed_tasks[0].state)
+
+    def test_poll_task_missing(self):
+        """
+        The task being followed should be fetched on its own when the server reports it missing.
+        """
+
+        # Setup
+        self.bindings.tasks = mock.MagicMock()
+        self.bindings.tasks.get_tasks.return_value.response_body = {
+            'tasks': [], 'missing_task_ids': ['1']}
+        self.bindings.tasks.get_task.side_effect = NotFoundException({})
+
+        # Test
+        task = Task({'task_id': '1', 'state': STATE_RUNNING})
+        self.assertRaises(NotFoundException, self.command._refresh_tasks, task)
+
+        # Verify
+        self.bindings.tasks.get_task.assert_called_once_with('1')
+
+    @mock.patch('time.sleep')
+    def test_poll_single_task_older_server(self, mock_sleep):
+        """
+        Task Count: 1
+        Statuses: the server does not support retrieving many tasks at once
+        Result: Success, with the task fetched on its own after each sleep
+        """
+
+        # Setup
+        sim = TaskSimulator()
+        sim.install(self.bindings)
+        sim.get_tasks = mock.MagicMock(side_effect=NotFoundException({}))
+
+        sim.add_task_states('1', [STATE_WAITING, STATE_RUNNING, STATE_RUNNING, STATE_FINISHED])
+
+        # Test
+        task_list = sim.get_all_tasks().response_body
+        completed_tasks = self.command.poll(task_list, {})
+
+        # Verify
+        self.assertEqual(1, sim.get_tasks.call_count)
+        self.assertEqual(3, mock_sleep.call_count)
+        self.assertEqual(mock_sleep.call_args_list[0][0][0], 0)  # frequency passed to sleep
+
+        self.assertEqual(1, len(completed_tasks))
+        self.assertEqual(STATE_FINISHED, completed_tasks[0].state)
+
     def test_get_tasks_to_poll_duplicate_tasks(self):
         sim = TaskSimulator()
         sim.add_task_state('1', STATE_FINISHED)
@@ -1,4 +1,5 @@
 import errno
+import hashlib
 import math
 import os
 import shutil
@@ -35,6 +36,7 @@ class UploadManagerTests(unittest.TestCase):
 
         self._mock_initialize_upload()
         self._mock_upload_segment()
+        self._mock_find_existing_units()
         self._mock_delete_upload()
         self._mock_import_upload()
 
@@ -289,6 +291,155 @@ class UploadManagerTests(unittest.TestCase):
         tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
         self.assertEqual(rpm_size, tracker.offset)
 
+    def test_upload_threads(self):
+        # Setup
+        self.upload_manager.chunk_size = 100
+        self.upload_manager.threads = 4
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1',
+                                                          {'k': 'v'}, 'm-1')
+
+        mock_callback = mock.Mock()
+
+        # Test
+        self.upload_manager.upload(upload_id, mock_callback.update_status)
+
+        # Verify
+        rpm_size = os.path.getsize(TEST_RPM_FILENAME)
+        num_upload_calls = int(math.ceil(float(rpm_size) / float(self.upload_manager.chunk_size)))
+        self.assertEqual(num_upload_calls, self.mock_upload_bindings.upload_segment.call_count)
+        self.assertEqual(rpm_size, mock_callback.update_status.call_args[0][0])
+
+        # Each chunk is sent once, with its checksum
+        f = open(TEST_RPM_FILENAME, 'r')
+        expected = f.read()
+        f.close()
+        received = {}
+        for single_call_args in self.mock_upload_bindings.upload_segment.call_args_list:
+            offset, data = single_call_args[0][1:3]
+            self.assertEqual(hashlib.sha256(data).hexdigest(),
+                             single_call_args[1]['checksum'])
+            received[offset] = data
+        self.assertEqual(expected, ''.join(received[o] for o in sorted(received)))
+
+        # Verify the state of the tracker file on disk
+        tf_filename = self.upload_manager._tracker_filename(upload_id)
+        tracker = upload_util.UploadTracker.load(tf_filename)
+        self.assertEqual(rpm_size, tracker.offset)
+        self.assertEqual([], tracker.pending_chunks())
+        self.assertTrue(tracker.is_finished_uploading)
+
+    def test_upload_resume(self):
+        # Setup
+        self.upload_manager.chunk_size = 100
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1',
+                                                          {'k': 'v'}, 'm-1')
+        rpm_size = os.path.getsize(TEST_RPM_FILENAME)
+
+        # Fail on the third chunk
+        def upload_segment(upload_id, offset, data, checksum=None):
+            if offset == 200:
+                raise NotFoundException({})
+        self.mock_upload_bindings.upload_segment.side_effect = upload_segment
+
+        self.assertRaises(NotFoundException, self.upload_manager.upload, upload_id)
+
+        tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
+        self.assertEqual(200, tracker.offset)
+        self.assertFalse(tracker.is_finished_uploading)
+        self.assertFalse(tracker.is_running)
+
+        # Test
+        self.mock_upload_bindings.upload_segment.reset_mock()
+        self.mock_upload_bindings.upload_segment.side_effect = None
+        self.upload_manager.upload(upload_id)
+
+        # Verify
+        first_offset = self.mock_upload_bindings.upload_segment.call_args_list[0][0][1]
+        self.assertEqual(200, first_offset)
+        self.assertEqual(rpm_size, tracker.offset)
+        self.assertTrue(tracker.is_finished_uploading)
+
+    def test_tracker_reset_chunks(self):
+        tracker = upload_util.UploadTracker('tracker')
+        tracker.offset = 250
+
+        # Test
+        tracker.reset_chunks(1000, 100)
+
+        # Verify
+        self.assertEqual(10, tracker.chunk_count)
+        self.assertEqual(200, tracker.offset)
+        self.assertEqual(range(2, 10), tracker.pending_chunks())
+
+        tracker.complete_chunk(3, 1000)
+        self.assertEqual(200, tracker.offset)
+        tracker.complete_chunk(2, 1000)
+        self.assertEqual(400, tracker.offset)
+        self.assertEqual(range(4, 10), tracker.pending_chunks())
+
+    def test_upload_existing_unit(self):
+        # Setup
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1',
+                                                          {'k': 'v'}, None)
+        self.mock_upload_bindings.find_existing_units.return_value = Response(200, ['unit-1'])
+
+        mock_callback = mock.Mock()
+
+        # Test
+        self.upload_manager.upload(upload_id, mock_callback.update_status)
+
+        # Verify
+        rpm_size = os.path.getsize(TEST_RPM_FILENAME)
+        self.mock_upload_bindings.find_existing_units.assert_called_once_with(
+            [{'type_id': 'type-1', 'unit_key': {'k': 'v'}}])
+        self.assertFalse(self.mock_upload_bindings.upload_segment.called)
+        mock_callback.update_status.assert_called_once_with(rpm_size, rpm_size)
+
+        tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
+        self.assertEqual('unit-1', tracker.unit_id)
+        self.assertTrue(tracker.is_finished_uploading)
+        self.assertFalse(tracker.is_running)
+
+        # The stored unit is imported rather than the upload
+        self.upload_manager.import_upload(upload_id)
+        self.assertEqual('unit-1',
+                         self.mock_upload_bindings.import_upload.call_args[1]['unit_id'])
+
+    def test_upload_existing_unit_with_metadata(self):
+        # Setup
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1',
+                                                          {'k': 'v'}, 'm-1')
+        self.mock_upload_bindings.find_existing_units.return_value = Response(200, ['unit-1'])
+
+        # Test
+        self.upload_manager.upload(upload_id)
+
+        # Verify
+        self.assertFalse(self.mock_upload_bindings.find_existing_units.called)
+        self.assertTrue(self.mock_upload_bindings.upload_segment.called)
+        tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
+        self.assertEqual(None, tracker.unit_id)
+
+    def test_upload_existing_unit_unsupported(self):
+        # Setup
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1',
+                                                          {'k': 'v'}, 'm-1')
+        self.mock_upload_bindings.find_existing_units.side_effect = NotFoundException({})
+
+        # Test
+        self.upload_manager.upload(upload_id)
+
+        # Verify
+        self.assertTrue(self.mock_upload_bindings.upload_segment.called)
+        tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
+        self.assertEqual(None, tracker.unit_id)
+        self.assertTrue(tracker.is_finished_uploading)
+
     def test_upload_concurrent_upload(self):
         # Setup
         self.upload_manager.initialize()
@@ -433,6 +584,12 @@ class UploadManagerTests(unittest.TestCase):
         """
         self.mock_upload_bindings.upload_segment.return_value = Response(200, {})
 
+    def _mock_find_existing_units(self):
+        """
+        Configures the mock bindings to report that units are not stored on the server.
+        """
+        self.mock_upload_bindings.find_existing_units.return_value = Response(200, [None])
+
     def _mock_delete_upload(self):
         """
         Configures the mock bindings to return a valid response to deleting an upload.
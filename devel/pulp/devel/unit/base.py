@@ -21,6 +21,7 @@ DEFAULT_CONFIG = {
         'verify_ssl': 'true',
         'ca_path': '/etc/pki/tls/certs/ca-bundle.crt',
         'upload_chunk_size': '1048576',
+        'upload_threads': '1',
     },
     'client': {
         'role': 'admin'
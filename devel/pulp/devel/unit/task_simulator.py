@@ -123,6 +123,36 @@ class TaskSimulator(object):
 
         return response
 
+    def get_tasks(self, task_ids, states=None, timeout=None):
+        """
+        Returns the next state for each of the given tasks. Unlike get_task, the last state
+        configured for a task is returned for all further requests, in the same way the server
+        keeps returning a completed task.
+
+        The states and timeout parameters are accepted for compatibility with the bindings but
+        are not used; the simulated server never waits. Task IDs without any states configured
+        are reported as missing, as the server does for tasks that do not exist.
+
+        :return: response object as if the bindings had contacted the server
+        :rtype:  pulp.bindings.response.Response
+        """
+        task_list = []
+        missing_task_ids = []
+        for task_id in task_ids:
+            if task_id not in self.tasks_by_id:
+                missing_task_ids.append(task_id)
+                continue
+
+            states_for_id = self.tasks_by_id[task_id]
+            if len(states_for_id) > 1:
+                task_list.append(states_for_id.pop())
+            else:
+                task_list.append(states_for_id[0])
+
+        response = responses.Response('200', {'tasks': task_list,
+                                              'missing_task_ids': missing_task_ids})
+        return response
+
     def get_all_tasks(self, tags=()):
         """
         Returns the next state for all tasks that match the given tags, if any. The index
@@ -76,6 +76,23 @@ class TaskSimulatorTests(unittest.TestCase):
 
         self.assertEqual(0, len(sim.tasks_by_id[task_id]))
 
+    def test_get_tasks(self):
+        # Setup
+        sim = TaskSimulator()
+        sim.add_task_states('task-1', ['waiting', 'running', 'success'])
+        sim.add_task_states('task-2', ['waiting', 'success'])
+
+        # Test & Verify
+        for expected in (['waiting', 'waiting'], ['running', 'success'],
+                         ['success', 'success']):
+            found = sim.get_tasks(['task-1', 'task-2']).response_body
+            self.assertEqual([task.state for task in found['tasks']], expected)
+            self.assertEqual(found['missing_task_ids'], [])
+
+        found = sim.get_tasks(['task-1', 'task-3']).response_body
+        self.assertEqual([task.task_id for task in found['tasks']], ['task-1'])
+        self.assertEqual(found['missing_task_ids'], ['task-3'])
+
     def test_get_all_tasks(self):
         # Setup
         sim = TaskSimulator()
@@ -1,3 +1,5 @@
+from threading import RLock
+
 from pulp_node.error import ErrorList
 from pulp_node.reports import RepositoryReport, RepositoryProgress
 
@@ -85,6 +87,7 @@ class HandlerProgress(object):
         self.conduit = conduit
         self.state = self.PENDING
         self.progress = []
+        self.__mutex = RLock()
 
     def started(self, bindings):
         """
@@ -137,9 +140,14 @@ class HandlerProgress(object):
     def _updated(self):
         """
         Notification that the report has been updated.
-        Reported using the conduit.
-        """
-        self.conduit.update_progress(self.dict())
+        Reported using the conduit.  Serialized because repositories
+        may be synchronized concurrently.
+        """
+        self.__mutex.acquire()
+        try:
+            self.conduit.update_progress(self.dict())
+        finally:
+            self.__mutex.release()
 
     def dict(self):
         return dict(
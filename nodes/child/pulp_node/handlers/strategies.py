@@ -1,6 +1,8 @@
 from gettext import gettext as _
 from logging import getLogger
 from operator import itemgetter
+from Queue import Queue, Empty
+from threading import Thread
 
 from pulp_node import constants
 from pulp_node.error import NodeError, CaughtException
@@ -32,6 +34,8 @@ class Request(object):
     :type scope: str
     :ivar options: synchronization options.
     :type options: dict
+    :ivar concurrency: The number of repositories synchronized concurrently.
+    :type concurrency: int
     """
 
     def __init__(self, conduit, progress, summary, bindings, scope, options):
@@ -55,6 +59,10 @@ class Request(object):
         self.bindings = sorted(bindings, key=itemgetter('repo_id'))
         self.scope = scope
         self.options = options
+        concurrency = options.get(constants.MAX_REPOSITORY_CONCURRENCY_KEYWORD)
+        concurrency = concurrency or constants.DEFAULT_REPOSITORY_CONCURRENCY
+        # each repository needs at least one download
+        self.concurrency = max(1, min(concurrency, len(self.bindings), self.max_downloads()))
         summary.setup(self.bindings)
 
     def cancelled(self):
@@ -65,6 +73,32 @@ class Request(object):
         """
         return self.conduit.cancelled()
 
+    def max_downloads(self):
+        """
+        Get the maximum number of concurrent downloads for the node as a whole.
+        :return: The download concurrency.
+        :rtype: int
+        """
+        max_downloads = self.options.get(constants.MAX_DOWNLOAD_CONCURRENCY_KEYWORD)
+        return max_downloads or constants.DEFAULT_DOWNLOAD_CONCURRENCY
+
+    def repository_options(self):
+        """
+        Get the options used to synchronize each repository.
+        When repositories are synchronized concurrently, the download concurrency
+        is divided among them so the node as a whole stays within the limit.
+        The repository concurrency never exceeds the download concurrency, so
+        each repository is left at least one download.
+        :return: synchronization options.
+        :rtype: dict
+        """
+        if self.concurrency == 1:
+            return self.options
+        options = dict(self.options)
+        max_downloads = self.max_downloads() / self.concurrency
+        options[constants.MAX_DOWNLOAD_CONCURRENCY_KEYWORD] = max_downloads
+        return options
+
     def started(self):
         """
         Processing of the request has started.
@@ -128,34 +162,76 @@ class HandlerStrategy(object):
         Add or update repositories based on bindings.
           - Merge repositories found in BOTH parent and child.
           - Add repositories found in the parent but NOT in the child.
+        Repositories are merged concurrently by a pool of workers
+        when the request concurrency is greater than one.
         :param request: A synchronization request.
         :type request: SyncRequest
         """
+        if request.concurrency == 1:
+            for bind in request.bindings:
+                self._merge_repository(request, bind)
+            return
+        queue = Queue()
         for bind in request.bindings:
+            queue.put(bind)
+        workers = []
+        for n in range(request.concurrency):
+            worker = Thread(target=self._merge_worker, args=(request, queue))
+            worker.setDaemon(True)
+            worker.start()
+            workers.append(worker)
+        for worker in workers:
+            worker.join()
+
+    def _merge_worker(self, request, queue):
+        """
+        Merge repositories (bindings) taken from the queue until it is empty.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param queue: A queue of consumer binding payloads.
+        :type queue: Queue.Queue
+        """
+        while True:
             try:
-                repo_id = bind['repo_id']
-                details = bind['details']
-                if request.cancelled():
-                    request.summary[repo_id].action = RepositoryReport.CANCELLED
-                    continue
-                parent = model.Repository(repo_id, details)
-                child = model.Repository.fetch(repo_id)
-                progress = request.progress.find_report(repo_id)
-                progress.begin_merging()
-                if child:
-                    request.summary[repo_id].action = RepositoryReport.MERGED
-                    child.merge(parent)
-                else:
-                    child = model.Repository(repo_id, parent.details)
-                    request.summary[repo_id].action = RepositoryReport.ADDED
-                    child.add()
-                self._synchronize_repository(request, repo_id)
-            except NodeError, ne:
-                request.summary.errors.append(ne)
-            except Exception, e:
-                log.exception(repo_id)
-                error = CaughtException(e, repo_id)
-                request.summary.errors.append(error)
+                bind = queue.get_nowait()
+            except Empty:
+                break
+            self._merge_repository(request, bind)
+
+    def _merge_repository(self, request, bind):
+        """
+        Add or update the repository referenced by a binding.
+        Errors are recorded in the summary report and not raised so that
+        a failure does not affect the other repositories.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param bind: A consumer binding payload.
+        :type bind: dict
+        """
+        repo_id = bind['repo_id']
+        try:
+            details = bind['details']
+            if request.cancelled():
+                request.summary[repo_id].action = RepositoryReport.CANCELLED
+                return
+            parent = model.Repository(repo_id, details)
+            child = model.Repository.fetch(repo_id)
+            progress = request.progress.find_report(repo_id)
+            progress.begin_merging()
+            if child:
+                request.summary[repo_id].action = RepositoryReport.MERGED
+                child.merge(parent)
+            else:
+                child = model.Repository(repo_id, parent.details)
+                request.summary[repo_id].action = RepositoryReport.ADDED
+                child.add()
+            self._synchronize_repository(request, repo_id)
+        except NodeError, ne:
+            request.summary.errors.append(ne)
+        except Exception, e:
+            log.exception(repo_id)
+            error = CaughtException(e, repo_id)
+            request.summary.errors.append(error)
 
     def _synchronize_repository(self, request, repo_id):
         """
@@ -171,7 +247,8 @@ class HandlerStrategy(object):
             progress.finished()
             return
         repo = model.Repository(repo_id)
-        importer_report = repo.run_synchronization(progress, request.cancelled, request.options)
+        options = request.repository_options()
+        importer_report = repo.run_synchronization(progress, request.cancelled, options)
         if request.cancelled():
             request.summary[repo_id].action = RepositoryReport.CANCELLED
             return
@@ -1,6 +1,7 @@
 import os
 import tarfile
 
+from pulp.plugins.model import Unit
 from pulp.server.content.sources.container import Listener
 from pulp.server.content.sources.model import Request
 from pulp_node import constants
@@ -83,8 +84,10 @@ class ContentDownloadListener(Listener):
         A specific download (request) has succeeded.
           1. Fetch the content unit using the reference.
           2. Update the storage_path on the unit.
-          3. Add the unit.
-          4. Extract downloaded tarballs as needed.
+          3. Extract downloaded tarballs as needed.
+          4. Add the unit, which releases the download claim.
+        The unit is added last so that the files are complete when other
+        tasks waiting on the download reuse them.
         :param request: The download request that succeeded.
         :type request: Request
         """
@@ -92,17 +95,20 @@ class ContentDownloadListener(Listener):
         unit_ref = request.data[UNIT_REF]
         unit = unit_ref.fetch()
         unit[constants.STORAGE_PATH] = storage_path
-        self._strategy.add_unit(self.request, unit)
         if unit.get(constants.TARBALL_PATH):
             untar_dir(request.destination, storage_path)
+        self._strategy.add_unit(self.request, unit)
 
     def download_failed(self, request):
         """
         A specific download (request) has failed.
-        Append download request errors to our list of errors.
+        Append download request errors to our list of errors and release
+        the download claim so that another task may download the file.
         :param request: The download request that failed.
         :type request: Request
         """
         for msg in request.errors:
             error = UnitDownloadError(request.url, self.request.repo_id, msg)
             self.error_list.append(error)
+        claim = Unit(request.type_id, request.unit_key, {}, request.data[STORAGE_PATH])
+        self.request.conduit.release_download(claim)
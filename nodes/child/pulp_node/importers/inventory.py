@@ -1,101 +1,113 @@
 from pulp_node import constants
-
-
-class UniqueKey(object):
-    """
-    A unique unit key consisting of a unit's type_id & unit_key.
-    The unit key is sorted to ensure consistency.
-    :ivar uid: The unique ID.
-    :type uid: A tuple of: (type_id, unit_key)
-    """
-
-    def __init__(self, unit):
-        """
-        :param unit: A content unit.
-        :type unit: dict
-        """
-        type_id = unit['type_id']
-        unit_key = tuple(sorted(unit['unit_key'].items()))
-        self.uid = (type_id, unit_key)
-
-    def __hash__(self):
-        return hash(self.uid)
-
-    def __eq__(self, other):
-        return self.uid == other.uid
-
-    def __ne__(self, other):
-        return self.uid != other.uid
+from pulp_node.manifest import UnitIndex, unit_locator
 
 
 class UnitInventory(object):
     """
     The unit inventory contains both the parent and child inventory
-    of content units associated with a specific repository.  Each is contained
-    within a dictionary keyed by {UnitKey} to ensure uniqueness.
+    of content units associated with a specific repository.  The child
+    inventory is contained within a dictionary keyed by unit locator to
+    ensure uniqueness.  Only what is needed to compare and remove child
+    units is kept: (type_id, unit_id, last_updated).  The parent inventory
+    is streamed from the (indexed) units file each time it is needed rather
+    than being held in memory.
     """
 
-    @staticmethod
-    def _import_parent_units(units):
-        _units = {}
-        for unit, ref in units:
-            unit.pop('metadata', None)
-            key = UniqueKey(unit)
-            _units[key] = (unit, ref)
-        return _units
-
     @staticmethod
     def _import_child_units(units):
         _units = {}
+        type_ids = {}
         for unit in units:
-            unit.pop('metadata', None)
-            key = UniqueKey(unit)
-            _units[key] = unit
+            key = unit_locator(unit)
+            type_id = type_ids.setdefault(unit['type_id'], unit['type_id'])
+            _units[key] = (type_id, unit['unit_id'], unit.get(constants.LAST_UPDATED, 0))
         return _units
 
     def __init__(self, base_URL, parent_units, child_units):
         """
         :param base_URL: The base URL for downloading parent units.
         :param parent_units: The content units in the parent node.
+            An iterable of (unit, ref) that may be iterated more than once.
+            When it has an index (UnitIterator), the index is used to find
+            parent units by locator.
         :type parent_units: iterable
         :param child_units: The content units in the child node.
         :type child_units: iterable
         """
         self.base_URL = base_URL
-        self.parent_units = self._import_parent_units(parent_units)
+        self.parent_units = parent_units
         self.child_units = self._import_child_units(child_units)
 
+    def _parent_units(self):
+        """
+        Stream the parent units.
+        :return: A generator of (locator, unit, ref).
+        :rtype: generator
+        """
+        for unit, ref in self.parent_units:
+            unit.pop('metadata', None)
+            yield unit_locator(unit), unit, ref
+
+    def _parent_index(self):
+        """
+        Get an object used to determine if a unit is contained in
+        the parent inventory by locator.
+        :return: The parent units file index or a set of locators.
+        :rtype: pulp_node.manifest.UnitIndex|set
+        """
+        index = getattr(self.parent_units, 'index', None)
+        if not isinstance(index, UnitIndex):
+            index = set(key for key, unit, ref in self._parent_units())
+        return index
+
     def units_on_parent_only(self):
         """
         Listing of units contained in the parent inventory
         but not contained in the child inventory.
-        :return: List of (unit, ref).
-        :rtype: list
+        :return: A generator of (unit, ref).
+        :rtype: generator
+        """
+        for key, unit, ref in self._parent_units():
+            if key not in self.child_units:
+                yield unit, ref
+
+    def count_units_on_parent_only(self):
+        """
+        Count the units contained in the parent inventory
+        but not contained in the child inventory.
+        :return: The number of units.
+        :rtype: int
         """
-        return [r for k, r in self.parent_units.items() if k not in self.child_units]
+        index = getattr(self.parent_units, 'index', None)
+        if not isinstance(index, UnitIndex):
+            return sum(1 for unit in self.units_on_parent_only())
+        on_both = sum(1 for key in self.child_units if key in index)
+        return len(index) - on_both
 
     def units_on_child_only(self):
         """
         Listing of units contained in the child inventory
         but not contained in the parent inventory.
-        :return: List of units that need to be purged.
-        :rtype: list
+        :return: A generator of units that need to be purged.
+            Each unit has only the type_id and unit_id.
+        :rtype: generator
         """
-        return [u for k, u in self.child_units.items() if k not in self.parent_units]
+        index = self._parent_index()
+        for key, (type_id, unit_id, last_updated) in self.child_units.iteritems():
+            if key not in index:
+                yield dict(type_id=type_id, unit_id=unit_id)
 
     def updated_units(self):
         """
         Listing of units updated on the parent.
-        :return: List of (unit, ref).
-        :rtype: list
+        :return: A generator of (unit, ref).
+        :rtype: generator
         """
-        updated = []
-        for key, (unit, ref) in self.parent_units.items():
+        for key, unit, ref in self._parent_units():
             child_unit = self.child_units.get(key)
             if child_unit is None:
                 continue
             parent_last_updated = unit.get(constants.LAST_UPDATED, 0)
-            child_last_updated = child_unit.get(constants.LAST_UPDATED, 0)
+            child_last_updated = child_unit[2]
             if parent_last_updated > child_last_updated:
-                updated.append((unit, ref))
-        return updated
+                yield unit, ref
@@ -6,6 +6,7 @@ the strategies provided here.
 
 import os
 import errno
+import time
 
 from gettext import gettext as _
 from logging import getLogger
@@ -13,6 +14,7 @@ from logging import getLogger
 from pulp.plugins.model import Unit, AssociatedUnit
 from pulp.server.config import config as pulp_conf
 from pulp.server.content.sources.container import ContentContainer
+from pulp.server.content.sources.model import DownloadDetails
 
 from pulp_node import constants
 from pulp_node import pathlib
@@ -29,6 +31,9 @@ _log = getLogger(__name__)
 
 STRATEGY_UNSUPPORTED = _('Importer strategy "%(s)s" not supported')
 
+# The maximum number of seconds to wait on files being downloaded by other tasks.
+DOWNLOAD_WAIT_TIMEOUT = 3600
+
 
 class Request(object):
     """
@@ -185,8 +190,9 @@ class ImporterStrategy(object):
             fetched_manifest.fetch()
             if manifest != fetched_manifest or \
                     not manifest.is_valid() or not manifest.has_valid_units():
-                fetched_manifest.write()
-                fetched_manifest.fetch_units()
+                if not self._apply_delta(request, manifest, fetched_manifest):
+                    fetched_manifest.write()
+                    fetched_manifest.fetch_units()
                 manifest = fetched_manifest
             if not manifest.is_valid():
                 raise InvalidManifestError()
@@ -202,6 +208,36 @@ class ImporterStrategy(object):
         inventory = UnitInventory(base_URL, parent_units, child_units)
         return inventory
 
+    def _apply_delta(self, request, manifest, fetched_manifest):
+        """
+        Build the units file for the fetched manifest by applying the delta
+        published by the parent to the units file of the cached manifest.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param manifest: The cached manifest.
+        :type manifest: Manifest
+        :param fetched_manifest: The fetched manifest.
+        :type fetched_manifest: RemoteManifest
+        :return: True if applied.  False when no suitable delta has been published
+            or it could not be applied and the full units file must be fetched.
+        :rtype: bool
+        """
+        if not fetched_manifest.has_delta(manifest):
+            return False
+        if not manifest.is_valid() or not manifest.has_valid_units():
+            return False
+        try:
+            units_path = manifest.unzip_units(manifest.units_path())
+            delta_path = fetched_manifest.fetch_delta(manifest.id)
+            try:
+                fetched_manifest.apply_delta(units_path, delta_path)
+            finally:
+                os.unlink(delta_path)
+            return True
+        except Exception:
+            _log.exception(request.repo_id)
+            return False
+
     def _reset_storage_path(self, unit):
         """
         Reset the storage_path using the storage_dir defined in
@@ -224,41 +260,170 @@ class ImporterStrategy(object):
         Determine the list of units contained in the parent inventory
         but are not contained in the child inventory and add them.
         For each unit, this is performed in the following steps:
-          1. Download the file (if defined) associated with the unit.
-          2. Add the unit to the child inventory.
-          3. Associate the unit to the repository.
+          1. Claim the download of the file (if defined) associated with the unit.
+          2. Download the file, unless another task has already downloaded it.
+          3. Add the unit to the child inventory.
+          4. Associate the unit to the repository.
         The unit is added only:
           1. If no file is associated with unit.
-          2. The file associated with the unit is successfully downloaded.
-        For units with files, the unit is added to the inventory as part of the
-        unit download manager callback.
+          2. The file associated with the unit is successfully downloaded
+             or was downloaded by another task.
+        For units with files that are downloaded, the unit is added to the inventory
+        as part of the unit download manager callback.
+        Units with files being downloaded by another task are deferred.  They are
+        waited on once the downloads claimed by this task are finished and released,
+        so that two tasks never wait on each other's claims.
         :param request: A synchronization request.
         :type request: SyncRequest
         :param unit_inventory: The inventory of both parent and child content units.
         :type unit_inventory: UnitInventory
         """
-        download_list = []
+        deadline = time.time() + DOWNLOAD_WAIT_TIMEOUT
+        request.progress.begin_adding_units(unit_inventory.count_units_on_parent_only())
         units = unit_inventory.units_on_parent_only()
-        request.progress.begin_adding_units(len(units))
-        listener = ContentDownloadListener(self, request)
-        for unit, unit_ref in units:
+        deferred = self._download_units(request, unit_inventory.base_URL, units)
+        while deferred:
             if request.cancelled():
                 return
-            self._reset_storage_path(unit)
-            if not self._needs_download(unit):
-                # unit has no file associated
-                self.add_unit(request, unit_ref.fetch())
-                continue
-            unit_path, destination = self._path_and_destination(unit)
-            unit_URL = pathlib.url_join(unit_inventory.base_URL, unit_path)
-            _request = listener.create_request(unit_URL, destination, unit, unit_ref)
-            download_list.append(_request)
-        if request.cancelled():
-            return
-        container = ContentContainer()
-        request.summary.sources = \
-            container.download(request.cancel_event, request.downloader, download_list, listener)
-        request.summary.errors.extend(listener.error_list)
+            deferred = self._wait_downloads(request, deferred, deadline)
+            deferred = self._download_units(request, unit_inventory.base_URL, deferred)
+
+    def _download_units(self, request, base_URL, units):
+        """
+        Claim, download and add the specified units.
+        The claims are all released before returning.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param base_URL: The base URL of the parent units.
+        :type base_URL: str
+        :param units: An iterable of: (unit, unit_ref).
+        :type units: iterable
+        :return: The list of: (unit, unit_ref) with files being downloaded by
+            another task.
+        :rtype: list
+        """
+        try:
+            download_list = []
+            deferred = []
+            listener = ContentDownloadListener(self, request)
+            for unit, unit_ref in units:
+                if request.cancelled():
+                    return []
+                self._reset_storage_path(unit)
+                if not self._needs_download(unit):
+                    # unit has no file associated
+                    self.add_unit(request, unit_ref.fetch())
+                    continue
+                try:
+                    claimed = self._claim_download(request, unit)
+                except Exception:
+                    _log.exception(unit[constants.STORAGE_PATH])
+                    request.summary.errors.append(AddUnitError(request.repo_id))
+                    continue
+                if claimed is None:
+                    # the file is being downloaded by another task
+                    deferred.append((unit, unit_ref))
+                    continue
+                if not claimed:
+                    # the file has been downloaded by another task
+                    fetched = unit_ref.fetch()
+                    fetched[constants.STORAGE_PATH] = unit[constants.STORAGE_PATH]
+                    self.add_unit(request, fetched)
+                    continue
+                unit_path, destination = self._path_and_destination(unit)
+                unit_URL = pathlib.url_join(base_URL, unit_path)
+                _request = listener.create_request(unit_URL, destination, unit, unit_ref)
+                download_list.append(_request)
+            if request.cancelled():
+                return []
+            container = ContentContainer()
+            report = container.download(
+                request.cancel_event, request.downloader, download_list, listener)
+            self._update_sources(request, report)
+            request.summary.errors.extend(listener.error_list)
+            return deferred
+        finally:
+            # downloads that were cancelled or never finished
+            request.conduit.release_downloads()
+
+    def _wait_downloads(self, request, units, deadline):
+        """
+        Wait for other tasks to finish downloading the files associated with units.
+        Must only be called when no downloads are claimed by this task.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param units: A list of: (unit, unit_ref).
+        :type units: list
+        :param deadline: The time at which to stop waiting.
+        :type deadline: float
+        :return: The list of: (unit, unit_ref) no longer being downloaded.
+        :rtype: list
+        """
+        finished = []
+        for unit, unit_ref in units:
+            if request.cancelled():
+                return []
+            timeout = max(deadline - time.time(), 0)
+            try:
+                if request.conduit.wait_download(self._claim(unit), timeout=timeout):
+                    finished.append((unit, unit_ref))
+                    continue
+                _log.error(_('Timed out waiting on download of: %(p)s'),
+                           {'p': unit[constants.STORAGE_PATH]})
+            except Exception:
+                _log.exception(unit[constants.STORAGE_PATH])
+            request.summary.errors.append(AddUnitError(request.repo_id))
+        return finished
+
+    def _update_sources(self, request, report):
+        """
+        Add the statistics of a content container download to the summary.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param report: A content container download report.
+        :type report: pulp.server.content.sources.model.DownloadReport
+        """
+        sources = request.summary.sources
+        sources.total_sources = report.total_sources
+        for source_id, details in report.downloads.items():
+            summed = sources.downloads.setdefault(source_id, DownloadDetails())
+            summed.total_succeeded += details.total_succeeded
+            summed.total_failed += details.total_failed
+
+    def _claim(self, unit):
+        """
+        Build the claim used to coordinate the download of the file associated
+        with a unit with other tasks.
+        :param unit: A content unit.
+        :type unit: dict
+        :return: The claim.
+        :rtype: Unit
+        """
+        return Unit(
+            type_id=unit[constants.TYPE_ID],
+            unit_key=unit[constants.UNIT_KEY],
+            metadata={},
+            storage_path=unit[constants.STORAGE_PATH])
+
+    def _claim_download(self, request, unit):
+        """
+        Claim the download of the file associated with a unit so that concurrent
+        synchronizations of repositories that share the unit download it only once.
+        Never waits on another task.  When the file has been downloaded by another
+        task, the storage path of the unit is updated to reference it.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param unit: A content unit.
+        :type unit: dict
+        :return: True if the file needs to be downloaded.  False if it has been
+            downloaded by another task.  None if another task is downloading it.
+        :rtype: bool
+        """
+        claim = self._claim(unit)
+        claimed = request.conduit.try_claim_download(claim)
+        if claimed is False:
+            unit[constants.STORAGE_PATH] = claim.storage_path
+        return claimed
 
     def _update_units(self, request, unit_inventory):
         """
@@ -321,7 +486,7 @@ class ImporterStrategy(object):
             try:
                 _unit = AssociatedUnit(
                     type_id=unit['type_id'],
-                    unit_key=unit['unit_key'],
+                    unit_key={},
                     metadata={},
                     storage_path=None,
                     created=None,
@@ -18,8 +18,13 @@ json encoded file.  For performance reasons, the unit files are compressed.
 
 import os
 import gzip
+import heapq
+import mmap
 import errno
+import struct
+import tempfile
 
+from hashlib import sha256
 from logging import getLogger
 
 from nectar.request import DownloadRequest
@@ -39,6 +44,10 @@ log = getLogger(__name__)
 MANIFEST_VERSION = 2
 MANIFEST_FILE_NAME = 'manifest.json'
 UNITS_FILE_NAME = 'units.json.gz'
+DELTAS_DIR_NAME = 'deltas'
+DELTA_FILE_NAME = '%s.json.gz'
+HISTORY_DIR_NAME = 'history'
+INDEX_SUFFIX = '.idx'
 
 ID = 'id'
 VERSION = 'version'
@@ -48,6 +57,9 @@ UNITS = 'units'
 UNITS_PATH = 'path'
 UNITS_TOTAL = 'total'
 UNITS_SIZE = 'size'
+DELTAS = 'deltas'
+DELTA_ADDED = 'added'
+DELTA_REMOVED = 'removed'
 
 
 # --- utils -----------------------------------------------------------------------------
@@ -76,6 +88,187 @@ def unzip(path, destination, bfrlen=65535):
         fp_in.close()
 
 
+def unzip_and_index(path, destination):
+    """
+    Unzip the units file at the specified path and build the index
+    for the uncompressed units file while unzipping.
+    :param path: The path to the compressed units file.
+    :type path: str
+    :param destination: The destination path.
+    :type destination: str
+    :raise IOError: on any i/o error.
+    :raise ValueError: json decoding errors
+    """
+    index = IndexWriter(destination + INDEX_SUFFIX)
+    fp_in = gzip.open(path)
+    try:
+        with open(destination, 'w+') as fp_out:
+            offset = 0
+            for json_unit in fp_in:
+                fp_out.write(json_unit)
+                index.add(json_unit, offset)
+                offset += len(json_unit)
+    finally:
+        fp_in.close()
+    index.close()
+
+
+def map_file(path):
+    """
+    Memory-map the file at the specified path (read-only).
+    :param path: The absolute path to a file.
+    :type path: str
+    :return: The memory-map or None when the file is empty.
+    :rtype: mmap.mmap
+    :raise IOError: on any i/o error.
+    """
+    with open(path, 'rb') as fp:
+        if not os.fstat(fp.fileno()).st_size:
+            return None
+        return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def build_index(path, index_path):
+    """
+    Build the index for the uncompressed units file at the specified path.
+    :param path: The path to the uncompressed units file.
+    :type path: str
+    :param index_path: The path to the index file.
+    :type index_path: str
+    :raise IOError: on any i/o error.
+    :raise ValueError: json decoding errors
+    """
+    index = IndexWriter(index_path)
+    with open(path) as fp:
+        offset = 0
+        for json_unit in fp:
+            index.add(json_unit, offset)
+            offset += len(json_unit)
+    index.close()
+
+
+def unit_locator(unit):
+    """
+    Get the locator for the specified unit.
+    The locator is the SHA256 of the json encoding of the type_id and unit_key
+    and uniquely identifies the unit within a units file.
+    :param unit: A content unit.
+    :type unit: dict
+    :return: The calculated locator string.
+    :rtype: str
+    """
+    h = sha256()
+    s = json.dumps((unit['type_id'], unit['unit_key']), separators=(',', ':'), sort_keys=True)
+    h.update(s)
+    return h.hexdigest()
+
+
+def unit_digest(unit):
+    """
+    Get the digest of the specified unit.
+    The digest is the SHA256 of the json encoding of the entire unit and
+    is used to detect units that have changed between publishing.
+    :param unit: A content unit.
+    :type unit: dict
+    :return: The calculated digest string.
+    :rtype: str
+    """
+    h = sha256()
+    s = json.dumps(unit, separators=(',', ':'), sort_keys=True)
+    h.update(s)
+    return h.hexdigest()
+
+
+def write_history(path, history):
+    """
+    Write the unit history to the file at the specified path.
+    The history is (1) "<locator> <digest>" pair per line and is
+    compressed for performance reasons.
+    :param path: The absolute path to the history file.
+    :type path: str
+    :param history: The unit history: {locator: digest}
+    :type history: dict
+    :raise IOError: on any i/o error.
+    """
+    fp = gzip.open(path, 'wb')
+    try:
+        for locator, digest in history.iteritems():
+            fp.write(' '.join((locator, digest)))
+            fp.write('\n')
+    finally:
+        fp.close()
+
+
+def read_history(path):
+    """
+    Read the unit history file at the specified path.
+    :param path: The absolute path to the history file.
+    :type path: str
+    :return: The unit history: {locator: digest}
+    :rtype: dict
+    :raise IOError: on any i/o error.
+    """
+    history = {}
+    fp = gzip.open(path)
+    try:
+        for line in fp:
+            locator, digest = line.split()
+            history[locator] = digest
+    finally:
+        fp.close()
+    return history
+
+
+def apply_delta(units_path, delta_path, destination):
+    """
+    Apply the delta at the specified path to an uncompressed units file.
+    Units removed or changed by the delta are dropped and units added or
+    changed by the delta are appended.  The original units file is not modified.
+    :param units_path: The path to the (uncompressed) units file on which the delta is based.
+    :type units_path: str
+    :param delta_path: The path to the (compressed) delta file.
+    :type delta_path: str
+    :param destination: The path to the resulting (uncompressed) units file.
+        The index for the resulting units file is built as well.
+    :type destination: str
+    :return: The number of units in the resulting units file.
+    :rtype: int
+    :raise IOError: on any i/o error.
+    :raise ValueError: json decoding errors
+    """
+    removed = set()
+    added = []
+    fp_in = gzip.open(delta_path)
+    try:
+        for line in fp_in:
+            entry = json.loads(line)
+            if DELTA_REMOVED in entry:
+                removed.add(entry[DELTA_REMOVED])
+            else:
+                unit = entry[DELTA_ADDED]
+                removed.add(unit_locator(unit))
+                added.append(unit)
+    finally:
+        fp_in.close()
+    index = IndexWriter(destination + INDEX_SUFFIX)
+    offset = 0
+    with open(destination, 'w+') as fp_out:
+        with open(units_path) as fp_in:
+            for json_unit in fp_in:
+                if unit_locator(json.loads(json_unit)) in removed:
+                    continue
+                fp_out.write(json_unit)
+                index.add(json_unit, offset)
+                offset += len(json_unit)
+        for unit in added:
+            json_unit = json.dumps(unit) + '\n'
+            fp_out.write(json_unit)
+            index.add(json_unit, offset)
+            offset += len(json_unit)
+    index.close()
+    return len(index)
+
+
 # --- manifest --------------------------------------------------------------------------
 
 
@@ -90,6 +283,9 @@ class Manifest(object):
     :type total_units: int
     :param publishing_details: Details of how units have been published.
     :type publishing_details: dict
+    :ivar deltas: The IDs of previously published manifests for which
+        a delta to this manifest has been published.
+    :type deltas: list
     """
 
     def __init__(self, path, manifest_id=None):
@@ -104,6 +300,7 @@ class Manifest(object):
         self.version = MANIFEST_VERSION
         self.units = {UNITS_PATH: None, UNITS_TOTAL: 0, UNITS_SIZE: 0}
         self.publishing_details = {}
+        self.deltas = []
         if os.path.isdir(path):
             path = pathlib.join(path, MANIFEST_FILE_NAME)
         self.path = path
@@ -118,7 +315,8 @@ class Manifest(object):
             ID: self.id,
             VERSION: self.version,
             UNITS: self.units,
-            PUBLISHING_DETAILS: self.publishing_details
+            PUBLISHING_DETAILS: self.publishing_details,
+            DELTAS: self.deltas
         }
         with open(self.path, 'w+') as fp:
             json.dump(state, fp, indent=2)
@@ -138,6 +336,7 @@ class Manifest(object):
         self.version = d.get(VERSION, 0)
         self.units = d.get(UNITS, {UNITS_PATH: None, UNITS_TOTAL: 0, UNITS_SIZE: 0})
         self.publishing_details = d.get(PUBLISHING_DETAILS, {})
+        self.deltas = d.get(DELTAS, [])
 
     def get_units(self):
         """
@@ -151,7 +350,10 @@ class Manifest(object):
         if total:
             path = self.units_path()
             path = self.unzip_units(path)
-            return UnitIterator(path, total)
+            index_path = path + INDEX_SUFFIX
+            if not os.path.exists(index_path):
+                build_index(path, index_path)
+            return UnitIterator(path, total, UnitIndex(index_path))
         else:
             return []
 
@@ -215,7 +417,7 @@ class Manifest(object):
         if not self.has_valid_units():
             return path
         destination = path[:-3]
-        unzip(path, destination)
+        unzip_and_index(path, destination)
         self.units[UNITS_PATH] = destination
         self.units[UNITS_SIZE] = os.path.getsize(destination)
         os.unlink(path)
@@ -229,6 +431,44 @@ class Manifest(object):
         """
         return self.units[UNITS_PATH] or pathlib.join(os.path.dirname(self.path), UNITS_FILE_NAME)
 
+    def has_delta(self, manifest):
+        """
+        Get whether a delta from the specified manifest to this manifest
+        has been published.
+        :param manifest: A previously published manifest.
+        :type manifest: Manifest
+        :return: True if a delta has been published.
+        :rtype: bool
+        """
+        return manifest.id in self.deltas
+
+    def apply_delta(self, units_path, delta_path):
+        """
+        Build the units file referenced by this manifest by applying a delta
+        to the (uncompressed) units file of a previously published manifest.
+        The manifest is updated and written to reference the built units file.
+        :param units_path: The path to the units file on which the delta is based.
+        :type units_path: str
+        :param delta_path: The path to the delta file.
+        :type delta_path: str
+        :raise IOError: on any i/o error.
+        :raise ValueError: json decoding errors or when the built units file
+            does not contain the expected number of units.
+        """
+        destination = units_path[:-3] if units_path.endswith('.gz') else units_path
+        tmp_path = pathlib.join(os.path.dirname(destination), '.' + os.path.basename(destination))
+        total = apply_delta(units_path, delta_path, tmp_path)
+        if total != self.units[UNITS_TOTAL]:
+            os.unlink(tmp_path)
+            os.unlink(tmp_path + INDEX_SUFFIX)
+            msg = 'delta: %d units expected, found: %d' % (self.units[UNITS_TOTAL], total)
+            raise ValueError(msg)
+        os.rename(tmp_path, destination)
+        os.rename(tmp_path + INDEX_SUFFIX, destination + INDEX_SUFFIX)
+        self.units[UNITS_PATH] = destination
+        self.units[UNITS_SIZE] = os.path.getsize(destination)
+        self.write()
+
     def __eq__(self, other):
         if isinstance(other, Manifest):
             return self.id == other.id
@@ -292,6 +532,29 @@ class RemoteManifest(Manifest):
             report = listener.failed_reports[0]
             raise ManifestDownloadError(self.url, report.error_msg)
 
+    def fetch_delta(self, manifest_id):
+        """
+        Fetch the delta from the specified (previously published) manifest
+        to this manifest.
+        :param manifest_id: The ID of a previously published manifest.
+        :type manifest_id: str
+        :return: The absolute path to the downloaded delta file.
+        :rtype: str
+        :raise ManifestDownloadError: on downloading errors.
+        """
+        base_url = self.url.rsplit('/', 1)[0]
+        file_name = DELTA_FILE_NAME % manifest_id
+        url = pathlib.url_join(base_url, DELTAS_DIR_NAME, file_name)
+        destination = pathlib.join(os.path.dirname(self.path), '.' + file_name)
+        request = DownloadRequest(str(url), destination)
+        listener = AggregatingEventListener()
+        self.downloader.event_listener = listener
+        self.downloader.download([request])
+        if listener.failed_reports:
+            report = listener.failed_reports[0]
+            raise ManifestDownloadError(self.url, report.error_msg)
+        return destination
+
 
 class UnitWriter(object):
     """
@@ -369,43 +632,297 @@ class UnitWriter(object):
         return False
 
 
+class DeltaWriter(object):
+    """
+    Writes the json encoded delta between two published units files.
+    Each line is either a unit that was added (or changed) or the
+    locator of a unit that was removed.
+    :ivar path: The absolute path to the delta file.
+    :type path: str
+    :ivar fp: The file pointer used to write the delta.
+    :type fp: A python file object.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: The absolute path to the delta file.
+        :type path: str
+        :raise IOError: on I/O errors
+        """
+        self.path = path
+        self.fp = gzip.open(path, 'wb')
+
+    def add(self, unit):
+        """
+        Write a unit that was added or changed.
+        :param unit: A content unit.
+        :type unit: dict
+        :raise IOError: on I/O errors.
+        """
+        self.fp.write(json.dumps({DELTA_ADDED: unit}))
+        self.fp.write('\n')
+
+    def remove(self, locator):
+        """
+        Write the locator of a unit that was removed.
+        :param locator: A unit locator.
+        :type locator: str
+        :raise IOError: on I/O errors.
+        """
+        self.fp.write(json.dumps({DELTA_REMOVED: locator}))
+        self.fp.write('\n')
+
+    def close(self):
+        """
+        Close and compress the associated file.
+        """
+        self.fp.close()
+
+
+class IndexWriter(object):
+    """
+    Writes the index for an uncompressed units file.
+    The index is a sorted array of fixed length records of:
+    (locator, offset, length) where the locator is the binary SHA256 digest
+    of the unit's type_id and unit_key.  Records are written to a temporary
+    file in sorted runs of RUN_LENGTH records as they are added.  The runs
+    are merged into the index on close() so that the memory used does not
+    grow with the number of units.
+    :ivar path: The absolute path to the index file.
+    :type path: str
+    :ivar records: The (packed) records of the current run.
+    :type records: list
+    :ivar runs: The sorted runs written as: (first record, number of records).
+    :type runs: list
+    :ivar total: The number of records added.
+    :type total: int
+    """
+
+    # The number of records sorted in memory.
+    RUN_LENGTH = 65536
+
+    def __init__(self, path):
+        """
+        :param path: The absolute path to the index file.
+        :type path: str
+        :raise IOError: on I/O errors.
+        """
+        self.path = path
+        self.records = []
+        self.runs = []
+        self.total = 0
+        self.fp = tempfile.TemporaryFile(dir=os.path.dirname(path))
+
+    def add(self, json_unit, offset):
+        """
+        Add the json encoded unit written at the specified offset.
+        :param json_unit: A json encoded unit (including the line terminator).
+        :type json_unit: str
+        :param offset: The offset of the unit within the units file.
+        :type offset: int
+        :raise ValueError: json decoding errors
+        :raise IOError: on I/O errors.
+        """
+        locator = unit_locator(json.loads(json_unit)).decode('hex')
+        record = UnitIndex.RECORD.pack(locator, offset, len(json_unit))
+        self.records.append(record)
+        self.total += 1
+        if len(self.records) >= self.RUN_LENGTH:
+            self._write_run()
+
+    def close(self):
+        """
+        Merge the sorted runs and write the index.
+        :raise IOError: on I/O errors.
+        """
+        try:
+            if not self.runs:
+                self.records.sort()
+                with open(self.path, 'wb') as fp:
+                    fp.write(''.join(self.records))
+                return
+            self._write_run()
+            self.fp.flush()
+            runs_map = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                runs = [self._read_run(runs_map, first, count) for first, count in self.runs]
+                with open(self.path, 'wb') as fp:
+                    for record in heapq.merge(*runs):
+                        fp.write(record)
+            finally:
+                runs_map.close()
+        finally:
+            self.records = []
+            self.fp.close()
+
+    def _write_run(self):
+        """
+        Sort the records of the current run and write them to the temporary file.
+        :raise IOError: on I/O errors.
+        """
+        if not self.records:
+            return
+        self.records.sort()
+        self.runs.append((self.total - len(self.records), len(self.records)))
+        self.fp.write(''.join(self.records))
+        self.records = []
+
+    @staticmethod
+    def _read_run(runs_map, first, count):
+        """
+        Read the records of a sorted run.
+        :param runs_map: The memory-mapped temporary file.
+        :type runs_map: mmap.mmap
+        :param first: The position of the first record of the run.
+        :type first: int
+        :param count: The number of records in the run.
+        :type count: int
+        :return: A generator of (packed) records.
+        :rtype: generator
+        """
+        record_size = UnitIndex.RECORD.size
+        for offset in xrange(first * record_size, (first + count) * record_size, record_size):
+            yield runs_map[offset:offset + record_size]
+
+    def __len__(self):
+        return self.total
+
+
+class UnitIndex(object):
+    """
+    A memory-mapped index of an uncompressed units file used to find
+    units by locator in O(log n) without loading the units into memory.
+    :ivar path: The absolute path to the index file.
+    :type path: str
+    :ivar total: The number of indexed units.
+    :type total: int
+    """
+
+    # (locator, offset, length)
+    RECORD = struct.Struct('>32sQI')
+
+    def __init__(self, path):
+        """
+        :param path: The absolute path to the index file.
+        :type path: str
+        :raise IOError: on I/O errors.
+        """
+        self.path = path
+        self.map = map_file(path)
+        if self.map is not None:
+            self.total = len(self.map) / self.RECORD.size
+        else:
+            self.total = 0
+
+    def find(self, locator):
+        """
+        Find a unit by locator using a binary search.
+        :param locator: A unit locator.
+        :type locator: str
+        :return: The (offset, length) of the unit within the units file or None.
+        :rtype: tuple
+        """
+        locator = locator.decode('hex')
+        record_size = self.RECORD.size
+        low = 0
+        high = self.total
+        while low < high:
+            middle = (low + high) / 2
+            offset = middle * record_size
+            key = self.map[offset:offset + 32]
+            if key < locator:
+                low = middle + 1
+            elif key > locator:
+                high = middle
+            else:
+                unused, offset, length = self.RECORD.unpack_from(self.map, offset)
+                return offset, length
+        return None
+
+    def close(self):
+        """
+        Close (unmap) the index.
+        """
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+    def __contains__(self, locator):
+        return self.find(locator) is not None
+
+    def __len__(self):
+        return self.total
+
+
 class UnitIterator:
     """
     Used to iterate content units inventory file associated with a manifest.
     The file contains (1) json encoded unit per line.  The total number
-    of units in the file is reported by __len__().
+    of units in the file is reported by __len__().  The file is memory-mapped
+    and shared by all of the references yielded.  Each call to __iter__() starts
+    a new pass over the file.
+    :ivar index: An optional index of the units file.
+    :type index: UnitIndex
     """
 
     @staticmethod
-    def get_units(path):
-        with open(path) as fp:
-            while True:
-                begin = fp.tell()
-                json_unit = fp.readline()
-                end = fp.tell()
-                if json_unit:
-                    unit = json.loads(json_unit)
-                    length = (end - begin)
-                    ref = UnitRef(path, begin, length)
-                    yield (unit, ref)
-                else:
-                    break
-
-    def __init__(self, path, total_units):
+    def get_units(path, units_map=None):
+        if units_map is None:
+            units_map = map_file(path)
+            if units_map is None:
+                return
+        size = len(units_map)
+        begin = 0
+        while begin < size:
+            end = units_map.find('\n', begin)
+            if end < 0:
+                end = size
+            else:
+                end += 1
+            json_unit = units_map[begin:end]
+            unit = json.loads(json_unit)
+            length = (end - begin)
+            ref = UnitRef(path, begin, length, units_map)
+            yield (unit, ref)
+            begin = end
+
+    def __init__(self, path, total_units, index=None):
         """
         :param path: The absolute path to the units file to be iterated.
         :type path: str
         :param total_units: The number of units contained in the units file.
         :type total_units: int
+        :param index: An optional index of the units file.
+        :type index: UnitIndex
         """
-        self.unit_generator = UnitIterator.get_units(path)
+        self.path = path
+        self.units_map = map_file(path)
+        self.unit_generator = iter(self)
         self.total_units = total_units
+        self.index = index
+
+    def find(self, locator):
+        """
+        Find a unit by locator using the index.
+        :param locator: A unit locator.
+        :type locator: str
+        :return: The (unit, ref) or None when not found.
+        :rtype: tuple
+        """
+        found = self.index.find(locator)
+        if found is None:
+            return None
+        offset, length = found
+        ref = UnitRef(self.path, offset, length, self.units_map)
+        return ref.fetch(), ref
 
     def next(self):
         return self.unit_generator.next()
 
     def __iter__(self):
-        return self
+        if self.units_map is None:
+            return iter([])
+        return UnitIterator.get_units(self.path, self.units_map)
 
     def __len__(self):
         return self.total_units
@@ -420,9 +937,11 @@ class UnitRef(object):
     :type offset: int
     :ivar length: The length of a specific unit within the file.
     :type length: int
+    :ivar units_map: An optional memory-map of the units file.
+    :type units_map: mmap.mmap
     """
 
-    def __init__(self, path, offset, length):
+    def __init__(self, path, offset, length, units_map=None):
         """
         :param path: The absolute path to the units file.
         :type path: str
@@ -430,10 +949,13 @@ class UnitRef(object):
         :type offset: int
         :param length: The length of a specific unit within the file.
         :type length: int
+        :param units_map: An optional memory-map of the units file.
+        :type units_map: mmap.mmap
         """
         self.path = path
         self.offset = offset
         self.length = length
+        self.units_map = units_map
 
     def fetch(self):
         """
@@ -443,6 +965,9 @@ class UnitRef(object):
         :raise IOError: on I/O errors.
         :raise ValueError: json decoding errors
         """
+        if self.units_map is not None:
+            json_unit = self.units_map[self.offset:self.offset + self.length]
+            return json.loads(json_unit)
         with open(self.path) as fp:
             fp.seek(self.offset)
             json_unit = fp.read(self.length)
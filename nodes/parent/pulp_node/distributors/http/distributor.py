@@ -14,6 +14,7 @@ from pulp_node import constants
 from pulp_node import pathlib
 from pulp_node.conduit import NodesConduit
 from pulp_node.distributors.http.publisher import HttpPublisher
+from pulp_node.distributors.publisher import staging_path
 
 
 _logger = getLogger(__name__)
@@ -158,7 +159,8 @@ class NodesHttpDistributor(Distributor):
         """
         Called when a distributor of this type is removed from a repository.
 
-        This will delete any published node data from the filesystem.
+        This will delete any published node data from the filesystem, including
+        the tree kept for staging the next publish.
 
         :param repo:    metadata describing the repository
         :type  repo:    pulp.plugins.model.Repository
@@ -168,6 +170,7 @@ class NodesHttpDistributor(Distributor):
         _logger.debug(_('removing published node data for repo %s' % repo.id))
         repo_publish_path = self._get_publish_dir(repo.id, config)
         os.system('rm -rf %s' % repo_publish_path)
+        os.system('rm -rf %s' % staging_path(repo_publish_path))
 
     def _get_publish_dir(self, repo_id, config):
         """
@@ -10,20 +10,40 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import os
+import gzip
+import shutil
+import hashlib
 import tarfile
 
 from uuid import uuid4
-from tempfile import mkdtemp
 from logging import getLogger
 
+from pulp.server.compat import json
+
 from pulp_node import constants
 from pulp_node import pathlib
-from pulp_node.manifest import Manifest, UnitWriter
+from pulp_node.manifest import (Manifest, UnitWriter, DeltaWriter, unit_locator, unit_digest,
+                                read_history, write_history, UNITS_FILE_NAME, DELTAS_DIR_NAME,
+                                DELTA_FILE_NAME, HISTORY_DIR_NAME)
 
 
 log = getLogger(__name__)
 
 
+# The number of previously published manifests for which deltas are published.
+MAX_DELTAS = 5
+
+# The directory (within the publish directory) containing published tarballs
+# named by the digest of the directory contents.  Tarballs are carried forward
+# (hard linked) from the previous publish when the directory is unchanged.
+TARBALL_DIR_NAME = '.tarballs'
+
+# The directory (next to the publish directory) holding the tree retired by
+# the last commit.  The next publish is staged in it so that only the entries
+# of units added, changed or removed since that tree was published are updated.
+STAGING_DIR_NAME = '.%s.staging'
+
+
 # --- utils --------------------------------------------------------
 
 def tar_path(path):
@@ -57,6 +77,90 @@ def tar_dir(dir_path, tar_path, bufsize=65535):
         tb.close()
 
 
+def dir_digest(dir_path, bufsize=65535):
+    """
+    Calculate a digest of the directory contents.
+    The digest is based on the relative path and content of each file.
+    Symlinks are digested by their target, as they are stored in the tarball.
+    :param dir_path: The absolute path to a directory.
+    :type dir_path: str
+    :param bufsize: The buffer size to be used.
+    :type bufsize: int
+    :return: The hex digest.
+    :rtype: str
+    """
+    h = hashlib.sha256()
+    for root, dirs, files in os.walk(dir_path):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            h.update(os.path.relpath(path, dir_path))
+            if os.path.islink(path):
+                h.update('\0link\0%s\0' % os.readlink(path))
+                continue
+            h.update('\0%d\0' % os.path.getsize(path))
+            with open(path, 'rb') as fp:
+                while True:
+                    buf = fp.read(bufsize)
+                    if not buf:
+                        break
+                    h.update(buf)
+    return h.hexdigest()
+
+
+def read_entries(units_path):
+    """
+    Read the entries published for the units in a units file.
+    :param units_path: The absolute path to a units file.
+    :type units_path: str
+    :return: The storage path of each published file keyed by its path
+        relative to the publish directory.
+    :rtype: dict
+    :raise IOError: on I/O errors.
+    :raise ValueError: json decoding errors
+    """
+    entries = {}
+    fp = gzip.open(units_path)
+    try:
+        for json_unit in fp:
+            unit = json.loads(json_unit)
+            storage_path = unit.get(constants.STORAGE_PATH)
+            if not storage_path:
+                continue
+            relative_path = unit.get(constants.TARBALL_PATH) or unit[constants.RELATIVE_PATH]
+            entries[relative_path] = storage_path
+    finally:
+        fp.close()
+    return entries
+
+
+def staging_path(publish_dir):
+    """
+    Construct the path to the directory in which publishing is staged.
+    :param publish_dir: The publishing root directory for a repository.
+    :type publish_dir: str
+    :return: The absolute path to the staging directory.
+    :rtype: str
+    """
+    parent_path, name = os.path.split(os.path.normpath(publish_dir))
+    return pathlib.join(parent_path, STAGING_DIR_NAME % name)
+
+
+def link(source, target):
+    """
+    Hard link the target to the source.
+    The file is copied when hard links are not supported.
+    :param source: The absolute path to an existing file.
+    :type source: str
+    :param target: The absolute path to the link.
+    :type target: str
+    """
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy(source, target)
+
+
 # --- publisher ----------------------------------------------------
 
 
@@ -88,22 +192,35 @@ class Publisher(object):
 class FilePublisher(Publisher):
     """
     The file-based publisher.
+    Publishing is staged in the tree retired by the previous commit, when there
+    is one, so that only the entries of units added, changed or removed since
+    that tree was published need to be updated.
     :ivar publish_dir: full path to the publish_dir directory for this repository.
     :type publish_dir: str
     :ivar tmp_dir: The absolute path to the temporary publishing directory.
     :type tmp_dir: str
     :ivar staged: A flag indicating that publishing has been staged and needs commit.
     :type staged: bool
+    :ivar max_deltas: The number of previously published manifests for which
+        deltas are published.
+    :type max_deltas: int
+    :ivar tarballs: The digests of the tarballs published in the tmp_dir.
+    :type tarballs: set
     """
 
-    def __init__(self, publish_dir):
+    def __init__(self, publish_dir, max_deltas=MAX_DELTAS):
         """
         :param publish_dir: The publishing root directory for this repository
         :type publish_dir: str
+        :param max_deltas: The number of previously published manifests for which
+            deltas are published.
+        :type max_deltas: int
         """
         self.publish_dir = publish_dir
         self.tmp_dir = None
         self.staged = False
+        self.max_deltas = max_deltas
+        self.tarballs = set()
 
     def publish(self, units):
         """
@@ -116,59 +233,247 @@ class FilePublisher(Publisher):
         :return: The absolute path to the manifest.
         :rtype: str
         """
-        # make the parent dir and a temp dir within it
-        parent_path = os.path.normpath(os.path.join(self.publish_dir, '../'))
-        pathlib.mkdir(parent_path)
-        self.tmp_dir = mkdtemp(dir=parent_path)
+        # make the parent dir and the staging dir within it
+        self.tmp_dir = staging_path(self.publish_dir)
+        pathlib.mkdir(os.path.dirname(self.tmp_dir))
+        entries = self.reuse_staged()
 
+        history = {}
+        self.tarballs = set()
         with UnitWriter(self.tmp_dir) as writer:
             for unit in units:
-                self.publish_unit(unit)
+                self.publish_unit(unit, entries)
                 writer.add(unit)
+                history[unit_locator(unit)] = unit_digest(unit)
+        for relative_path in entries:
+            self.unpublish(relative_path)
+        self.prune_tarballs()
         manifest_id = str(uuid4())
         manifest = Manifest(self.tmp_dir, manifest_id)
         manifest.units_published(writer)
+        manifest.deltas = self.publish_deltas(manifest_id, history)
         manifest.write()
         self.staged = True
         return manifest.path
 
-    def publish_unit(self, unit):
+    def reuse_staged(self):
+        """
+        Prepare the tmp_dir for publishing.
+        The tree retired by the previous commit is reused when its manifest and
+        units file are intact.  Otherwise, the tmp_dir is (re)created empty.
+        The manifest is removed first so that a tree left behind by an interrupted
+        publish is never reused.
+        :return: The storage path of each file already published in the tmp_dir
+            keyed by its path relative to the tmp_dir.
+        :rtype: dict
+        """
+        manifest = Manifest(self.tmp_dir)
+        try:
+            manifest.read()
+            if manifest.is_valid() and manifest.has_valid_units():
+                entries = read_entries(manifest.units_path())
+            else:
+                entries = None
+        except (IOError, ValueError):
+            entries = None
+        if entries is None:
+            shutil.rmtree(self.tmp_dir, ignore_errors=True)
+            pathlib.mkdir(self.tmp_dir)
+            return {}
+        os.unlink(manifest.path)
+        for name in (HISTORY_DIR_NAME, DELTAS_DIR_NAME):
+            shutil.rmtree(pathlib.join(self.tmp_dir, name), ignore_errors=True)
+        return entries
+
+    def publish_deltas(self, manifest_id, history):
+        """
+        Publish the deltas from previously published manifests to the manifest
+        being published.  The unit history (locator and digest of each unit) of
+        each published manifest is retained so that the units added, changed and
+        removed since can be determined without the previously published units files.
+        :param manifest_id: The ID of the manifest being published.
+        :type manifest_id: str
+        :param history: The unit history of the manifest being published: {locator: digest}
+        :type history: dict
+        :return: The IDs of the previously published manifests for which
+            deltas have been published.
+        :rtype: list
+        """
+        history_dir = pathlib.join(self.tmp_dir, HISTORY_DIR_NAME)
+        pathlib.mkdir(history_dir)
+        write_history(pathlib.join(history_dir, manifest_id), history)
+        if self.max_deltas < 1:
+            return []
+
+        # previously published manifests
+        previous = Manifest(self.publish_dir)
+        try:
+            previous.read()
+        except (IOError, ValueError):
+            return []
+        if not previous.is_valid():
+            return []
+        base_ids = [previous.id] + previous.deltas
+
+        # determine the units added, changed and removed since each
+        deltas = []
+        for base_id in base_ids[:self.max_deltas]:
+            base_path = pathlib.join(self.publish_dir, HISTORY_DIR_NAME, base_id)
+            try:
+                base_history = read_history(base_path)
+            except IOError:
+                continue
+            added = set(k for k, v in history.iteritems() if base_history.get(k) != v)
+            removed = [k for k in base_history if k not in history]
+            deltas.append((base_id, added, removed))
+            if len(deltas) < self.max_deltas:
+                shutil.copy(base_path, history_dir)
+        if not deltas:
+            return []
+
+        # write the deltas in a single pass over the units file
+        delta_dir = pathlib.join(self.tmp_dir, DELTAS_DIR_NAME)
+        pathlib.mkdir(delta_dir)
+        writers = []
+        try:
+            for base_id, added, removed in deltas:
+                writer = DeltaWriter(pathlib.join(delta_dir, DELTA_FILE_NAME % base_id))
+                writers.append((writer, added))
+                for locator in removed:
+                    writer.remove(locator)
+            fp = gzip.open(pathlib.join(self.tmp_dir, UNITS_FILE_NAME))
+            try:
+                for json_unit in fp:
+                    unit = json.loads(json_unit)
+                    locator = unit_locator(unit)
+                    for writer, added in writers:
+                        if locator in added:
+                            writer.add(unit)
+            finally:
+                fp.close()
+        finally:
+            for writer, added in writers:
+                writer.close()
+        return [base_id for base_id, added, removed in deltas]
+
+    def publish_unit(self, unit, entries):
         """
         Publish the file associated with the unit into the publish directory.
+        A symlink already published in the tmp_dir to the same storage path is kept.
         :param unit: A content unit.
         :type unit: dict
+        :param entries: The storage path of each file already published in the
+            tmp_dir keyed by relative path.  The entry for the unit is removed.
+        :type entries: dict
         """
         storage_path = unit.get(constants.STORAGE_PATH)
         if not storage_path:
             # not all units have associated files.
-            return unit, None
+            return
         relative_path = unit[constants.RELATIVE_PATH]
-        published_path = pathlib.join(self.tmp_dir, relative_path)
-        pathlib.mkdir(os.path.dirname(published_path))
         unit[constants.FILE_SIZE] = os.path.getsize(storage_path)
         if os.path.isdir(storage_path):
-            tar_dir(storage_path, tar_path(published_path))
-            unit[constants.TARBALL_PATH] = tar_path(relative_path)
+            relative_path = tar_path(relative_path)
+            unit[constants.TARBALL_PATH] = relative_path
+            entries.pop(relative_path, None)
+            self.publish_tarball(storage_path, pathlib.join(self.tmp_dir, relative_path))
+            return
+        if entries.pop(relative_path, None) == storage_path:
+            return
+        published_path = pathlib.join(self.tmp_dir, relative_path)
+        if os.path.lexists(published_path):
+            os.unlink(published_path)
         else:
-            os.symlink(storage_path, published_path)
+            pathlib.mkdir(os.path.dirname(published_path))
+        os.symlink(storage_path, published_path)
+
+    def unpublish(self, relative_path):
+        """
+        Remove a file published in the tmp_dir along with the directories
+        left empty by its removal.
+        :param relative_path: The path of the file relative to the tmp_dir.
+        :type relative_path: str
+        """
+        path = pathlib.join(self.tmp_dir, relative_path)
+        if os.path.lexists(path):
+            os.unlink(path)
+        path = os.path.dirname(path)
+        while path != self.tmp_dir:
+            try:
+                os.rmdir(path)
+            except OSError:
+                break
+            path = os.path.dirname(path)
+
+    def publish_tarball(self, dir_path, published_path):
+        """
+        Publish a tarball of the directory associated with a unit.
+        Tarballs are named by the digest of the directory contents.  When the
+        directory is unchanged since the previous publish, the tarball already
+        published is hard linked rather than creating the tarball again.
+        :param dir_path: The absolute path to the directory.
+        :type dir_path: str
+        :param published_path: The absolute path to the published tarball.
+        :type published_path: str
+        """
+        tarball_dir = pathlib.join(self.tmp_dir, TARBALL_DIR_NAME)
+        pathlib.mkdir(tarball_dir)
+        digest = dir_digest(dir_path)
+        self.tarballs.add(digest)
+        path = pathlib.join(tarball_dir, digest)
+        if not os.path.exists(path):
+            previous = pathlib.join(self.publish_dir, TARBALL_DIR_NAME, digest)
+            if os.path.isfile(previous):
+                link(previous, path)
+            else:
+                tar_dir(dir_path, path)
+        if os.path.lexists(published_path):
+            if os.path.samefile(path, published_path):
+                return
+            os.unlink(published_path)
+        else:
+            pathlib.mkdir(os.path.dirname(published_path))
+        link(path, published_path)
+
+    def prune_tarballs(self):
+        """
+        Remove the tarballs in the tmp_dir that are no longer published.
+        """
+        tarball_dir = pathlib.join(self.tmp_dir, TARBALL_DIR_NAME)
+        if not os.path.isdir(tarball_dir):
+            return
+        for name in os.listdir(tarball_dir):
+            if name not in self.tarballs:
+                os.unlink(pathlib.join(tarball_dir, name))
 
     def commit(self):
         """
         Commit publishing.
-        Move the tmp_dir to the publish_dir.
+        Swap the tmp_dir with the publish_dir.  The previously published
+        directory is moved aside (renamed) and kept as the tmp_dir in which
+        the next publish is staged.
         """
         if not self.staged:
             # nothing to commit
             return
-        os.system('rm -rf %s' % self.publish_dir)
+        retired = None
+        if os.path.exists(self.publish_dir):
+            retired = self.tmp_dir + '.old'
+            shutil.rmtree(retired, ignore_errors=True)
+            os.rename(self.publish_dir, retired)
         os.rename(self.tmp_dir, self.publish_dir)
         self.staged = False
+        if retired:
+            os.rename(retired, self.tmp_dir)
+        self.tmp_dir = None
 
     def unstage(self):
         """
         Un-stage publishing.
+        The tmp_dir is removed unless publishing has been committed.
         """
-        os.system('rm -rf %s' % self.tmp_dir)
+        if self.tmp_dir:
+            shutil.rmtree(self.tmp_dir, ignore_errors=True)
         self.staged = False
 
     def __enter__(self):
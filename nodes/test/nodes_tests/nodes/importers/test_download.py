@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+from mock import Mock, patch
+
+from pulp_node import constants
+from pulp_node.importers.download import ContentDownloadListener, STORAGE_PATH, UNIT_REF
+
+
+class TestContentDownloadListener(TestCase):
+
+    def download_request(self, unit):
+        request = Mock(type_id='T', unit_key={'a': 1}, destination='/tmp/unit.tar')
+        request.errors = ['go fish']
+        unit_ref = Mock()
+        unit_ref.fetch.return_value = unit
+        request.data = {STORAGE_PATH: '/tmp/unit', UNIT_REF: unit_ref}
+        return request
+
+    @patch('pulp_node.importers.download.untar_dir')
+    def test_download_succeeded(self, fake_untar):
+        strategy = Mock()
+        sync_request = Mock()
+        unit = {constants.TARBALL_PATH: 'unit.tar'}
+        listener = ContentDownloadListener(strategy, sync_request)
+
+        # test
+        strategy.add_unit.side_effect = lambda r, u: self.assertTrue(fake_untar.called)
+        listener.download_succeeded(self.download_request(unit))
+
+        # validation
+        fake_untar.assert_called_once_with('/tmp/unit.tar', '/tmp/unit')
+        strategy.add_unit.assert_called_once_with(sync_request, unit)
+        self.assertEqual(unit[constants.STORAGE_PATH], '/tmp/unit')
+
+    def test_download_failed(self):
+        sync_request = Mock(repo_id='r1')
+        listener = ContentDownloadListener(Mock(), sync_request)
+
+        # test
+        listener.download_failed(self.download_request({}))
+
+        # validation
+        self.assertEqual(len(listener.error_list), 1)
+        claim = sync_request.conduit.release_download.call_args[0][0]
+        self.assertEqual(claim.type_id, 'T')
+        self.assertEqual(claim.unit_key, {'a': 1})
+        self.assertEqual(claim.storage_path, '/tmp/unit')
@@ -1,6 +1,7 @@
 from unittest import TestCase
 
 from mock import Mock, patch
+from pulp.server.content.sources.model import DownloadReport, DownloadDetails
 
 from pulp_node.importers.strategies import ImporterStrategy
 
@@ -9,10 +10,16 @@ class TestAddUnits(TestCase):
 
     @patch('pulp.server.content.sources.container.ContentContainer.download')
     def test_download_reporting(self, fake_download):
-        fake_download.return_value = Mock()
+        details = DownloadDetails()
+        details.total_succeeded = 3
+        report = DownloadReport()
+        report.total_sources = 2
+        report.downloads['source-1'] = details
+        fake_download.return_value = report
 
         fake_request = Mock()
         fake_request.cancelled.return_value = False
+        fake_request.summary.sources = DownloadReport()
 
         fake_inventory = Mock()
         fake_inventory.units_on_parent_only.return_value = []
@@ -22,4 +29,4 @@ class TestAddUnits(TestCase):
         strategy._add_units(fake_request, fake_inventory)
 
         # validation
-        self.assertEqual(fake_request.summary.sources, fake_download())
+        self.assertEqual(fake_request.summary.sources.dict(), report.dict())
@@ -69,17 +69,18 @@ PARENT_SETTINGS = {
 
 class TestBase(TestCase):
 
-    def request(self, cancel_on=0):
+    def request(self, cancel_on=0, repo_ids=(REPO_ID,), **options):
         conduit = TestConduit(cancel_on)
         progress = HandlerProgress(conduit)
         summary = SummaryReport()
+        options[constants.PARENT_SETTINGS] = PARENT_SETTINGS
         request = Request(
             conduit=conduit,
             progress=progress,
             summary=summary,
-            bindings=[dict(repo_id=REPO_ID, details={})],
+            bindings=[dict(repo_id=repo_id, details={}) for repo_id in repo_ids],
             scope=constants.NODE_SCOPE,
-            options={constants.PARENT_SETTINGS: PARENT_SETTINGS}
+            options=options
         )
         return request
 
@@ -219,6 +220,76 @@ class TestBase(TestCase):
         # Verify
         mock_cancel.assert_called_with(TASK_ID)
 
+    def test_request_concurrency(self):
+        # Setup
+        repo_ids = ['repo_1', 'repo_2', 'repo_3']
+        options = {
+            constants.MAX_REPOSITORY_CONCURRENCY_KEYWORD: 10,
+            constants.MAX_DOWNLOAD_CONCURRENCY_KEYWORD: 7,
+        }
+        # Test
+        request = self.request(repo_ids=repo_ids, **options)
+        repo_options = request.repository_options()
+        # Verify
+        self.assertEqual(request.concurrency, 3)
+        self.assertEqual(repo_options[constants.MAX_DOWNLOAD_CONCURRENCY_KEYWORD], 2)
+        self.assertEqual(request.options[constants.MAX_DOWNLOAD_CONCURRENCY_KEYWORD], 7)
+
+    def test_request_concurrency_above_downloads(self):
+        # Setup
+        repo_ids = ['repo_%d' % n for n in range(10)]
+        options = {
+            constants.MAX_REPOSITORY_CONCURRENCY_KEYWORD: 8,
+            constants.MAX_DOWNLOAD_CONCURRENCY_KEYWORD: 3,
+        }
+        # Test
+        request = self.request(repo_ids=repo_ids, **options)
+        repo_options = request.repository_options()
+        # Verify
+        self.assertEqual(request.concurrency, 3)
+        self.assertEqual(repo_options[constants.MAX_DOWNLOAD_CONCURRENCY_KEYWORD], 1)
+
+    def test_request_concurrency_default(self):
+        # Test
+        request = self.request(repo_ids=['repo_1', 'repo_2'])
+        # Verify
+        self.assertEqual(request.concurrency, constants.DEFAULT_REPOSITORY_CONCURRENCY)
+        self.assertTrue(request.repository_options() is request.options)
+
+    @patch('pulp_node.handlers.strategies.HandlerStrategy._synchronize_repository')
+    @patch('pulp_node.handlers.model.Repository.add')
+    @patch('pulp_node.handlers.model.Repository.fetch', return_value=None)
+    def test_merge_repositories_concurrent(self, mock_fetch, mock_add, mock_synchronize):
+        # Setup
+        repo_ids = ['repo_%d' % n for n in range(10)]
+        options = {constants.MAX_REPOSITORY_CONCURRENCY_KEYWORD: 3}
+        request = self.request(repo_ids=repo_ids, **options)
+        request.started()
+        # Test
+        strategy = HandlerStrategy()
+        strategy._merge_repositories(request)
+        # Verify
+        self.assertEqual(len(request.summary.errors), 0)
+        self.assertEqual(mock_add.call_count, len(repo_ids))
+        synchronized = sorted(c[0][1] for c in mock_synchronize.call_args_list)
+        self.assertEqual(synchronized, repo_ids)
+        for repo_id in repo_ids:
+            self.assertEqual(request.summary[repo_id].action, RepositoryReport.ADDED)
+
+    @patch('pulp_node.handlers.model.Repository.fetch', side_effect=ValueError())
+    def test_merge_repositories_concurrent_exception(self, *unused):
+        # Setup
+        repo_ids = ['repo_1', 'repo_2', 'repo_3']
+        options = {constants.MAX_REPOSITORY_CONCURRENCY_KEYWORD: 2}
+        request = self.request(repo_ids=repo_ids, **options)
+        # Test
+        strategy = HandlerStrategy()
+        strategy._merge_repositories(request)
+        # Verify
+        self.assertEqual(len(request.summary.errors), len(repo_ids))
+        for error in request.summary.errors:
+            self.assertEqual(error.error_id, CaughtException.ERROR_ID)
+
     def test_strategy_factory(self):
         for name, strategy in STRATEGIES.items():
             self.assertEqual(find_strategy(name), strategy)
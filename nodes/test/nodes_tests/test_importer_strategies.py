@@ -7,6 +7,7 @@ from uuid import uuid4
 from mock import Mock, patch
 from pulp.plugins.model import Unit
 from pulp.server.config import config as pulp_conf
+from pulp.server.content.sources.model import DownloadReport
 
 from pulp_node.importers.strategies import *
 from pulp_node.importers.inventory import UnitInventory
@@ -27,6 +28,10 @@ class TestConduit:
     save_unit = Mock()
     remove_unit = Mock()
     set_progress = Mock()
+    try_claim_download = Mock(return_value=True)
+    wait_download = Mock(return_value=True)
+    release_download = Mock()
+    release_downloads = Mock()
 
 
 class CancelEvent(object):
@@ -241,6 +246,149 @@ class TestBase(TestCase):
         self.assertEqual(request.cancel_event.call_count, 2)
         self.assertFalse(mock_download.called)
 
+    @patch('pulp_node.importers.strategies.ContentContainer')
+    @patch('pulp_node.importers.strategies.ImporterStrategy.add_unit')
+    def test_add_units_downloaded_by_other_task(self, mock_add_unit, mock_container):
+        # Setup
+        request = self.request()
+        request.conduit = Mock()
+        existing_path = os.path.join(self.tmp_dir, 'existing')
+
+        def try_claim_download(claim):
+            claim.storage_path = existing_path
+            return False
+
+        request.conduit.try_claim_download.side_effect = try_claim_download
+        unit_id = str(uuid4())
+        unit = dict(
+            unit_id=unit_id,
+            type_id='T',
+            unit_key={'a': 1},
+            metadata={},
+            storage_path=os.path.join(self.tmp_dir, unit_id),
+            relative_path=os.path.join(self.tmp_dir, 'testing', unit_id))
+        manifest = TestManifest([unit])
+        inventory = UnitInventory(BASE_URL, manifest.get_units(), [])
+        # Test
+        strategy = ImporterStrategy()
+        strategy._add_units(request, inventory)
+        # Verify
+        claim = request.conduit.try_claim_download.call_args[0][0]
+        self.assertEqual(claim.type_id, 'T')
+        self.assertEqual(claim.unit_key, {'a': 1})
+        added = mock_add_unit.call_args[0][1]
+        self.assertEqual(added[constants.STORAGE_PATH], existing_path)
+        self.assertEqual(mock_container.return_value.download.call_args[0][2], [])
+        request.conduit.release_downloads.assert_called_once_with()
+        self.assertFalse(request.conduit.wait_download.called)
+
+    @patch('pulp_node.importers.strategies.ContentContainer')
+    @patch('pulp_node.importers.strategies.ImporterStrategy.add_unit')
+    def test_add_units_deferred(self, mock_add_unit, mock_container):
+        """
+        Units being downloaded by another task are waited on only after the
+        downloads claimed by this task are finished and released.
+        """
+        # Setup
+        request = self.request()
+        request.conduit = Mock()
+        existing_path = os.path.join(self.tmp_dir, 'existing')
+        calls = []
+        claims = [None, True, False]
+
+        def try_claim_download(claim):
+            calls.append('claim')
+            claimed = claims.pop(0)
+            if claimed is False:
+                claim.storage_path = existing_path
+            return claimed
+
+        def wait_download(claim, timeout):
+            calls.append('wait')
+            return True
+
+        request.conduit.try_claim_download.side_effect = try_claim_download
+        request.conduit.wait_download.side_effect = wait_download
+        request.conduit.release_downloads.side_effect = lambda: calls.append('release')
+        mock_container.return_value.download.side_effect = \
+            lambda *unused: calls.append('download') or DownloadReport()
+        units = []
+        for n in range(2):
+            unit_id = str(uuid4())
+            units.append(dict(
+                unit_id=unit_id,
+                type_id='T',
+                unit_key={'a': n},
+                metadata={},
+                storage_path=os.path.join(self.tmp_dir, unit_id),
+                relative_path=os.path.join(self.tmp_dir, 'testing', unit_id)))
+        manifest = TestManifest(units)
+        inventory = UnitInventory(BASE_URL, manifest.get_units(), [])
+        # Test
+        strategy = ImporterStrategy()
+        strategy._add_units(request, inventory)
+        # Verify
+        self.assertEqual(
+            calls, ['claim', 'claim', 'download', 'release', 'wait', 'claim', 'download', 'release'])
+        waited = request.conduit.wait_download.call_args[0][0]
+        self.assertEqual(waited.unit_key, {'a': 0})
+        self.assertTrue(request.conduit.wait_download.call_args[1]['timeout'] > 0)
+        downloaded = mock_container.return_value.download.call_args_list[0][0][2]
+        self.assertEqual([r.unit_key for r in downloaded], [{'a': 1}])
+        self.assertEqual(mock_container.return_value.download.call_args_list[1][0][2], [])
+        added = mock_add_unit.call_args[0][1]
+        self.assertEqual(added[constants.STORAGE_PATH], existing_path)
+        self.assertEqual(request.summary.errors, [])
+
+    @patch('pulp_node.importers.strategies.ContentContainer')
+    @patch('pulp_node.importers.strategies.ImporterStrategy.add_unit')
+    def test_add_units_deferred_timeout(self, mock_add_unit, mock_container):
+        # Setup
+        request = self.request()
+        request.conduit = Mock()
+        request.conduit.try_claim_download.return_value = None
+        request.conduit.wait_download.return_value = False
+        unit_id = str(uuid4())
+        unit = dict(
+            unit_id=unit_id,
+            type_id='T',
+            unit_key={'a': 1},
+            metadata={},
+            storage_path=os.path.join(self.tmp_dir, unit_id),
+            relative_path=os.path.join(self.tmp_dir, 'testing', unit_id))
+        manifest = TestManifest([unit])
+        inventory = UnitInventory(BASE_URL, manifest.get_units(), [])
+        # Test
+        strategy = ImporterStrategy()
+        strategy._add_units(request, inventory)
+        # Verify
+        self.assertEqual(request.conduit.try_claim_download.call_count, 1)
+        self.assertEqual(request.conduit.wait_download.call_count, 1)
+        self.assertFalse(mock_add_unit.called)
+        self.assertEqual(len(request.summary.errors), 1)
+        self.assertEqual(request.summary.errors[0].error_id, AddUnitError.ERROR_ID)
+
+    def test_inventory(self):
+        # Setup
+        parent_units = [
+            dict(unit_id='p1', type_id='T', unit_key={'n': 1}, last_updated=2),
+            dict(unit_id='p2', type_id='T', unit_key={'n': 2}, last_updated=1),
+            dict(unit_id='p3', type_id='T', unit_key={'n': 3}, last_updated=1),
+        ]
+        child_units = [
+            dict(unit_id='c1', type_id='T', unit_key={'n': 1}, last_updated=1, metadata={}),
+            dict(unit_id='c2', type_id='T', unit_key={'n': 2}, last_updated=1, metadata={}),
+            dict(unit_id='c4', type_id='T', unit_key={'n': 4}, last_updated=1, metadata={}),
+        ]
+        manifest = TestManifest(parent_units)
+        # Test
+        inventory = UnitInventory(BASE_URL, manifest.get_units(), child_units)
+        # Verify
+        self.assertEqual(inventory.count_units_on_parent_only(), 1)
+        self.assertEqual([u['unit_id'] for u, r in inventory.units_on_parent_only()], ['p3'])
+        self.assertEqual([u['unit_id'] for u, r in inventory.updated_units()], ['p1'])
+        self.assertEqual(list(inventory.units_on_child_only()), [dict(type_id='T', unit_id='c4')])
+
     def test_needs_update(self):
         # Setup
         path = os.path.join(self.tmp_dir, 'unit_1')
@@ -17,6 +17,8 @@ import json
 
 from unittest import TestCase
 
+from mock import patch
+
 from nectar.downloaders.local import LocalFileDownloader
 from nectar.config import DownloaderConfig
 
@@ -131,4 +133,122 @@ class TestManifest(TestCase):
             units_in.append(unit)
             _unit = ref.fetch()
             self.assertEqual(unit, _unit)
-        self.verify(units, units_in)
\ No newline at end of file
+        self.verify(units, units_in)
+
+    def test_delta(self):
+        # Setup
+        units = []
+        for i in range(0, self.NUM_UNITS):
+            unit = dict(unit_id=i, type_id='T', unit_key={'n': i})
+            units.append(unit)
+        units_path = os.path.join(self.tmp_dir, 'units.json')
+        with open(units_path, 'w+') as fp:
+            for u in units:
+                fp.write(json.dumps(u))
+                fp.write('\n')
+        changed = dict(unit_id=100, type_id='T', unit_key={'n': 1})
+        added = dict(unit_id=101, type_id='T', unit_key={'n': self.NUM_UNITS})
+        delta_path = os.path.join(self.tmp_dir, DELTA_FILE_NAME % self.MANIFEST_ID)
+        writer = DeltaWriter(delta_path)
+        writer.remove(unit_locator(units[0]))
+        writer.add(changed)
+        writer.add(added)
+        writer.close()
+        manifest_path = os.path.join(self.tmp_dir, MANIFEST_FILE_NAME)
+        manifest = Manifest(manifest_path, '456')
+        manifest.units[UNITS_TOTAL] = self.NUM_UNITS
+        manifest.deltas = [self.MANIFEST_ID]
+        # Test
+        manifest.apply_delta(units_path, delta_path)
+        # Verify
+        self.assertTrue(manifest.has_delta(Manifest(manifest_path, self.MANIFEST_ID)))
+        self.assertTrue(manifest.has_valid_units())
+        manifest.read()
+        self.assertEqual(manifest.deltas, [self.MANIFEST_ID])
+        units_in = [u for u, ref in manifest.get_units()]
+        units_out = units[2:] + [changed, added]
+        self.verify(units_out, units_in)
+
+    def test_delta_total_mismatch(self):
+        # Setup
+        units_path = os.path.join(self.tmp_dir, 'units.json')
+        with open(units_path, 'w+') as fp:
+            fp.write(json.dumps(dict(unit_id=0, type_id='T', unit_key={})))
+            fp.write('\n')
+        delta_path = os.path.join(self.tmp_dir, DELTA_FILE_NAME % self.MANIFEST_ID)
+        writer = DeltaWriter(delta_path)
+        writer.close()
+        manifest_path = os.path.join(self.tmp_dir, MANIFEST_FILE_NAME)
+        manifest = Manifest(manifest_path, '456')
+        manifest.units[UNITS_TOTAL] = self.NUM_UNITS
+        # Test
+        self.assertRaises(ValueError, manifest.apply_delta, units_path, delta_path)
+        # Verify
+        expected = sorted(['units.json', DELTA_FILE_NAME % self.MANIFEST_ID])
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), expected)
+
+    def test_index(self):
+        # Setup
+        units = []
+        manifest_path = os.path.join(self.tmp_dir, MANIFEST_FILE_NAME)
+        for i in range(0, self.NUM_UNITS):
+            unit = dict(unit_id=i, type_id='T', unit_key={'n': i})
+            units.append(unit)
+        units_path = os.path.join(self.tmp_dir, UNITS_FILE_NAME)
+        writer = UnitWriter(units_path)
+        for u in units:
+            writer.add(u)
+        writer.close()
+        manifest = Manifest(manifest_path, self.MANIFEST_ID)
+        manifest.units_published(writer)
+        manifest.write()
+        # Test
+        iterator = manifest.get_units()
+        # Verify
+        index_path = manifest.units_path() + INDEX_SUFFIX
+        self.assertTrue(os.path.exists(index_path))
+        self.assertEqual(len(iterator.index), self.NUM_UNITS)
+        for unit in units:
+            locator = unit_locator(unit)
+            self.assertTrue(locator in iterator.index)
+            unit_in, ref = iterator.find(locator)
+            self.assertEqual(unit_in, unit)
+            self.assertEqual(ref.fetch(), unit)
+        missing = unit_locator(dict(type_id='T', unit_key={'n': self.NUM_UNITS}))
+        self.assertFalse(missing in iterator.index)
+        self.assertEqual(iterator.find(missing), None)
+        # iterable more than once
+        self.verify(units, [u for u, ref in iterator])
+        self.verify(units, [u for u, ref in iterator])
+        # rebuilt when missing
+        os.unlink(index_path)
+        iterator = manifest.get_units()
+        self.assertTrue(os.path.exists(index_path))
+        self.assertEqual(len(iterator.index), self.NUM_UNITS)
+
+    def test_index_merged_runs(self):
+        # Setup
+        units_path = os.path.join(self.tmp_dir, 'units.json')
+        index_path = units_path + INDEX_SUFFIX
+        units = [dict(unit_id=i, type_id='T', unit_key={'n': i}) for i in range(self.NUM_UNITS)]
+        with open(units_path, 'w') as fp:
+            for unit in units:
+                fp.write(json.dumps(unit) + '\n')
+        # Test
+        with patch.object(IndexWriter, 'RUN_LENGTH', 3):
+            build_index(units_path, index_path)
+        # Verify
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), ['units.json', 'units.json.idx'])
+        index = UnitIndex(index_path)
+        try:
+            self.assertEqual(len(index), self.NUM_UNITS)
+            record_size = UnitIndex.RECORD.size
+            records = [index.map[n:n + record_size]
+                       for n in range(0, len(index.map), record_size)]
+            self.assertEqual(records, sorted(records))
+            iterator = UnitIterator(units_path, self.NUM_UNITS, index)
+            for unit in units:
+                unit_in, ref = iterator.find(unit_locator(unit))
+                self.assertEqual(unit_in, unit)
+        finally:
+            index.close()
@@ -8,7 +8,7 @@ import tarfile
 from copy import deepcopy
 from unittest import TestCase
 
-from mock import Mock, patch
+from mock import Mock, call, patch
 from base import ServerTests
 import mock
 
@@ -579,7 +579,9 @@ class TestDistributor(PluginTestBase):
 
         dist.distributor_removed(repo, config)
 
-        mock_system.assert_called_once_with('rm -rf /var/www/pulp/nodes/https/repos/%s' % repo.id)
+        self.assertEqual(mock_system.call_args_list, [
+            call('rm -rf /var/www/pulp/nodes/https/repos/%s' % repo.id),
+            call('rm -rf /var/www/pulp/nodes/https/repos/.%s.staging' % repo.id)])
 
 
 class ImporterTest(PluginTestBase):
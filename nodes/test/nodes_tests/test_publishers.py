@@ -15,13 +15,16 @@ import tempfile
 import tarfile
 
 from unittest import TestCase
+from mock import patch
 from nectar.downloaders.local import LocalFileDownloader
 from nectar.config import DownloaderConfig
 
 from pulp_node import constants
 from pulp_node import pathlib
 from pulp_node.distributors.http.publisher import HttpPublisher
-from pulp_node.manifest import RemoteManifest
+from pulp_node.distributors.publisher import dir_digest, tar_dir, TARBALL_DIR_NAME
+from pulp_node.manifest import (Manifest, RemoteManifest, DELTAS_DIR_NAME, DELTA_FILE_NAME,
+                                MANIFEST_FILE_NAME, UNITS_TOTAL)
 
 
 class TestHttp(TestCase):
@@ -157,3 +160,132 @@ class TestHttp(TestCase):
             p.publish(units)
         # verify
         self.assertFalse(os.path.exists(p.tmp_dir))
+
+    def test_publisher_deltas(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        repo_publish_dir = os.path.join(publish_dir, repo_id)
+        virtual_host = (publish_dir, publish_dir)
+        with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+            p.publish(units[:2])
+            p.commit()
+        first = Manifest(repo_publish_dir)
+        first.read()
+        # test
+        with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+            p.publish(units[1:])
+            p.commit()
+        # verify
+        manifest = Manifest(repo_publish_dir)
+        manifest.read()
+        self.assertEqual(first.deltas, [])
+        self.assertEqual(manifest.deltas, [first.id])
+        self.assertTrue(manifest.has_delta(first))
+        path = os.path.join(repo_publish_dir, DELTAS_DIR_NAME, DELTA_FILE_NAME % first.id)
+        self.assertTrue(os.path.isfile(path))
+
+    @patch('pulp_node.distributors.publisher.tar_dir', side_effect=tar_dir)
+    def test_publisher_tarball_reused(self, mock_tar_dir):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        repo_publish_dir = os.path.join(publish_dir, repo_id)
+        virtual_host = (publish_dir, publish_dir)
+        with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+            p.publish(units)
+            p.commit()
+        path = pathlib.join(repo_publish_dir, units[0][constants.TARBALL_PATH])
+        first = os.stat(path)
+        # test
+        with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+            p.publish(units)
+            p.commit()
+        # verify
+        self.assertEqual(mock_tar_dir.call_count, 1)
+        self.assertEqual(os.stat(path).st_ino, first.st_ino)
+        staging_dir = os.path.join(publish_dir, '.%s.staging' % repo_id)
+        self.assertFalse(os.path.exists(staging_dir + '.old'))
+
+    def test_publisher_incremental(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        repo_publish_dir = os.path.join(publish_dir, repo_id)
+        staging_dir = os.path.join(publish_dir, '.%s.staging' % repo_id)
+        virtual_host = (publish_dir, publish_dir)
+        for n in range(2):
+            with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+                p.publish(units)
+                p.commit()
+        # the tree retired by the second commit is kept for staging
+        self.assertTrue(os.path.isfile(os.path.join(staging_dir, MANIFEST_FILE_NAME)))
+        added_path = os.path.join(self.unit_dir, self.RELATIVE_PATH, 'test_3')
+        with open(added_path, 'w') as fp:
+            fp.write('test_3')
+        added = {
+            'type_id': 'unit',
+            'unit_key': {'n': 3},
+            'storage_path': added_path,
+            'relative_path': os.path.join(self.RELATIVE_PATH, 'test_3')
+        }
+        # test
+        with patch('os.symlink', side_effect=os.symlink) as mock_symlink:
+            with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+                p.publish(units[1:] + [added])
+                p.commit()
+        # verify
+        mock_symlink.assert_called_once_with(
+            added_path, os.path.join(staging_dir, added['relative_path']))
+        for unit in units[1:] + [added]:
+            path = os.path.join(repo_publish_dir, unit['relative_path'])
+            self.assertEqual(os.readlink(path), unit['storage_path'])
+        tarball = os.path.join(repo_publish_dir, units[0][constants.TARBALL_PATH])
+        self.assertFalse(os.path.exists(tarball))
+        self.assertEqual(os.listdir(os.path.join(repo_publish_dir, TARBALL_DIR_NAME)), [])
+        manifest = Manifest(repo_publish_dir)
+        manifest.read()
+        self.assertEqual(manifest.units[UNITS_TOTAL], 3)
+        self.assertTrue(os.path.isfile(os.path.join(staging_dir, MANIFEST_FILE_NAME)))
+
+    def test_publisher_interrupted(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        repo_publish_dir = os.path.join(publish_dir, repo_id)
+        staging_dir = os.path.join(publish_dir, '.%s.staging' % repo_id)
+        virtual_host = (publish_dir, publish_dir)
+        for n in range(2):
+            with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+                p.publish(units)
+                p.commit()
+        # test
+        with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+            p.publish(units)
+        # verify
+        self.assertFalse(os.path.exists(staging_dir))
+        self.assertTrue(os.path.isfile(os.path.join(repo_publish_dir, MANIFEST_FILE_NAME)))
+
+    def test_dir_digest(self):
+        # setup
+        dirs = []
+        for content in ('abc', 'xyz'):
+            path = tempfile.mkdtemp(dir=self.tmpdir)
+            file_path = os.path.join(path, 'file')
+            with open(file_path, 'w') as fp:
+                fp.write(content)
+            os.utime(file_path, (1000, 1000))
+            dirs.append(path)
+        # test and verify
+        self.assertNotEqual(dir_digest(dirs[0]), dir_digest(dirs[1]))
+        with open(os.path.join(dirs[1], 'file'), 'w') as fp:
+            fp.write('abc')
+        self.assertEqual(dir_digest(dirs[0]), dir_digest(dirs[1]))
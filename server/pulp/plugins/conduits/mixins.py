@@ -1,6 +1,10 @@
 from gettext import gettext as _
 import logging
+import os
 import sys
+import threading
+import time
+from uuid import uuid4
 
 from pymongo.errors import DuplicateKeyError
 
@@ -9,6 +13,7 @@ from pulp.server.async.tasks import get_current_task_id
 from pulp.server.controllers import units as units_controller
 from pulp.server.db import model
 from pulp.server.db.model import TaskStatus
+from pulp.server.managers.content.download import LEASE, RENEW_INTERVAL
 from pulp.server import exceptions as pulp_exceptions
 import pulp.plugins.conduits._common as common_utils
 import pulp.server.managers.factory as manager_factory
@@ -427,6 +432,13 @@ class AddUnitMixin(object):
         self._added_count = 0
         self._updated_count = 0
 
+        # identifies this conduit in the in-flight download registry
+        self._download_owner = str(uuid4())
+        # (type_id, storage_path) of each claimed download mapped to the unit key
+        self._claimed_downloads = {}
+        self._claims_lock = threading.Lock()
+        self._lease_renewal = None
+
     def init_unit(self, type_id, unit_key, metadata, relative_path):
         """
         Initializes the Pulp representation of a content unit. The conduit will
@@ -514,6 +526,232 @@ class AddUnitMixin(object):
         except Exception, e:
             _logger.exception(_('Content unit association failed [%s]' % str(unit)))
             raise ImporterConduitException(e), None, sys.exc_info()[2]
+        finally:
+            if self._claimed_downloads:
+                self.release_download(unit)
+
+    def claim_download(self, unit, timeout=None):
+        """
+        Claims the download of the file associated with a unit returned from
+        the init_unit call. Concurrent syncs of repositories that share content
+        coordinate through this call so that each file is downloaded only once.
+
+        If the file is already stored in Pulp, or another task is downloading it,
+        this call waits for that download to finish and updates the storage_path
+        of the unit to reference the existing file. In that case, the importer
+        should skip the download and simply save the unit.
+
+        Otherwise, the download is claimed by this conduit and the importer
+        should download the file to the unit's storage_path. The claim is kept
+        alive while it is held, and is released by save_unit, or by
+        release_download if the download fails.
+
+        Waiting on another task while holding claims could deadlock with a task
+        claiming the same files in a different order, so this call fails instead
+        of waiting when this conduit holds claims. Importers that claim several
+        downloads before fetching them should use try_claim_download and only
+        wait, using wait_download, once their own claims have been released.
+
+        :param unit: unit object returned from the init_unit call
+        :type  unit: Unit
+        :param timeout: maximum number of seconds to wait on a download owned by
+                        another task; None means to wait until it is finished or
+                        abandoned by its owner
+        :type  timeout: int, None
+
+        :return: True if the caller should download the file; False if the
+                 existing file should be reused
+        :rtype:  bool
+
+        :raises ImporterConduitException: if the download could not be claimed,
+                 including when the timeout is reached while another task is still
+                 downloading the file, or when waiting is needed while this conduit
+                 holds claims
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            claimed = self.try_claim_download(unit)
+            if claimed is not None:
+                return claimed
+            # Wait for the download to finish, or for its owner to abandon it,
+            # then try again; the file is never written without the claim.
+            if deadline is None:
+                wait_timeout = LEASE
+            else:
+                wait_timeout = deadline - time.time()
+                if wait_timeout <= 0:
+                    msg = _('Timed out waiting on download of [%s]') % unit.storage_path
+                    raise ImporterConduitException(msg)
+            self.wait_download(unit, timeout=wait_timeout)
+
+    def try_claim_download(self, unit):
+        """
+        Claims the download of the file associated with a unit returned from
+        the init_unit call, without waiting on another task. See claim_download.
+
+        :param unit: unit object returned from the init_unit call
+        :type  unit: Unit
+
+        :return: True if the caller should download the file; False if the
+                 existing file should be reused; None if another task is
+                 downloading the file
+        :rtype:  bool, None
+
+        :raises ImporterConduitException: if the download could not be claimed
+        """
+        if unit.storage_path is None:
+            return True
+
+        try:
+            download_manager = manager_factory.content_download_manager()
+            acquired = download_manager.acquire(
+                self._download_owner, unit.type_id, unit.unit_key, unit.storage_path)
+            if not acquired:
+                return None
+            if self._reuse_download(unit):
+                download_manager.release(self._download_owner, unit.type_id, unit.unit_key)
+                return False
+            self._add_claim(unit)
+            return True
+        except Exception, e:
+            _logger.exception(_('Claiming download failed [%s]' % str(unit)))
+            raise ImporterConduitException(e), None, sys.exc_info()[2]
+
+    def wait_download(self, unit, timeout=None):
+        """
+        Waits for another task to finish, or abandon, the download of the file
+        associated with a unit. The download should then be claimed again to
+        learn whether the file can be reused.
+
+        Waiting is refused while this conduit holds claims: another task could
+        be waiting on them in turn.
+
+        :param unit: unit object passed to try_claim_download
+        :type  unit: Unit
+        :param timeout: maximum number of seconds to wait; None means to wait
+                        until the download is finished or abandoned
+        :type  timeout: int, None
+
+        :return: True if the download is no longer in progress
+        :rtype:  bool
+
+        :raises ImporterConduitException: if this conduit holds claims, or the
+                 download registry could not be read
+        """
+        with self._claims_lock:
+            holding_claims = bool(self._claimed_downloads)
+        if holding_claims:
+            msg = _('Cannot wait on download of [%s] while holding download claims')
+            raise ImporterConduitException(msg % unit.storage_path)
+        try:
+            download_manager = manager_factory.content_download_manager()
+            if timeout is not None:
+                return download_manager.wait(unit.type_id, unit.unit_key, timeout=timeout)
+            while not download_manager.wait(unit.type_id, unit.unit_key, timeout=LEASE):
+                continue
+            return True
+        except Exception, e:
+            _logger.exception(_('Waiting on download failed [%s]' % str(unit)))
+            raise ImporterConduitException(e), None, sys.exc_info()[2]
+
+    def release_download(self, unit):
+        """
+        Releases a download claimed using claim_download. This is done
+        automatically by save_unit and should only be called by the importer
+        when the download has failed and the unit will not be saved.
+
+        :param unit: unit object passed to claim_download
+        :type  unit: Unit
+        """
+        with self._claims_lock:
+            unit_key = self._claimed_downloads.pop((unit.type_id, unit.storage_path), None)
+            if unit_key is None:
+                return
+            self._stop_lease_renewal()
+        try:
+            download_manager = manager_factory.content_download_manager()
+            download_manager.release(self._download_owner, unit.type_id, unit.unit_key)
+        except Exception:
+            _logger.exception(_('Releasing download failed [%s]' % str(unit)))
+
+    def release_downloads(self):
+        """
+        Releases all downloads claimed using claim_download that have not been
+        released yet. The importer should call this when it stops adding units,
+        for example when the sync is cancelled, so that no claims outlive it.
+        """
+        with self._claims_lock:
+            claims, self._claimed_downloads = self._claimed_downloads, {}
+            self._stop_lease_renewal()
+        download_manager = manager_factory.content_download_manager()
+        for (type_id, storage_path), unit_key in claims.items():
+            try:
+                download_manager.release(self._download_owner, type_id, unit_key)
+            except Exception:
+                _logger.exception(_('Releasing download failed [%s]' % storage_path))
+
+    def _add_claim(self, unit):
+        """
+        Record a claimed download and make sure the leases of the claims held
+        by this conduit are being renewed.
+
+        :param unit: unit object passed to claim_download
+        :type  unit: Unit
+        """
+        with self._claims_lock:
+            self._claimed_downloads[(unit.type_id, unit.storage_path)] = unit.unit_key
+            if self._lease_renewal is None:
+                self._lease_renewal = threading.Event()
+                thread = threading.Thread(target=self._renew_leases, args=(self._lease_renewal,))
+                thread.daemon = True
+                thread.start()
+
+    def _stop_lease_renewal(self):
+        """
+        Stop renewing leases once no claims are held. Must be called with the
+        claims lock held.
+        """
+        if not self._claimed_downloads and self._lease_renewal is not None:
+            self._lease_renewal.set()
+            self._lease_renewal = None
+
+    def _renew_leases(self, stopped):
+        """
+        Renew the leases of the downloads claimed by this conduit every
+        RENEW_INTERVAL seconds, until stopped.
+
+        :param stopped: set when the leases no longer need to be renewed
+        :type  stopped: threading.Event
+        """
+        download_manager = manager_factory.content_download_manager()
+        while not stopped.wait(RENEW_INTERVAL):
+            try:
+                download_manager.renew(self._download_owner)
+            except Exception:
+                _logger.exception(_('Renewing download leases failed'))
+
+    def _reuse_download(self, unit):
+        """
+        Update the storage_path of the unit to reference the file of an identical
+        unit already stored in Pulp, if there is one.
+
+        :param unit: unit object returned from the init_unit call
+        :type  unit: Unit
+
+        :return: True if the unit now references an existing file
+        :rtype:  bool
+        """
+        content_query_manager = manager_factory.content_query_manager()
+        try:
+            existing_unit = content_query_manager.get_content_unit_by_keys_dict(
+                unit.type_id, unit.unit_key, model_fields=['_storage_path'])
+        except pulp_exceptions.MissingResource:
+            return False
+        storage_path = existing_unit.get('_storage_path')
+        if not storage_path or not os.path.exists(storage_path):
+            return False
+        unit.storage_path = storage_path
+        return True
 
     def _update_unit(self, unit, pulp_unit):
         """
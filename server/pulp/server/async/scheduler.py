@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
 from gettext import gettext as _
+import heapq
 import itertools
 import logging
 import platform
@@ -14,10 +15,11 @@ from pulp.common.constants import (CELERYBEAT_WAIT_SECONDS, RESOURCE_MANAGER_WOR
 from pulp.server.async import worker_watcher
 from pulp.server.async.celery_instance import celery as app
 from pulp.server.async.tasks import _delete_worker
+from pulp.server.config import config
 from pulp.server.db import connection as db_connection
 from pulp.server.db.connection import UnsafeRetry
 from pulp.server.db.model.dispatch import ScheduledCall, ScheduleEntry
-from pulp.server.db.model import Worker, CeleryBeatLock
+from pulp.server.db.model import CeleryBeatLock
 from pulp.server.managers.schedule import utils
 
 # The import below is not used in this module, but it needs to be kept here. This module is the
@@ -111,10 +113,11 @@ class CeleryProcessTimeoutMonitor(threading.Thread):
         """
         Look for missing Celery processes, log and cleanup as needed.
 
-        To find a missing Celery process, filter the Workers model for entries older than
-        utcnow() - WORKER_TIMEOUT_SECONDS. The heartbeat times are stored in native UTC, so this is
-        a comparable datetime. For each missing worker found, call _delete_worker() synchronously
-        for cleanup.
+        To find a missing Celery process, look in the worker heartbeat table kept by the
+        worker_watcher for heartbeats older than utcnow() - WORKER_TIMEOUT_SECONDS. The heartbeat
+        times are kept in native UTC, so this is a comparable datetime. For each missing worker
+        found, remove it from the table and call _delete_worker() synchronously for cleanup. The
+        heartbeats received since the last write are also written to the database.
 
         This method also checks that at least one resource_manager and one scheduler process is
         present. If there are zero of either, log at the error level that Pulp will not operate
@@ -124,18 +127,19 @@ class CeleryProcessTimeoutMonitor(threading.Thread):
                 'processes are missing for more than %d seconds') % self.CELERY_TIMEOUT_SECONDS
         _logger.debug(msg)
         oldest_heartbeat_time = datetime.utcnow() - timedelta(seconds=self.CELERY_TIMEOUT_SECONDS)
-        worker_list = Worker.objects.all()
+        worker_heartbeats = worker_watcher.get_worker_heartbeats()
         worker_count = 0
         resource_manager_count = 0
         scheduler_count = 0
-        for worker in worker_list:
-            if worker.last_heartbeat < oldest_heartbeat_time:
-                msg = _("Worker '%s' has gone missing, removing from list of workers") % worker.name
+        for name, last_heartbeat in worker_heartbeats.iteritems():
+            if last_heartbeat < oldest_heartbeat_time:
+                msg = _("Worker '%s' has gone missing, removing from list of workers") % name
                 _logger.error(msg)
-                _delete_worker(worker.name)
-            elif worker.name.startswith(SCHEDULER_WORKER_NAME):
+                worker_watcher.forget_worker(name)
+                _delete_worker(name)
+            elif name.startswith(SCHEDULER_WORKER_NAME):
                 scheduler_count = scheduler_count + 1
-            elif worker.name.startswith(RESOURCE_MANAGER_WORKER_NAME):
+            elif name.startswith(RESOURCE_MANAGER_WORKER_NAME):
                 resource_manager_count = resource_manager_count + 1
             else:
                 worker_count = worker_count + 1
@@ -153,6 +157,7 @@ class CeleryProcessTimeoutMonitor(threading.Thread):
                 "pulp_celerybeat processes, and %(resource_manager)d "
                 "pulp_resource_manager processes") % output_dict
         _logger.debug(msg)
+        worker_watcher.flush_heartbeats()
 
 
 class Scheduler(beat.Scheduler):
@@ -189,7 +194,21 @@ class Scheduler(beat.Scheduler):
         and should create the necessary pulp helper threads using spawn_pulp_monitor_threads().
         """
         self._schedule = None
-        self._loaded_from_db_count = 0
+        # IDs of the enabled schedules in the database, including those not in _schedule because
+        # they have no remaining runs
+        self._db_schedule_ids = set()
+        self._most_recent_timestamp = 0
+        self._enabled_count = 0
+        self._schedule_checked = False
+        # min-heap of (due time, entry name) tuples, and the current due time of each entry, which
+        # tells apart the heap items that are still valid from those left by changed entries
+        self._due_heap = []
+        self._due_times = {}
+        # maximum number of scheduled tasks to queue per second, or 0 for no limit, the time at
+        # which the next task may be queued, and the queuing times reserved by due entries
+        self.dispatch_rate = config.getfloat('tasks', 'schedule_dispatch_rate')
+        self._next_dispatch_time = 0
+        self._dispatch_times = {}
 
         # Force the use of the Pulp celery_instance when this custom Scheduler is used.
         kwargs['app'] = app
@@ -225,7 +244,7 @@ class Scheduler(beat.Scheduler):
 
     @staticmethod
     def call_tick(self, celerybeat_name):
-        ret = super(Scheduler, self).tick()
+        ret = self._tick_due_entries()
         _logger.debug(_("%(celerybeat_name)s will tick again in %(ret)s secs")
                       % {'ret': ret, 'celerybeat_name': celerybeat_name})
         return ret
@@ -243,6 +262,9 @@ class Scheduler(beat.Scheduler):
         # Setting the celerybeat name
         celerybeat_name = SCHEDULER_WORKER_NAME + "@" + platform.node()
 
+        # look for changed schedules once, on the first access to the schedule during this tick
+        self._schedule_checked = False
+
         # this is not an event that gets sent anywhere. We process it
         # immediately.
         scheduler_event = {'timestamp': time.time(),
@@ -295,52 +317,221 @@ class Scheduler(beat.Scheduler):
             Scheduler._mongo_initialized = True
         _logger.debug(_('loading schedules from app'))
         self._schedule = {}
+        self._due_heap = []
+        self._due_times = {}
+        self._dispatch_times = {}
         for key, value in self.app.conf.CELERYBEAT_SCHEDULE.iteritems():
             self._schedule[key] = beat.ScheduleEntry(**dict(value, name=key))
-
-        # include a "0" as the default in case there are no schedules to load
-        update_timestamps = [0]
+            self._set_due_time(key, time.time())
 
         _logger.debug(_('loading schedules from DB'))
-        ignored_db_count = 0
-        self._loaded_from_db_count = 0
-        for call in itertools.imap(ScheduledCall.from_db, utils.get_enabled()):
+        self._db_schedule_ids = set()
+        self._most_recent_timestamp = 0
+        self._apply_schedule_changes(itertools.imap(ScheduledCall.from_db, utils.get_enabled()))
+        self._enabled_count = len(self._db_schedule_ids)
+
+        _logger.debug('loaded %(count)d schedules' % {'count': self._enabled_count})
+
+    def _apply_schedule_changes(self, calls):
+        """
+        Add, replace or remove the entries in "_schedule" for the given schedules, according to
+        whether they are enabled and have runs remaining.
+
+        :param calls:   scheduled calls that are new or have changed
+        :type  calls:   iterable of pulp.server.db.model.dispatch.ScheduledCall
+        """
+        for call in calls:
+            self._most_recent_timestamp = max(self._most_recent_timestamp, call.last_updated)
+            if not call.enabled:
+                self._db_schedule_ids.discard(call.id)
+                self._remove_entry(call.id)
+                continue
+            self._db_schedule_ids.add(call.id)
             if call.remaining_runs == 0:
                 _logger.debug(
                     _('ignoring schedule with 0 remaining runs: %(id)s') % {'id': call.id})
-                ignored_db_count += 1
+                self._remove_entry(call.id)
             else:
                 self._schedule[call.id] = call.as_schedule_entry()
-                update_timestamps.append(call.last_updated)
-                self._loaded_from_db_count += 1
+                # the new entry may be due at a different time, so check it on the next tick
+                self._set_due_time(call.id, time.time())
+
+    def _remove_entry(self, name):
+        """
+        Remove an entry from "_schedule" and from the due time index.
 
-        _logger.debug('loaded %(count)d schedules' % {'count': self._loaded_from_db_count})
+        :param name:    name of the entry, which is the schedule ID for schedules from the database
+        :type  name:    basestring
+        """
+        self._schedule.pop(name, None)
+        self._due_times.pop(name, None)
+        self._dispatch_times.pop(name, None)
+
+    def _set_due_time(self, name, due_time):
+        """
+        Set the time at which an entry should next be checked with its is_due() method.
 
-        self._most_recent_timestamp = max(update_timestamps)
+        Heap items are not removed when an entry's due time changes. Instead the item that no
+        longer matches "_due_times" is skipped when it reaches the top, and the heap is rebuilt
+        when such items outnumber the valid ones.
+
+        :param name:        name of the entry in "_schedule"
+        :type  name:        basestring
+        :param due_time:    seconds since the epoch
+        :type  due_time:    float
+        """
+        self._due_times[name] = due_time
+        heapq.heappush(self._due_heap, (due_time, name))
+        if len(self._due_heap) > 2 * len(self._due_times) + 100:
+            self._due_heap = [(t, n) for n, t in self._due_times.iteritems()]
+            heapq.heapify(self._due_heap)
+
+    def _pop_due_entry(self, now):
+        """
+        Remove and return the name of the next entry that is due by "now", skipping heap items
+        whose entry has since been removed or given a different due time.
+
+        :param now: seconds since the epoch
+        :type  now: float
+
+        :return:    name of a due entry, or None if no entry is due
+        :rtype:     basestring or None
+        """
+        while self._due_heap and self._due_heap[0][0] <= now:
+            due_time, name = heapq.heappop(self._due_heap)
+            if self._due_times.get(name) == due_time:
+                del self._due_times[name]
+                return name
+
+    def _seconds_until_next_due(self, now):
+        """
+        :param now: seconds since the epoch
+        :type  now: float
+
+        :return:    number of seconds until the next entry is due, at most "max_interval"
+        :rtype:     float
+        """
+        while self._due_heap:
+            due_time, name = self._due_heap[0]
+            if self._due_times.get(name) == due_time:
+                return max(min(due_time - now, self.max_interval), 0)
+            heapq.heappop(self._due_heap)
+        return self.max_interval
+
+    def maybe_due(self, entry, publisher=None):
+        """
+        Queue the entry's task if it is due, like the superclass method, but no faster than
+        "dispatch_rate" tasks per second. Each due entry reserves the next free queuing time, and
+        is queued when that time comes, so that a burst of due entries is queued in order.
+
+        :param entry:       entry to check
+        :type  entry:       celery.beat.ScheduleEntry
+        :param publisher:   publisher used to queue the task
+        :type  publisher:   celery.app.amqp.TaskProducer
+
+        :return:    number of seconds until the entry should be checked again
+        :rtype:     float
+        """
+        is_due, next_time_to_run = entry.is_due()
+        if not is_due:
+            return next_time_to_run
+
+        if self.dispatch_rate > 0:
+            now = time.time()
+            dispatch_time = self._dispatch_times.pop(entry.name, None)
+            if dispatch_time is None:
+                dispatch_time = max(now, self._next_dispatch_time)
+                self._next_dispatch_time = dispatch_time + 1.0 / self.dispatch_rate
+            if dispatch_time > now:
+                self._dispatch_times[entry.name] = dispatch_time
+                return dispatch_time - now
+
+        _logger.info(_('Scheduler: Sending due task %(name)s (%(task)s)') %
+                     {'name': entry.name, 'task': entry.task})
+        try:
+            result = self.apply_async(entry, publisher=publisher)
+        except Exception as e:
+            _logger.exception(_('Message Error: %(e)s') % {'e': e})
+        else:
+            _logger.debug('%(task)s sent. id->%(id)s' % {'task': entry.task, 'id': result.id})
+        return next_time_to_run
+
+    def _tick_due_entries(self):
+        """
+        Run one iteration of the scheduler, like the superclass tick(), but only call is_due() on
+        the entries whose due time has come instead of on every entry in the schedule.
+
+        :return:    number of seconds before the next tick should run
+        :rtype:     float
+        """
+        # reading the schedule applies any changes made in the database to it
+        schedule = self.schedule
+        now = time.time()
+        # collect the due entries before checking any, so that an entry that is due again right
+        # away waits for the next tick
+        due_names = []
+        name = self._pop_due_entry(now)
+        while name is not None:
+            due_names.append(name)
+            name = self._pop_due_entry(now)
+
+        for name in due_names:
+            entry = schedule.get(name)
+            if entry is not None:
+                # maybe_due() replaces the entry in the schedule if it runs, and returns the number
+                # of seconds until it is due again either way
+                next_time_to_run = self.maybe_due(entry, self.publisher)
+                self._set_due_time(name, now + (next_time_to_run or self.max_interval))
+        return self._seconds_until_next_due(now)
 
     @property
     @UnsafeRetry.retry_decorator()
     def schedule_changed(self):
         """
-        Looks at the update timestamps in the database to determine if there
-        are new or modified schedules.
-
-        Indexing should make this very fast.
+        Looks at the number of enabled schedules and their most recent update
+        timestamp, with a single indexed query, to determine if there are new,
+        modified, disabled or deleted schedules.
 
         :return:    True iff the set of enabled scheduled calls has changed
                     in the database.
         :rtype:     bool
         """
-        if utils.get_enabled().count() != self._loaded_from_db_count:
-            logging.debug(_('number of enabled schedules has changed'))
+        self._enabled_count, most_recent_timestamp = utils.get_enabled_summary()
+
+        if self._enabled_count != len(self._db_schedule_ids):
+            _logger.debug(_('number of enabled schedules has changed'))
             return True
 
-        if utils.get_updated_since(self._most_recent_timestamp).count() > 0:
-            logging.debug(_('one or more enabled schedules has been updated'))
+        if most_recent_timestamp > self._most_recent_timestamp:
+            _logger.debug(_('one or more enabled schedules has been updated'))
             return True
 
         return False
 
+    @UnsafeRetry.retry_decorator()
+    def update_schedule(self):
+        """
+        Patch "_schedule" in place with the schedules that changed since it was last loaded,
+        rather than rebuilding every entry.
+
+        Schedules that were added, modified or disabled carry a newer update timestamp and are
+        fetched by it. Deleted schedules leave no trace, so if the number of enabled schedules
+        still differs from the database afterwards, the enabled IDs are compared to find them.
+        """
+        changed = utils.get_changed_since(self._most_recent_timestamp)
+        self._apply_schedule_changes(itertools.imap(ScheduledCall.from_db, changed))
+
+        if self._enabled_count != len(self._db_schedule_ids):
+            enabled_ids = utils.get_enabled_ids()
+            for schedule_id in self._db_schedule_ids - enabled_ids:
+                self._db_schedule_ids.discard(schedule_id)
+                self._remove_entry(schedule_id)
+            missing_ids = enabled_ids - self._db_schedule_ids
+            if missing_ids:
+                self._apply_schedule_changes(utils.get(list(missing_ids)))
+
+        _logger.debug('updated schedules, %(count)d loaded' % {'count': len(self._db_schedule_ids)})
+
     @property
     def schedule(self):
         """
@@ -352,8 +543,12 @@ class Scheduler(beat.Scheduler):
         if self._schedule is None:
             return self.get_schedule()
 
-        if self.schedule_changed:
-            self.setup_schedule()
+        # The schedule is read many times during a tick, and changing its keys while the
+        # superclass iterates over it would end the tick, so only look for changes once per tick.
+        if not self._schedule_checked:
+            self._schedule_checked = True
+            if self.schedule_changed:
+                self.update_schedule()
 
         return self._schedule
 
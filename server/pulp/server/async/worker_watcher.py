@@ -9,6 +9,10 @@ See the individual function docblocks for more detail on how each event type is
 The use of an 'event' or 'celery event' throughout this module refers to a dict built by celery
 that contains event information. Read more about this in the docs for celery.events.
 
+Heartbeats are recorded in an in-memory table of each worker's last heartbeat, which is written
+to the database in a single bulk write at most every HEARTBEAT_FLUSH_SECONDS. The table is also
+what is consulted to find workers that have gone missing.
+
 Other functions in this module are helper functions designed to deduplicate the amount of shared
 code between the event handlers.
 """
@@ -16,6 +20,8 @@ code between the event handlers.
 from datetime import datetime
 from gettext import gettext as _
 import logging
+import threading
+import time
 
 from pulp.server.async.tasks import _delete_worker
 from pulp.server.db.model import Worker
@@ -23,6 +29,17 @@ from pulp.server.db.model import Worker
 
 _logger = logging.getLogger(__name__)
 
+# The longest time in seconds that heartbeats are kept in memory before being written to the db
+HEARTBEAT_FLUSH_SECONDS = 10
+
+# The last heartbeat of each known worker, the names of the workers whose heartbeat has not been
+# written to the database yet, and when it was last written. All are guarded by _heartbeats_lock.
+_heartbeats = {}
+_unflushed = set()
+_last_flush = 0
+_heartbeats_loaded = False
+_heartbeats_lock = threading.RLock()
+
 
 def _parse_and_log_event(event):
     """
@@ -61,27 +78,97 @@ def _log_event(event_info):
     _logger.debug(msg)
 
 
+def _load_heartbeats():
+    """
+    Load the workers and their last heartbeats from the database the first time it is called.
+    Heartbeats already received are more recent, so they are kept.
+
+    The caller must hold _heartbeats_lock.
+    """
+    global _heartbeats_loaded
+    if _heartbeats_loaded:
+        return
+    for worker in Worker.objects.only('name', 'last_heartbeat'):
+        # a worker without a heartbeat is treated as long gone
+        _heartbeats.setdefault(worker.name, worker.last_heartbeat or datetime.min)
+    _heartbeats_loaded = True
+
+
+def flush_heartbeats(force=False):
+    """
+    Write the heartbeats received since the last flush to the database, with one bulk write, if
+    HEARTBEAT_FLUSH_SECONDS have passed since then.
+
+    The lock is held during the write, so that a worker that is forgotten meanwhile is not
+    written back to the database.
+
+    :param force: write the heartbeats even if HEARTBEAT_FLUSH_SECONDS have not passed
+    :type  force: bool
+    """
+    global _last_flush
+    with _heartbeats_lock:
+        now = time.time()
+        if not _unflushed or not (force or now - _last_flush >= HEARTBEAT_FLUSH_SECONDS):
+            return
+        bulk = Worker._get_collection().initialize_unordered_bulk_op()
+        for name in _unflushed:
+            bulk.find({'_id': name}).upsert().update_one(
+                {'$set': {'last_heartbeat': _heartbeats[name]}})
+        bulk.execute()
+        _logger.debug(_('Wrote the heartbeats of %(count)d workers') % {'count': len(_unflushed)})
+        _unflushed.clear()
+        _last_flush = now
+
+
+def get_worker_heartbeats():
+    """
+    :return: the last heartbeat of each known worker, as a naive datetime.datetime in UTC
+    :rtype:  dict
+    """
+    with _heartbeats_lock:
+        _load_heartbeats()
+        return dict(_heartbeats)
+
+
+def forget_worker(name):
+    """
+    Remove a worker from the heartbeat table, so that it is no longer written to the database.
+    This should be called before the worker's database record is deleted.
+
+    :param name: name of the worker
+    :type  name: basestring
+    """
+    with _heartbeats_lock:
+        _heartbeats.pop(name, None)
+        _unflushed.discard(name)
+
+
 def handle_worker_heartbeat(event):
     """
     Celery event handler for 'worker-heartbeat' events.
 
-    The event is first parsed and logged.  Then the existing Worker objects are
-    searched for one to update. If an existing one is found, it is updated.
-    Otherwise a new Worker entry is created. Logging at the info and debug
-    level is also done.
+    The event is first parsed and logged. Then the worker's heartbeat is recorded in the
+    in-memory heartbeat table. A worker that was not known is logged at the info level and
+    written to the database right away, and the other heartbeats are written together once
+    HEARTBEAT_FLUSH_SECONDS have passed since the last write.
 
     :param event: A celery event to handle.
     :type event: dict
     """
     event_info = _parse_and_log_event(event)
-    worker = Worker.objects(name=event_info['worker_name']).first()
-
-    if not worker:
-        msg = _("New worker '%(worker_name)s' discovered") % event_info
-        _logger.info(msg)
+    name = event_info['worker_name']
 
-    Worker.objects(name=event_info['worker_name']).\
-        update_one(set__last_heartbeat=event_info['timestamp'], upsert=True)
+    with _heartbeats_lock:
+        _load_heartbeats()
+        new_worker = name not in _heartbeats
+        if new_worker:
+            msg = _("New worker '%(worker_name)s' discovered") % event_info
+            _logger.info(msg)
+        # events can arrive out of order, so keep the most recent heartbeat
+        if new_worker or event_info['timestamp'] > _heartbeats[name]:
+            _heartbeats[name] = event_info['timestamp']
+        _unflushed.add(name)
+        flush_heartbeats(force=new_worker)
 
 
 def handle_worker_offline(event):
@@ -104,4 +191,5 @@ def handle_worker_offline(event):
 
     msg = _("Worker '%(worker_name)s' shutdown") % event_info
     _logger.info(msg)
+    forget_worker(event_info['worker_name'])
     _delete_worker(event_info['worker_name'], normal_shutdown=True)
@@ -22,6 +22,9 @@ _default_values = {
         'repo_group_publish_history': '60',
         'task_status_history': '7',
         'task_result_history': '3',
+        'batch_size': '1000',
+        'batch_pause': '0.1',
+        'ttl_indexes': 'false',
     },
     'database': {
         'name': 'pulp_database',
@@ -79,7 +82,10 @@ _default_values = {
         'log_level': 'INFO',
         'key_url': '/pulp/gpg',
         'ks_url': '/pulp/ks',
-        'working_directory': '/var/cache/pulp'
+        'working_directory': '/var/cache/pulp',
+        'response_cache_ttl': '0',
+        'response_compression_level': '6',
+        'response_compression_min_size': '1024',
     },
     'tasks': {
         'broker_url': 'qpid://localhost/',
@@ -88,6 +94,8 @@ _default_values = {
         'keyfile': '/etc/pki/pulp/qpid/client.crt',
         'certfile': '/etc/pki/pulp/qpid/client.crt',
         'login_method': '',
+        'schedule_jitter': '0',
+        'schedule_dispatch_rate': '0',
     },
 }
 
@@ -448,7 +448,8 @@ def update_unit_count(repo_id, unit_type_id, delta):
     atomic_inc_key = 'inc__content_unit_counts__{unit_type_id}'.format(unit_type_id=unit_type_id)
     if delta:
         try:
-            model.Repository.objects(repo_id=repo_id).update_one(**{atomic_inc_key: delta})
+            model.Repository.objects(repo_id=repo_id).update_one(inc__revision=1,
+                                                                 **{atomic_inc_key: delta})
         except OperationError:
             message = 'There was a problem updating repository %s' % repo_id
             raise pulp_exceptions.PulpExecutionException(message), None, sys.exc_info()[2]
@@ -599,6 +600,7 @@ def sync(repo_id, sync_config_override=None, scheduled_call_id=None):
         # Do an update instead of a save in case the importer has changed the scratchpad
         importer_collection.update(
             {'repo_id': repo_obj.repo_id}, {'$set': {'last_sync': sync_end_timestamp}}, safe=True)
+        model.Repository.objects.bump_revision(repo_obj.repo_id)
         # Add a sync history entry for this run
         sync_result_collection.save(sync_result, safe=True)
 
@@ -791,6 +793,7 @@ def _do_publish(repo_obj, dist_id, dist_inst, transfer_repo, conduit, call_confi
         repo_distributor = distributor_coll.find_one(
             {'repo_id': repo_obj.repo_id, 'id': dist_id})
         distributor_coll.save(repo_distributor, safe=True)
+        model.Repository.objects.bump_revision(repo_obj.repo_id)
 
         # Add a publish history entry for the run
         result = RepoPublishResult.error_result(
@@ -809,6 +812,7 @@ def _do_publish(repo_obj, dist_id, dist_inst, transfer_repo, conduit, call_confi
     repo_distributor = distributor_coll.find_one({'repo_id': repo_obj.repo_id, 'id': dist_id})
     repo_distributor['last_publish'] = datetime.utcnow()
     distributor_coll.save(repo_distributor, safe=True)
+    model.Repository.objects.bump_revision(repo_obj.repo_id)
 
     # Add a publish entry
     summary = publish_report.summary
@@ -0,0 +1,45 @@
+"""
+This migration stores the timestamps of the consumer_history collection as dates instead of
+ISO8601 strings, so that they can be compared as dates, and drops the consumer_id and type
+indexes, which are prefixes of the compound indexes the history is now queried with.
+"""
+from pulp.common import dateutils
+from pulp.server.db import connection
+
+
+# Number of documents updated by each bulk write.
+BATCH_SIZE = 1000
+
+# Indexes replaced by the compound indexes of ConsumerHistoryEvent.
+OBSOLETE_INDEXES = ('consumer_id_-1', 'type_-1')
+
+
+def migrate(*args, **kwargs):
+    """
+    Perform the migration as described in this module's docblock.
+
+    :param args:   unused
+    :type  args:   list
+    :param kwargs: unused
+    :type  kwargs: dict
+    """
+    db = connection.get_database()
+    collection = db['consumer_history']
+
+    bulk, pending = collection.initialize_unordered_bulk_op(), 0
+    # $type 2 is a string
+    for event in collection.find({'timestamp': {'$type': 2}}, fields=['timestamp']):
+        timestamp = dateutils.to_utc_datetime(
+            dateutils.parse_iso8601_datetime(event['timestamp']), no_tz_equals_local_tz=False)
+        bulk.find({'_id': event['_id']}).update({'$set': {'timestamp': timestamp}})
+        pending += 1
+        if pending == BATCH_SIZE:
+            bulk.execute()
+            bulk, pending = collection.initialize_unordered_bulk_op(), 0
+    if pending:
+        bulk.execute()
+
+    indexes = collection.index_information()
+    for name in OBSOLETE_INDEXES:
+        if name in indexes:
+            collection.drop_index(name)
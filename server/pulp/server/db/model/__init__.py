@@ -66,6 +66,9 @@ class Repository(AutoRetryDocument):
     :type last_unit_added: mongoengine.DateTimeField
     :ivar last_unit_removed: Datetime of the most recent occurence of removing a unit from the repo
     :type last_unit_removed: mongoengine.DateTimeField
+    :ivar revision: counter incremented whenever the repository, its importer or its distributors
+                    change; used to tell clients whether their copy of the repository is current
+    :type revision: mongoengine.IntField
     :ivar _ns: (Deprecated) Namespace of repo, included for backwards compatibility.
     :type _is: mongoengine.StringField
     """
@@ -81,6 +84,7 @@ class Repository(AutoRetryDocument):
     content_unit_counts = DictField(default={})
     last_unit_added = DateTimeField()
     last_unit_removed = DateTimeField()
+    revision = IntField(default=0)
 
     # For backward compatibility
     _ns = StringField(default='repos')
@@ -125,9 +129,25 @@ class Repository(AutoRetryDocument):
                     self.notes[key] = value
 
         # These keys may not be changed.
-        prohibited = ['content_unit_counts', 'repo_id', 'last_unit_added', 'last_unit_removed']
+        prohibited = ['content_unit_counts', 'repo_id', 'last_unit_added', 'last_unit_removed',
+                      'revision']
         [setattr(self, key, value) for key, value in repo_delta.items() if key not in prohibited]
 
+    @classmethod
+    def post_save_signal(cls, sender, document, **kwargs):
+        """
+        Increment the revision of the repository whenever it is saved.
+
+        :param sender: class of sender (unused)
+        :type  sender: class
+        :param document: repository that was saved
+        :type  document: pulp.server.db.model.Repository
+        """
+        cls.objects.bump_revision(document.repo_id)
+
+
+signals.post_save.connect(Repository.post_save_signal, sender=Repository)
+
 
 class RepositoryContentUnit(AutoRetryDocument):
     """
@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 
 from pulp.server.db.model.base import Model
-from pulp.server.db.model.reaper_base import ReaperMixin
+from pulp.server.db.model.reaper_base import ReaperMixin, _remove_in_batches
 
 
 class CeleryResult(Model, ReaperMixin):
@@ -11,9 +11,10 @@ class CeleryResult(Model, ReaperMixin):
 
     collection_name = 'celery_taskmeta'
     unique_indices = tuple()
+    ttl_field = 'date_done'
 
     @classmethod
-    def reap_old_documents(cls, config_days):
+    def reap_old_documents(cls, config_days, batch_size=0, batch_pause=0):
         """
         Delete old Celery task results from the celery_taskmeta collection.
 
@@ -23,8 +24,16 @@ class CeleryResult(Model, ReaperMixin):
 
         :param config_days: Remove all records older than the number of days set by config_days.
         :type config_days: float
+        :param batch_size: maximum number of documents to remove at a time, 0 for no limit
+        :type batch_size: int
+        :param batch_pause: seconds to wait between batches
+        :type batch_pause: float
+
+        :return: number of documents removed
+        :rtype:  int
         """
         # Remove all objects older than the epoch time encoded in last_valid_date_done
         last_valid_date_done = datetime.utcnow() - timedelta(days=config_days)
         collection = cls.get_collection()
-        collection.remove({'date_done': {'$lt': last_valid_date_done}})
+        return _remove_in_batches(collection, {'date_done': {'$lt': last_valid_date_done}},
+                                  batch_size, batch_pause)
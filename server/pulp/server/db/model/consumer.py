@@ -334,9 +334,19 @@ class ConsumerHistoryEvent(Model, ReaperMixin):
 
     :param details: event details
     :type details: dict
+
+    :ivar timestamp: UTC time the event was recorded at
+    :type timestamp: datetime.datetime
     """
     collection_name = 'consumer_history'
-    search_indices = ('consumer_id', 'originator', 'type', )
+    # history is listed newest first, optionally limited to a consumer, an event type or both, and
+    # paged by timestamp and _id, so each supported filter has an index ending in the sort fields
+    search_indices = (('consumer_id', 'timestamp', '_id'),
+                      ('consumer_id', 'type', 'timestamp', '_id'),
+                      ('type', 'timestamp', '_id'),
+                      ('timestamp', '_id'),
+                      'originator', )
+    ttl_field = 'timestamp'
 
     def __init__(self, consumer_id, originator, event_type, details):
         super(ConsumerHistoryEvent, self).__init__()
@@ -345,8 +355,9 @@ class ConsumerHistoryEvent(Model, ReaperMixin):
         self.originator = originator
         self.type = event_type
         self.details = details
-        now = datetime.datetime.now(dateutils.utc_tz())
-        self.timestamp = dateutils.format_iso8601_datetime(now)
+        # whole seconds, like the ISO8601 timestamps the events are returned with, so that an
+        # event's timestamp can be recovered exactly when paging from it
+        self.timestamp = datetime.datetime.now(dateutils.utc_tz()).replace(microsecond=0)
 
 
 class ConsumerGroup(Model):
@@ -148,3 +148,133 @@ class ContentCatalog(Model):
         self.unit_key = unit_key
         self.locator = self.get_locator(type_id, unit_key)
         self.url = url
+
+
+class ContentDownload(Model):
+    """
+    Represents a content unit file download that is in progress.
+    Things to know about in-flight downloads:
+     - An entry is a lock owned by the task downloading the file.  Only one
+       entry may exist for a given locator.
+     - The locator is the same hashed json encoding of the type_id and unit_key
+       used by the content catalog.
+     - Each entry contains an expiration timestamp.  An expired entry is
+       considered abandoned (the owner crashed) and may be taken over.
+    :ivar owner: Uniquely identifies the downloader holding the lock.
+    :type owner: str
+    :ivar expiration: The expiration UTC timestamp.
+    :type expiration: int
+    :ivar type_id: The unit type ID.
+    :type type_id: str
+    :ivar unit_key: The unit key.
+    :type unit_key: dict
+    :ivar locator: The hashed json encoding of the type_id and unit_key.
+    :type locator: str
+    :ivar path: The absolute path to which the file is being downloaded.
+    :type path: str
+    """
+
+    collection_name = 'content_downloads'
+    search_indices = ('owner', 'expiration')
+    unique_indices = ('locator',)
+
+    def __init__(self, owner, lease, type_id, unit_key, path):
+        """
+        :param owner: Uniquely identifies the downloader holding the lock.
+        :type owner: str
+        :param lease: The lock lease (duration in seconds).
+        :type lease: int
+        :param type_id: A content unit's type ID.
+        :type type_id: str
+        :param unit_key: A content unit's key.
+        :type unit_key: dict
+        :param path: The absolute path to which the file is being downloaded.
+        :type path: str
+        """
+        Model.__init__(self)
+        self.owner = owner
+        self.expiration = ContentCatalog.get_expiration(lease)
+        self.type_id = type_id
+        self.unit_key = unit_key
+        self.locator = ContentCatalog.get_locator(type_id, unit_key)
+        self.path = path
+
+
+class OrphanScanReport(Model):
+    """
+    The result of scanning for orphaned content units of a content type.
+    Things to know about orphan scans:
+     - There is one report for each scanned content type.
+     - The orphans found are recorded as OrphanScanUnit entries.
+     - The scan position (last_id) is checkpointed after each page of orphans
+       so that an interrupted scan can be resumed.
+     - The count and size are calculated when the scan has finished.
+    :ivar content_type_id: The scanned content type ID.
+    :type content_type_id: str
+    :ivar state: The state of the scan (scanning|finished).
+    :type state: str
+    :ivar last_id: The _id of the last orphan recorded.
+    :type last_id: str
+    :ivar count: The number of orphans found.
+    :type count: int
+    :ivar size: The total number of bytes used on disk by the orphans.
+    :type size: int
+    :ivar started: The UTC timestamp of when the scan started.
+    :type started: str
+    :ivar finished: The UTC timestamp of when the scan finished.
+    :type finished: str
+    """
+
+    SCANNING = 'scanning'
+    FINISHED = 'finished'
+
+    collection_name = 'orphan_scan_reports'
+    unique_indices = ('content_type_id',)
+
+    def __init__(self, content_type_id):
+        """
+        :param content_type_id: The scanned content type ID.
+        :type content_type_id: str
+        """
+        Model.__init__(self)
+        self.content_type_id = content_type_id
+        self.state = self.SCANNING
+        self.last_id = None
+        self.count = 0
+        self.size = 0
+        self.started = dateutils.format_iso8601_datetime(datetime.now(dateutils.utc_tz()))
+        self.finished = None
+
+
+class OrphanScanUnit(Model):
+    """
+    An orphaned content unit found by an orphan scan.
+    :ivar content_type_id: The content type ID.
+    :type content_type_id: str
+    :ivar unit_id: The content unit ID.
+    :type unit_id: str
+    :ivar storage_path: The content unit storage path.
+    :type storage_path: str
+    :ivar size: The number of bytes used on disk.
+    :type size: int
+    """
+
+    collection_name = 'orphan_scan_units'
+    unique_indices = (('content_type_id', 'unit_id'),)
+
+    def __init__(self, content_type_id, unit_id, storage_path, size):
+        """
+        :param content_type_id: The content type ID.
+        :type content_type_id: str
+        :param unit_id: The content unit ID.
+        :type unit_id: str
+        :param storage_path: The content unit storage path.
+        :type storage_path: str
+        :param size: The number of bytes used on disk.
+        :type size: int
+        """
+        Model.__init__(self)
+        self.content_type_id = content_type_id
+        self.unit_id = unit_id
+        self.storage_path = storage_path
+        self.size = size
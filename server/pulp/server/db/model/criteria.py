@@ -1,5 +1,7 @@
 from types import NoneType
+import base64
 import copy
+import json
 import re
 import sys
 
@@ -7,6 +9,7 @@ import pymongo
 
 from pulp.common.dateutils import parse_iso8601_datetime
 from pulp.server import exceptions as pulp_exceptions
+from pulp.server.compat import json_util
 from pulp.server.db.model.base import Model
 
 
@@ -101,7 +104,8 @@ class UnitAssociationCriteria(Model):
 
     def __init__(self, type_ids=None, association_filters=None, unit_filters=None,
                  association_sort=None, unit_sort=None, limit=None, skip=None,
-                 association_fields=None, unit_fields=None, remove_duplicates=False):
+                 association_fields=None, unit_fields=None, remove_duplicates=False,
+                 continuation=None):
         """
         There are a number of entry points into creating one of these instances:
         multiple REST interfaces, the plugins, etc. As such, this constructor
@@ -144,6 +148,10 @@ class UnitAssociationCriteria(Model):
         @param remove_duplicates: if True, units with multiple associations will
                only return a single association; defaults to False
         @type  remove_duplicates: bool
+
+        @param continuation: decoded continuation token describing where the
+               previous page of results ended; results start after it
+        @type  continuation: dict
         """
         super(UnitAssociationCriteria, self).__init__()
 
@@ -177,6 +185,8 @@ class UnitAssociationCriteria(Model):
 
         self.remove_duplicates = remove_duplicates
 
+        self.continuation = continuation
+
     @classmethod
     def from_client_input(cls, query):
         """
@@ -200,7 +210,8 @@ class UnitAssociationCriteria(Model):
             "unit" : ["name", "version", "arch"],
             "association" : ["created"]
           },
-          "remove_duplicates" : True
+          "remove_duplicates" : True,
+          "continuation" : <token returned with the previous page>
         }
 
         @param query: user-provided query details
@@ -244,6 +255,10 @@ class UnitAssociationCriteria(Model):
 
         remove_duplicates = bool(query.pop('remove_duplicates', False))
 
+        continuation = decode_continuation(query.pop('continuation', None))
+        if continuation is not None and skip:
+            raise pulp_exceptions.InvalidValue(['skip'])
+
         # report any superfluous doc key, value pairs as errors
         for d in (query, filters, sort, fields):
             if d:
@@ -261,7 +276,7 @@ class UnitAssociationCriteria(Model):
                    unit_filters=unit_filters, association_sort=association_sort,
                    unit_sort=unit_sort, limit=limit, skip=skip,
                    association_fields=association_fields, unit_fields=unit_fields,
-                   remove_duplicates=remove_duplicates)
+                   remove_duplicates=remove_duplicates, continuation=continuation)
 
     @property
     def association_spec(self):
@@ -299,10 +314,53 @@ class UnitAssociationCriteria(Model):
             s += 'Assoc Fields [%s] ' % self.association_fields
         if self.unit_fields:
             s += 'Unit Fields [%s] ' % self.unit_fields
+        if self.continuation:
+            s += 'Continuation [%s] ' % self.continuation
         s += 'Remove Duplicates [%s]' % self.remove_duplicates
         return s
 
 
+def encode_continuation(continuation):
+    """
+    Encode a continuation as the opaque token handed to clients.
+
+    @param continuation: sort fields and values of the last result of a page
+    @type  continuation: dict
+
+    @return: continuation token
+    @rtype:  str
+    """
+    return base64.urlsafe_b64encode(json.dumps(continuation, default=json_util.default))
+
+
+def decode_continuation(token):
+    """
+    Decode a continuation token created by encode_continuation.
+
+    @type  token: str
+
+    @rtype: dict
+    """
+    if token is None:
+        return None
+    try:
+        continuation = json.loads(base64.urlsafe_b64decode(str(token)),
+                                  object_hook=json_util.object_hook)
+        if not isinstance(continuation, dict):
+            raise ValueError()
+        sort = continuation['sort']
+        values = continuation['values']
+        if not isinstance(sort, list) or not isinstance(values, list) or \
+                len(sort) != len(values):
+            raise ValueError()
+        for field in sort:
+            if not isinstance(field, list) or len(field) != 2:
+                raise ValueError()
+    except (TypeError, ValueError, KeyError):
+        raise pulp_exceptions.InvalidValue(['continuation']), None, sys.exc_info()[2]
+    return continuation
+
+
 def _validate_filters(filters):
     if filters is None:
         return None
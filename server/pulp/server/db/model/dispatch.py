@@ -1,5 +1,6 @@
 from datetime import datetime
 import calendar
+import hashlib
 import isodate
 import logging
 import pickle
@@ -12,6 +13,7 @@ from celery.utils.timeutils import timedelta_seconds
 
 from pulp.common import dateutils
 from pulp.server.async.celery_instance import celery as app
+from pulp.server.config import config
 from pulp.server.db.model.base import Model
 from pulp.server.managers import factory
 
@@ -24,17 +26,17 @@ class ScheduledCall(Model):
     Serialized scheduled call request
     """
     USER_UPDATE_FIELDS = frozenset(['iso_schedule', 'args', 'kwargs', 'enabled',
-                                    'failure_threshold'])
+                                    'failure_threshold', 'jitter'])
 
     collection_name = 'scheduled_calls'
     unique_indices = ()
-    search_indices = ('resource', 'last_updated')
+    search_indices = ('resource', 'last_updated', ('enabled', 'last_updated'))
 
     def __init__(self, iso_schedule, task, total_run_count=0, next_run=None,
                  schedule=None, args=None, kwargs=None, principal=None, last_updated=None,
                  consecutive_failures=0, enabled=True, failure_threshold=None,
                  last_run_at=None, first_run=None, remaining_runs=None, id=None,
-                 tags=None, name=None, options=None, resource=None):
+                 tags=None, name=None, options=None, resource=None, jitter=None):
         """
         :param iso_schedule:        string representing the schedule in ISO8601 format
         :type  iso_schedule:        basestring
@@ -102,6 +104,10 @@ class ScheduledCall(Model):
                                     repo, and this collection will be searched for that resource
                                     string.
         :type  resource:            basestring
+        :param jitter:              number of seconds over which runs of this schedule may be
+                                    delayed, so that schedules due at the same time are spread out.
+                                    If None, the [tasks] schedule_jitter setting is used.
+        :type  jitter:              int or NoneType
         """
         if id is None:
             # this creates self._id and self.id
@@ -128,6 +134,7 @@ class ScheduledCall(Model):
         self.enabled = enabled
         self.failure_threshold = failure_threshold
         self.iso_schedule = iso_schedule
+        self.jitter = jitter
         self.kwargs = kwargs or {}
         self.last_run_at = last_run_at
         self.last_updated = last_updated or time.time()
@@ -210,6 +217,7 @@ class ScheduledCall(Model):
             'first_run': self.first_run,
             'kwargs': self.kwargs,
             'iso_schedule': self.iso_schedule,
+            'jitter': self.jitter,
             'last_run_at': self.last_run_at,
             'last_updated': self.last_updated,
             'next_run': self.calculate_next_run(),
@@ -317,6 +325,26 @@ class ScheduledCall(Model):
 
         return now_s, first_run_s, since_first_s, run_every_s, last_scheduled_run_s, expected_runs
 
+    def calculate_jitter(self, run_every_s):
+        """
+        Calculate how long each run of this schedule is delayed after its scheduled time. The delay
+        is derived from the schedule's ID, so it is the same for every run, and the schedules that
+        share a scheduled time are spread evenly over the jitter window.
+
+        :param run_every_s: number of seconds between runs, which the delay is kept below
+        :type  run_every_s: float
+
+        :return:    number of seconds to delay each run
+        :rtype:     float
+        """
+        window = self.jitter
+        if window is None:
+            window = config.getint('tasks', 'schedule_jitter')
+        if window <= 0:
+            return 0
+        fraction = int(hashlib.md5(self.id).hexdigest()[:8], 16) / float(0x100000000)
+        return fraction * min(window, run_every_s)
+
     def calculate_next_run(self):
         """
         This algorithm starts by determining when the first call was or should
@@ -399,9 +427,12 @@ class ScheduleEntry(beat.ScheduleEntry):
         now_s, first_run_s, since_first_s, run_every_s, \
             last_scheduled_run_s, expected_runs = self._scheduled_call._calculate_times()
 
+        # runs after the first are delayed by the jitter, which is less than the interval
+        jitter_s = self._scheduled_call.calculate_jitter(run_every_s)
+
         # seconds remaining until the next time this should run, not counting
         # whether it gets run now or not
-        remaining_s = last_scheduled_run_s + run_every_s - now_s
+        remaining_s = last_scheduled_run_s + run_every_s + jitter_s - now_s
 
         # if the first run is in the future, don't run it now
         if since_first_s < 0:
@@ -416,6 +447,10 @@ class ScheduleEntry(beat.ScheduleEntry):
 
         # is this hasn't run since the most recent scheduled run, then run now
         if last_run_s < last_scheduled_run_s:
+            if now_s < last_scheduled_run_s + jitter_s:
+                _logger.debug('not running task %s: delayed %d seconds by jitter' % (
+                              self.name, jitter_s))
+                return False, last_scheduled_run_s + jitter_s - now_s
             _logger.debug('running task %s: it has been %d seconds since last run' % (
                           self.name, now_s - last_run_s))
             return True, remaining_s
@@ -27,3 +27,20 @@ class EventListener(Model):
         self.notifier_type_id = notifier_type_id
         self.notifier_config = notifier_config
         self.event_types = event_types
+
+
+class EventListenerGeneration(Model):
+    """
+    Counts the changes made to the configured event listeners so that the
+    processes caching them know when to reload them. The collection holds a
+    single document, identified by GENERATION_ID.
+
+    @ivar generation: incremented each time a listener is created, updated
+          or deleted
+    @type generation: int
+    """
+
+    collection_name = 'event_listener_generation'
+    unique_indices = ()
+
+    GENERATION_ID = 'event_listeners'
@@ -1,38 +1,162 @@
 from datetime import timedelta, datetime
+from gettext import gettext as _
+import logging
+import time
 
 from pulp.common import dateutils
 from pulp.server.compat import ObjectId
 
 
+_logger = logging.getLogger(__name__)
+
+
 class ReaperMixin(object):
     """
     A Mixin class providing default reaping functionality.
 
     This class is designed to be used as a Mixin on any Model object that needs to have its
     documents periodically reaped by the pulp reaper.
+
+    :cvar ttl_field: name of a field holding a BSON date, on which a MongoDB TTL index can expire
+                     documents instead of the reaper removing them. None if the documents have no
+                     such field.
+    :type ttl_field: basestring or None
     """
 
+    ttl_field = None
+
+    @classmethod
+    def _get_reaper_collection(cls):
+        """
+        :return: the collection whose documents are reaped
+        :rtype:  pymongo.collection.Collection
+        """
+        try:
+            return cls.get_collection()
+        except AttributeError:
+            # This is a temporary fix to make the models migrated to mongoengine
+            # work with ReaperMixin. Once all the models are migrated, we will remove this
+            # and just use mongoengine queryset to delete old documents.
+            return cls._get_collection()
+
     @classmethod
-    def reap_old_documents(cls, config_days):
+    def reap_old_documents(cls, config_days, batch_size=0, batch_pause=0):
         """
         Remove documents from that are older than config_days.
 
         :param config_days: Remove all records older than the number of days set by config_days.
         :type config_days: float
+        :param batch_size: maximum number of documents to remove at a time, 0 for no limit
+        :type batch_size: int
+        :param batch_pause: seconds to wait between batches
+        :type batch_pause: float
+
+        :return: number of documents removed
+        :rtype:  int
         """
         age = timedelta(days=config_days)
         # Generate an ObjectId that we can use to know which objects to remove
         expired_object_id = _create_expired_object_id(age)
         # Remove all objects older than the timestamp encoded into the generated ObjectId
-        try:
-            collection = cls.get_collection()
-        except AttributeError:
-            # This is a temporary fix to make the models migrated to mongoengine
-            # work with ReaperMixin. Once all the models are migrated, we will remove this
-            # and just use mongoengine queryset to delete old documents.
-            collection = cls._get_collection()
+        return _remove_in_batches(cls._get_reaper_collection(),
+                                  {'_id': {'$lte': expired_object_id}}, batch_size, batch_pause)
 
-        collection.remove({'_id': {'$lte': expired_object_id}})
+    @classmethod
+    def manage_ttl_index(cls, config_days):
+        """
+        Create, update or drop the TTL index on ttl_field, so that MongoDB removes documents older
+        than config_days in the background.
+
+        :param config_days: age in days after which documents expire, or None to drop the index
+        :type config_days: float or None
+
+        :return: True if a TTL index now expires the documents, else False
+        :rtype:  bool
+        """
+        if cls.ttl_field is None:
+            return False
+
+        collection = cls._get_reaper_collection()
+        key = [(cls.ttl_field, 1)]
+        existing = None
+        for name, info in collection.index_information().items():
+            if info['key'] == key:
+                existing = (name, info)
+
+        if config_days is None:
+            if existing is not None and 'expireAfterSeconds' in existing[1]:
+                _logger.info(_('Dropping the TTL index on %(collection)s') %
+                             {'collection': collection.name})
+                collection.drop_index(existing[0])
+            return False
+
+        expire_after = int(timedelta(days=config_days).total_seconds())
+        if existing is not None and 'expireAfterSeconds' not in existing[1]:
+            # an expiry can only be changed in place on an index that already has one
+            collection.drop_index(existing[0])
+            existing = None
+        if existing is None:
+            _logger.info(_('Creating a TTL index on %(collection)s') %
+                         {'collection': collection.name})
+            collection.create_index(key, expireAfterSeconds=expire_after)
+        elif existing[1]['expireAfterSeconds'] != expire_after:
+            collection.database.command('collMod', collection.name,
+                                        index={'keyPattern': dict(key),
+                                               'expireAfterSeconds': expire_after})
+        return True
+
+
+def _remove_in_batches(collection, spec, batch_size, batch_pause):
+    """
+    Remove the documents that match spec, in batches of at most batch_size documents, oldest _id
+    first. Each batch is removed by an _id range, so an interrupted run loses no work and the next
+    one continues with the documents that remain.
+
+    :param collection: collection to remove documents from
+    :type  collection: pymongo.collection.Collection
+    :param spec: query matching the documents to remove
+    :type  spec: dict
+    :param batch_size: maximum number of documents to remove at a time, 0 for no limit
+    :type  batch_size: int
+    :param batch_pause: seconds to wait between batches
+    :type  batch_pause: float
+
+    :return: number of documents removed
+    :rtype:  int
+    """
+    if batch_size <= 0:
+        return _removed_count(collection.remove(spec))
+
+    removed = 0
+    while True:
+        batch = [doc['_id'] for doc in
+                 collection.find(spec, fields=['_id']).sort('_id', 1).limit(batch_size)]
+        if not batch:
+            break
+        id_range = {'_id': {'$gte': batch[0], '$lte': batch[-1]}}
+        removed += _removed_count(collection.remove({'$and': [spec, id_range]}), len(batch))
+        _logger.debug(_('Removed %(removed)d old documents from %(collection)s so far') %
+                      {'removed': removed, 'collection': collection.name})
+        if len(batch) < batch_size:
+            break
+        if batch_pause > 0:
+            time.sleep(batch_pause)
+    return removed
+
+
+def _removed_count(result, default=0):
+    """
+    :param result: return value of pymongo's Collection.remove()
+    :type  result: dict or None
+    :param default: count to return if the write was not acknowledged
+    :type  default: int
+
+    :return: number of documents removed
+    :rtype:  int
+    """
+    if result is None:
+        return default
+    return result.get('n', default)
 
 
 def _create_expired_object_id(age):
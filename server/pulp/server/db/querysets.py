@@ -89,3 +89,13 @@ class RepoQuerySet(CriteriaQuerySet):
             return self.get(repo_id=repo_id)
         except DoesNotExist:
             raise pulp_exceptions.MissingResource(repository=repo_id)
+
+    def bump_revision(self, repo_id):
+        """
+        Atomically increment the revision of a repository to record that it has changed. Nothing
+        happens if the repository does not exist.
+
+        :param repo_id: identifies the repository that changed
+        :type  repo_id: str
+        """
+        self.filter(repo_id=repo_id).update_one(inc__revision=1)
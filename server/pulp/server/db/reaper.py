@@ -42,11 +42,22 @@ def reap_expired_documents():
     For each collection in _COLLECTION_TIMEDELTAS, call the class method reap_old_documents().
 
     This method gets the number of days from the pulp_config, and calls reap_old_documents with the
-    number of days as the argument.
+    number of days as the argument. Documents are removed in batches of the configured size, with
+    a pause between batches, so that reaping a large backlog does not monopolize the database.
+
+    If TTL indexes are enabled, collections whose documents have a date field are expired by a
+    MongoDB TTL index instead, and are not reaped here. Otherwise any such TTL index is dropped.
     """
     _logger.info(_('The reaper task is cleaning out old documents from the database.'))
+    batch_size = pulp_config.config.getint('data_reaping', 'batch_size')
+    batch_pause = pulp_config.config.getfloat('data_reaping', 'batch_pause')
+    ttl_indexes = pulp_config.config.getboolean('data_reaping', 'ttl_indexes')
     for model_class, config_name in _COLLECTION_TIMEDELTAS.items():
         # Get the config for how old documents should be before they are reaped.
         config_days = pulp_config.config.getfloat('data_reaping', config_name)
-        model_class.reap_old_documents(config_days)
+        if model_class.manage_ttl_index(config_days if ttl_indexes else None):
+            continue
+        removed = model_class.reap_old_documents(config_days, batch_size, batch_pause)
+        _logger.info(_('The reaper removed %(removed)s documents for %(name)s.') %
+                     {'removed': removed, 'name': config_name})
     _logger.info(_('The reaper task has completed.'))
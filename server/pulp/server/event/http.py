@@ -6,24 +6,299 @@ url
   Full URL to contact with the event data. A POST request will be made to this
   URL with the contents of the events in the body.
 
+batch_size
+  Optional. Events are buffered and delivered as a single JSON array once this
+  many events have been buffered.
+
+batch_window
+  Optional. Events are buffered and delivered as a single JSON array once the
+  oldest buffered event has waited this many seconds.
+
+Buffered events are delivered when the process shuts down.
+
 Eventually this should be enhanced to support authentication credentials as well.
 """
 
+import atexit
 import base64
 import httplib
 import logging
+import os
+import socket
 import threading
+import time
+from Queue import Queue, Full
+
+from celery.signals import worker_process_shutdown
 
 from pulp.server.compat import json, json_util
 
 
 TYPE_ID = 'http'
 
+# The number of threads posting events to each server.
+WORKERS = 4
+
+# The maximum number of events waiting to be posted to each server.
+# Events are dropped (and logged) when the queue is full.
+QUEUE_SIZE = 1000
+
+# The number of seconds to wait on a server to accept a connection
+# or send (part of) a response before the post is failed.
+TIMEOUT = 30
+
+# The number of attempts made to post an event.
+ATTEMPTS = 3
+
+# The number of seconds to wait before retrying a failed post.
+# Doubled after each failed attempt.
+BACKOFF = 1
+
+# The number of seconds between checks for batches to be delivered.
+BATCH_INTERVAL = 1
+
 _logger = logging.getLogger(__name__)
 
 
+class Dispatcher(object):
+    """
+    Posts events using worker threads fed by bounded queues.
+    Each server has its own queue and workers so that a slow or unresponsive
+    server only delays (and drops) the events posted to it.
+    Each worker keeps a (keep-alive) connection open to its server.
+    The workers are started on first use in each process because threads do not
+    survive a fork.
+    :ivar workers: The number of worker threads per server.
+    :type workers: int
+    :ivar queues: The queues of (notifier_config, body) to be posted keyed by server.
+    :type queues: dict
+    """
+
+    def __init__(self, workers=WORKERS, queue_size=QUEUE_SIZE):
+        """
+        :param workers: The number of worker threads per server.
+        :type  workers: int
+        :param queue_size: The maximum number of events waiting to be posted to each server.
+        :type  queue_size: int
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queues = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def put(self, notifier_config, body):
+        """
+        Queue an event to be posted.
+
+        :param notifier_config: the notifier configuration
+        :type  notifier_config: dict
+        :param body: the serialized event
+        :type  body: str
+        """
+        server = _server(notifier_config)
+        queue = self._queue(server)
+        try:
+            queue.put_nowait((notifier_config, body))
+        except Full:
+            _logger.warn('HTTP notifier queue for %(s)s is full; event dropped' % {'s': server})
+
+    def _queue(self, server):
+        """
+        Get the queue for a server, starting its workers on first use
+        (in each process).
+
+        :param server: the server as returned by _server()
+        :type  server: tuple
+        :return: the queue of (notifier_config, body) to be posted to the server
+        :rtype:  Queue.Queue
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self.queues = {}
+            queue = self.queues.get(server)
+            if queue is not None:
+                return queue
+            queue = Queue(self.queue_size)
+            self.queues[server] = queue
+            for n in range(self.workers):
+                thread = threading.Thread(target=self._run, args=[queue])
+                thread.setDaemon(True)
+                thread.start()
+            return queue
+
+    @staticmethod
+    def _run(queue):
+        """
+        Worker main loop.
+
+        :param queue: The queue of (notifier_config, body) to be posted.
+        :type  queue: Queue.Queue
+        """
+        connections = {}
+        while True:
+            notifier_config, body = queue.get()
+            try:
+                _send_post(notifier_config, body, connections)
+            except Exception:
+                _logger.exception('HTTP notifier failed')
+
+
+class Batch(object):
+    """
+    Events buffered for delivery to a listener.
+    :ivar notifier_config: The notifier configuration.
+    :type notifier_config: dict
+    :ivar bodies: The serialized events.
+    :type bodies: list
+    :ivar deadline: When the batch is due (seconds since the epoch); None when there is no window.
+    :type deadline: float
+    """
+
+    def __init__(self, notifier_config):
+        """
+        :param notifier_config: The notifier configuration.
+        :type  notifier_config: dict
+        """
+        self.notifier_config = notifier_config
+        self.bodies = []
+        window = notifier_config.get('batch_window')
+        self.deadline = time.time() + float(window) if window else None
+
+    def full(self):
+        """
+        :return: True if the batch has reached the configured batch_size.
+        :rtype:  bool
+        """
+        size = self.notifier_config.get('batch_size')
+        return bool(size) and len(self.bodies) >= int(size)
+
+    def due(self, now):
+        """
+        :param now: The current time (seconds since the epoch).
+        :type  now: float
+        :return: True if the configured batch_window has elapsed.
+        :rtype:  bool
+        """
+        return self.deadline is not None and now >= self.deadline
+
+    def body(self):
+        """
+        :return: The events as a JSON array.
+        :rtype:  str
+        """
+        return '[%s]' % ','.join(self.bodies)
+
+
+class Batcher(object):
+    """
+    Buffers events per listener (notifier configuration) and delivers
+    each batch as a single post using the dispatcher.
+    :ivar dispatcher: Used to post the batches.
+    :type dispatcher: Dispatcher
+    :ivar batches: The pending batches keyed by serialized notifier configuration.
+    :type batches: dict
+    """
+
+    def __init__(self, dispatcher):
+        """
+        :param dispatcher: Used to post the batches.
+        :type  dispatcher: Dispatcher
+        """
+        self.dispatcher = dispatcher
+        self.batches = {}
+        self._pid = None
+        self._lock = threading.RLock()
+
+    def add(self, notifier_config, body):
+        """
+        Add an event to the listener's batch.  The batch is posted when full.
+
+        :param notifier_config: the notifier configuration
+        :type  notifier_config: dict
+        :param body: the serialized event
+        :type  body: str
+        """
+        self._start()
+        key = json.dumps(notifier_config, sort_keys=True)
+        with self._lock:
+            batch = self.batches.get(key)
+            if batch is None:
+                batch = Batch(notifier_config)
+                self.batches[key] = batch
+            batch.bodies.append(body)
+            if batch.full():
+                del self.batches[key]
+                self.dispatcher.put(notifier_config, batch.body())
+
+    def flush(self, now=None, sync=False):
+        """
+        Post pending batches.
+
+        :param now: only post batches due at this time; None means post all of them
+        :type  now: float
+        :param sync: post in the calling thread rather than using the dispatcher
+        :type  sync: bool
+        """
+        with self._lock:
+            if now is None:
+                ready = self.batches.values()
+                self.batches.clear()
+            else:
+                ready = []
+                for key, batch in self.batches.items():
+                    if batch.due(now):
+                        ready.append(self.batches.pop(key))
+        for batch in ready:
+            if sync:
+                _send_post(batch.notifier_config, batch.body())
+            else:
+                self.dispatcher.put(batch.notifier_config, batch.body())
+
+    def shutdown(self, *unused, **unused_kwargs):
+        """
+        Deliver all pending batches before the process exits.
+        """
+        try:
+            self.flush(sync=True)
+        except Exception:
+            _logger.exception('HTTP notifier failed')
+
+    def _start(self):
+        """
+        Start the thread that posts batches when they are due (once per process).
+        """
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.batches = {}
+            thread = threading.Thread(target=self._run)
+            thread.setDaemon(True)
+            thread.start()
+
+    def _run(self):
+        """
+        Post batches when they are due.
+        """
+        while True:
+            time.sleep(BATCH_INTERVAL)
+            try:
+                self.flush(now=time.time())
+            except Exception:
+                _logger.exception('HTTP notifier failed')
+
+
+dispatcher = Dispatcher()
+batcher = Batcher(dispatcher)
+
+atexit.register(batcher.shutdown)
+worker_process_shutdown.connect(batcher.shutdown, weak=False)
+
+
 def handle_event(notifier_config, event):
-    # fire the actual http push function off in a separate thread to keep
+    # the actual http push is done by a pool of threads to keep
     # pulp from blocking or deadlocking due to the tasking subsystem
 
     data = event.data()
@@ -32,12 +307,43 @@ def handle_event(notifier_config, event):
 
     body = json.dumps(data, default=json_util.default)
 
-    thread = threading.Thread(target=_send_post, args=[notifier_config, body])
-    thread.setDaemon(True)
-    thread.start()
+    if notifier_config.get('batch_size') or notifier_config.get('batch_window'):
+        batcher.add(notifier_config, body)
+    else:
+        dispatcher.put(notifier_config, body)
+
 
+def _server(notifier_config):
+    """
+    Get the server to which events are posted for a listener.
 
-def _send_post(notifier_config, body):
+    :param notifier_config: the notifier configuration
+    :type  notifier_config: dict
+    :return: (scheme, server) parsed from the configured URL; (None, url) when
+             the URL cannot be parsed
+    :rtype:  tuple
+    """
+    url = notifier_config.get('url')
+    try:
+        scheme, empty, server, path = url.split('/', 3)
+    except (AttributeError, ValueError):
+        return None, url
+    return scheme, server
+
+
+def _send_post(notifier_config, body, connections=None):
+    """
+    Post the event body to the configured URL.
+    Failed posts (connection errors and server errors) are retried with backoff.
+
+    :param notifier_config: the notifier configuration
+    :type  notifier_config: dict
+    :param body: the serialized event
+    :type  body: str
+    :param connections: open connections to reuse keyed by (scheme, server);
+                        connections are closed after the post when not specified
+    :type  connections: dict
+    """
 
     # Basic headers
     headers = {'Accept': 'application/json',
@@ -56,25 +362,45 @@ def _send_post(notifier_config, body):
         _logger.warn('Improperly configured post_sync_url: %(u)s' % {'u': url})
         return
 
-    connection = _create_connection(scheme, server)
-
     # Process authentication
     if 'username' in notifier_config and 'password' in notifier_config:
         raw = ':'.join((notifier_config['username'], notifier_config['password']))
         encoded = base64.encodestring(raw)[:-1]
         headers['Authorization'] = 'Basic ' + encoded
 
-    connection.request('POST', '/' + path, body=body, headers=headers)
-    response = connection.getresponse()
-    if response.status != httplib.OK:
-        error_msg = response.read()
-        _logger.warn('Error response from HTTP notifier: %(e)s' % {'e': error_msg})
-    connection.close()
+    key = (scheme, server)
+    for attempt in range(ATTEMPTS):
+        connection = None
+        if connections is not None:
+            connection = connections.pop(key, None)
+        if connection is None:
+            connection = _create_connection(scheme, server)
+        try:
+            connection.request('POST', '/' + path, body=body, headers=headers)
+            response = connection.getresponse()
+            content = response.read()
+        except (httplib.HTTPException, socket.error), e:
+            connection.close()
+            error_msg = str(e)
+        else:
+            if connections is None or response.will_close:
+                connection.close()
+            else:
+                connections[key] = connection
+            if response.status == httplib.OK:
+                return
+            error_msg = content
+            if response.status < httplib.INTERNAL_SERVER_ERROR:
+                break
+        if attempt + 1 < ATTEMPTS:
+            time.sleep(BACKOFF * 2 ** attempt)
+
+    _logger.warn('Error response from HTTP notifier: %(e)s' % {'e': error_msg})
 
 
 def _create_connection(scheme, server):
     if scheme.startswith('https'):
-        connection = httplib.HTTPSConnection(server)
+        connection = httplib.HTTPSConnection(server, timeout=TIMEOUT)
     else:
-        connection = httplib.HTTPConnection(server)
+        connection = httplib.HTTPConnection(server, timeout=TIMEOUT)
     return connection
@@ -10,6 +10,7 @@ import pymongo
 from pulp.common import dateutils
 from pulp.server import config
 from pulp.server.db.model.consumer import Consumer, ConsumerHistoryEvent
+from pulp.server.db.model.criteria import decode_continuation, encode_continuation
 from pulp.server.exceptions import InvalidValue, MissingResource
 from pulp.server.managers import factory as managers_factory
 
@@ -29,6 +30,9 @@ TYPES = (TYPE_CONSUMER_REGISTERED, TYPE_CONSUMER_UNREGISTERED, TYPE_REPO_BOUND,
          TYPE_REPO_UNBOUND, TYPE_CONTENT_UNIT_INSTALLED, TYPE_CONTENT_UNIT_UNINSTALLED,
          TYPE_UNIT_PROFILE_CHANGED, TYPE_ADDED_TO_GROUP, TYPE_REMOVED_FROM_GROUP)
 
+# Event fields that may be selected when querying
+FIELDS = ('consumer_id', 'originator', 'type', 'details', 'timestamp')
+
 # Maps user entered query sort parameters to the pymongo representation
 SORT_ASCENDING = 'ascending'
 SORT_DESCENDING = 'descending'
@@ -88,10 +92,14 @@ class ConsumerHistoryManager(object):
         ConsumerHistoryEvent.get_collection().save(event)
 
     def query(self, consumer_id=None, event_type=None, limit=None, sort='descending',
-              start_date=None, end_date=None):
+              start_date=None, end_date=None, continuation=None, fields=None):
         '''
         Queries the consumer history storage.
 
+        Events are ordered by timestamp and then by _id, which every filter combination
+        has an index for, so a page of events is read from an index rather than sorted
+        in memory.
+
         @param consumer_id: if specified, events will only be returned for the the
                             consumer referenced
         @type  consumer_id: string or number
@@ -108,10 +116,19 @@ class ConsumerHistoryManager(object):
         @type  sort: string; valid values are 'ascending' and 'descending'
 
         @param start_date: if specified, no events prior to this date will be returned
-        @type  start_date: datetime.datetime
+        @type  start_date: string, ISO8601 date or date-time
 
         @param end_date: if specified, no events after this date will be returned
-        @type  end_date: datetime.datetime
+        @type  end_date: string, ISO8601 date or date-time
+
+        @param continuation: if specified, only events following the last event of the
+                             page the token was created for are returned (see
+                             continuation_token)
+        @type  continuation: string
+
+        @param fields: if specified, only these fields of each event are returned, along
+                       with the id and timestamp
+        @type  fields: list of strings (found in FIELDS)
 
         @return: list of consumer history entries that match the given parameters;
                  empty list (not None) if no matching entries are found
@@ -133,52 +150,123 @@ class ConsumerHistoryManager(object):
             invalid_values.append('sort')
 
         # Verify that start_date and end_date is valid
-        if start_date is not None:
-            try:
-                dateutils.parse_iso8601_date(start_date)
-            except (ValueError, isodate.ISO8601Error):
-                invalid_values.append('start_date')
-        if end_date is not None:
+        date_range = {}
+        for name, operator, value in (('start_date', '$gte', start_date),
+                                      ('end_date', '$lte', end_date)):
+            if value is None:
+                continue
             try:
-                dateutils.parse_iso8601_date(end_date)
-            except (ValueError, isodate.ISO8601Error):
-                invalid_values.append('end_date')
+                date = dateutils.parse_iso8601_datetime_or_date(value)
+            except (TypeError, ValueError, isodate.ISO8601Error):
+                invalid_values.append(name)
+            else:
+                # timestamps are stored in UTC, which is also what a date without a time
+                # zone has always been compared as
+                date_range[operator] = dateutils.to_utc_datetime(date,
+                                                                 no_tz_equals_local_tz=False)
+
+        if fields is not None and not set(fields).issubset(FIELDS):
+            invalid_values.append('fields')
 
         if invalid_values:
             raise InvalidValue(invalid_values)
 
+        direction = SORT_DIRECTION[sort]
+        order = [('timestamp', direction), ('_id', direction)]
+
         # Assemble the mongo search parameters
         search_params = {}
         if consumer_id:
             search_params['consumer_id'] = consumer_id
         if event_type:
             search_params['type'] = event_type
-
-        # Add in date range limits if specified
-        date_range = {}
-        if start_date:
-            date_range['$gte'] = start_date
-        if end_date:
-            date_range['$lte'] = end_date
-
-        if len(date_range) > 0:
+        if date_range:
             search_params['timestamp'] = date_range
+        if continuation is not None:
+            search_params = {'$and': [search_params,
+                                      self._continuation_spec(continuation, order)]}
 
-        # Determine the correct mongo cursor to retrieve
-        if len(search_params) == 0:
-            cursor = ConsumerHistoryEvent.get_collection().find()
-        else:
-            cursor = ConsumerHistoryEvent.get_collection().find(search_params)
+        # The sort fields are needed to create a continuation token from the results.
+        if fields is not None:
+            fields = list(set(fields) | set(['id', 'timestamp']))
 
-        # Sort by most recent entry first
-        cursor.sort('timestamp', direction=SORT_DIRECTION[sort])
+        cursor = ConsumerHistoryEvent.get_collection().find(search_params, fields=fields)
+        cursor.sort(order)
 
         # If a limit was specified, add it to the cursor
         if limit:
             cursor.limit(limit)
 
         # Finally convert to a list before returning
-        return list(cursor)
+        events = list(cursor)
+        for event in events:
+            if isinstance(event.get('timestamp'), datetime.datetime):
+                event['timestamp'] = self._format_timestamp(event['timestamp'])
+        return events
+
+    def continuation_token(self, events, limit, sort='descending'):
+        '''
+        Create the token to pass as the continuation of a query to get the page of
+        events following the given one.
+
+        @param events: page of events returned by query
+        @type  events: list
+
+        @param limit: limit the page of events was queried with
+        @type  limit: int or None
+
+        @param sort: sort direction the page of events was queried with
+        @type  sort: string; valid values are 'ascending' and 'descending'
+
+        @return: continuation token, or None if the page is the last one
+        @rtype:  string or None
+        '''
+        if not limit or len(events) < limit:
+            return None
+        last = events[-1]
+        direction = SORT_DIRECTION[sort]
+        timestamp = dateutils.to_utc_datetime(
+            dateutils.parse_iso8601_datetime(last['timestamp']), no_tz_equals_local_tz=False)
+        return encode_continuation({'sort': [['timestamp', direction], ['_id', direction]],
+                                    'values': [timestamp, last['_id']]})
+
+    @staticmethod
+    def _continuation_spec(token, order):
+        '''
+        Build the spec matching the events that follow the last event of the page the
+        continuation token was created for.
+
+        @param token: continuation token created by continuation_token
+        @type  token: string
+
+        @param order: sort fields and directions of the query
+        @type  order: list
+
+        @return: mongo spec
+        @rtype:  dict
+
+        @raises InvalidValue: if the token is malformed or was created for another sort
+        '''
+        continuation = decode_continuation(token)
+        if [list(s) for s in continuation['sort']] != [list(s) for s in order]:
+            raise InvalidValue(['continuation'])
+        timestamp, last_id = continuation['values']
+        operator = '$gt' if order[0][1] == pymongo.ASCENDING else '$lt'
+        return {'$or': [{'timestamp': {operator: timestamp}},
+                        {'timestamp': timestamp, '_id': {operator: last_id}}]}
+
+    @staticmethod
+    def _format_timestamp(timestamp):
+        '''
+        Format a stored event timestamp as the ISO8601 string returned to clients.
+
+        @param timestamp: timestamp as read from the database
+        @type  timestamp: datetime.datetime
+
+        @rtype: string
+        '''
+        return dateutils.format_iso8601_datetime(
+            dateutils.to_utc_datetime(timestamp, no_tz_equals_local_tz=False))
 
     def event_types(self):
         return TYPES
@@ -191,10 +279,9 @@ class ConsumerHistoryManager(object):
                          are deleted in this call
         @type  lifetime: L{datetime.timedelta}
         '''
-        now = datetime.datetime.now(dateutils.local_tz())
-        limit = dateutils.format_iso8601_datetime(now - lifetime)
+        limit = datetime.datetime.now(dateutils.utc_tz()) - lifetime
         spec = {'timestamp': {'$lt': limit}}
-        self.collection.remove(spec, safe=False)
+        ConsumerHistoryEvent.get_collection().remove(spec, safe=False)
 
     def _get_lifetime(self):
         '''
@@ -0,0 +1,144 @@
+from logging import getLogger
+import time
+
+from pymongo.errors import DuplicateKeyError
+
+from pulp.server.db.model.content import ContentCatalog, ContentDownload
+
+
+log = getLogger(__name__)
+
+
+# The lease in seconds.
+# The lease defines how long a download lock is held before it is
+# considered abandoned and may be taken over by another downloader.
+LEASE = 3600  # 1 hour.
+
+# The number of seconds to sleep between checks while waiting
+# on a download owned by another downloader.
+POLL_INTERVAL = 2
+
+# The number of seconds between renewals of the leases held by a
+# downloader, so that a download that runs longer than the lease
+# is not taken over while it is still in progress.
+RENEW_INTERVAL = LEASE / 4
+
+
+class ContentDownloadManager(object):
+    """
+    Manages the registry of in-flight content unit downloads.
+    Things to know about the registry:
+     - Entries are locks keyed by unit locator and shared by all tasks.
+     - A downloader acquires the lock before fetching the file associated
+       with a unit and releases it once the unit has been saved.
+     - Other downloaders of the same unit wait for the lock to be released
+       and then reuse the file rather than downloading it again.
+     - Locks are leased.  The owner renews its leases while it is downloading.
+       Expired locks are considered abandoned and may be taken over by
+       another downloader.
+    """
+
+    def acquire(self, owner, type_id, unit_key, path, lease=LEASE):
+        """
+        Acquire the download lock for a content unit.
+        :param owner: Uniquely identifies the downloader.
+        :type owner: str
+        :param type_id: The unit type ID.
+        :type type_id: str
+        :param unit_key: The unit key.
+        :type unit_key: dict
+        :param path: The absolute path to which the file will be downloaded.
+        :type path: str
+        :param lease: The lock lease in seconds.
+        :type lease: int
+        :return: True if acquired.
+        :rtype: bool
+        """
+        collection = ContentDownload.get_collection()
+        entry = ContentDownload(owner, lease, type_id, unit_key, path)
+        try:
+            collection.insert(entry)
+            return True
+        except DuplicateKeyError:
+            pass
+        # take over an abandoned lock
+        query = {
+            'locator': entry.locator,
+            'expiration': {'$lt': ContentCatalog.get_expiration(0)}
+        }
+        update = {
+            '$set': {
+                'owner': owner,
+                'expiration': entry.expiration,
+                'path': path
+            }
+        }
+        taken = collection.find_and_modify(query=query, update=update, new=True)
+        if taken is not None:
+            log.info('took over abandoned download of: %s', taken['path'])
+        return taken is not None
+
+    def release(self, owner, type_id, unit_key):
+        """
+        Release the download lock for a content unit.
+        Only a lock held by the specified owner is released.
+        :param owner: Uniquely identifies the downloader.
+        :type owner: str
+        :param type_id: The unit type ID.
+        :type type_id: str
+        :param unit_key: The unit key.
+        :type unit_key: dict
+        """
+        collection = ContentDownload.get_collection()
+        locator = ContentCatalog.get_locator(type_id, unit_key)
+        collection.remove({'locator': locator, 'owner': owner})
+
+    def renew(self, owner, lease=LEASE):
+        """
+        Renew the leases of all download locks held by a downloader.
+        :param owner: Uniquely identifies the downloader.
+        :type owner: str
+        :param lease: The lock lease in seconds.
+        :type lease: int
+        """
+        collection = ContentDownload.get_collection()
+        update = {'$set': {'expiration': ContentCatalog.get_expiration(lease)}}
+        collection.update({'owner': owner}, update, multi=True)
+
+    def find(self, type_id, unit_key):
+        """
+        Find the (unexpired) download lock for a content unit.
+        :param type_id: The unit type ID.
+        :type type_id: str
+        :param unit_key: The unit key.
+        :type unit_key: dict
+        :return: The lock entry or None.
+        :rtype: dict
+        """
+        collection = ContentDownload.get_collection()
+        query = {
+            'locator': ContentCatalog.get_locator(type_id, unit_key),
+            'expiration': {'$gte': ContentCatalog.get_expiration(0)}
+        }
+        return collection.find_one(query)
+
+    def wait(self, type_id, unit_key, timeout=LEASE, interval=POLL_INTERVAL):
+        """
+        Wait for a download owned by another downloader to finish.
+        :param type_id: The unit type ID.
+        :type type_id: str
+        :param unit_key: The unit key.
+        :type unit_key: dict
+        :param timeout: The maximum number of seconds to wait.
+        :type timeout: int
+        :param interval: The number of seconds to sleep between checks.
+        :type interval: int
+        :return: True if the lock was released (or expired) within the timeout.
+        :rtype: bool
+        """
+        deadline = time.time() + timeout
+        while self.find(type_id, unit_key) is not None:
+            if time.time() >= deadline:
+                return False
+            time.sleep(interval)
+        return True
@@ -1,17 +1,23 @@
+from datetime import datetime
 from gettext import gettext as _
+from Queue import Queue, Empty
+from threading import Thread
 import logging
 import os
 import re
 import shutil
 
 from celery import task
+from pymongo.errors import DuplicateKeyError
 
+from pulp.common import dateutils
 from pulp.plugins.types import database as content_types_db
 from pulp.plugins.loader import api as plugin_api
 from pulp.plugins.util import misc as plugin_misc
 from pulp.server import config as pulp_config, exceptions as pulp_exceptions
 from pulp.server.async.tasks import Task
 from pulp.server.controllers import units as units_controller
+from pulp.server.db.model.content import OrphanScanReport, OrphanScanUnit
 from pulp.server.db.model.repository import RepoContentUnit
 from pulp.server.db import model
 from pulp.server.exceptions import MissingResource
@@ -19,6 +25,9 @@ from pulp.server.exceptions import MissingResource
 
 _logger = logging.getLogger(__name__)
 
+# The number of threads used to delete orphaned files.
+DELETE_THREADS = 8
+
 
 class OrphanManager(object):
 
@@ -84,16 +93,19 @@ class OrphanManager(object):
                 yield content_unit
 
     @staticmethod
-    def generate_orphans_by_type(content_type_id, fields=None):
+    def generate_orphans_by_type(content_type_id, fields=None, after_id=None):
         """
         Return an generator of all orphaned content units of the given content type.
 
         If fields is not specified, only the `_id` field will be present.
+        Orphans are generated in `_id` order.
 
         :param content_type_id: id of the content type
         :type content_type_id: basestring
         :param fields: list of fields to include in each content unit
         :type fields: list or None
+        :param after_id: only generate orphans with an `_id` greater than this
+        :type after_id: basestring or None
         :return: generator of orphaned content units for the given content type
         :rtype: generator
         """
@@ -102,15 +114,43 @@ class OrphanManager(object):
         content_units_collection = content_types_db.type_units_collection(content_type_id)
         repo_content_units_collection = RepoContentUnit.get_collection()
 
-        for content_unit in content_units_collection.find({}, fields=fields):
+        spec = {}
+        if after_id is not None:
+            spec['_id'] = {'$gt': after_id}
+        cursor = content_units_collection.find(spec, fields=fields).sort('_id')
+
+        associated = OrphanManager.associated_unit_ids(content_type_id)
+        candidates = (u for u in cursor if u['_id'] not in associated)
+
+        # units associated since the set was built are filtered out using the unit_id index
+        for page in plugin_misc.paginate(candidates):
+            spec = {'unit_id': {'$in': [u['_id'] for u in page]}}
+            associated_since = set(rcu['unit_id'] for rcu in
+                                   repo_content_units_collection.find(spec, fields=['unit_id']))
+            for content_unit in page:
+                if content_unit['_id'] in associated_since:
+                    continue
+                yield content_unit
 
-            repo_content_units_cursor = repo_content_units_collection.find(
-                {'unit_id': content_unit['_id']})
+    @staticmethod
+    def associated_unit_ids(content_type_id):
+        """
+        Return the set of ids of the content units of the given content type
+        that are associated with at least one repository.
 
-            if repo_content_units_cursor.count() > 0:
-                continue
+        The associations are streamed (only the `unit_id` field) so orphan detection
+        costs a scan of the associations plus a scan of the content units rather than
+        a query per content unit.
 
-            yield content_unit
+        :param content_type_id: id of the content type
+        :type content_type_id: basestring
+        :return: set of associated content unit ids
+        :rtype: set
+        """
+        repo_content_units_collection = RepoContentUnit.get_collection()
+        cursor = repo_content_units_collection.find({'unit_type_id': content_type_id},
+                                                    fields=['unit_id'])
+        return set(rcu['unit_id'] for rcu in cursor)
 
     @staticmethod
     def generate_orphans_by_type_with_unit_keys(content_type_id):
@@ -135,6 +175,116 @@ class OrphanManager(object):
         for content_unit in OrphanManager.generate_orphans_by_type(content_type_id, fields):
             yield content_unit
 
+    @staticmethod
+    def scan_orphans(content_type_ids=None):
+        """
+        Scan for orphaned content units and record them with the size used on disk.
+
+        The results are stored per content type as an OrphanScanReport and the
+        orphans as OrphanScanUnit entries.  An interrupted scan is resumed from the
+        last recorded orphan.  Scanning a content type that has already been
+        scanned (finished) replaces the previous results.
+
+        :param content_type_ids: ids of the content types to scan; None means all of them
+        :type content_type_ids: list or None
+        """
+        if content_type_ids is None:
+            content_type_ids = content_types_db.all_type_ids()
+        for content_type_id in content_type_ids:
+            OrphanManager.scan_orphans_by_type(content_type_id)
+
+    @staticmethod
+    def scan_orphans_by_type(content_type_id):
+        """
+        Scan for orphaned content units of the given content type.
+
+        :param content_type_id: id of the content type
+        :type content_type_id: basestring
+        :return: the scan report
+        :rtype: dict
+        """
+        reports = OrphanScanReport.get_collection()
+        scanned = OrphanScanUnit.get_collection()
+
+        report = reports.find_one({'content_type_id': content_type_id})
+        if report is None or report['state'] != OrphanScanReport.SCANNING:
+            reports.remove({'content_type_id': content_type_id})
+            scanned.remove({'content_type_id': content_type_id})
+            report = OrphanScanReport(content_type_id)
+            reports.insert(report)
+        else:
+            _logger.info(_('Resuming orphan scan of: %(t)s') % {'t': content_type_id})
+
+        orphans = OrphanManager.generate_orphans_by_type(content_type_id,
+                                                         fields=['_id', '_storage_path'],
+                                                         after_id=report['last_id'])
+        for page in plugin_misc.paginate(orphans):
+            entries = []
+            for content_unit in page:
+                storage_path = content_unit.get('_storage_path', None)
+                size = OrphanManager.disk_usage(storage_path)
+                entries.append(
+                    OrphanScanUnit(content_type_id, content_unit['_id'], storage_path, size))
+            try:
+                # entries recorded before an interruption are already present
+                scanned.insert(entries, continue_on_error=True)
+            except DuplicateKeyError:
+                pass
+            # checkpoint
+            reports.update({'content_type_id': content_type_id},
+                           {'$set': {'last_id': page[-1]['_id']}})
+
+        count = 0
+        size = 0
+        for entry in scanned.find({'content_type_id': content_type_id}, fields=['size']):
+            count += 1
+            size += entry['size']
+        finished = dateutils.format_iso8601_datetime(datetime.now(dateutils.utc_tz()))
+        update = {
+            '$set': {
+                'state': OrphanScanReport.FINISHED,
+                'count': count,
+                'size': size,
+                'finished': finished,
+            }
+        }
+        reports.update({'content_type_id': content_type_id}, update)
+        return reports.find_one({'content_type_id': content_type_id})
+
+    @staticmethod
+    def orphan_scan_reports():
+        """
+        Return the orphan scan reports.
+
+        :return: list of scan reports, one per scanned content type
+        :rtype: list
+        """
+        return list(OrphanScanReport.get_collection().find())
+
+    @staticmethod
+    def disk_usage(path):
+        """
+        Return the number of bytes used on disk by a content unit's storage path.
+        Links (shared content) are not followed.  A path that does not exist uses none.
+
+        :param path: absolute path to a file or directory; may be None
+        :type path: str
+        :return: the number of bytes
+        :rtype: int
+        """
+        if not path:
+            return 0
+        try:
+            if not os.path.isdir(path) or os.path.islink(path):
+                return os.lstat(path).st_size
+            size = 0
+            for root, dirs, files in os.walk(path):
+                for name in files:
+                    size += os.lstat(os.path.join(root, name)).st_size
+            return size
+        except OSError:
+            return 0
+
     def get_orphan(self, content_type_id, content_unit_id):
         """
         Look up a single orphaned content unit by content type and unit id.
@@ -214,17 +364,73 @@ class OrphanManager(object):
 
         content_units_collection = content_types_db.type_units_collection(content_type_id)
 
-        for content_unit in OrphanManager.generate_orphans_by_type(content_type_id,
-                                                                   fields=['_id', '_storage_path']):
+        orphans = OrphanManager.generate_orphans_by_type(content_type_id,
+                                                         fields=['_id', '_storage_path'])
+        if content_unit_ids is not None:
+            content_unit_ids = set(content_unit_ids)
+            orphans = (u for u in orphans if u['_id'] in content_unit_ids)
 
-            if content_unit_ids is not None and content_unit['_id'] not in content_unit_ids:
-                continue
+        # empty directories are pruned once, after all of the files have been deleted
+        parent_dirs = set()
+        try:
+            for page in plugin_misc.paginate(orphans):
+                spec = {'_id': {'$in': [u['_id'] for u in page]}}
+                content_units_collection.remove(spec, safe=False)
 
-            content_units_collection.remove(content_unit['_id'], safe=False)
+                paths = [u['_storage_path'] for u in page if u.get('_storage_path') is not None]
+                parent_dirs.update(OrphanManager.delete_orphaned_files(paths))
+        finally:
+            OrphanManager.prune_empty_dirs(parent_dirs)
 
-            storage_path = content_unit.get('_storage_path', None)
-            if storage_path is not None:
-                OrphanManager.delete_orphaned_file(storage_path)
+    @staticmethod
+    def delete_scanned_orphans(content_type_ids=None):
+        """
+        Delete the orphaned content units recorded by finished orphan scans.
+
+        The content units are not scanned again.  Each recorded orphan is only
+        checked to still be unassociated before it is deleted.  The scan results
+        are removed once the orphans have been deleted.
+
+        NOTE: this method deletes the content unit's bits from disk, if applicable.
+
+        :param content_type_ids: ids of the content types to delete; None means all
+                                 content types with a finished scan
+        :type content_type_ids: list or None
+        """
+        reports = OrphanScanReport.get_collection()
+        scanned = OrphanScanUnit.get_collection()
+        repo_content_units_collection = RepoContentUnit.get_collection()
+
+        spec = {'state': OrphanScanReport.FINISHED}
+        if content_type_ids is not None:
+            spec['content_type_id'] = {'$in': list(content_type_ids)}
+
+        for report in reports.find(spec):
+            content_type_id = report['content_type_id']
+            content_units_collection = content_types_db.type_units_collection(content_type_id)
+            parent_dirs = set()
+
+            entries = scanned.find({'content_type_id': content_type_id},
+                                   fields=['unit_id', 'storage_path'])
+            try:
+                for page in plugin_misc.paginate(entries):
+                    query = {'unit_id': {'$in': [e['unit_id'] for e in page]}}
+                    associated = set(rcu['unit_id'] for rcu in repo_content_units_collection.find(
+                        query, fields=['unit_id']))
+                    orphans = [e for e in page if e['unit_id'] not in associated]
+                    if not orphans:
+                        continue
+
+                    query = {'_id': {'$in': [e['unit_id'] for e in orphans]}}
+                    content_units_collection.remove(query, safe=False)
+
+                    paths = [e['storage_path'] for e in orphans
+                             if e.get('storage_path') is not None]
+                    parent_dirs.update(OrphanManager.delete_orphaned_files(paths))
+            finally:
+                OrphanManager.prune_empty_dirs(parent_dirs)
+            scanned.remove({'content_type_id': content_type_id})
+            reports.remove({'content_type_id': content_type_id})
 
     @staticmethod
     def delete_orphan_content_units_by_type(type_id):
@@ -276,25 +482,111 @@ class OrphanManager(object):
 
         storage_dir = pulp_config.config.get('server', 'storage_dir')
 
+        if OrphanManager._delete_orphaned_file(storage_dir, path):
+            OrphanManager.prune_empty_dirs([os.path.dirname(path)])
+
+    @staticmethod
+    def delete_orphaned_files(paths, threads=DELETE_THREADS):
+        """
+        Delete orphaned files using a pool of threads.
+        Parent directories are not deleted.  Instead, the directories that may
+        have fallen empty are returned so they can be pruned once using
+        prune_empty_dirs() after all of the files have been deleted.
+        @param paths: absolute paths to the files to delete
+        @type  paths: list
+        @param threads: the number of threads used to delete the files
+        @type  threads: int
+        @return: the parent directories of the deleted (non-shared) files
+        @rtype:  set
+        @raise PulpExecutionException: if any of the files could not be deleted;
+                                       the other files are still deleted
+        """
+        for path in paths:
+            if not os.path.isabs(path):
+                raise ValueError(_('Path: %(p)s must be absolute path') % {'p': path})
+
+        storage_dir = pulp_config.config.get('server', 'storage_dir')
+
+        queue = Queue()
+        for path in paths:
+            queue.put(path)
+
+        parent_dirs = set()
+        failed = []
+
+        def worker():
+            while True:
+                try:
+                    path = queue.get_nowait()
+                except Empty:
+                    return
+                _logger.debug(_('Deleting orphaned file: %(p)s') % {'p': path})
+                try:
+                    if OrphanManager._delete_orphaned_file(storage_dir, path):
+                        parent_dirs.add(os.path.dirname(path))
+                except Exception:
+                    # keep going so that one bad path does not stop the thread
+                    _logger.exception(_('Failed to delete orphaned file: %(p)s') % {'p': path})
+                    failed.append(path)
+
+        pool = [Thread(target=worker) for n in range(min(threads, len(paths)))]
+        for thread in pool:
+            thread.setDaemon(True)
+            thread.start()
+        for thread in pool:
+            thread.join()
+
+        if failed:
+            OrphanManager.prune_empty_dirs(parent_dirs)
+            msg = _('Failed to delete %(n)d orphaned files, including: %(p)s')
+            raise pulp_exceptions.PulpExecutionException(
+                msg % {'n': len(failed), 'p': ', '.join(sorted(failed)[:5])})
+
+        return parent_dirs
+
+    @staticmethod
+    def _delete_orphaned_file(storage_dir, path):
+        """
+        Delete an orphaned file.  Shared content is unlinked.
+        @param storage_dir: the absolute path to the pulp content storage directory
+        @type  storage_dir: str
+        @param path: absolute path to the file to delete
+        @type  path: str
+        @return: True if the parent directory may need to be pruned
+        @rtype:  bool
+        """
         # shared content
         if OrphanManager.is_shared(storage_dir, path):
             OrphanManager.unlink_shared(path)
-            return
+            return False
 
         OrphanManager.delete(path)
+        return True
 
-        # delete parent directories on the path as long as they fall empty
+    @staticmethod
+    def prune_empty_dirs(dirs):
+        """
+        Delete the specified directories and their parent directories as long
+        as they fall empty.  Pruning stops at the content type directory.
+        Directories are visited deepest first so each is listed once per pass.
+        @param dirs: absolute paths to directories
+        @type  dirs: iterable
+        """
+        storage_dir = pulp_config.config.get('server', 'storage_dir')
         root_content_regex = re.compile(os.path.join(storage_dir, 'content', '[^/]+/?'))
-        while True:
-            path = os.path.dirname(path)
-            if root_content_regex.match(path):
-                break
-            contents = os.listdir(path)
-            if contents:
-                break
-            if not os.access(path, os.W_OK):
-                break
-            os.rmdir(path)
+        for path in sorted(set(dirs), key=lambda p: p.count(os.sep), reverse=True):
+            while True:
+                if root_content_regex.match(path):
+                    break
+                if not os.path.isdir(path):
+                    break
+                contents = os.listdir(path)
+                if contents:
+                    break
+                if not os.access(path, os.W_OK):
+                    break
+                os.rmdir(path)
+                path = os.path.dirname(path)
 
     @staticmethod
     def is_shared(storage_dir, path):
@@ -362,3 +654,5 @@ class OrphanManager(object):
 delete_all_orphans = task(OrphanManager.delete_all_orphans, base=Task, ignore_result=True)
 delete_orphans_by_id = task(OrphanManager.delete_orphans_by_id, base=Task, ignore_result=True)
 delete_orphans_by_type = task(OrphanManager.delete_orphans_by_type, base=Task, ignore_result=True)
+scan_orphans = task(OrphanManager.scan_orphans, base=Task, ignore_result=True)
+delete_scanned_orphans = task(OrphanManager.delete_scanned_orphans, base=Task, ignore_result=True)
@@ -232,6 +232,59 @@ class ContentQueryManager(object):
             for item in collection.find(spec, fields=fields):
                 yield str(item['_id'])
 
+    @staticmethod
+    def find_existing_units(units):
+        """
+        Determine which of the given content units are already stored on the
+        server, so clients can skip transferring their bits.
+
+        :param units: list of dicts, each with the 'type_id' and 'unit_key'
+                      of a content unit
+        :type  units: list of dict
+
+        :return:    list of the same length as units containing the ID of each
+                    stored unit, or None if the unit is not stored
+        :rtype:     list
+        :raises InvalidValue: if any of the content types does not exist, or a
+                              unit key has a list or dict value
+        """
+        found = [None] * len(units)
+
+        indexes_by_type = {}
+        for index, unit in enumerate(units):
+            indexes_by_type.setdefault(unit['type_id'], []).append(index)
+
+        for type_id, indexes in indexes_by_type.items():
+            key_fields = []
+            _flatten_keys(key_fields, content_types_db.type_units_unit_key(type_id))
+            if not key_fields:
+                raise InvalidValue(['type_id'])
+
+            # A unit key that does not consist of exactly the key fields of the
+            # type cannot match a stored unit, so it is not looked up.
+            indexes_by_key = {}
+            for index in indexes:
+                unit_key = units[index]['unit_key']
+                if set(unit_key) != set(key_fields):
+                    continue
+                key = tuple(unit_key[f] for f in key_fields)
+                try:
+                    hash(key)
+                except TypeError:
+                    raise InvalidValue(['unit_key'])
+                indexes_by_key.setdefault(key, []).append(index)
+
+            unit_keys = [units[i[0]]['unit_key'] for i in indexes_by_key.values()]
+            collection = content_types_db.type_units_collection(type_id)
+            for segment in paginate(unit_keys, page_size=50):
+                spec = _build_multi_keys_spec(type_id, segment)
+                for unit in collection.find(spec, fields=['_id'] + key_fields):
+                    key = tuple(unit.get(f) for f in key_fields)
+                    for index in indexes_by_key.get(key, ()):
+                        found[index] = str(unit['_id'])
+
+        return found
+
     def get_root_content_dir(self, content_type):
         """
         Get the full path to Pulp's root content directory for a given content
@@ -1,5 +1,6 @@
 from errno import ENOENT
 from gettext import gettext as _
+import hashlib
 import logging
 import os
 import sys
@@ -13,16 +14,19 @@ from pulp.plugins.loader import api as plugin_api, exceptions as plugin_exceptio
 from pulp.server import config as pulp_config
 from pulp.server.async.tasks import Task
 from pulp.server.db import model
-from pulp.server.exceptions import (PulpDataException, MissingResource, PulpExecutionException,
-                                    PulpException)
+from pulp.server.exceptions import (InvalidValue, PulpDataException, MissingResource,
+                                    PulpExecutionException, PulpException)
 import pulp.server.managers.factory as manager_factory
 
 
 logger = logging.getLogger(__name__)
 
+# Number of bytes read from an upload stream and written at a time.
+STREAM_BUFFER_SIZE = 65536
+
 
 class ContentUploadManager(object):
-    def initialize_upload(self):
+    def initialize_upload(self, size=None):
         """
         Informs the Pulp server that a new file is about to be uploaded, allowing
         it to do any preparation it needs to do to store or track the upload.
@@ -30,6 +34,12 @@ class ContentUploadManager(object):
         The ID returned from this call is used to track this specific uploaded
         file for the remainder of its life.
 
+        When the size of the file is known, the upload file is extended to that
+        size up front so that segments may be written in any order.
+
+        @param size: optional size in bytes of the file to be uploaded
+        @type  size: int
+
         @return: unique ID to refer to this upload request in the future
         @rtype:  str
         """
@@ -46,11 +56,15 @@ class ContentUploadManager(object):
         # before attempting to write bits.
         file_path = ContentUploadManager._upload_file_path(upload_id)
         f = open(file_path, 'w')
-        f.close()
+        try:
+            if size:
+                f.truncate(size)
+        finally:
+            f.close()
 
         return upload_id
 
-    def save_data(self, upload_id, offset, data):
+    def save_data(self, upload_id, offset, data, checksum=None):
         """
         Saves bits into the given upload request starting at an offset value.
         The initialize_upload method should be called prior to this method
@@ -65,18 +79,75 @@ class ContentUploadManager(object):
 
         @param data: content to write to the file
         @type  data: str
+
+        @param checksum: optional SHA256 hex digest of data; when specified,
+               the segment is rejected if it does not match
+        @type  checksum: str
+
+        @raise MissingResource: if the upload request ID does not exist
+        @raise InvalidValue: if the checksum does not match the data
         """
 
-        file_path = ContentUploadManager._upload_file_path(upload_id)
+        if checksum and hashlib.sha256(data).hexdigest() != checksum.lower():
+            raise InvalidValue(['checksum'])
 
-        # Make sure the upload was initialized first and hasn't been deleted
-        if not os.path.exists(file_path):
-            raise MissingResource(upload_request=upload_id)
+        fd = ContentUploadManager._open_upload(upload_id)
+        try:
+            os.lseek(fd, offset, os.SEEK_SET)
+            ContentUploadManager._write(fd, data)
+        finally:
+            os.close(fd)
 
-        f = open(file_path, 'r+')
-        f.seek(offset)
-        f.write(data)
-        f.close()
+    def save_stream(self, upload_id, offset, stream, size, checksum=None):
+        """
+        Saves bits read from a stream into the given upload request starting at
+        an offset value. The stream is copied to the file in buffers of
+        STREAM_BUFFER_SIZE bytes so the segment is never held in memory in full.
+
+        As the checksum can only be calculated once the segment has been read,
+        it is verified after the bits have been written. A segment that fails
+        verification has to be saved again.
+
+        @param upload_id: upload request ID
+        @type  upload_id: str
+
+        @param offset: area in the uploaded file to start writing at
+        @type  offset: int
+
+        @param stream: file-like object from which to read the content
+        @type  stream: file
+
+        @param size: number of bytes to read from the stream
+        @type  size: int
+
+        @param checksum: optional SHA256 hex digest of the content; when
+               specified, the segment is rejected if it does not match
+        @type  checksum: str
+
+        @raise MissingResource: if the upload request ID does not exist
+        @raise InvalidValue: if fewer than size bytes could be read from the
+               stream or the checksum does not match the content
+        """
+        digest = hashlib.sha256()
+        received = 0
+
+        fd = ContentUploadManager._open_upload(upload_id)
+        try:
+            os.lseek(fd, offset, os.SEEK_SET)
+            while received < size:
+                data = stream.read(min(STREAM_BUFFER_SIZE, size - received))
+                if not data:
+                    break
+                digest.update(data)
+                ContentUploadManager._write(fd, data)
+                received += len(data)
+        finally:
+            os.close(fd)
+
+        if received != size:
+            raise InvalidValue(['size'])
+        if checksum and digest.hexdigest() != checksum.lower():
+            raise InvalidValue(['checksum'])
 
     def delete_upload(self, upload_id):
         """
@@ -224,6 +295,73 @@ class ContentUploadManager(object):
 
         # TODO: Add support for tracking the report as a history entry on the repo
 
+    @staticmethod
+    def import_existing_unit(repo_id, unit_type_id, unit_id):
+        """
+        Called in place of import_uploaded_unit when the unit being uploaded is
+        already stored on the server. The existing unit is associated with the
+        repository without its bits being transferred again.
+
+        This call will first call is_valid_upload to check the integrity of the
+        destination repository. See that method's documentation for exception
+        possibilities.
+
+        :param repo_id:       identifies the repository into which the unit is imported
+        :type  repo_id:       str
+        :param unit_type_id:  type of unit being imported
+        :type  unit_type_id:  str
+        :param unit_id:       identifies the stored unit
+        :type  unit_id:       str
+        :return:              A report in the format returned by importers for an upload
+        :rtype:               dict
+        :raises MissingResource: if the unit does not exist
+        """
+        ContentUploadManager.is_valid_upload(repo_id, unit_type_id)
+
+        # Raises MissingResource if the unit has been removed in the meantime
+        query_manager = manager_factory.content_query_manager()
+        query_manager.get_content_unit_by_id(unit_type_id, unit_id, model_fields=['_id'])
+
+        association_manager = manager_factory.repo_unit_association_manager()
+        association_manager.associate_unit_by_id(repo_id, unit_type_id, unit_id)
+
+        return {'success_flag': True, 'summary': {}, 'details': {}}
+
+    @staticmethod
+    def _open_upload(upload_id):
+        """
+        Opens the file backing the given upload for writing. Segments may arrive
+        concurrently and out of order, so they are written directly to the
+        descriptor at their offset rather than through a buffered file.
+
+        :param upload_id: identifies the upload in question
+        :type  upload_id: str
+        :return:          file descriptor opened for writing
+        :rtype:           int
+        :raises MissingResource: if the upload was not initialized or has been deleted
+        """
+        file_path = ContentUploadManager._upload_file_path(upload_id)
+        try:
+            return os.open(file_path, os.O_WRONLY)
+        except OSError, e:
+            if e.errno == ENOENT:
+                raise MissingResource(upload_request=upload_id)
+            raise
+
+    @staticmethod
+    def _write(fd, data):
+        """
+        Writes all of the data to the descriptor at its current position.
+
+        :param fd:   file descriptor opened for writing
+        :type  fd:   int
+        :param data: content to write
+        :type  data: str
+        """
+        written = 0
+        while written < len(data):
+            written += os.write(fd, buffer(data, written))
+
     @staticmethod
     def _upload_file_path(upload_id):
         """
@@ -259,3 +397,4 @@ class ContentUploadManager(object):
 
 
 import_uploaded_unit = task(ContentUploadManager.import_uploaded_unit, base=Task)
+import_existing_unit = task(ContentUploadManager.import_existing_unit, base=Task)
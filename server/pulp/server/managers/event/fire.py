@@ -6,13 +6,85 @@ in a consistent event format for that type.
 """
 
 import logging
+import threading
+import time
 
-from pulp.server.db.model.event import EventListener
+from pulp.server.db.model.event import EventListener, EventListenerGeneration
 from pulp.server.event import data as e, notifiers
 
 
 _logger = logging.getLogger(__name__)
 
+# The number of seconds event listeners are cached.
+LISTENER_CACHE_TTL = 30
+
+
+class ListenerRegistry(object):
+    """
+    A cache of the event listeners defined in the database so that firing an
+    event does not query all of them.  The cache is invalidated by the
+    EventListenerManager when listeners are created, updated or deleted, which
+    increments the listener generation stored in the database.  Each process
+    reads the generation (a single document looked up by _id) when an event is
+    fired and reloads the listeners when it has changed, so that changes made
+    in the web server are seen right away by the workers firing events.
+    """
+
+    def __init__(self, ttl=LISTENER_CACHE_TTL):
+        """
+        :param ttl: The number of seconds listeners are cached.
+        :type  ttl: int
+        """
+        self.ttl = ttl
+        self._listeners = []
+        self._generation = None
+        self._expiration = 0
+        self._lock = threading.RLock()
+
+    def find(self, event_type):
+        """
+        Find the listeners for the given event type.
+
+        :param event_type: an event type
+        :type  event_type: str
+        :return: list of event listener SON documents
+        :rtype:  list
+        """
+        return [listener for listener in self._load()
+                if event_type in listener['event_types'] or '*' in listener['event_types']]
+
+    def invalidate(self):
+        """
+        Invalidate the cache in all processes; the listeners are reloaded on the next find.
+        """
+        collection = EventListenerGeneration.get_collection()
+        collection.update({'_id': EventListenerGeneration.GENERATION_ID},
+                          {'$inc': {'generation': 1}}, upsert=True)
+        with self._lock:
+            self._expiration = 0
+
+    def _load(self):
+        """
+        Get all of the listeners, (re)loading them from the database when they
+        have changed or the cache has expired.
+
+        :return: list of event listener SON documents
+        :rtype:  list
+        """
+        with self._lock:
+            now = time.time()
+            generation = EventListenerGeneration.get_collection().find_one(
+                {'_id': EventListenerGeneration.GENERATION_ID})
+            generation = generation['generation'] if generation else 0
+            if generation != self._generation or now >= self._expiration:
+                self._listeners = list(EventListener.get_collection().find())
+                self._generation = generation
+                self._expiration = now + self.ttl
+            return self._listeners
+
+
+registry = ListenerRegistry()
+
 
 class EventFireManager(object):
 
@@ -62,8 +134,7 @@ class EventFireManager(object):
         @type  event: pulp.server.event.data.Event
         """
         # Determine which listeners should be notified
-        listeners = list(EventListener.get_collection().find(
-            {'$or': ({'event_types': event.event_type}, {'event_types': '*'})}))
+        listeners = registry.find(event.event_type)
 
         # For each listener, retrieve the notifier and invoke it. Be sure that
         # an exception from a notifier is logged but does not interrupt the
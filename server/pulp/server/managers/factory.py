@@ -28,6 +28,7 @@ TYPE_CONSUMER_QUERY = 'consumer-query-manager'
 TYPE_CONSUMER_SCHEDULE = 'consumer-schedule-manager'
 TYPE_CONTENT = 'content-manager'
 TYPE_CONTENT_CATALOG = 'content-catalog-manager'
+TYPE_CONTENT_DOWNLOAD = 'content-download-manager'
 TYPE_CONTENT_ORPHAN = 'content-orphan-manager'
 TYPE_CONTENT_QUERY = 'content-query-manager'
 TYPE_CONTENT_UPLOAD = 'content-upload-manager'
@@ -196,6 +197,13 @@ def content_catalog_manager():
     return get_manager(TYPE_CONTENT_CATALOG)
 
 
+def content_download_manager():
+    """
+    @rtype: L{pulp.server.managers.content.download.ContentDownloadManager}
+    """
+    return get_manager(TYPE_CONTENT_DOWNLOAD)
+
+
 def content_orphan_manager():
     """
     @rtype: L{pulp.server.managers.content.orphan.OrphanManager}
@@ -400,6 +408,7 @@ def initialize():
     from pulp.server.managers.consumer.query import ConsumerQueryManager
     from pulp.server.managers.content.cud import ContentManager
     from pulp.server.managers.content.catalog import ContentCatalogManager
+    from pulp.server.managers.content.download import ContentDownloadManager
     from pulp.server.managers.content.orphan import OrphanManager
     from pulp.server.managers.content.query import ContentQueryManager
     from pulp.server.managers.content.upload import ContentUploadManager
@@ -438,6 +447,7 @@ def initialize():
         TYPE_CONSUMER_SCHEDULE: ConsumerScheduleManager,
         TYPE_CONTENT: ContentManager,
         TYPE_CONTENT_CATALOG: ContentCatalogManager,
+        TYPE_CONTENT_DOWNLOAD: ContentDownloadManager,
         TYPE_CONTENT_ORPHAN: OrphanManager,
         TYPE_CONTENT_QUERY: ContentQueryManager,
         TYPE_CONTENT_UPLOAD: ContentUploadManager,
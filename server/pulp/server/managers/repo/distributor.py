@@ -190,6 +190,7 @@ class RepoDistributorManager(object):
         distributor = RepoDistributor(repo_id, distributor_id, distributor_type_id, clean_config,
                                       auto_publish)
         distributor_coll.save(distributor)
+        model.Repository.objects.bump_revision(repo_id)
 
         return distributor
 
@@ -229,6 +230,7 @@ class RepoDistributorManager(object):
 
         # Update the database to reflect the removal
         distributor_coll.remove({'_id': repo_distributor['_id']})
+        model.Repository.objects.bump_revision(repo_id)
 
     @staticmethod
     def update_distributor_config(repo_id, distributor_id, distributor_config, auto_publish=None):
@@ -310,6 +312,7 @@ class RepoDistributorManager(object):
         # If we got this far, the new config is valid, so update the database
         repo_distributor['config'] = merged_config
         distributor_coll.save(repo_distributor)
+        model.Repository.objects.bump_revision(repo_id)
 
         return repo_distributor
 
@@ -409,6 +412,7 @@ class RepoDistributorManager(object):
         # Update
         repo_distributor['scratchpad'] = contents
         distributor_coll.save(repo_distributor)
+        model.Repository.objects.bump_revision(repo_id)
 
     def add_publish_schedule(self, repo_id, distributor_id, schedule_id):
         """
@@ -425,6 +429,7 @@ class RepoDistributorManager(object):
             return
         collection.update({'_id': distributor['_id']},
                           {'$push': {'scheduled_publishes': schedule_id}})
+        model.Repository.objects.bump_revision(repo_id)
 
     def remove_publish_schedule(self, repo_id, distributor_id, schedule_id):
         """
@@ -441,6 +446,7 @@ class RepoDistributorManager(object):
             return
         collection.update({'_id': distributor['_id']},
                           {'$pull': {'scheduled_publishes': schedule_id}})
+        model.Repository.objects.bump_revision(repo_id)
 
     def list_publish_schedules(self, repo_id, distributor_id):
         """
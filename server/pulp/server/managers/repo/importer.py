@@ -126,6 +126,7 @@ class RepoImporterManager(object):
 
         importer = RepoImporter(repo_id, importer_id, importer_type_id, clean_config)
         importer_coll.save(importer)
+        model.Repository.objects.bump_revision(repo_id)
 
         return importer
 
@@ -210,6 +211,7 @@ class RepoImporterManager(object):
 
         # Update the database to reflect the removal
         importer_coll.remove({'repo_id': repo_id})
+        model.Repository.objects.bump_revision(repo_id)
 
     @staticmethod
     def update_importer_config(repo_id, importer_config):
@@ -282,6 +284,7 @@ class RepoImporterManager(object):
         # If we got this far, the new config is valid, so update the database
         repo_importer['config'] = merged_config
         importer_coll.save(repo_importer)
+        model.Repository.objects.bump_revision(repo_id)
 
         serializer = serializers.ImporterSerializer(repo_importer)
         return serializer.data
@@ -333,6 +336,7 @@ class RepoImporterManager(object):
         # Update
         repo_importer['scratchpad'] = contents
         importer_coll.save(repo_importer)
+        model.Repository.objects.bump_revision(repo_id)
 
 
 remove_importer = task(RepoImporterManager.remove_importer, base=Task, ignore_result=True)
@@ -6,8 +6,9 @@ import itertools
 import pymongo
 
 from pulp.plugins.types import database as types_db
-from pulp.server.db.model.criteria import UnitAssociationCriteria
+from pulp.server.db.model.criteria import UnitAssociationCriteria, encode_continuation
 from pulp.server.db.model.repository import RepoContentUnit
+from pulp.server.exceptions import InvalidValue
 
 
 # Valid sort strings
@@ -44,6 +45,10 @@ class RepoUnitAssociationQueryManager(object):
         Get the units associated with the repository based on the provided unit
         association criteria.
 
+        If the criteria has a continuation, the units start after the last unit of the
+        page the continuation was created for (see continuation_token). Unlike skip, this
+        doesn't read the units of the earlier pages.
+
         :param repo_id: identifies the repository
         :type  repo_id: str
 
@@ -59,6 +64,9 @@ class RepoUnitAssociationQueryManager(object):
 
         criteria = criteria or UnitAssociationCriteria()
 
+        if criteria.continuation:
+            self._validate_continuation(criteria)
+
         unit_associations_generator = self._unit_associations_cursor(repo_id, criteria)
 
         if criteria.remove_duplicates:
@@ -107,12 +115,21 @@ class RepoUnitAssociationQueryManager(object):
         # multiple calls with skip and limit to work across types.
         association_unit_types = sorted(association_unit_types)
 
+        unit_continuation = None
+        if criteria.continuation and not criteria.association_sort:
+            # Units are ordered by type first, so the types before the one the previous page
+            # ended in are done.
+            unit_continuation = criteria.continuation
+            association_unit_types = [t for t in association_unit_types
+                                      if t >= unit_continuation['type_id']]
+
         # Use a generator expression here to keep from going back to the types
         # collections once we've returned our limit of results.
         # Be sure to skip cursors that would otherwise return an empty result set.
-        units_cursors = (self._associated_units_by_type_cursor(t, criteria,
-                                                               associations_lookup[t].keys())
-                         for t in association_unit_types if t in associations_lookup)
+        units_cursors = (self._associated_units_by_type_cursor(
+            t, criteria, associations_lookup[t].keys(),
+            unit_continuation if unit_continuation and t == unit_continuation['type_id'] else None)
+            for t in association_unit_types if t in associations_lookup)
 
         if not criteria.association_sort:
             # If we're not sorting based on association fields, then set the
@@ -221,6 +238,93 @@ class RepoUnitAssociationQueryManager(object):
 
         return self.get_units(repo_id, criteria, as_generator)
 
+    @classmethod
+    def continuation_token(cls, criteria, units):
+        """
+        Create the token a client passes as the criteria continuation to get the page of
+        units following the given one. Pages are ordered by the association sort and the
+        association id when an association sort is specified, otherwise by unit type, the
+        unit sort and the unit id.
+
+        :param criteria: criteria the page of units was retrieved with
+        :type  criteria: UnitAssociationCriteria
+
+        :param units: page of units returned by get_units for the criteria
+        :type  units: list
+
+        :return: continuation token, or None if the page is the last one
+        :rtype: str or None
+        """
+        if not criteria.limit or len(units) < criteria.limit:
+            return None
+
+        last = units[-1]
+        if criteria.association_sort:
+            sort = cls._association_sort(criteria)
+            continuation = {'sort': sort,
+                            'values': [_field_value(last, f) for f, d in sort]}
+        else:
+            sort = cls._unit_sort(last['unit_type_id'], criteria)
+            continuation = {'type_id': last['unit_type_id'], 'sort': sort,
+                            'values': [_field_value(last['metadata'], f) for f, d in sort]}
+        return encode_continuation(continuation)
+
+    @staticmethod
+    def _validate_continuation(criteria):
+        """
+        Check that the criteria continuation was created for a page sorted the same way:
+        continuations of association sorted pages have no unit type, and continuations of
+        other pages name the unit type the page ended in.
+
+        :type criteria: UnitAssociationCriteria
+
+        :raises InvalidValue: if the continuation does not match the sort of the criteria
+        """
+        continuation = criteria.continuation
+        if criteria.association_sort:
+            valid = 'type_id' not in continuation
+        else:
+            valid = isinstance(continuation.get('type_id'), basestring)
+        if not valid:
+            raise InvalidValue(['continuation'])
+
+    @staticmethod
+    def _continuation_spec(continuation, sort):
+        """
+        Build the spec matching the documents that follow the ones described by the
+        continuation, given the sort the documents are ordered by.
+
+        :type continuation: dict
+        :type sort: list
+        :rtype: dict
+
+        :raises InvalidValue: if the continuation was created for a different sort
+        """
+        if [list(s) for s in continuation['sort']] != [list(s) for s in sort]:
+            raise InvalidValue(['continuation'])
+
+        clauses = []
+        values = continuation['values']
+        for index, (field, direction) in enumerate(sort):
+            prefix = dict((f, v) for (f, d), v in zip(sort[:index], values[:index]))
+            value = values[index]
+            # Missing values sort before all others, but are not matched by comparisons.
+            if direction == SORT_ASCENDING:
+                if value is None:
+                    following = [{'$ne': None}]
+                else:
+                    following = [{'$gt': value}]
+            else:
+                if value is None:
+                    following = []
+                else:
+                    following = [{'$lt': value}, None]
+            for condition in following:
+                clause = prefix.copy()
+                clause[field] = condition
+                clauses.append(clause)
+        return {'$or': clauses}
+
     @staticmethod
     def unit_type_ids_for_repo(repo_id):
         """
@@ -256,15 +360,45 @@ class RepoUnitAssociationQueryManager(object):
         if criteria.type_ids:
             spec['unit_type_id'] = {'$in': criteria.type_ids}
 
+        fields = criteria.association_fields
+
+        if criteria.association_sort:
+            sort = RepoUnitAssociationQueryManager._association_sort(criteria)
+            # The sort fields are needed to create a continuation token from the results.
+            if fields is not None:
+                fields = fields + [f for f, d in sort if f not in fields]
+            if criteria.continuation:
+                continuation_spec = RepoUnitAssociationQueryManager._continuation_spec(
+                    criteria.continuation, sort)
+                spec = {'$and': [spec, continuation_spec]}
+
         collection = RepoContentUnit.get_collection()
 
-        cursor = collection.find(spec, fields=criteria.association_fields)
+        cursor = collection.find(spec, fields=fields)
 
         if criteria.association_sort:
-            cursor.sort(criteria.association_sort)
+            cursor.sort(sort)
 
         return cursor
 
+    @staticmethod
+    def _association_sort(criteria):
+        """
+        Return the association sort of the criteria followed by the fields needed to make
+        the order of the associations deterministic: "created", when removing duplicates,
+        and the association id.
+
+        :type criteria: UnitAssociationCriteria
+        :rtype: list
+        """
+        sort = list(criteria.association_sort or [])
+        created_sort_tuple = ('created', SORT_ASCENDING)
+        if criteria.remove_duplicates and created_sort_tuple not in sort:
+            sort.append(created_sort_tuple)
+        if '_id' not in [f for f, d in sort]:
+            sort.append(('_id', SORT_ASCENDING))
+        return sort
+
     @staticmethod
     def _unit_associations_no_duplicates(criteria, cursor):
         """
@@ -278,11 +412,7 @@ class RepoUnitAssociationQueryManager(object):
         # This algorithm returns the earliest association in the case of duplicates.
 
         # Sorting by the "created" flag is crucial to removing duplicate associations.
-        created_sort_tuple = ('created', SORT_ASCENDING)
-        sort = criteria.association_sort or []
-        if created_sort_tuple not in sort:
-            sort.append(created_sort_tuple)
-        cursor.sort(sort)
+        cursor.sort(RepoUnitAssociationQueryManager._association_sort(criteria))
 
         previously_generated_association_ids = set()
 
@@ -333,7 +463,8 @@ class RepoUnitAssociationQueryManager(object):
     # -- associated units methods ----------------------------------------------
 
     @staticmethod
-    def _associated_units_by_type_cursor(unit_type_id, criteria, associated_unit_ids):
+    def _associated_units_by_type_cursor(unit_type_id, criteria, associated_unit_ids,
+                                         continuation=None):
         """
         Retrieve a pymongo cursor for units associated with a repository of a
         give unit type that meet to the provided criteria.
@@ -341,6 +472,8 @@ class RepoUnitAssociationQueryManager(object):
         :type unit_type_id: str
         :type criteria: UnitAssociationCriteria
         :type associated_unit_ids: list
+        :param continuation: if specified, only units following it are returned
+        :type continuation: dict
         :rtype: pymongo.cursor.Cursor
         """
 
@@ -349,27 +482,49 @@ class RepoUnitAssociationQueryManager(object):
         spec = criteria.unit_filters.copy()
         spec['_id'] = {'$in': associated_unit_ids}
 
+        sort = RepoUnitAssociationQueryManager._unit_sort(unit_type_id, criteria)
+
+        if continuation:
+            continuation_spec = RepoUnitAssociationQueryManager._continuation_spec(
+                continuation, sort)
+            spec = {'$and': [spec, continuation_spec]}
+
         fields = criteria.unit_fields
 
-        # The _content_type_id is required for looking up the association.
-        if fields is not None and '_content_type_id' not in fields:
+        # The _content_type_id is required for looking up the association and the
+        # sort fields for creating a continuation token.
+        if fields is not None:
             fields = list(fields)
-            fields.append('_content_type_id')
+            for field in ['_content_type_id'] + [f for f, d in sort]:
+                if field not in fields:
+                    fields.append(field)
 
         cursor = collection.find(spec, fields=fields)
 
+        cursor.sort(sort)
+
+        return cursor
+
+    @staticmethod
+    def _unit_sort(unit_type_id, criteria):
+        """
+        Return the unit sort of the criteria, or the unit key of the type if there is none,
+        followed by the unit id to make the order of the units deterministic.
+
+        :type unit_type_id: str
+        :type criteria: UnitAssociationCriteria
+        :rtype: list
+        """
         sort = criteria.unit_sort
 
         if sort is None:
             unit_key = types_db.type_units_unit_key(unit_type_id)
+            sort = [(u, SORT_ASCENDING) for u in unit_key or []]
 
-            if unit_key is not None:
-                sort = [(u, SORT_ASCENDING) for u in unit_key]
-
-        if sort is not None:
-            cursor.sort(sort)
-
-        return cursor
+        sort = list(sort)
+        if '_id' not in [f for f, d in sort]:
+            sort.append(('_id', SORT_ASCENDING))
+        return sort
 
     @staticmethod
     def _associated_units_cursors_with_skip(units_cursors, skip):
@@ -516,3 +671,19 @@ class RepoUnitAssociationQueryManager(object):
                 association = association.copy()
                 association['metadata'] = unit
                 yield association
+
+
+def _field_value(document, field):
+    """
+    Return the value of a field of a document, following dotted field names into
+    embedded documents.
+
+    :type document: dict
+    :type field: str
+    :return: the value, or None if the field is missing
+    """
+    for name in field.split('.'):
+        if not isinstance(document, dict):
+            return None
+        document = document.get(name)
+    return document
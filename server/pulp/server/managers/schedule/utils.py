@@ -87,6 +87,52 @@ def get_updated_since(seconds):
     return ScheduledCall.get_collection().query(criteria)
 
 
+def get_changed_since(seconds):
+    """
+    Get schedules, whether or not they are enabled, that have been updated since the timestamp
+    represented by "seconds". Unlike get_updated_since(), this includes schedules that were
+    disabled since then.
+
+    :param seconds: seconds since the epoch
+    :type  seconds: float
+
+    :return:    pymongo cursor of ScheduledCall database objects
+    :rtype:     pymongo.cursor.Cursor
+    """
+    criteria = Criteria(filters={'last_updated': {'$gt': seconds}})
+    return ScheduledCall.get_collection().query(criteria)
+
+
+def get_enabled_summary():
+    """
+    Count the enabled schedules and find the most recent update among them, using a single
+    aggregation that the index on "enabled" and "last_updated" can answer.
+
+    :return:    tuple of the number of enabled schedules and the most recent "last_updated"
+                timestamp among them, which is 0 if there are none
+    :rtype:     tuple
+    """
+    pipeline = [
+        {'$match': {'enabled': True}},
+        {'$group': {'_id': None, 'count': {'$sum': 1},
+                    'last_updated': {'$max': '$last_updated'}}},
+    ]
+    for summary in ScheduledCall.get_collection().aggregate(pipeline, cursor={}):
+        return summary['count'], summary['last_updated'] or 0
+    return 0, 0
+
+
+def get_enabled_ids():
+    """
+    Get the IDs of all enabled schedules.
+
+    :return:    set of schedule IDs
+    :rtype:     set
+    """
+    criteria = Criteria(filters={'enabled': True}, fields=['_id'])
+    return set(str(call['_id']) for call in ScheduledCall.get_collection().query(criteria))
+
+
 def delete(schedule_id):
     """
     Deletes the schedule with unique ID schedule_id
@@ -298,6 +344,9 @@ def validate_updated_schedule_options(options):
     if 'enabled' in options and not _is_valid_enabled_flag(options['enabled']):
         invalid_options.append('enabled')
 
+    if 'jitter' in options and not _is_valid_jitter(options['jitter']):
+        invalid_options.append('jitter')
+
     if not invalid_options:
         return
 
@@ -392,3 +441,22 @@ def _is_valid_enabled_flag(enabled_flag):
     """
 
     return isinstance(enabled_flag, bool)
+
+
+def _is_valid_jitter(jitter):
+    """
+    Test that the jitter is either None or a non-negative integer.
+
+    :param jitter: jitter to test
+    :type  jitter: int or None
+    :return: True if the jitter is valid, False otherwise
+    :rtype:  bool
+    """
+
+    if jitter is None:
+        return True
+
+    if isinstance(jitter, int) and jitter >= 0:
+        return True
+
+    return False
@@ -0,0 +1,157 @@
+import httplib
+import itertools
+import zlib
+
+from django.utils.cache import patch_vary_headers
+
+from pulp.server.config import config
+
+
+# Content codings the middleware can produce, in order of preference, mapped to the zlib window
+# bits that select the gzip (RFC 1952) or zlib (RFC 1950, HTTP "deflate") container.
+ENCODINGS = (('gzip', 16 + zlib.MAX_WBITS), ('deflate', zlib.MAX_WBITS))
+
+
+def _parse_accept_encoding(header):
+    """
+    Parse an Accept-Encoding header into the quality value of each content coding.
+
+    :param header: value of the Accept-Encoding header
+    :type  header: str
+
+    :return: dict of lower case content coding to its quality value
+    :rtype:  dict
+    """
+    qualities = {}
+    for item in header.split(','):
+        params = item.split(';')
+        coding = params[0].strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params[1:]:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def negotiate_encoding(header):
+    """
+    Choose the content coding to use for a response, given the Accept-Encoding header of the
+    request.
+
+    :param header: value of the Accept-Encoding header, may be empty
+    :type  header: str
+
+    :return: the chosen coding from ENCODINGS, or None if the response should not be compressed
+    :rtype:  str or None
+    """
+    qualities = _parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for coding, unused in ENCODINGS:
+        quality = qualities.get(coding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def _compress_sequence(sequence, encoding, level):
+    """
+    Compress an iterable of strings, yielding the compressed data as it becomes available.
+
+    :param sequence: strings to compress
+    :type  sequence: iterable
+    :param encoding: content coding from ENCODINGS
+    :type  encoding: str
+    :param level: zlib compression level, from 1 to 9
+    :type  level: int
+
+    :return: generator of compressed data
+    :rtype:  generator
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, dict(ENCODINGS)[encoding])
+    for item in sequence:
+        data = compressor.compress(item)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class CompressionMiddleware(object):
+    """
+    Compress response bodies with gzip or deflate when the client accepts it.
+
+    The [server] response_compression_level setting is the zlib compression level, 0 disables
+    compression, and bodies smaller than response_compression_min_size bytes are sent as they are.
+    Streaming responses are compressed as they are written.
+
+    The entity tag of every response to a client that accepts compression is made weak, including
+    304 responses and bodies too small to compress, so that the tag a client cached always matches
+    the one it is sent when revalidating.
+    """
+
+    def __init__(self):
+        self.level = config.getint('server', 'response_compression_level')
+        self.min_size = config.getint('server', 'response_compression_min_size')
+
+    def process_response(self, request, response):
+        """
+        Compress the response if the client accepts a supported content coding.
+
+        :param request: WSGI request object
+        :type  request: django.core.handlers.wsgi.WSGIRequest
+        :param response: response to compress
+        :type  response: django.http.HttpResponseBase
+
+        :return: the response, compressed if appropriate
+        :rtype:  django.http.HttpResponseBase
+        """
+        not_modified = response.status_code == httplib.NOT_MODIFIED
+        if self.level <= 0 or (response.has_header('Content-Encoding') and not not_modified):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        # The resource may be sent compressed, which is a different representation, so only weak
+        # comparison may match its entity tag.
+        if response.has_header('ETag') and not response['ETag'].startswith('W/'):
+            response['ETag'] = 'W/' + response['ETag']
+        if not_modified:
+            return response
+
+        if response.streaming:
+            # Read enough of the stream to tell whether it reaches the minimum size.
+            head, size = [], 0
+            content = iter(response.streaming_content)
+            for chunk in content:
+                head.append(chunk)
+                size += len(chunk)
+                if size >= self.min_size:
+                    break
+            content = itertools.chain(head, content)
+            if size < self.min_size:
+                response.streaming_content = content
+                return response
+            response.streaming_content = _compress_sequence(content, encoding, self.level)
+            # The compressed size is not known until the content has been written.
+            del response['Content-Length']
+        else:
+            if len(response.content) < self.min_size:
+                return response
+            compressed = ''.join(_compress_sequence((response.content,), encoding, self.level))
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        response['Content-Encoding'] = encoding
+        return response
@@ -20,6 +20,7 @@ INSTALLED_APPS = (
 
 MIDDLEWARE_CLASSES = (
     'django.middleware.http.ConditionalGetMiddleware',
+    'pulp.server.webservices.middleware.compression.CompressionMiddleware',
     'pulp.server.webservices.middleware.exception.ExceptionHandlerMiddleware',
     'pulp.server.webservices.middleware.postponed.PostponedOperationMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -42,8 +42,11 @@ from pulp.server.webservices.views.content import (
     ContentUnitSearch,
     ContentUnitUserMetadataResourceView,
     DeleteOrphansActionView,
+    ExistingUnitsActionView,
     OrphanCollectionView,
     OrphanResourceView,
+    OrphanScanCollectionView,
+    OrphanScanReclaimActionView,
     OrphanTypeSubCollectionView,
     UploadResourceView,
     UploadsCollectionView,
@@ -138,9 +141,15 @@ urlpatterns = patterns('',
         ConsumerGroupBindingView.as_view(), name='consumer_group_unbind'),
     url(r'^v2/content/actions/delete_orphans/$', DeleteOrphansActionView.as_view(),
         name='content_actions_delete_orphans'),
+    url(r'^v2/content/actions/find_existing_units/$', ExistingUnitsActionView.as_view(),
+        name='content_actions_find_existing_units'),
     url(r'^v2/content/catalog/(?P<source_id>[^/]+)/$', CatalogResourceView.as_view(),
         name='content_catalog_resource'),
     url(r'^v2/content/orphans/$', OrphanCollectionView.as_view(), name='content_orphan_collection'),
+    url(r'^v2/content/orphan_scans/$', OrphanScanCollectionView.as_view(),
+        name='content_orphan_scan_collection'),
+    url(r'^v2/content/orphan_scans/actions/reclaim/$', OrphanScanReclaimActionView.as_view(),
+        name='content_orphan_scan_reclaim'),
     url(r'^v2/content/orphans/(?P<content_type>[^/]+)/$', OrphanTypeSubCollectionView.as_view(),
         name='content_orphan_type_subcollection'),
     url(r'^v2/content/orphans/(?P<content_type>[^/]+)/(?P<unit_id>[^/]+)/$',
@@ -243,6 +252,8 @@ urlpatterns = patterns('',
     url(r'^v2/status/$', StatusView.as_view(), name='status'),
     url(r'^v2/tasks/$', tasks.TaskCollectionView.as_view(), name='task_collection'),
     url(r'^v2/tasks/search/$', tasks.TaskSearchView.as_view(), name='task_search'),
+    url(r'^v2/tasks/actions/status/$', tasks.TaskStatusView.as_view(),
+        name='task_actions_status'),
     url(r'^v2/tasks/(?P<task_id>[^/]+)/$', tasks.TaskResourceView.as_view(), name='task_resource'),
     url(r'^v2/users/$', users.UsersView.as_view(), name='users'),
     url(r'^v2/users/search/$', users.UserSearchView.as_view(),
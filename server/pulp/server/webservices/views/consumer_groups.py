@@ -14,6 +14,7 @@ from pulp.server.webservices.views.decorators import auth_required
 from pulp.server.webservices.views import search
 from pulp.server.webservices.views.util import (generate_json_response,
                                                 generate_json_response_with_pulp_encoder,
+                                                generate_json_streaming_response_with_pulp_encoder,
                                                 generate_redirect_response,
                                                 json_body_allow_empty,
                                                 json_body_required)
@@ -150,7 +151,7 @@ class ConsumerGroupSearchView(search.SearchView):
     """
     This view provides GET and POST searching on Consumer Groups.
     """
-    response_builder = staticmethod(generate_json_response_with_pulp_encoder)
+    response_builder = staticmethod(generate_json_streaming_response_with_pulp_encoder)
     manager = query.ConsumerGroupQueryManager()
     serializer = staticmethod(serialize)
 
@@ -21,9 +21,10 @@ from pulp.server.managers.schedule.consumer import (UNIT_INSTALL_ACTION, UNIT_UN
 from pulp.server.webservices.views import search
 from pulp.server.webservices.views.decorators import auth_required
 from pulp.server.webservices.views.serializers import binding as serial_binding
-from pulp.server.webservices.views.util import (_ensure_input_encoding,
+from pulp.server.webservices.views.util import (CONTINUATION_HEADER, _ensure_input_encoding,
                                                 generate_json_response,
                                                 generate_json_response_with_pulp_encoder,
+                                                generate_json_streaming_response_with_pulp_encoder,
                                                 generate_redirect_response,
                                                 json_body_required,
                                                 json_body_allow_empty)
@@ -287,7 +288,7 @@ class ConsumerSearchView(search.SearchView):
     This view provides GET and POST searching for Consumers.
     """
     optional_bool_fields = ('details', 'bindings')
-    response_builder = staticmethod(generate_json_response_with_pulp_encoder)
+    response_builder = staticmethod(generate_json_streaming_response_with_pulp_encoder)
     manager = query_manager.ConsumerQueryManager()
 
     @classmethod
@@ -319,7 +320,7 @@ class ConsumerBindingSearchView(search.SearchView):
     """
     This view provides GET and POST searching for Consumer Bindings.
     """
-    response_builder = staticmethod(generate_json_response_with_pulp_encoder)
+    response_builder = staticmethod(generate_json_streaming_response_with_pulp_encoder)
     manager = bind.BindManager()
 
 
@@ -327,7 +328,7 @@ class ConsumerProfileSearchView(search.SearchView):
     """
     This view provides GET and POST searching for Consumer Profiles.
     """
-    response_builder = staticmethod(generate_json_response_with_pulp_encoder)
+    response_builder = staticmethod(generate_json_streaming_response_with_pulp_encoder)
     manager = profile.ProfileManager()
 
 
@@ -620,6 +621,10 @@ class ConsumerHistoryView(View):
         """
         Retrieve histroy for the specified consumer
 
+        Events may be limited to a comma separated list of fields. When the limit is reached,
+        the token to pass as the continuation to get the next page of events is returned in
+        the CONTINUATION_HEADER header.
+
         :param request: WSGI request object
         :type request: django.core.handlers.wsgi.WSGIRequest
         :param consumer_id: A consumer ID.
@@ -639,6 +644,8 @@ class ConsumerHistoryView(View):
         sort = filters.get('sort', 'descending')
         start_date = filters.get('start_date', None)
         end_date = filters.get('end_date', None)
+        continuation = filters.get('continuation', None)
+        fields = filters.get('fields', None)
 
         if limit:
             try:
@@ -646,13 +653,18 @@ class ConsumerHistoryView(View):
             except ValueError:
                 raise InvalidValue('limit')
 
-        results = factory.consumer_history_manager().query(consumer_id=consumer_id,
-                                                           event_type=event_type,
-                                                           limit=limit,
-                                                           sort=sort,
-                                                           start_date=start_date,
-                                                           end_date=end_date)
-        return generate_json_response_with_pulp_encoder(results)
+        if fields:
+            fields = [f.strip() for f in fields.split(',') if f.strip()]
+
+        manager = factory.consumer_history_manager()
+        results = manager.query(consumer_id=consumer_id, event_type=event_type, limit=limit,
+                                sort=sort, start_date=start_date, end_date=end_date,
+                                continuation=continuation, fields=fields)
+        response = generate_json_response_with_pulp_encoder(results)
+        continuation = manager.continuation_token(results, limit, sort)
+        if continuation:
+            response[CONTINUATION_HEADER] = continuation
+        return response
 
 
 class ConsumerProfilesView(View):
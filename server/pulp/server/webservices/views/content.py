@@ -14,7 +14,8 @@ from pulp.server.content.sources.container import ContentContainer
 from pulp.server.controllers import content
 from pulp.server.controllers import units
 from pulp.server.db.model.criteria import Criteria
-from pulp.server.exceptions import InvalidValue, MissingResource, OperationPostponed
+from pulp.server.exceptions import (InvalidValue, MissingResource, MissingValue,
+                                    OperationPostponed)
 from pulp.server.managers import factory
 from pulp.server.managers.content import query as content_query
 from pulp.server.managers.content import orphan as content_orphan
@@ -28,6 +29,10 @@ from pulp.server.webservices.views.util import (generate_json_response,
                                                 json_body_required)
 
 
+# Number of units whose repo memberships are looked up together when searching units.
+REPO_MEMBERSHIP_BATCH_SIZE = 1000
+
+
 def _process_content_unit(content_unit, content_type):
     """
     Adds an href to the content unit and hrefs for its children.
@@ -216,6 +221,73 @@ class DeleteOrphansActionView(View):
         raise OperationPostponed(async_task)
 
 
+class OrphanScanCollectionView(View):
+    """
+    Views for orphan scans.
+    """
+
+    @auth_required(authorization.READ)
+    def get(self, request):
+        """
+        Return a response containing a list of orphan scan reports, one for each content type.
+
+        :param request: WSGI request object
+        :type  request: django.core.handlers.wsgi.WSGIRequest
+
+        :return: response containing a list of orphan scan reports
+        :rtype: django.http.HttpResponse
+        """
+        orphan_manager = factory.content_orphan_manager()
+        return generate_json_response_with_pulp_encoder(orphan_manager.orphan_scan_reports())
+
+    @auth_required(authorization.CREATE)
+    @json_body_allow_empty
+    def post(self, request):
+        """
+        Dispatch a scan_orphans task.
+
+        :param request: WSGI request object
+        :type  request: django.core.handlers.wsgi.WSGIRequest
+
+        :raises: OperationPostponed when an async operation is performed
+        :raises: InvalidValue if content_types is not a list
+        """
+        content_type_ids = request.body_as_json.get('content_types')
+        if content_type_ids is not None and not isinstance(content_type_ids, list):
+            raise InvalidValue(['content_types'])
+        task_tags = [tags.action_tag('scan_orphans'),
+                     tags.resource_tag(tags.RESOURCE_CONTENT_UNIT_TYPE, 'orphans')]
+        async_task = content_orphan.scan_orphans.apply_async([content_type_ids], tags=task_tags)
+        raise OperationPostponed(async_task)
+
+
+class OrphanScanReclaimActionView(View):
+    """
+    Delete the orphans recorded by orphan scans.
+    """
+
+    @auth_required(authorization.DELETE)
+    @json_body_allow_empty
+    def post(self, request):
+        """
+        Dispatch a delete_scanned_orphans task.
+
+        :param request: WSGI request object
+        :type  request: django.core.handlers.wsgi.WSGIRequest
+
+        :raises: OperationPostponed when an async operation is performed
+        :raises: InvalidValue if content_types is not a list
+        """
+        content_type_ids = request.body_as_json.get('content_types')
+        if content_type_ids is not None and not isinstance(content_type_ids, list):
+            raise InvalidValue(['content_types'])
+        task_tags = [tags.action_tag('delete_orphans'),
+                     tags.resource_tag(tags.RESOURCE_CONTENT_UNIT_TYPE, 'orphans')]
+        async_task = content_orphan.delete_scanned_orphans.apply_async(
+            [content_type_ids], tags=task_tags)
+        raise OperationPostponed(async_task)
+
+
 class CatalogResourceView(View):
     """
     Views for the catalog by source_id.
@@ -281,16 +353,40 @@ class ContentUnitSearch(search.SearchView):
             unit['repository_memberships'] = list(association_map.get(unit['_id'], []))
         return units
 
+    @classmethod
+    def _iter_with_repo_memberships(cls, units, type_id):
+        """
+        Add the repo memberships to units as they are iterated, looking them up for
+        REPO_MEMBERSHIP_BATCH_SIZE units at a time.
+
+        :param units:   unit documents
+        :type  units:   iterable of dicts
+        :param type_id: content type id
+        :type  type_id: str
+        :return:    generator of the units with their repo memberships added
+        :rtype:     generator
+        """
+        batch = []
+        for unit in units:
+            batch.append(unit)
+            if len(batch) >= REPO_MEMBERSHIP_BATCH_SIZE:
+                for unit_with_repos in cls._add_repo_memberships(batch, type_id):
+                    yield unit_with_repos
+                batch = []
+        for unit_with_repos in cls._add_repo_memberships(batch, type_id):
+            yield unit_with_repos
+
     @classmethod
     def get_results(cls, query, search_method, options, *args, **kwargs):
         """
-        Overrides the base class so additional information can optionally be added.
+        Overrides the base class so additional information can optionally be added. Units are
+        processed as they are read from the database so the results can be streamed.
         """
         type_id = kwargs['type_id']
-        units = list(search_method(type_id, query))
-        units = [_process_content_unit(unit, type_id) for unit in units]
+        units = (_process_content_unit(unit, type_id)
+                 for unit in search_method(type_id, query))
         if options.get('include_repos') is True:
-            cls._add_repo_memberships(units, type_id)
+            units = cls._iter_with_repo_memberships(units, type_id)
         return units
 
 
@@ -326,6 +422,45 @@ class ContentUnitResourceView(View):
         return generate_json_response_with_pulp_encoder(resource)
 
 
+class ExistingUnitsActionView(View):
+    """
+    View to determine which content units are already stored on the server.
+    """
+
+    @auth_required(authorization.READ)
+    @json_body_required
+    def post(self, request):
+        """
+        Return a response containing the ID of each of the requested units that is already
+        stored on the server. The body contains a list of 'units', each a dict with the
+        'type_id' and 'unit_key' of a content unit.
+
+        :param request: WSGI request object
+        :type  request: django.core.handlers.wsgi.WSGIRequest
+
+        :return: response containing a list of the same length as the requested units with
+                 the ID of each stored unit or None if the unit is not stored
+        :rtype: django.http.HttpResponse
+
+        :raises MissingValue: if the units are not specified
+        :raises InvalidValue: if a unit does not specify a type_id and unit_key
+        """
+        try:
+            units = request.body_as_json['units']
+        except KeyError:
+            raise MissingValue(['units'])
+
+        if not isinstance(units, list):
+            raise InvalidValue(['units'])
+        for unit in units:
+            if not isinstance(unit, dict) or not isinstance(unit.get('unit_key'), dict) or \
+                    not unit.get('type_id'):
+                raise InvalidValue(['units'])
+
+        found = content_query.ContentQueryManager.find_existing_units(units)
+        return generate_json_response(found)
+
+
 class ContentUnitsCollectionView(View):
     """
     View for all content units of a specified type.
@@ -429,14 +564,25 @@ class UploadsCollectionView(View):
     def post(self, request, *args, **kwargs):
         """
         Initialize an upload and return a serialized dict containing the upload data.
+        The body may optionally contain the 'size' of the file to be uploaded.
 
         :param request: WSGI request object
         :type request: django.core.handlers.wsgi.WSGIRequest
         :return : Serialized response containing a url to delete an upload and a unique id.
         :rtype : django.http.HttpResponse
+
+        :raises InvalidValue: if the size is not a non-negative integer
         """
+        size = request.body_as_json.get('size')
+        if size is not None:
+            try:
+                size = int(size)
+            except (TypeError, ValueError):
+                raise InvalidValue(['size'])
+            if size < 0:
+                raise InvalidValue(['size'])
         upload_manager = factory.content_upload_manager()
-        upload_id = upload_manager.initialize_upload()
+        upload_id = upload_manager.initialize_upload(size=size)
         href = reverse('content_upload_resource', kwargs={'upload_id': upload_id})
         response = generate_json_response({'_href': href, 'upload_id': upload_id})
         response_redirect = generate_redirect_response(response, href)
@@ -451,7 +597,9 @@ class UploadSegmentResourceView(View):
     @auth_required(authorization.UPDATE)
     def put(self, request, upload_id, offset):
         """
-        Upload to a specific file upload.
+        Upload to a specific file upload. The request body is streamed to the upload file
+        rather than read into memory. The optional 'checksum' query parameter is the SHA256
+        hex digest of the segment and is verified once the segment has been written.
 
         :param request:   WSGI request object, body contains bits to upload
         :type  request:   django.core.handlers.wsgi.WSGIRequest
@@ -463,7 +611,9 @@ class UploadSegmentResourceView(View):
         :rtype:           django.http.HttpResponse
 
         :raises:          pulp.server.exceptions.MissingResource if upload ID does not exist
-        :raises:          InvalidValue if offset cannot be converted to an integer
+        :raises:          InvalidValue if offset cannot be converted to an integer, the
+                          body is shorter than its Content-Length or the checksum does not
+                          match the segment
         """
 
         try:
@@ -471,11 +621,17 @@ class UploadSegmentResourceView(View):
         except ValueError:
             raise InvalidValue(['offset'])
 
+        try:
+            size = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            raise InvalidValue(['Content-Length'])
+
+        checksum = request.GET.get('checksum')
         upload_manager = factory.content_upload_manager()
 
         # If the upload ID doesn't exists, either because it was not initialized
         # or was deleted, the call to the manager will raise missing resource
-        upload_manager.save_data(upload_id, offset, request.body)
+        upload_manager.save_stream(upload_id, offset, request, size, checksum=checksum)
         return generate_json_response(None)
 
 
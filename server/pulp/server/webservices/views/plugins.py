@@ -4,7 +4,7 @@ from pulp.server.auth import authorization
 from pulp.server.exceptions import MissingResource
 from pulp.server.managers import factory
 from pulp.server.webservices.views.decorators import auth_required
-from pulp.server.webservices.views.util import (generate_json_response,
+from pulp.server.webservices.views.util import (conditional_get, generate_json_response,
                                                 generate_json_response_with_pulp_encoder)
 
 
@@ -124,6 +124,7 @@ class TypeResourceView(View):
     """
 
     @auth_required(authorization.READ)
+    @conditional_get()
     def get(self, request, type_id):
         """
         Return a single type definition.
@@ -152,6 +153,7 @@ class TypesView(View):
     """
 
     @auth_required(authorization.READ)
+    @conditional_get()
     def get(self, request):
         """
         Get all type definitions
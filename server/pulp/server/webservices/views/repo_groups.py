@@ -13,7 +13,8 @@ from pulp.server.managers.repo.group.publish import publish as repo_group_publis
 from pulp.server.webservices.views import search
 from pulp.server.webservices.views.decorators import auth_required
 from pulp.server.webservices.views.util import (
-    generate_json_response, generate_json_response_with_pulp_encoder, generate_redirect_response,
+    generate_json_response, generate_json_response_with_pulp_encoder,
+    generate_json_streaming_response_with_pulp_encoder, generate_redirect_response,
     json_body_allow_empty, json_body_required
 )
 
@@ -154,7 +155,7 @@ class RepoGroupSearch(search.SearchView):
     """
     serializer = staticmethod(_add_group_link)
     manager = repo_group_query.RepoGroupQueryManager()
-    response_builder = staticmethod(generate_json_response_with_pulp_encoder)
+    response_builder = staticmethod(generate_json_streaming_response_with_pulp_encoder)
 
 
 class RepoGroupAssociateView(View):
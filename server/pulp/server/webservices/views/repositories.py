@@ -12,15 +12,17 @@ from pulp.server.db import model
 from pulp.server.db.model.criteria import Criteria, UnitAssociationCriteria
 from pulp.server.managers import factory as manager_factory
 from pulp.server.managers.consumer.applicability import regenerate_applicability_for_repos
-from pulp.server.managers.content.upload import import_uploaded_unit
+from pulp.server.managers.content.upload import import_existing_unit, import_uploaded_unit
 from pulp.server.managers.repo import importer as repo_importer_manager
 from pulp.server.managers.repo.distributor import RepoDistributorManager
 from pulp.server.managers.repo.unit_association import associate_from_repo, unassociate_by_criteria
 from pulp.server.webservices.views import search, serializers
 from pulp.server.webservices.views.decorators import auth_required
 from pulp.server.webservices.views.schedule import ScheduleResource
-from pulp.server.webservices.views.util import (generate_json_response,
+from pulp.server.webservices.views.util import (CONTINUATION_HEADER, conditional_get,
+                                                generate_json_response,
                                                 generate_json_response_with_pulp_encoder,
+                                                generate_json_streaming_response_with_pulp_encoder,
                                                 generate_redirect_response,
                                                 json_body_allow_empty,
                                                 json_body_required)
@@ -90,6 +92,39 @@ def _process_repos(repo_objs, details, importers, distributors):
     return repos
 
 
+def _repos_revision(request):
+    """
+    Return the revision of every repository. The result changes whenever a repository, its
+    importer or its distributors change, and whenever a repository is created or deleted.
+
+    :param request: WSGI request object
+    :type  request: django.core.handlers.wsgi.WSGIRequest
+
+    :return: sorted list of (repo_id, revision) tuples
+    :rtype:  list
+    """
+    return sorted((repo.repo_id, repo.revision)
+                  for repo in model.Repository.objects.only('repo_id', 'revision'))
+
+
+def _repo_revision(request, repo_id):
+    """
+    Return the revision of a single repository.
+
+    :param request: WSGI request object
+    :type  request: django.core.handlers.wsgi.WSGIRequest
+    :param repo_id: id of the repository
+    :type  repo_id: str
+
+    :return: revision of the repository, or None if it does not exist
+    :rtype:  int or None
+    """
+    repo = model.Repository.objects(repo_id=repo_id).only('revision').first()
+    if repo is None:
+        return None
+    return repo.revision
+
+
 def _get_valid_importer(repo_id, importer_id):
     """
     Validates if the specified repo_id and importer_id are valid.
@@ -122,6 +157,7 @@ class ReposView(View):
     """
 
     @auth_required(authorization.READ)
+    @conditional_get(_repos_revision)
     def get(self, request):
         """
         Return information about all repositories.
@@ -176,6 +212,7 @@ class RepoResourceView(View):
     """
 
     @auth_required(authorization.READ)
+    @conditional_get(_repo_revision)
     def get(self, request, repo_id):
         """
         Looks for query parameters 'importers' and 'distributors', and will add
@@ -265,7 +302,7 @@ class RepoSearch(search.SearchView):
     """
     model = model.Repository
     optional_bool_fields = ('details', 'importers', 'distributors')
-    response_builder = staticmethod(generate_json_response_with_pulp_encoder)
+    response_builder = staticmethod(generate_json_streaming_response_with_pulp_encoder)
 
     @classmethod
     def get_results(cls, query, search_method, options, *args, **kwargs):
@@ -301,7 +338,9 @@ class RepoUnitSearch(search.SearchView):
         serialized HttpReponse object.
 
         This overrides the base class so we can validate repo existance and to choose the search
-        method depending on how many unit types we are dealing with.
+        method depending on how many unit types we are dealing with. When there may be more
+        units than the limit of the query, the token to pass as the continuation of the query
+        to get the next page is returned in the CONTINUATION_HEADER header.
 
         :param query: The criteria that should be used to search for objects
         :type  query: dict
@@ -320,7 +359,11 @@ class RepoUnitSearch(search.SearchView):
             units = manager.get_units_by_type(repo_id, type_id, criteria=criteria)
         else:
             units = manager.get_units_across_types(repo_id, criteria=criteria)
-        return generate_json_response_with_pulp_encoder(units)
+        response = generate_json_streaming_response_with_pulp_encoder(units)
+        continuation = manager.continuation_token(criteria, units)
+        if continuation:
+            response[CONTINUATION_HEADER] = continuation
+        return response
 
 
 class RepoImportersView(View):
@@ -689,7 +732,7 @@ class RepoDistributorsSearchView(search.SearchView):
     """
 
     manager = RepoDistributorManager()
-    response_builder = staticmethod(generate_json_response_with_pulp_encoder)
+    response_builder = staticmethod(generate_json_streaming_response_with_pulp_encoder)
 
 
 class RepoDistributorResourceView(View):
@@ -1250,7 +1293,10 @@ class RepoImportUpload(View):
     @json_body_required
     def post(self, request, repo_id):
         """
-        Import an uploaded unit into the given repository.
+        Import an uploaded unit into the given repository. When the body specifies the
+        'unit_id' of a unit already stored on the server instead of an 'upload_id', that
+        unit is associated with the repository. The importer is not invoked in that case, so
+        the body may not contain any 'unit_metadata' or 'override_config' for it to apply.
 
         :param request: WSGI request object
         :type  request: django.core.handlers.wsgi.WSGIRequest
@@ -1258,19 +1304,34 @@ class RepoImportUpload(View):
         :type  repo_id: str
 
         :raises pulp_exceptions.OperationPostponed: dispatch a importy_uploaded_unit task
+        :raises pulp_exceptions.InvalidValue: if a unit_id is specified with unit_metadata or
+                                              override_config
         """
 
+        unit_id = request.body_as_json.get('unit_id')
         try:
-            upload_id = request.body_as_json['upload_id']
             unit_type_id = request.body_as_json['unit_type_id']
-            unit_key = request.body_as_json['unit_key']
+            if unit_id is None:
+                upload_id = request.body_as_json['upload_id']
+                unit_key = request.body_as_json['unit_key']
         except KeyError, e:
             raise pulp_exceptions.MissingValue(e.args[0])
 
-        unit_metadata = request.body_as_json.pop('unit_metadata', None)
-        override_config = request.body_as_json.pop('override_config', None)
         task_tags = [tags.resource_tag(tags.RESOURCE_REPOSITORY_TYPE, repo_id),
                      tags.action_tag('import_upload')]
+
+        if unit_id is not None:
+            ignored = [name for name in ('unit_metadata', 'override_config')
+                       if request.body_as_json.get(name)]
+            if ignored:
+                raise pulp_exceptions.InvalidValue(['unit_id'] + ignored)
+            async_result = import_existing_unit.apply_async_with_reservation(
+                tags.RESOURCE_REPOSITORY_TYPE, repo_id, [repo_id, unit_type_id, unit_id],
+                tags=task_tags)
+            raise pulp_exceptions.OperationPostponed(async_result)
+
+        unit_metadata = request.body_as_json.pop('unit_metadata', None)
+        override_config = request.body_as_json.pop('override_config', None)
         async_result = import_uploaded_unit.apply_async_with_reservation(
             tags.RESOURCE_REPOSITORY_TYPE, repo_id,
             [repo_id, unit_type_id, unit_key, unit_metadata, upload_id, override_config],
@@ -5,6 +5,7 @@ search view for a specific model.
 import json
 
 from django.views import generic
+from mongoengine.queryset import QuerySet
 
 from pulp.server import exceptions
 from pulp.server.auth import authorization
@@ -25,7 +26,9 @@ class SearchView(generic.View):
     :cvar    response_builder: The function that should be used to turn the search results
                                into a JSON serialized Django Response object. If not defined,
                                this defaults to
-                               pulp.server.webservices.views.util.generate_json_response.
+                               pulp.server.webservices.views.util.
+                               generate_json_streaming_response, which serializes the
+                               results as they are read from the database.
     :vartype response_builder: staticmethod
     :cvar    manager:          Define this class attribute if you are making a SearchView for
                                a model that has not yet been converted to MongoEngine. It
@@ -45,7 +48,7 @@ class SearchView(generic.View):
     :vartype serializer:       staticmethod
     """
 
-    response_builder = staticmethod(util.generate_json_response)
+    response_builder = staticmethod(util.generate_json_streaming_response)
     optional_string_fields = tuple()
     optional_bool_fields = tuple()
 
@@ -177,10 +180,13 @@ class SearchView(generic.View):
         :param options: additional options for including extra data
         :type  options: dict
 
-        :return: search results
-        :rtype:  list
+        :return: search results, serialized as they are iterated
+        :rtype:  iterable
         """
-        results = list(search_method(query))
+        results = search_method(query)
+        if isinstance(results, QuerySet):
+            # Don't let MongoEngine keep every document it has returned.
+            results = results.no_cache()
         if hasattr(cls, 'serializer'):
-            results = [cls.serializer(r) for r in results]
+            results = (cls.serializer(r) for r in results)
         return results
@@ -1,6 +1,7 @@
 """
 This module contains views related to Pulp's task system models.
 """
+import time
 from datetime import datetime
 
 from django.views.generic import View
@@ -13,17 +14,25 @@ from pulp.server import exceptions as pulp_exceptions
 from pulp.server.async import tasks
 from pulp.server.auth import authorization
 from pulp.server.db.model import Worker, TaskStatus
-from pulp.server.exceptions import MissingResource
+from pulp.server.exceptions import InvalidValue, MissingResource, MissingValue
 from pulp.server.webservices.views import search
 from pulp.server.webservices.views.decorators import auth_required
 from pulp.server.webservices.views.serializers import dispatch as serial_dispatch
 from pulp.server.webservices.views.util import (generate_json_response,
-                                                generate_json_response_with_pulp_encoder)
+                                                generate_json_response_with_pulp_encoder,
+                                                generate_json_streaming_response_with_pulp_encoder,
+                                                json_body_required)
 
 
 # This constant set is used for deleting the completed tasks from the collection.
 VALID_STATES = set(filter(lambda state: state != CALL_CANCELED_STATE, CALL_COMPLETE_STATES))
 
+# Upper bound, in seconds, on how long a task status request may block waiting for a change.
+MAX_LONG_POLL_TIMEOUT = 30
+
+# Seconds between checks of the task states while a task status request is blocked.
+LONG_POLL_INTERVAL = 0.25
+
 
 def task_serializer(task):
     """
@@ -41,11 +50,42 @@ def task_serializer(task):
     return task
 
 
+def _add_queue(task_dict):
+    """
+    Add the name of the queue of the worker a task is assigned to, if any.
+
+    :param task_dict: serialized task
+    :type  task_dict: dict
+
+    :return: the same task with the 'queue' added
+    :rtype: dict
+    """
+    if 'worker_name' in task_dict:
+        queue_name = Worker(name=task_dict['worker_name'],
+                            last_heartbeat=datetime.now()).queue_name
+        task_dict.update({'queue': queue_name})
+    return task_dict
+
+
+def _task_states(task_ids):
+    """
+    Load only the state of each of the given tasks.
+
+    :param task_ids: IDs of the tasks to look up
+    :type  task_ids: list
+
+    :return: mapping of task ID to state for each task that exists
+    :rtype: dict
+    """
+    tasks_with_state = TaskStatus.objects(task_id__in=task_ids).only('task_id', 'state')
+    return dict((task.task_id, task.state) for task in tasks_with_state)
+
+
 class TaskSearchView(search.SearchView):
     """
     This view provides GET and POST searching on TaskStatus objects.
     """
-    response_builder = staticmethod(generate_json_response_with_pulp_encoder)
+    response_builder = staticmethod(generate_json_streaming_response_with_pulp_encoder)
     model = TaskStatus
     serializer = staticmethod(task_serializer)
 
@@ -63,16 +103,16 @@ class TaskCollectionView(View):
         :param request: WSGI request object
         :type  request: django.core.handlers.wsgi.WSGIRequest
 
-        :return: Response containing a serialized list of dicts, one for each task
-        :rtype:  django.http.HttpResponse
+        :return: Response streaming a serialized list of dicts, one for each task
+        :rtype:  django.http.StreamingHttpResponse
         """
         tags = request.GET.getlist('tag')
         if tags:
-            raw_tasks = TaskStatus.objects(tags__all=tags)
+            raw_tasks = TaskStatus.objects(tags__all=tags).no_cache()
         else:
-            raw_tasks = TaskStatus.objects()
-        serialized_task_statuses = [task_serializer(task) for task in raw_tasks]
-        return generate_json_response_with_pulp_encoder(serialized_task_statuses)
+            raw_tasks = TaskStatus.objects().no_cache()
+        serialized_task_statuses = (task_serializer(task) for task in raw_tasks)
+        return generate_json_streaming_response_with_pulp_encoder(serialized_task_statuses)
 
     @auth_required(authorization.DELETE)
     def delete(self, request):
@@ -124,11 +164,7 @@ class TaskResourceView(View):
         except DoesNotExist:
             raise MissingResource(task_id)
 
-        task_dict = task_serializer(task)
-        if 'worker_name' in task_dict:
-            queue_name = Worker(name=task_dict['worker_name'],
-                                last_heartbeat=datetime.now()).queue_name
-            task_dict.update({'queue': queue_name})
+        task_dict = _add_queue(task_serializer(task))
         return generate_json_response_with_pulp_encoder(task_dict)
 
     @auth_required(authorization.DELETE)
@@ -146,3 +182,66 @@ class TaskResourceView(View):
         """
         tasks.cancel(task_id)
         return generate_json_response(None)
+
+
+class TaskStatusView(View):
+    """
+    View to retrieve the status of many tasks in a single request.
+    """
+
+    @auth_required(authorization.READ)
+    @json_body_required
+    def post(self, request):
+        """
+        Return a response containing the requested tasks. The body contains a list of
+        'task_ids' and may contain a 'timeout' in seconds. When a timeout is given, the request
+        blocks until the state of any of the tasks differs from the one given for it in the
+        optional 'states' mapping of task ID to state, or until the timeout passes. Tasks missing
+        from 'states' are compared with their state at the time of the request. Tasks that do
+        not exist, for example because they were reaped, are listed in the response instead of
+        failing the request, so that one of them does not keep the others from being polled.
+
+        :param request: WSGI request object
+        :type  request: django.core.handlers.wsgi.WSGIRequest
+
+        :return: Response containing a dict with the serialized 'tasks' that were found, in the
+                 requested order, and the 'missing_task_ids' of the tasks that were not
+        :rtype: django.http.HttpResponse
+
+        :raises MissingValue: if the task IDs are not specified
+        :raises InvalidValue: if the task IDs, states or timeout are malformed
+        """
+        try:
+            task_ids = request.body_as_json['task_ids']
+        except KeyError:
+            raise MissingValue(['task_ids'])
+        if not isinstance(task_ids, list):
+            raise InvalidValue(['task_ids'])
+
+        states = request.body_as_json.get('states') or {}
+        if not isinstance(states, dict):
+            raise InvalidValue(['states'])
+
+        timeout = request.body_as_json.get('timeout') or 0
+        if isinstance(timeout, bool) or not isinstance(timeout, (int, long, float)) or \
+                timeout < 0:
+            raise InvalidValue(['timeout'])
+        deadline = time.time() + min(timeout, MAX_LONG_POLL_TIMEOUT)
+
+        current_states = _task_states(task_ids)
+        known_states = dict(current_states)
+        known_states.update((k, v) for k, v in states.items() if k in current_states)
+        while current_states == known_states:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(min(LONG_POLL_INTERVAL, remaining))
+            current_states = _task_states(task_ids)
+
+        tasks_by_id = dict((task.task_id, task)
+                           for task in TaskStatus.objects(task_id__in=task_ids))
+        task_dicts = [_add_queue(task_serializer(tasks_by_id[task_id]))
+                      for task_id in task_ids if task_id in tasks_by_id]
+        missing = [task_id for task_id in task_ids if task_id not in tasks_by_id]
+        return generate_json_response_with_pulp_encoder({'tasks': task_dicts,
+                                                         'missing_task_ids': missing})
@@ -13,6 +13,7 @@ from pulp.server.webservices.views import search
 from pulp.server.webservices.views.decorators import auth_required
 from pulp.server.webservices.views.util import (generate_json_response,
                                                 generate_json_response_with_pulp_encoder,
+                                                generate_json_streaming_response_with_pulp_encoder,
                                                 generate_redirect_response,
                                                 json_body_required)
 
@@ -39,7 +40,7 @@ class UserSearchView(search.SearchView):
     """
     This view provides GET and POST searching on User objects.
     """
-    response_builder = staticmethod(generate_json_response_with_pulp_encoder)
+    response_builder = staticmethod(generate_json_streaming_response_with_pulp_encoder)
     manager = query.UserQueryManager()
     serializer = staticmethod(serialize)
 
@@ -2,19 +2,35 @@ from datetime import datetime
 from functools import wraps
 
 import functools
+import hashlib
 import httplib
+import itertools
 import json
 import sys
+import threading
+import time
 
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.utils.encoding import iri_to_uri
+from django.utils.http import parse_etags, quote_etag
 
 from pulp.common import dateutils, error_codes
 from pulp.common.util import decode_unicode, encode_unicode
 from pulp.server.compat import json_util
+from pulp.server.config import config
 from pulp.server.exceptions import PulpCodedValidationException, InputEncodingError
 
 
+# Response header containing the continuation token for the next page of a paged query.
+CONTINUATION_HEADER = 'Pulp-Continuation'
+
+# Approximate size, in bytes, of the chunks written by a streaming JSON response.
+STREAMING_CHUNK_SIZE = 65536
+
+# Number of responses a ResponseCache holds before it starts evicting entries.
+RESPONSE_CACHE_MAX_ENTRIES = 1024
+
+
 def pulp_json_encoder(obj):
     """
     Specialized json encoding.
@@ -65,6 +81,74 @@ generate_json_response_with_pulp_encoder = functools.partial(
 )
 
 
+def _json_array_chunks(content, default=None):
+    """
+    Serialize the elements of an iterable one at a time into a JSON array, yielding the
+    serialized text in chunks of about STREAMING_CHUNK_SIZE bytes.
+
+    :param content: elements of the array
+    :type  content: iterable
+    :param default: function used by json.dumps to serialize each element
+    :type  default: function or None
+
+    :return: generator of the serialized array, in chunks
+    :rtype:  generator
+    """
+    chunk = ['[']
+    chunk_size = 1
+    separator = ''
+    for element in content:
+        serialized = separator + json.dumps(element, default=default)
+        chunk.append(serialized)
+        chunk_size += len(serialized)
+        separator = ', '
+        if chunk_size >= STREAMING_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+            chunk_size = 0
+    chunk.append(']')
+    yield ''.join(chunk)
+
+
+def generate_json_streaming_response(content, default=None,
+                                     content_type='application/json; charset=utf-8'):
+    """
+    Serialize an iterable as a JSON array in a streaming django response. Elements are
+    serialized as the response is written, so the content may be a database cursor or a
+    generator that is never held in memory as a whole.
+
+    The first chunk is serialized before the response is returned, so an invalid query or an
+    element that cannot be serialized raises here and is reported with an error status. Only an
+    error in a later chunk happens after the response status has been sent.
+
+    :param content        : elements of the array to be serialized
+    :type  content        : iterable of anything that is serializable by json.dumps
+    :param default        : function used by json.dumps to serialize each element
+    :type  default        : function or None
+    :param content_type   : type of returned content
+    :type  content_type   : str
+
+    :return               : response streaming the serialized content
+    :rtype                : django.http.StreamingHttpResponse
+    """
+    chunks = _json_array_chunks(content, default)
+    first_chunk = next(chunks)
+    return StreamingHttpResponse(itertools.chain([first_chunk], chunks),
+                                 content_type=content_type)
+
+
+"""
+Shortcut function to generate a streaming json response using the in house json_encoder.
+
+This function is equivalent to:
+generate_json_streaming_response(content, default=pulp_json_encoder)
+"""
+generate_json_streaming_response_with_pulp_encoder = functools.partial(
+    generate_json_streaming_response,
+    default=pulp_json_encoder,
+)
+
+
 def generate_redirect_response(response, href):
     response['Location'] = iri_to_uri(href)
     response.status_code = httplib.CREATED
@@ -72,6 +156,186 @@ def generate_redirect_response(response, href):
     return response
 
 
+def generate_etag(*parts):
+    """
+    Build a strong entity tag from a digest of the given values.
+
+    :param parts: values that together identify a version of a response
+    :type  parts: anything that is serializable by json.dumps
+
+    :return: quoted entity tag, suitable for the ETag header
+    :rtype:  str
+    """
+    serialized = json.dumps(parts, sort_keys=True, default=pulp_json_encoder)
+    return quote_etag(hashlib.md5(serialized).hexdigest())
+
+
+def etag_matches(request, etag):
+    """
+    Determine whether the If-None-Match header of a request matches the given entity tag.
+
+    :param request: WSGI request object
+    :type  request: django.core.handlers.wsgi.WSGIRequest
+    :param etag: quoted entity tag of the current version of the resource
+    :type  etag: str
+
+    :return: True if the client already has the current version of the resource
+    :rtype:  bool
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag in [quote_etag(tag) for tag in parse_etags(if_none_match)]
+
+
+def generate_not_modified_response(etag):
+    """
+    Return a response telling the client that its copy of a resource is current.
+
+    :param etag: quoted entity tag of the current version of the resource
+    :type  etag: str
+
+    :return: response with a 304 status code and no content
+    :rtype:  django.http.HttpResponseNotModified
+    """
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    return response
+
+
+class ResponseCache(object):
+    """
+    Process local cache of serialized responses, each of which expires after its own time to live.
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        """
+        :param max_entries: number of responses to hold before evicting entries
+        :type  max_entries: int
+        """
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return a cached response that has not yet expired.
+
+        :param key: identifies the response, usually the full path of the request
+        :type  key: str
+
+        :return: tuple of (etag, content, content_type), or None if there is no current entry
+        :rtype:  tuple or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            return entry[1:]
+
+    def put(self, key, etag, content, content_type, ttl):
+        """
+        Cache a response.
+
+        :param key: identifies the response, usually the full path of the request
+        :type  key: str
+        :param etag: quoted entity tag of the response
+        :type  etag: str
+        :param content: serialized body of the response
+        :type  content: str
+        :param content_type: value of the Content-Type header of the response
+        :type  content_type: str
+        :param ttl: number of seconds the entry may be served for
+        :type  ttl: float
+        """
+        now = time.time()
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                for cached_key, entry in self._entries.items():
+                    if entry[0] <= now:
+                        del self._entries[cached_key]
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[key] = (now + ttl, etag, content, content_type)
+
+    def clear(self):
+        """
+        Remove every entry from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+# Responses of views decorated with conditional_get, shared by every view in the process.
+response_cache = ResponseCache()
+
+
+def conditional_get(version=None):
+    """
+    Decorator for the GET method of a view that answers conditional requests.
+
+    Responses carry an ETag header and a request whose If-None-Match header matches it gets a
+    304 response. If a version function is given, it is called with the view's request and
+    arguments and should cheaply return a value that changes whenever the resource does, or None
+    if it cannot tell; a matching request is then answered without running the view. Otherwise the
+    entity tag is a digest of the response body.
+
+    When the [server] response_cache_ttl setting is greater than zero, successful responses are
+    also cached in the process for that many seconds and served from the cache, without running
+    the view or the version function.
+
+    :param version: function returning the current version of the resource
+    :type  version: callable or None
+
+    :return: decorator for a view method
+    :rtype:  function
+    """
+    def _conditional_get(func):
+
+        @wraps(func)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.get_full_path()
+            ttl = config.getfloat('server', 'response_cache_ttl')
+            if ttl > 0:
+                cached = response_cache.get(key)
+                if cached is not None:
+                    etag, content, content_type = cached
+                    if etag_matches(request, etag):
+                        return generate_not_modified_response(etag)
+                    response = HttpResponse(content, content_type=content_type)
+                    response['ETag'] = etag
+                    return response
+
+            etag = None
+            if version is not None:
+                # The version is read before the view runs, so the tag may describe an older state
+                # than the body but never a newer one.
+                current = version(request, *args, **kwargs)
+                if current is not None:
+                    etag = generate_etag(key, current)
+                    if etag_matches(request, etag):
+                        return generate_not_modified_response(etag)
+
+            response = func(self, request, *args, **kwargs)
+            if response.status_code != httplib.OK or response.streaming:
+                return response
+            if etag is None:
+                etag = generate_etag(key, response.content)
+                if etag_matches(request, etag):
+                    return generate_not_modified_response(etag)
+            response['ETag'] = etag
+            if ttl > 0:
+                response_cache.put(key, etag, response.content, response['Content-Type'], ttl)
+            return response
+        return wrapper
+    return _conditional_get
+
+
 def _ensure_input_encoding(input):
     """
     Recursively traverse any input structures and ensure any strings are
@@ -13,6 +13,7 @@ from pulp.server import exceptions as pulp_exceptions
 from pulp.server.db import model
 from pulp.server.exceptions import MissingResource
 from pulp.server.managers import factory as manager_factory
+from pulp.server.managers.content import download
 from pulp.server.managers.repo.distributor import RepoDistributorManager
 from pulp.server.managers.repo.importer import RepoImporterManager
 import pulp.plugins.types.database as types_database
@@ -797,6 +798,223 @@ class AddUnitMixinTests(unittest.TestCase):
         # Test
         self.assertRaises(mixins.ImporterConduitException, self.mixin.link_unit, None, None)
 
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.'
+                'get_content_unit_by_keys_dict')
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.acquire')
+    def test_claim_download(self, mock_acquire, mock_get):
+        # Setup
+        unit = Unit('t', {'k': 'v'}, {'m': 'm1'}, '/tmp/bar')
+        mock_acquire.return_value = True
+        mock_get.side_effect = MissingResource()
+
+        # Test
+        claimed = self.mixin.claim_download(unit)
+
+        # Verify
+        self.assertTrue(claimed)
+        mock_acquire.assert_called_once_with(
+            self.mixin._download_owner, 't', {'k': 'v'}, '/tmp/bar')
+        self.assertEqual(unit.storage_path, '/tmp/bar')
+        self.assertEqual(self.mixin._claimed_downloads, {('t', '/tmp/bar'): {'k': 'v'}})
+        self.assertTrue(self.mixin._lease_renewal is not None)
+        self.mixin.release_downloads()
+
+    def test_claim_download_no_file(self):
+        unit = Unit('t', {'k': 'v'}, {'m': 'm1'}, None)
+        self.assertTrue(self.mixin.claim_download(unit))
+
+    @mock.patch('os.path.exists')
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.'
+                'get_content_unit_by_keys_dict')
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.release')
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.acquire')
+    def test_claim_download_existing(self, mock_acquire, mock_release, mock_get, mock_exists):
+        # Setup
+        unit = Unit('t', {'k': 'v'}, {'m': 'm1'}, '/tmp/bar')
+        mock_acquire.return_value = True
+        mock_get.return_value = {'_storage_path': '/tmp/existing'}
+        mock_exists.return_value = True
+
+        # Test
+        claimed = self.mixin.claim_download(unit)
+
+        # Verify
+        self.assertFalse(claimed)
+        self.assertEqual(unit.storage_path, '/tmp/existing')
+        mock_release.assert_called_once_with(self.mixin._download_owner, 't', {'k': 'v'})
+        self.assertEqual(self.mixin._claimed_downloads, {})
+
+    @mock.patch('os.path.exists')
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.'
+                'get_content_unit_by_keys_dict')
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.release')
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.wait')
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.acquire')
+    def test_claim_download_in_progress(self, mock_acquire, mock_wait, mock_release, mock_get,
+                                        mock_exists):
+        """
+        Another task holds the download lock.  Once released, the file it
+        downloaded is reused.
+        """
+        # Setup
+        unit = Unit('t', {'k': 'v'}, {'m': 'm1'}, '/tmp/bar')
+        mock_acquire.side_effect = [False, True]
+        mock_wait.return_value = True
+        mock_get.return_value = {'_storage_path': '/tmp/existing'}
+        mock_exists.return_value = True
+
+        # Test
+        claimed = self.mixin.claim_download(unit, timeout=10)
+
+        # Verify
+        self.assertFalse(claimed)
+        self.assertEqual(unit.storage_path, '/tmp/existing')
+        self.assertEqual(mock_acquire.call_count, 2)
+        self.assertEqual(mock_wait.call_count, 1)
+        self.assertTrue(0 < mock_wait.call_args[1]['timeout'] <= 10)
+
+    @mock.patch('pulp.plugins.conduits.mixins.time.time')
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.wait')
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.acquire')
+    def test_claim_download_wait_timeout(self, mock_acquire, mock_wait, mock_time):
+        """
+        The download is not claimed if another task is still downloading the file
+        when the timeout is reached.
+        """
+        # Setup
+        unit = Unit('t', {'k': 'v'}, {'m': 'm1'}, '/tmp/bar')
+        mock_acquire.return_value = False
+        mock_wait.return_value = False
+        mock_time.side_effect = [100, 101, 111]
+
+        # Test
+        self.assertRaises(mixins.ImporterConduitException, self.mixin.claim_download, unit,
+                          timeout=10)
+
+        # Verify
+        self.assertEqual(mock_acquire.call_count, 2)
+        mock_wait.assert_called_once_with('t', {'k': 'v'}, timeout=9)
+        self.assertEqual(self.mixin._claimed_downloads, {})
+
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.'
+                'get_content_unit_by_keys_dict')
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.wait')
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.acquire')
+    def test_claim_download_abandoned(self, mock_acquire, mock_wait, mock_get):
+        """
+        Without a timeout, the conduit waits until the lock is released or its lease
+        expires and then takes the download over.
+        """
+        # Setup
+        unit = Unit('t', {'k': 'v'}, {'m': 'm1'}, '/tmp/bar')
+        mock_acquire.side_effect = [False, False, True]
+        mock_wait.return_value = False
+        mock_get.side_effect = MissingResource()
+
+        # Test
+        claimed = self.mixin.claim_download(unit)
+
+        # Verify
+        self.assertTrue(claimed)
+        self.assertEqual(mock_wait.call_args_list,
+                         [mock.call('t', {'k': 'v'}, timeout=download.LEASE)] * 2)
+        self.assertEqual(self.mixin._claimed_downloads, {('t', '/tmp/bar'): {'k': 'v'}})
+        self.mixin.release_downloads()
+
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.wait')
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.acquire')
+    def test_try_claim_download_in_progress(self, mock_acquire, mock_wait):
+        unit = Unit('t', {'k': 'v'}, {'m': 'm1'}, '/tmp/bar')
+        mock_acquire.return_value = False
+
+        claimed = self.mixin.try_claim_download(unit)
+
+        self.assertTrue(claimed is None)
+        self.assertFalse(mock_wait.called)
+        self.assertEqual(self.mixin._claimed_downloads, {})
+
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.wait')
+    def test_wait_download(self, mock_wait):
+        unit = Unit('t', {'k': 'v'}, {'m': 'm1'}, '/tmp/bar')
+        mock_wait.return_value = True
+
+        self.assertTrue(self.mixin.wait_download(unit, timeout=5))
+
+        mock_wait.assert_called_once_with('t', {'k': 'v'}, timeout=5)
+
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.wait')
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.acquire')
+    def test_wait_download_holding_claims(self, mock_acquire, mock_wait):
+        """
+        Waiting on another task while holding claims could deadlock.
+        """
+        unit = Unit('t', {'k': 'v'}, {'m': 'm1'}, '/tmp/bar')
+        mock_acquire.return_value = False
+        self.mixin._claimed_downloads[('t', '/tmp/other')] = {'k': 'o'}
+
+        self.assertRaises(mixins.ImporterConduitException, self.mixin.wait_download, unit)
+        self.assertRaises(mixins.ImporterConduitException, self.mixin.claim_download, unit)
+
+        self.assertFalse(mock_wait.called)
+        self.mixin._claimed_downloads.clear()
+
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.acquire')
+    def test_claim_download_server_error(self, mock_acquire):
+        unit = Unit('t', {'k': 'v'}, {'m': 'm1'}, '/tmp/bar')
+        mock_acquire.side_effect = Exception()
+        self.assertRaises(mixins.ImporterConduitException, self.mixin.claim_download, unit)
+
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.'
+                'get_content_unit_by_keys_dict')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_unit')
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.'
+                'associate_unit_by_id')
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.release')
+    def test_save_unit_releases_download(self, mock_release, mock_associate, mock_add,
+                                         mock_get):
+        # Setup
+        unit = Unit('t', {'k': 'v'}, {'m': 'm1'}, '/tmp/bar')
+        self.mixin._claimed_downloads[('t', '/tmp/bar')] = {'k': 'v'}
+        mock_get.side_effect = MissingResource()
+        mock_add.return_value = 'new-unit-id'
+
+        # Test
+        self.mixin.save_unit(unit)
+
+        # Verify
+        mock_release.assert_called_once_with(self.mixin._download_owner, 't', {'k': 'v'})
+        self.assertEqual(self.mixin._claimed_downloads, {})
+
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.release')
+    def test_release_download_not_claimed(self, mock_release):
+        unit = Unit('t', {'k': 'v'}, {'m': 'm1'}, '/tmp/bar')
+        self.mixin.release_download(unit)
+        self.assertFalse(mock_release.called)
+
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.release')
+    def test_release_downloads(self, mock_release):
+        stopped = mock.Mock()
+        self.mixin._claimed_downloads[('t', '/tmp/bar')] = {'k': 'v'}
+        self.mixin._lease_renewal = stopped
+
+        self.mixin.release_downloads()
+
+        mock_release.assert_called_once_with(self.mixin._download_owner, 't', {'k': 'v'})
+        stopped.set.assert_called_once_with()
+        self.assertEqual(self.mixin._claimed_downloads, {})
+        self.assertTrue(self.mixin._lease_renewal is None)
+
+    @mock.patch('pulp.server.managers.content.download.ContentDownloadManager.renew')
+    def test_renew_leases(self, mock_renew):
+        stopped = mock.Mock()
+        stopped.wait.side_effect = [False, False, True]
+
+        self.mixin._renew_leases(stopped)
+
+        stopped.wait.assert_called_with(download.RENEW_INTERVAL)
+        self.assertEqual(mock_renew.call_args_list,
+                         [mock.call(self.mixin._download_owner)] * 2)
+
 
 class StatusMixinTests(unittest.TestCase):
 
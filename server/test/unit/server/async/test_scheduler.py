@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+import copy
 import unittest
 import platform
 
@@ -9,7 +10,7 @@ from mongoengine import NotUniqueError
 from pulp.common.constants import RESOURCE_MANAGER_WORKER_NAME, SCHEDULER_WORKER_NAME
 from pulp.server.async import scheduler
 from pulp.server.async.celery_instance import celery as app
-from pulp.server.db.model import dispatch, Worker
+from pulp.server.db.model import dispatch
 from pulp.server.managers.factory import initialize
 
 
@@ -55,7 +56,8 @@ class TestSchedulerInit(unittest.TestCase):
         my_scheduler = scheduler.Scheduler(arg1, arg2, kwarg1=kwarg1, kwarg2=kwarg2)
 
         self.assertTrue(my_scheduler._schedule is None)
-        self.assertTrue(my_scheduler._loaded_from_db_count == 0)
+        self.assertEqual(my_scheduler._db_schedule_ids, set())
+        self.assertEqual(my_scheduler._most_recent_timestamp, 0)
         self.assertTrue(not mock_spawn_pulp_monitor_threads.called)
         self.assertTrue(scheduler.Scheduler._mongo_initialized is False)
         mock_base_init.assert_called_once_with(arg1, arg2, app=app, kwarg1=kwarg1, kwarg2=kwarg2)
@@ -98,10 +100,11 @@ class TestSchedulerSpawnPulpMonitorThreads(unittest.TestCase):
 
 class TestSchedulerTick(unittest.TestCase):
     @mock.patch('celery.beat.Scheduler.__init__', new=mock.Mock())
-    @mock.patch('celery.beat.Scheduler.tick')
+    @mock.patch.object(scheduler.Scheduler, '_tick_due_entries')
     @mock.patch('pulp.server.async.scheduler.worker_watcher')
     @mock.patch('pulp.server.async.scheduler.CeleryBeatLock')
-    def test_calls_superclass(self, mock_celerybeatlock, mock_worker_watcher, mock_tick):
+    def test_calls_tick_due_entries(self, mock_celerybeatlock, mock_worker_watcher,
+                                    mock_tick):
         sched_instance = scheduler.Scheduler()
 
         sched_instance.tick()
@@ -109,7 +112,7 @@ class TestSchedulerTick(unittest.TestCase):
         mock_tick.assert_called_once_with()
 
     @mock.patch('celery.beat.Scheduler.__init__', new=mock.Mock())
-    @mock.patch('celery.beat.Scheduler.tick')
+    @mock.patch.object(scheduler.Scheduler, '_tick_due_entries')
     @mock.patch('pulp.server.async.scheduler.worker_watcher')
     @mock.patch('pulp.server.async.scheduler.CeleryBeatLock')
     def test_calls_handle_heartbeat(self, mock_celerybeatlock, mock_worker_watcher, mock_tick):
@@ -123,7 +126,7 @@ class TestSchedulerTick(unittest.TestCase):
     @mock.patch('pulp.server.async.scheduler.datetime')
     @mock.patch('pulp.server.async.scheduler.worker_watcher')
     @mock.patch('pulp.server.async.scheduler.CeleryBeatLock')
-    @mock.patch('celery.beat.Scheduler.tick')
+    @mock.patch.object(scheduler.Scheduler, '_tick_due_entries')
     def test_heartbeat_lock_insert_success(self, mock_tick, mock_celerybeatlock,
                                            mock_worker_watcher, mock_timestamp):
 
@@ -140,7 +143,7 @@ class TestSchedulerTick(unittest.TestCase):
     @mock.patch('celery.beat.Scheduler.__init__', new=mock.Mock())
     @mock.patch('pulp.server.async.scheduler.worker_watcher')
     @mock.patch('pulp.server.async.scheduler.CeleryBeatLock')
-    @mock.patch('celery.beat.Scheduler.tick')
+    @mock.patch.object(scheduler.Scheduler, '_tick_due_entries')
     def test_heartbeat_lock_update(self, mock_tick, mock_celerybeatlock, mock_worker_watcher):
 
         mock_celerybeatlock.objects.return_value.update.return_value = 1
@@ -153,7 +156,7 @@ class TestSchedulerTick(unittest.TestCase):
     @mock.patch('celery.beat.Scheduler.__init__', new=mock.Mock())
     @mock.patch('pulp.server.async.scheduler.worker_watcher')
     @mock.patch('pulp.server.async.scheduler.CeleryBeatLock')
-    @mock.patch('celery.beat.Scheduler.tick')
+    @mock.patch.object(scheduler.Scheduler, '_tick_due_entries')
     def test_heartbeat_lock_delete(self, mock_tick, mock_celerybeatlock, mock_worker_watcher):
 
         mock_celerybeatlock.objects.return_value.update.return_value = 0
@@ -168,7 +171,7 @@ class TestSchedulerTick(unittest.TestCase):
     @mock.patch('celery.beat.Scheduler.__init__', new=mock.Mock())
     @mock.patch('pulp.server.async.scheduler.worker_watcher')
     @mock.patch('pulp.server.async.scheduler.CeleryBeatLock')
-    @mock.patch('celery.beat.Scheduler.tick')
+    @mock.patch.object(scheduler.Scheduler, '_tick_due_entries')
     def test_heartbeat_lock_exception(self, mock_tick, mock_celerybeatlock, mock_worker_watcher):
 
         mock_celerybeatlock.objects.return_value.update.return_value = 0
@@ -180,6 +183,158 @@ class TestSchedulerTick(unittest.TestCase):
         self.assertFalse(mock_tick.called)
 
 
+class TestSchedulerDueIndex(unittest.TestCase):
+    """
+    Tests for finding the due entries with a heap instead of checking every entry.
+    """
+
+    @mock.patch('celery.beat.Scheduler.__init__', new=mock.Mock())
+    def setUp(self):
+        self.sched_instance = scheduler.Scheduler()
+        self.sched_instance.max_interval = 90
+        self.sched_instance._schedule = {}
+        self.sched_instance._schedule_checked = True
+        self.sched_instance.maybe_due = mock.MagicMock(return_value=30)
+        self.sched_instance.publisher = mock.MagicMock()
+
+    def _add(self, name, due_time):
+        self.sched_instance._schedule[name] = mock.MagicMock()
+        self.sched_instance._set_due_time(name, due_time)
+
+    @mock.patch('time.time', return_value=1000.0)
+    def test_only_due_entries_checked(self, mock_time):
+        self._add('due', 999.0)
+        self._add('now', 1000.0)
+        self._add('later', 1010.0)
+
+        ret = self.sched_instance._tick_due_entries()
+
+        checked = set(c[0][0] for c in self.sched_instance.maybe_due.call_args_list)
+        self.assertEqual(checked, set([self.sched_instance._schedule['due'],
+                                       self.sched_instance._schedule['now']]))
+        # sleep until the next due entry
+        self.assertEqual(ret, 10.0)
+        # checked entries are due again after the time is_due() reported
+        self.assertEqual(self.sched_instance._due_times,
+                         {'due': 1030.0, 'now': 1030.0, 'later': 1010.0})
+
+    @mock.patch('time.time', return_value=1000.0)
+    def test_sleeps_at_most_max_interval(self, mock_time):
+        self._add('later', 5000.0)
+
+        self.assertEqual(self.sched_instance._tick_due_entries(), 90)
+        self.assertFalse(self.sched_instance.maybe_due.called)
+
+    @mock.patch('time.time', return_value=1000.0)
+    def test_empty_schedule(self, mock_time):
+        self.assertEqual(self.sched_instance._tick_due_entries(), 90)
+
+    @mock.patch('time.time', return_value=1000.0)
+    def test_changed_and_removed_entries(self, mock_time):
+        """
+        Heap items left behind by an entry that was removed or given a new due time are skipped.
+        """
+        self._add('moved', 999.0)
+        self.sched_instance._set_due_time('moved', 1020.0)
+        self._add('removed', 999.0)
+        self.sched_instance._remove_entry('removed')
+
+        ret = self.sched_instance._tick_due_entries()
+
+        self.assertFalse(self.sched_instance.maybe_due.called)
+        self.assertEqual(ret, 20.0)
+        self.assertTrue('removed' not in self.sched_instance._due_times)
+
+    @mock.patch('time.time', return_value=1000.0)
+    def test_due_again_waits_for_next_tick(self, mock_time):
+        self.sched_instance.maybe_due.return_value = None
+        self._add('due', 999.0)
+
+        ret = self.sched_instance._tick_due_entries()
+
+        self.assertEqual(self.sched_instance.maybe_due.call_count, 1)
+        self.assertEqual(self.sched_instance._due_times['due'], 1090.0)
+        self.assertEqual(ret, 90.0)
+
+    def test_heap_compacted(self):
+        self._add('entry', 0.0)
+        for i in range(200):
+            self.sched_instance._set_due_time('entry', float(i))
+
+        self.assertTrue(len(self.sched_instance._due_heap) <= 102)
+        self.assertTrue((199.0, 'entry') in self.sched_instance._due_heap)
+
+    @mock.patch('time.time', return_value=1000.0)
+    @mock.patch.object(scheduler.Scheduler, '_mongo_initialized', new=True)
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
+    def test_new_entries_due_now(self, mock_get_enabled, mock_time):
+        """
+        Newly loaded entries are checked on the next tick to learn their due times.
+        """
+        mock_get_enabled.return_value = copy.deepcopy(SCHEDULES)
+        self.sched_instance.app = app
+
+        self.sched_instance.setup_schedule()
+
+        self.assertEqual(set(self.sched_instance._due_times),
+                         set(self.sched_instance._schedule))
+        self.assertEqual(set(self.sched_instance._due_times.values()), set([1000.0]))
+
+
+class TestSchedulerMaybeDue(unittest.TestCase):
+    """
+    Tests for queuing due entries no faster than the configured rate.
+    """
+
+    @mock.patch('celery.beat.Scheduler.__init__', new=mock.Mock())
+    def setUp(self):
+        self.sched_instance = scheduler.Scheduler()
+        self.sched_instance.apply_async = mock.MagicMock()
+
+    def _entry(self, name, is_due=True):
+        entry = mock.MagicMock()
+        entry.name = name
+        entry.is_due.return_value = (is_due, 3600)
+        return entry
+
+    def test_not_due(self):
+        ret = self.sched_instance.maybe_due(self._entry('a', is_due=False))
+
+        self.assertEqual(ret, 3600)
+        self.assertFalse(self.sched_instance.apply_async.called)
+
+    def test_no_rate_limit(self):
+        self.sched_instance.dispatch_rate = 0
+
+        for name in ('a', 'b', 'c'):
+            self.assertEqual(self.sched_instance.maybe_due(self._entry(name)), 3600)
+
+        self.assertEqual(self.sched_instance.apply_async.call_count, 3)
+
+    @mock.patch('time.time', return_value=1000.0)
+    def test_rate_limited(self, mock_time):
+        self.sched_instance.dispatch_rate = 2
+        entries = [self._entry(name) for name in ('a', 'b', 'c')]
+
+        ret = [self.sched_instance.maybe_due(entry) for entry in entries]
+
+        # the first is queued now, and the others wait for their turn
+        self.assertEqual(ret, [3600, 0.5, 1.0])
+        self.sched_instance.apply_async.assert_called_once_with(entries[0], publisher=None)
+
+        # when the turn of the second comes, it is queued without waiting behind the third
+        mock_time.return_value = 1000.5
+        self.assertEqual(self.sched_instance.maybe_due(entries[1]), 3600)
+        self.assertEqual(self.sched_instance.apply_async.call_count, 2)
+        self.assertEqual(self.sched_instance._dispatch_times, {'c': 1001.0})
+
+    def test_apply_async_error(self):
+        self.sched_instance.dispatch_rate = 0
+        self.sched_instance.apply_async.side_effect = Exception('boom')
+
+        self.assertEqual(self.sched_instance.maybe_due(self._entry('a')), 3600)
+
+
 class TestSchedulerSetupSchedule(unittest.TestCase):
 
     @mock.patch('threading.Thread', new=mock.MagicMock())
@@ -238,57 +393,143 @@ class TestSchedulerSetupSchedule(unittest.TestCase):
         self.assertEqual(sched_instance._most_recent_timestamp, 1387218569.811224)
         # make sure the entry with no remaining runs does not go into the schedule
         self.assertTrue('529f4bd93de3a31d0ec77340' not in sched_instance._schedule)
+        # but is still known to be enabled
+        self.assertEqual(sched_instance._db_schedule_ids,
+                         set(['529f4bd93de3a31d0ec77338', '529f4bd93de3a31d0ec77339',
+                              '529f4bd93de3a31d0ec77340']))
+        self.assertEqual(sched_instance._enabled_count, 3)
 
 
 class TestSchedulerScheduleChanged(unittest.TestCase):
     @mock.patch('threading.Thread', new=mock.MagicMock())
     @mock.patch('pulp.server.async.scheduler.Scheduler._mongo_initialized', True)
     @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
-    @mock.patch('pulp.server.managers.schedule.utils.get_updated_since')
-    def test_count_changed(self, mock_updated_since, mock_get_enabled):
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled_summary')
+    def test_count_changed(self, mock_summary, mock_get_enabled):
         """
         This test ensures that if the number of enabled schedules changes, the schedule_changed
         property returns True.
         """
-        mock_updated_since.return_value.count.return_value = 0
-        mock_get_enabled.return_value = SCHEDULES
+        mock_get_enabled.return_value = copy.deepcopy(SCHEDULES)
         sched_instance = scheduler.Scheduler()
 
-        mock_get_enabled.return_value = mock.MagicMock()
-        mock_get_enabled.return_value.count.return_value = sched_instance._loaded_from_db_count + 1
+        mock_summary.return_value = (len(SCHEDULES) + 1, sched_instance._most_recent_timestamp)
 
         self.assertTrue(sched_instance.schedule_changed is True)
+        self.assertEqual(sched_instance._enabled_count, len(SCHEDULES) + 1)
+        mock_summary.assert_called_once_with()
 
     @mock.patch('threading.Thread', new=mock.MagicMock())
     @mock.patch('pulp.server.async.scheduler.Scheduler._mongo_initialized', True)
     @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
-    @mock.patch('pulp.server.managers.schedule.utils.get_updated_since')
-    def test_new_updated(self, mock_updated_since, mock_get_enabled):
-        mock_get_enabled.return_value = SCHEDULES
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled_summary')
+    def test_new_updated(self, mock_summary, mock_get_enabled):
+        mock_get_enabled.return_value = copy.deepcopy(SCHEDULES)
         sched_instance = scheduler.Scheduler()
 
-        mock_get_enabled.return_value = mock.MagicMock()
-        mock_get_enabled.return_value.count.return_value = sched_instance._loaded_from_db_count
-        mock_updated_since.return_value.count.return_value = 1
+        mock_summary.return_value = (len(SCHEDULES), sched_instance._most_recent_timestamp + 1)
 
         self.assertTrue(sched_instance.schedule_changed is True)
 
     @mock.patch('threading.Thread', new=mock.MagicMock())
     @mock.patch('pulp.server.async.scheduler.Scheduler._mongo_initialized', True)
     @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
-    @mock.patch('pulp.server.managers.schedule.utils.get_updated_since')
-    def test_no_changes(self, mock_updated_since, mock_get_enabled):
-        mock_updated_since.return_value.count.return_value = 0
-        mock_get_enabled.return_value = SCHEDULES
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled_summary')
+    def test_no_changes(self, mock_summary, mock_get_enabled):
+        mock_get_enabled.return_value = copy.deepcopy(SCHEDULES)
         sched_instance = scheduler.Scheduler()
 
-        mock_get_enabled.return_value = mock.MagicMock()
-        # -1 because there is an ignored schedule that has 0 remaining runs
-        mock_get_enabled.return_value.count.return_value = len(SCHEDULES) - 1
+        # the schedule with 0 remaining runs is still counted as enabled
+        mock_summary.return_value = (len(SCHEDULES), sched_instance._most_recent_timestamp)
 
         self.assertTrue(sched_instance.schedule_changed is False)
 
 
+class TestSchedulerUpdateSchedule(unittest.TestCase):
+    """
+    Tests for patching the schedule with the schedules that changed in the database.
+    """
+
+    @mock.patch('threading.Thread', new=mock.MagicMock())
+    @mock.patch('pulp.server.async.scheduler.Scheduler._mongo_initialized', True)
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
+    def setUp(self, mock_get_enabled):
+        mock_get_enabled.return_value = copy.deepcopy(SCHEDULES)
+        self.sched_instance = scheduler.Scheduler()
+        self.entries = dict(self.sched_instance._schedule)
+
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled_ids')
+    @mock.patch('pulp.server.managers.schedule.utils.get_changed_since')
+    def test_changed_and_disabled(self, mock_changed_since, mock_get_enabled_ids):
+        """
+        Changed schedules replace their entries, and disabled ones are removed, without touching
+        the other entries.
+        """
+        changed, disabled = copy.deepcopy(SCHEDULES[:2])
+        changed['last_updated'] = 1387218600.0
+        disabled['enabled'] = False
+        disabled['last_updated'] = 1387218601.0
+        mock_changed_since.return_value = [changed, disabled]
+        self.sched_instance._enabled_count = len(SCHEDULES) - 1
+
+        self.sched_instance.update_schedule()
+
+        mock_changed_since.assert_called_once_with(1387218569.811224)
+        self.assertFalse(mock_get_enabled_ids.called)
+        schedule = self.sched_instance._schedule
+        self.assertTrue(schedule['529f4bd93de3a31d0ec77338'] is not
+                        self.entries['529f4bd93de3a31d0ec77338'])
+        self.assertTrue('529f4bd93de3a31d0ec77339' not in schedule)
+        for key in app.conf.CELERYBEAT_SCHEDULE:
+            self.assertTrue(schedule[key] is self.entries[key])
+        self.assertEqual(self.sched_instance._db_schedule_ids,
+                         set(['529f4bd93de3a31d0ec77338', '529f4bd93de3a31d0ec77340']))
+        self.assertEqual(self.sched_instance._most_recent_timestamp, 1387218601.0)
+
+    @mock.patch('pulp.server.managers.schedule.utils.get')
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled_ids')
+    @mock.patch('pulp.server.managers.schedule.utils.get_changed_since', return_value=[])
+    def test_deleted(self, mock_changed_since, mock_get_enabled_ids, mock_get):
+        """
+        Deleted schedules are found by comparing IDs when the count does not add up.
+        """
+        mock_get_enabled_ids.return_value = set(['529f4bd93de3a31d0ec77338',
+                                                 '529f4bd93de3a31d0ec77340'])
+        self.sched_instance._enabled_count = 2
+
+        self.sched_instance.update_schedule()
+
+        self.assertTrue('529f4bd93de3a31d0ec77339' not in self.sched_instance._schedule)
+        self.assertTrue(self.sched_instance._schedule['529f4bd93de3a31d0ec77338'] is
+                        self.entries['529f4bd93de3a31d0ec77338'])
+        self.assertEqual(self.sched_instance._db_schedule_ids,
+                         mock_get_enabled_ids.return_value)
+        self.assertFalse(mock_get.called)
+
+    @mock.patch('pulp.server.managers.schedule.utils.get')
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled_ids')
+    @mock.patch('pulp.server.managers.schedule.utils.get_changed_since', return_value=[])
+    def test_enabled_without_update(self, mock_changed_since, mock_get_enabled_ids, mock_get):
+        """
+        An enabled schedule that was not found by its update timestamp is loaded by its ID.
+        """
+        new_schedule = dict(copy.deepcopy(SCHEDULES[0]), _id=u'529f4bd93de3a31d0ec77341')
+        mock_get_enabled_ids.return_value = set(['529f4bd93de3a31d0ec77338',
+                                                 '529f4bd93de3a31d0ec77339',
+                                                 '529f4bd93de3a31d0ec77340',
+                                                 '529f4bd93de3a31d0ec77341'])
+        mock_get.return_value = [dispatch.ScheduledCall.from_db(new_schedule)]
+        self.sched_instance._enabled_count = 4
+
+        self.sched_instance.update_schedule()
+
+        mock_get.assert_called_once_with(['529f4bd93de3a31d0ec77341'])
+        self.assertTrue(isinstance(self.sched_instance._schedule['529f4bd93de3a31d0ec77341'],
+                                   dispatch.ScheduleEntry))
+        self.assertEqual(self.sched_instance._db_schedule_ids,
+                         mock_get_enabled_ids.return_value)
+
+
 class TestSchedulerSchedule(unittest.TestCase):
     @mock.patch('pulp.server.async.scheduler.Scheduler._mongo_initialized', True)
     @mock.patch('threading.Thread', new=mock.MagicMock())
@@ -303,20 +544,23 @@ class TestSchedulerSchedule(unittest.TestCase):
         mock_get_schedule.assert_called_once_with()
 
     @mock.patch('threading.Thread', new=mock.MagicMock())
+    @mock.patch.object(scheduler.Scheduler, 'update_schedule')
     @mock.patch.object(scheduler.Scheduler, 'setup_schedule')
     @mock.patch.object(scheduler.Scheduler, 'schedule_changed', new=True)
-    def test_schedule_changed(self, mock_setup_schedule):
+    def test_schedule_changed(self, mock_setup_schedule, mock_update_schedule):
         sched_instance = scheduler.Scheduler()
+        sched_instance._schedule = {}
 
         sched_instance.schedule
 
-        # make sure it called the setup_schedule() method
+        # make sure it patched the schedule instead of loading it again
+        mock_update_schedule.assert_called_once_with()
         mock_setup_schedule.assert_called_once_with()
 
     @mock.patch('threading.Thread', new=mock.MagicMock())
-    @mock.patch.object(scheduler.Scheduler, 'schedule_changed', return_value=False)
+    @mock.patch.object(scheduler.Scheduler, 'schedule_changed', new=False)
     @mock.patch.object(scheduler.Scheduler, 'setup_schedule')
-    def test_schedule_returns_value(self, mock_setup_schedule, mock_schedule_changed):
+    def test_schedule_returns_value(self, mock_setup_schedule):
         sched_instance = scheduler.Scheduler()
         sched_instance._schedule = mock.Mock()
 
@@ -324,6 +568,28 @@ class TestSchedulerSchedule(unittest.TestCase):
 
         self.assertTrue(ret is sched_instance._schedule)
 
+    @mock.patch('threading.Thread', new=mock.MagicMock())
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled_summary')
+    @mock.patch.object(scheduler.Scheduler, 'update_schedule')
+    @mock.patch.object(scheduler.Scheduler, 'setup_schedule')
+    def test_checked_once_per_tick(self, mock_setup_schedule, mock_update_schedule,
+                                   mock_summary):
+        """
+        Changes are only looked for on the first access to the schedule after a tick starts.
+        """
+        mock_summary.return_value = (1, 0)
+        sched_instance = scheduler.Scheduler()
+        sched_instance._schedule = {}
+
+        sched_instance.schedule
+        sched_instance.schedule
+        self.assertEqual(mock_summary.call_count, 1)
+        self.assertEqual(mock_update_schedule.call_count, 1)
+
+        sched_instance._schedule_checked = False
+        sched_instance.schedule
+        self.assertEqual(mock_summary.call_count, 2)
+
 
 class TestSchedulerAdd(unittest.TestCase):
     @mock.patch('threading.Thread', new=mock.MagicMock())
@@ -430,35 +696,37 @@ class TestCeleryProcessTimeoutMonitorRun(unittest.TestCase):
 
 class TestCeleryProcessTimeoutMonitorCheckCeleryProcesses(unittest.TestCase):
 
-    @mock.patch('pulp.server.async.scheduler.Worker', spec_set=True)
-    def test_queries_all_workers(self, mock_worker):
-        mock_worker.return_value = []
+    @mock.patch('pulp.server.async.scheduler.worker_watcher', spec_set=True)
+    def test_uses_heartbeat_table(self, mock_worker_watcher):
+        mock_worker_watcher.get_worker_heartbeats.return_value = {}
 
         scheduler.CeleryProcessTimeoutMonitor().check_celery_processes()
 
-        mock_worker.objects.all.assert_called_once_with()
+        mock_worker_watcher.get_worker_heartbeats.assert_called_once_with()
+        mock_worker_watcher.flush_heartbeats.assert_called_once_with()
 
     @mock.patch('pulp.server.async.scheduler._delete_worker', spec_set=True)
-    @mock.patch('pulp.server.async.scheduler.Worker', spec_set=True)
-    def test_deletes_workers(self, mock_worker, mock_delete_worker):
-        mock_worker.objects.all.return_value = [
-            Worker(name='name1', last_heartbeat=datetime.utcnow() - timedelta(seconds=400)),
-            Worker(name='name2', last_heartbeat=datetime.utcnow()),
-        ]
+    @mock.patch('pulp.server.async.scheduler.worker_watcher', spec_set=True)
+    def test_deletes_workers(self, mock_worker_watcher, mock_delete_worker):
+        mock_worker_watcher.get_worker_heartbeats.return_value = {
+            'name1': datetime.utcnow() - timedelta(seconds=400),
+            'name2': datetime.utcnow(),
+        }
 
         scheduler.CeleryProcessTimeoutMonitor().check_celery_processes()
 
         # make sure _delete_worker is only called for the old worker
-        mock_delete_worker.assert_has_calls([mock.call('name1')])
+        mock_delete_worker.assert_called_once_with('name1')
+        mock_worker_watcher.forget_worker.assert_called_once_with('name1')
 
     @mock.patch('pulp.server.async.scheduler._delete_worker', spec_set=True)
-    @mock.patch('pulp.server.async.scheduler.Worker', spec_set=True)
+    @mock.patch('pulp.server.async.scheduler.worker_watcher', spec_set=True)
     @mock.patch('pulp.server.async.scheduler._logger', spec_set=True)
-    def test_logs_scheduler_missing(self, mock__logger, mock_worker, mock_delete_worker):
-        mock_worker.objects.all.return_value = [
-            Worker(name=RESOURCE_MANAGER_WORKER_NAME, last_heartbeat=datetime.utcnow()),
-            Worker(name='name2', last_heartbeat=datetime.utcnow()),
-        ]
+    def test_logs_scheduler_missing(self, mock__logger, mock_worker_watcher, mock_delete_worker):
+        mock_worker_watcher.get_worker_heartbeats.return_value = {
+            RESOURCE_MANAGER_WORKER_NAME: datetime.utcnow(),
+            'name2': datetime.utcnow(),
+        }
 
         scheduler.CeleryProcessTimeoutMonitor().check_celery_processes()
 
@@ -467,13 +735,14 @@ class TestCeleryProcessTimeoutMonitorCheckCeleryProcesses(unittest.TestCase):
             'correctly without at least one pulp_celerybeat process running.')
 
     @mock.patch('pulp.server.async.scheduler._delete_worker', spec_set=True)
-    @mock.patch('pulp.server.async.scheduler.Worker', spec_set=True)
+    @mock.patch('pulp.server.async.scheduler.worker_watcher', spec_set=True)
     @mock.patch('pulp.server.async.scheduler._logger', spec_set=True)
-    def test_logs_resource_manager_missing(self, mock__logger, mock_worker, mock_delete_worker):
-        mock_worker.objects.all.return_value = [
-            Worker(name=SCHEDULER_WORKER_NAME, last_heartbeat=datetime.utcnow()),
-            Worker(name='name2', last_heartbeat=datetime.utcnow()),
-        ]
+    def test_logs_resource_manager_missing(self, mock__logger, mock_worker_watcher,
+                                           mock_delete_worker):
+        mock_worker_watcher.get_worker_heartbeats.return_value = {
+            SCHEDULER_WORKER_NAME: datetime.utcnow(),
+            'name2': datetime.utcnow(),
+        }
 
         scheduler.CeleryProcessTimeoutMonitor().check_celery_processes()
 
@@ -482,15 +751,15 @@ class TestCeleryProcessTimeoutMonitorCheckCeleryProcesses(unittest.TestCase):
             'correctly without at least one pulp_resource_mananger process running.')
 
     @mock.patch('pulp.server.async.scheduler._delete_worker', spec_set=True)
-    @mock.patch('pulp.server.async.scheduler.Worker', spec_set=True)
+    @mock.patch('pulp.server.async.scheduler.worker_watcher', spec_set=True)
     @mock.patch('pulp.server.async.scheduler._logger', spec_set=True)
-    def test_debug_logging(self, mock__logger, mock_worker, mock_delete_worker):
-        mock_worker.objects.all.return_value = [
-            Worker(name='name1', last_heartbeat=datetime.utcnow() - timedelta(seconds=400)),
-            Worker(name='name2', last_heartbeat=datetime.utcnow()),
-            Worker(name=RESOURCE_MANAGER_WORKER_NAME, last_heartbeat=datetime.utcnow()),
-            Worker(name=SCHEDULER_WORKER_NAME, last_heartbeat=datetime.utcnow()),
-        ]
+    def test_debug_logging(self, mock__logger, mock_worker_watcher, mock_delete_worker):
+        mock_worker_watcher.get_worker_heartbeats.return_value = {
+            'name1': datetime.utcnow() - timedelta(seconds=400),
+            'name2': datetime.utcnow(),
+            RESOURCE_MANAGER_WORKER_NAME: datetime.utcnow(),
+            SCHEDULER_WORKER_NAME: datetime.utcnow(),
+        }
 
         scheduler.CeleryProcessTimeoutMonitor().check_celery_processes()
         mock__logger.debug.assert_has_calls([
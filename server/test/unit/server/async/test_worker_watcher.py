@@ -1,3 +1,4 @@
+from datetime import datetime
 import unittest
 
 import mock
@@ -43,58 +44,178 @@ class TestLogEvent(unittest.TestCase):
         mock__logger.assert_called_once()
 
 
-class TestHandleWorkerHeartbeat(unittest.TestCase):
+class HeartbeatTableTestCase(unittest.TestCase):
+    """
+    Gives each test an empty heartbeat table that has already been loaded from the database.
+    """
 
+    def setUp(self):
+        for name, value in (('_heartbeats', {}), ('_unflushed', set()), ('_last_flush', 0),
+                            ('_heartbeats_loaded', True)):
+            patcher = mock.patch.object(worker_watcher, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class TestHandleWorkerHeartbeat(HeartbeatTableTestCase):
+
+    @mock.patch('pulp.server.async.worker_watcher.flush_heartbeats')
     @mock.patch('pulp.server.async.worker_watcher._logger')
-    @mock.patch('pulp.server.async.worker_watcher.Worker')
     @mock.patch('pulp.server.async.worker_watcher._parse_and_log_event')
-    def test_handle_worker_heartbeat_new(self, mock__parse_and_log_event,
-                                         mock_worker, mock_logger):
+    def test_handle_worker_heartbeat_new(self, mock__parse_and_log_event, mock_logger,
+                                         mock_flush_heartbeats):
         """
-        Ensure that we save a record and log when a new worker comes online.
+        Ensure that we record and log when a new worker comes online, and write it right away.
         """
 
         mock_event = mock.Mock()
-        mock_worker.objects.return_value.first.return_value = None
         mock__parse_and_log_event.return_value = {'worker_name': 'fake-worker',
-                                                  'timestamp': '2014-12-08T15:52:29Z',
+                                                  'timestamp': datetime(2014, 12, 8, 15, 52, 29),
                                                   'type': 'fake-type'}
 
         worker_watcher.handle_worker_heartbeat(mock_event)
 
-        mock_worker.objects.return_value.update_one.\
-            assert_called_once_with(set__last_heartbeat='2014-12-08T15:52:29Z', upsert=True)
+        self.assertEqual(worker_watcher._heartbeats,
+                         {'fake-worker': datetime(2014, 12, 8, 15, 52, 29)})
+        self.assertEqual(worker_watcher._unflushed, set(['fake-worker']))
         mock_logger.info.assert_called_once_with('New worker \'fake-worker\' discovered')
+        mock_flush_heartbeats.assert_called_once_with(force=True)
 
+    @mock.patch('pulp.server.async.worker_watcher.flush_heartbeats')
     @mock.patch('pulp.server.async.worker_watcher._logger')
-    @mock.patch('pulp.server.async.worker_watcher.Worker')
     @mock.patch('pulp.server.async.worker_watcher._parse_and_log_event')
-    def test_handle_worker_heartbeat_update(self, mock__parse_and_log_event,
-                                            mock_worker, mock_logger):
+    def test_handle_worker_heartbeat_update(self, mock__parse_and_log_event, mock_logger,
+                                            mock_flush_heartbeats):
         """
-        Ensure that we save a record but don't log when an existing worker is updated.
+        Ensure that we record but don't log or write right away when an existing worker is updated.
         """
 
+        worker_watcher._heartbeats['fake-worker'] = datetime(2014, 12, 8, 15, 52, 0)
         mock_event = mock.Mock()
-        mock_worker.objects.return_value.first.return_value = mock.Mock()
         mock__parse_and_log_event.return_value = {'worker_name': 'fake-worker',
-                                                  'timestamp': '2014-12-08T15:52:29Z',
+                                                  'timestamp': datetime(2014, 12, 8, 15, 52, 29),
                                                   'type': 'fake-type'}
 
         worker_watcher.handle_worker_heartbeat(mock_event)
 
-        mock_worker.objects.return_value.update_one.\
-            assert_called_once_with(set__last_heartbeat='2014-12-08T15:52:29Z', upsert=True)
+        self.assertEqual(worker_watcher._heartbeats,
+                         {'fake-worker': datetime(2014, 12, 8, 15, 52, 29)})
         self.assertEquals(mock_logger.info.called, False)
+        mock_flush_heartbeats.assert_called_once_with(force=False)
+
+    @mock.patch('pulp.server.async.worker_watcher.flush_heartbeats')
+    @mock.patch('pulp.server.async.worker_watcher._parse_and_log_event')
+    def test_handle_worker_heartbeat_out_of_order(self, mock__parse_and_log_event,
+                                                  mock_flush_heartbeats):
+        """
+        Ensure that a late heartbeat does not move a worker's last heartbeat back in time.
+        """
+
+        worker_watcher._heartbeats['fake-worker'] = datetime(2014, 12, 8, 15, 52, 29)
+        mock__parse_and_log_event.return_value = {'worker_name': 'fake-worker',
+                                                  'timestamp': datetime(2014, 12, 8, 15, 52, 0),
+                                                  'type': 'fake-type'}
+
+        worker_watcher.handle_worker_heartbeat(mock.Mock())
+
+        self.assertEqual(worker_watcher._heartbeats['fake-worker'],
+                         datetime(2014, 12, 8, 15, 52, 29))
+
+
+class TestFlushHeartbeats(HeartbeatTableTestCase):
+
+    def setUp(self):
+        super(TestFlushHeartbeats, self).setUp()
+        worker_watcher._heartbeats.update({'worker1': datetime(2014, 12, 8),
+                                           'worker2': datetime(2014, 12, 9)})
+        worker_watcher._unflushed.add('worker1')
+
+    @mock.patch('time.time', return_value=1000.0)
+    @mock.patch('pulp.server.async.worker_watcher.Worker')
+    def test_flush(self, mock_worker, mock_time):
+        bulk = mock_worker._get_collection.return_value.initialize_unordered_bulk_op.return_value
+
+        worker_watcher.flush_heartbeats()
+
+        # only the heartbeats that were not written yet are written, in a single bulk write
+        bulk.find.assert_called_once_with({'_id': 'worker1'})
+        bulk.find.return_value.upsert.return_value.update_one.assert_called_once_with(
+            {'$set': {'last_heartbeat': datetime(2014, 12, 8)}})
+        bulk.execute.assert_called_once_with()
+        self.assertEqual(worker_watcher._unflushed, set())
+        self.assertEqual(worker_watcher._last_flush, 1000.0)
+
+    @mock.patch('time.time', return_value=1000.0)
+    @mock.patch('pulp.server.async.worker_watcher.Worker')
+    def test_not_yet(self, mock_worker, mock_time):
+        worker_watcher._last_flush = 1000.0 - worker_watcher.HEARTBEAT_FLUSH_SECONDS + 1
+
+        worker_watcher.flush_heartbeats()
+
+        self.assertFalse(mock_worker._get_collection.called)
+
+        worker_watcher.flush_heartbeats(force=True)
+
+        self.assertEqual(mock_worker._get_collection.call_count, 1)
+
+    @mock.patch('pulp.server.async.worker_watcher.Worker')
+    def test_nothing_to_flush(self, mock_worker):
+        worker_watcher._unflushed.clear()
+
+        worker_watcher.flush_heartbeats(force=True)
+
+        self.assertFalse(mock_worker._get_collection.called)
+
+    @mock.patch('pulp.server.async.worker_watcher.Worker')
+    def test_failed_write(self, mock_worker):
+        bulk = mock_worker._get_collection.return_value.initialize_unordered_bulk_op.return_value
+        bulk.execute.side_effect = ValueError
+
+        self.assertRaises(ValueError, worker_watcher.flush_heartbeats)
+
+        # the heartbeats are written by the next flush instead
+        self.assertEqual(worker_watcher._unflushed, set(['worker1']))
+
+
+class TestGetWorkerHeartbeats(HeartbeatTableTestCase):
+
+    @mock.patch('pulp.server.async.worker_watcher.Worker')
+    def test_loads_once(self, mock_worker):
+        worker_watcher._heartbeats_loaded = False
+        worker_watcher._heartbeats['worker1'] = datetime(2014, 12, 9)
+        workers = [mock.Mock(last_heartbeat=datetime(2014, 12, 8)),
+                   mock.Mock(last_heartbeat=datetime(2014, 12, 8)),
+                   mock.Mock(last_heartbeat=None)]
+        for i, worker in enumerate(workers):
+            worker.name = 'worker%d' % (i + 1)
+        mock_worker.objects.only.return_value = workers
+
+        ret = worker_watcher.get_worker_heartbeats()
+        worker_watcher.get_worker_heartbeats()
+
+        mock_worker.objects.only.assert_called_once_with('name', 'last_heartbeat')
+        # the heartbeat received since the process started is more recent
+        self.assertEqual(ret, {'worker1': datetime(2014, 12, 9), 'worker2': datetime(2014, 12, 8),
+                               'worker3': datetime.min})
+
+    def test_forget_worker(self):
+        worker_watcher._heartbeats['worker1'] = datetime(2014, 12, 9)
+        worker_watcher._unflushed.add('worker1')
+
+        worker_watcher.forget_worker('worker1')
+
+        self.assertEqual(worker_watcher.get_worker_heartbeats(), {})
+        self.assertEqual(worker_watcher._unflushed, set())
 
 
 class TestHandleWorkerOffline(unittest.TestCase):
+    @mock.patch('pulp.server.async.worker_watcher.forget_worker')
     @mock.patch('pulp.server.async.worker_watcher._parse_and_log_event')
     @mock.patch('pulp.server.async.worker_watcher._delete_worker')
     @mock.patch('pulp.server.async.worker_watcher._')
     @mock.patch('pulp.server.async.worker_watcher._logger')
     def test_handle_worker_offline(self, mock__logger, mock_gettext, mock__delete_worker,
-                                   mock__parse_and_log_event):
+                                   mock__parse_and_log_event, mock_forget_worker):
         mock_event = mock.Mock()
 
         worker_watcher.handle_worker_offline(mock_event)
@@ -104,3 +225,4 @@ class TestHandleWorkerOffline(unittest.TestCase):
         mock_gettext.assert_called_once_with("Worker '%(worker_name)s' shutdown")
         mock__logger.info.assert_called_once()
         mock__delete_worker.assert_called_once_with(event_info['worker_name'], normal_shutdown=True)
+        mock_forget_worker.assert_called_once_with(event_info['worker_name'])
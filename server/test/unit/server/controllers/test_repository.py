@@ -772,6 +772,7 @@ class TestSync(unittest.TestCase):
         )
         mock_imp_manager.get_collection().update.assert_called_once_with(
             {'repo_id': mock_repo.repo_id}, {'$set': {'last_sync': mock_now()}}, safe=True)
+        mock_repo_qs.bump_revision.assert_called_once_with(mock_repo.repo_id)
         mock_result.get_collection().save.assert_called_once_with(mock_result.expected_result(),
                                                                   safe=True)
         mock_fire_man.fire_repo_sync_finished.assert_called_once_with(mock_result.expected_result())
@@ -925,8 +926,10 @@ class TestDoPublish(unittest.TestCase):
 
     @mock.patch('pulp.server.controllers.repository.sys')
     @mock.patch('pulp.server.controllers.repository.pulp_exceptions.PulpCodedException')
-    def test_invalid_publish_report(self, mock_e, mock_sys, mock_repo_dist, mock_repo_pub_result,
-                                    mock_now, mock_sig_handler, mock_log, mock_text):
+    @mock.patch('pulp.server.controllers.repository.model.Repository.objects')
+    def test_invalid_publish_report(self, mock_repo_qs, mock_e, mock_sys, mock_repo_dist,
+                                    mock_repo_pub_result, mock_now, mock_sig_handler, mock_log,
+                                    mock_text):
         """
         Test that invalid publish reports should raise.
         """
@@ -948,6 +951,7 @@ class TestDoPublish(unittest.TestCase):
             {'repo_id': mock_repo.repo_id, 'id': 'dist'})
         mock_repo_dist.get_collection().save.assert_called_once_with(
             mock_repo_dist.get_collection().find_one.return_value, safe=True)
+        mock_repo_qs.bump_revision.assert_called_once_with(mock_repo.repo_id)
         mock_repo_pub_result.error_result.assert_called_once_with(
             mock_repo.repo_id, mock_dist['id'], mock_dist['distributor_type_id'], mock_now(),
             mock_now(), expected_e, mock_sys.exc_info()[2])
@@ -957,8 +961,9 @@ class TestDoPublish(unittest.TestCase):
         mock_log.exception.assert_called_once_with(mock_text())
 
     @mock.patch('pulp.server.controllers.repository.datetime')
-    def test_successful_publish(self, mock_dt, mock_repo_dist, mock_repo_pub_result, mock_now,
-                                mock_sig_handler, mock_log, mock_text):
+    @mock.patch('pulp.server.controllers.repository.model.Repository.objects')
+    def test_successful_publish(self, mock_repo_qs, mock_dt, mock_repo_dist, mock_repo_pub_result,
+                                mock_now, mock_sig_handler, mock_log, mock_text):
         """
         Test publish when everything is as expected.
         """
@@ -971,6 +976,7 @@ class TestDoPublish(unittest.TestCase):
         result = repo_controller._do_publish(mock_repo, 'dist', mock_inst, 'transfer', 'conduit',
                                              'conf')
         self.assertTrue(mock_dist['last_publish'] is mock_dt.utcnow.return_value)
+        mock_repo_qs.bump_revision.assert_called_once_with(mock_repo.repo_id)
         mock_repo_pub_result.expected_result.assert_called_once_with(
             mock_repo.repo_id, 'mock_id', 'mock_dist_type', mock_now(), mock_now(), 'summary',
             'details', mock_repo_pub_result.RESULT_SUCCESS
@@ -1154,7 +1160,7 @@ class TestUpdateUnitCount(unittest.TestCase):
         """
         repo_controller.update_unit_count('mock_repo', 'mock_type', 2)
         expected_key = 'inc__content_unit_counts__mock_type'
-        mock_repo_qs().update_one.assert_called_once_with(**{expected_key: 2})
+        mock_repo_qs().update_one.assert_called_once_with(inc__revision=1, **{expected_key: 2})
 
     @mock.patch('pulp.server.controllers.repository.model.Repository.objects')
     def test_update_unit_count_errror(self, mock_repo_qs):
@@ -1165,4 +1171,4 @@ class TestUpdateUnitCount(unittest.TestCase):
         self.assertRaises(pulp_exceptions.PulpExecutionException, repo_controller.update_unit_count,
                           'mock_repo', 'mock_type', 2)
         expected_key = 'inc__content_unit_counts__mock_type'
-        mock_repo_qs().update_one.assert_called_once_with(**{expected_key: 2})
+        mock_repo_qs().update_one.assert_called_once_with(inc__revision=1, **{expected_key: 2})
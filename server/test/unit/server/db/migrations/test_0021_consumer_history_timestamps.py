@@ -0,0 +1,52 @@
+"""
+This module contains tests for pulp.server.db.migrations.0021_consumer_history_timestamps.py
+"""
+from datetime import datetime
+import unittest
+
+from mock import call, patch
+
+from pulp.common import dateutils
+from pulp.server.db.migrate.models import _import_all_the_way
+
+migration = _import_all_the_way('pulp.server.db.migrations.0021_consumer_history_timestamps')
+
+
+class TestMigrate(unittest.TestCase):
+    """
+    Test the migrate() function.
+    """
+
+    @patch.object(migration, 'BATCH_SIZE', 2)
+    @patch.object(migration.connection, 'get_database')
+    def test_timestamps_converted(self, mock_get_database):
+        collection = mock_get_database.return_value['consumer_history']
+        collection.find.return_value = [
+            {'_id': 1, 'timestamp': '2015-06-01T12:30:05Z'},
+            {'_id': 2, 'timestamp': '2015-06-01T14:30:06+02:00'},
+            {'_id': 3, 'timestamp': '2015-06-01T12:30:07Z'}]
+        bulk = collection.initialize_unordered_bulk_op.return_value
+
+        migration.migrate()
+
+        collection.find.assert_called_once_with({'timestamp': {'$type': 2}},
+                                                fields=['timestamp'])
+        self.assertEqual(bulk.find.call_args_list, [call({'_id': 1}), call({'_id': 2}),
+                                                    call({'_id': 3})])
+        self.assertEqual(bulk.find.return_value.update.call_args_list, [
+            call({'$set': {'timestamp': datetime(2015, 6, 1, 12, 30, second,
+                                                 tzinfo=dateutils.utc_tz())}})
+            for second in (5, 6, 7)])
+        self.assertEqual(bulk.execute.call_count, 2)
+
+    @patch.object(migration.connection, 'get_database')
+    def test_obsolete_indexes_dropped(self, mock_get_database):
+        collection = mock_get_database.return_value['consumer_history']
+        collection.find.return_value = []
+        collection.index_information.return_value = {'_id_': {}, 'type_-1': {},
+                                                     'originator_-1': {}}
+
+        migration.migrate()
+
+        collection.drop_index.assert_called_once_with('type_-1')
+        self.assertFalse(collection.initialize_unordered_bulk_op.return_value.execute.called)
@@ -6,6 +6,7 @@ import unittest
 
 from datetime import datetime
 
+from bson import ObjectId
 from mock import patch
 
 from pulp.server import exceptions
@@ -292,6 +293,48 @@ class TestValidateFields(unittest.TestCase):
         self.assertRaises(exceptions.InvalidValue, criteria._validate_fields, input)
 
 
+class TestValidateContinuation(unittest.TestCase):
+    def test_round_trip(self):
+        continuation = {'type_id': 'rpm', 'sort': [['name', 1], ['_id', 1]],
+                        'values': ['zsh', 'unit-1']}
+        token = criteria.encode_continuation(continuation)
+        self.assertEqual(criteria.decode_continuation(token), continuation)
+
+    def test_round_trip_object_id(self):
+        continuation = {'sort': [['_id', 1]], 'values': [ObjectId()]}
+        token = criteria.encode_continuation(continuation)
+        self.assertEqual(criteria.decode_continuation(token), continuation)
+
+    def test_as_none(self):
+        self.assertTrue(criteria.decode_continuation(None) is None)
+
+    def test_as_garbage(self):
+        self.assertRaises(exceptions.InvalidValue, criteria.decode_continuation, 'abc 123')
+
+    def test_mismatched_values(self):
+        token = criteria.encode_continuation({'sort': [['_id', 1]], 'values': []})
+        self.assertRaises(exceptions.InvalidValue, criteria.decode_continuation, token)
+
+    def test_malformed_sort(self):
+        for continuation in ({'sort': 'name', 'values': 'abcd'},
+                             {'sort': [1], 'values': ['unit-1']},
+                             {'sort': [['_id', 1]], 'values': {'a': 1}}):
+            token = criteria.encode_continuation(continuation)
+            self.assertRaises(exceptions.InvalidValue, criteria.decode_continuation, token)
+
+    def test_from_client_input(self):
+        continuation = {'sort': [['_id', 1]], 'values': ['unit-1']}
+        query = {'limit': 10, 'continuation': criteria.encode_continuation(continuation)}
+        ret = criteria.UnitAssociationCriteria.from_client_input(query)
+        self.assertEqual(ret.continuation, continuation)
+
+    def test_from_client_input_with_skip(self):
+        continuation = {'sort': [['_id', 1]], 'values': ['unit-1']}
+        query = {'skip': 10, 'continuation': criteria.encode_continuation(continuation)}
+        self.assertRaises(exceptions.InvalidValue,
+                          criteria.UnitAssociationCriteria.from_client_input, query)
+
+
 class TestDateOperator(unittest.TestCase):
 
     def test_apply(self):
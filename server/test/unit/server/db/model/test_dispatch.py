@@ -861,6 +861,49 @@ class TestScheduledCallCalculateNextRun(unittest.TestCase):
                              dateutils.parse_iso8601_datetime(next_run))
 
 
+class TestScheduledCallCalculateJitter(unittest.TestCase):
+    def test_no_jitter(self):
+        call = ScheduledCall('PT1H', 'pulp.tasks.dosomething')
+
+        # the default [tasks] schedule_jitter setting is 0
+        self.assertEqual(call.calculate_jitter(3600), 0)
+
+    def test_deterministic(self):
+        call = ScheduledCall('PT1H', 'pulp.tasks.dosomething', jitter=600)
+        same_call = ScheduledCall('PT1H', 'pulp.tasks.dosomething', jitter=600, id=call.id)
+
+        jitter = call.calculate_jitter(3600)
+
+        self.assertTrue(0 <= jitter < 600)
+        self.assertEqual(same_call.calculate_jitter(3600), jitter)
+
+    def test_spread(self):
+        calls = [ScheduledCall('PT1H', 'pulp.tasks.dosomething', jitter=600) for i in range(20)]
+
+        jitters = [call.calculate_jitter(3600) for call in calls]
+
+        self.assertEqual(len(set(jitters)), 20)
+
+    def test_less_than_interval(self):
+        call = ScheduledCall('PT1M', 'pulp.tasks.dosomething', jitter=3600)
+
+        self.assertTrue(0 <= call.calculate_jitter(60) < 60)
+
+    @mock.patch('pulp.server.db.model.dispatch.config')
+    def test_global_jitter(self, mock_config):
+        mock_config.getint.return_value = 600
+        call = ScheduledCall('PT1H', 'pulp.tasks.dosomething')
+
+        jitter = call.calculate_jitter(3600)
+
+        mock_config.getint.assert_called_once_with('tasks', 'schedule_jitter')
+        self.assertTrue(0 <= jitter < 600)
+
+        # a schedule's own value takes precedence
+        call.jitter = 0
+        self.assertEqual(call.calculate_jitter(3600), 0)
+
+
 class TestScheduleEntryInit(unittest.TestCase):
     def test_captures_scheduled_call(self):
         call = ScheduledCall('2014-01-19T17:15Z/PT1H', 'pulp.tasks.dosomething')
@@ -976,6 +1019,36 @@ class TestScheduleEntryIsDue(unittest.TestCase):
         # this was hand-calculated as the remaining time until the next hourly run
         self.assertEqual(seconds, 1442)
 
+    @mock.patch('time.time')
+    @mock.patch.object(ScheduledCall, 'calculate_jitter', return_value=2400.0)
+    def test_past_runs_delayed_by_jitter(self, mock_jitter, mock_time):
+        mock_time.return_value = 1389389758  # 2014-01-10T21:35:58
+        # This call would be overdue, but its runs are delayed by 40 minutes.
+        call = ScheduledCall('2014-01-10T20:00Z/PT1H', 'pulp.tasks.dosomething',
+                             last_run_at='2014-01-10T20:40Z', total_run_count=1)
+        entry = call.as_schedule_entry()
+
+        is_due, seconds = entry.is_due()
+
+        self.assertFalse(is_due)
+        # the delayed run is at 21:40
+        self.assertEqual(seconds, 242)
+        mock_jitter.assert_called_once_with(3600)
+
+    @mock.patch('time.time')
+    @mock.patch.object(ScheduledCall, 'calculate_jitter', return_value=600.0)
+    def test_past_runs_due_after_jitter(self, mock_jitter, mock_time):
+        mock_time.return_value = 1389389758  # 2014-01-10T21:35:58
+        call = ScheduledCall('2014-01-10T20:00Z/PT1H', 'pulp.tasks.dosomething',
+                             last_run_at='2014-01-10T20:10Z', total_run_count=1)
+        entry = call.as_schedule_entry()
+
+        is_due, seconds = entry.is_due()
+
+        self.assertTrue(is_due)
+        # the next run is at 22:10
+        self.assertEqual(seconds, 1442 + 600)
+
 
 class TaskStatusTests(base.PulpServerTests):
     """
@@ -466,6 +466,9 @@ class TestRepository(unittest.TestCase):
         self.assertTrue(isinstance(model.Repository.last_unit_removed, DateTimeField))
         self.assertFalse(model.Repository.last_unit_removed.required)
 
+        self.assertTrue(isinstance(model.Repository.revision, IntField))
+        self.assertEqual(model.Repository.revision.default, 0)
+
         self.assertTrue(isinstance(model.Repository._ns, StringField))
         self.assertEquals(model.Repository._ns.default, 'repos')
 
@@ -544,8 +547,18 @@ class TestRepository(unittest.TestCase):
         Attempt to update a prohibited field. Make sure it is ignored.
         """
         repo_obj = model.Repository('mock_repo')
-        repo_obj.update_from_delta({'repo_id': 'id_updated'})
+        repo_obj.update_from_delta({'repo_id': 'id_updated', 'revision': 10})
         self.assertEqual(repo_obj.repo_id, 'mock_repo')
+        self.assertEqual(repo_obj.revision, 0)
+
+    @patch('pulp.server.db.model.Repository.objects')
+    def test_post_save_signal(self, mock_repo_qs):
+        """
+        Saving a repository increments its revision.
+        """
+        repo_obj = model.Repository('mock_repo')
+        model.Repository.post_save_signal(model.Repository, repo_obj)
+        mock_repo_qs.bump_revision.assert_called_once_with('mock_repo')
 
     def test_update_from_delta_notes(self):
         """
@@ -102,3 +102,13 @@ class TestReqoQuerySet(unittest.TestCase):
         qs.get = mock_get
         self.assertRaises(pulp_exceptions.MissingResource, qs.get_repo_or_missing_resource, 'repo')
         mock_get.assert_called_once_with(repo_id='repo')
+
+    def test_bump_revision(self):
+        """
+        The revision of the repository is incremented atomically.
+        """
+        qs = querysets.RepoQuerySet(mock.MagicMock(), mock.MagicMock())
+        qs.filter = mock.MagicMock()
+        qs.bump_revision('repo')
+        qs.filter.assert_called_once_with(repo_id='repo')
+        qs.filter.return_value.update_one.assert_called_once_with(inc__revision=1)
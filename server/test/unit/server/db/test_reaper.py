@@ -12,7 +12,8 @@ from pulp.server.db import model
 from pulp.server.db import reaper
 from pulp.server.db.model import celery_result, consumer, repo_group, repository
 from pulp.server.db.model.consumer import ConsumerHistoryEvent
-from pulp.server.db.model.reaper_base import _create_expired_object_id, ReaperMixin
+from pulp.server.db.model.reaper_base import (_create_expired_object_id, _remove_in_batches,
+                                              ReaperMixin)
 
 
 class TestReaperCollectionConfig(unittest.TestCase):
@@ -90,6 +91,159 @@ class TestReapInheritance(unittest.TestCase):
             self.assertTrue(issubclass(model_class, ReaperMixin))
 
 
+class TestRemoveInBatches(unittest.TestCase):
+    """
+    Assert correct behavior from _remove_in_batches().
+    """
+
+    def _collection(self, *batches):
+        collection = mock.MagicMock()
+        cursor = collection.find.return_value.sort.return_value.limit
+        cursor.side_effect = [[{'_id': i} for i in batch] for batch in batches]
+        collection.remove.side_effect = [{'n': len(batch)} for batch in batches]
+        return collection
+
+    def test_unlimited(self):
+        collection = mock.MagicMock()
+        collection.remove.return_value = {'n': 5}
+
+        removed = _remove_in_batches(collection, {'_id': {'$lte': 10}}, 0, 0)
+
+        self.assertEqual(removed, 5)
+        collection.remove.assert_called_once_with({'_id': {'$lte': 10}})
+        self.assertFalse(collection.find.called)
+
+    @mock.patch('pulp.server.db.model.reaper_base.time.sleep')
+    def test_batches(self, mock_sleep):
+        spec = {'_id': {'$lte': 10}}
+        collection = self._collection([1, 2], [3, 4], [5])
+
+        removed = _remove_in_batches(collection, spec, 2, 0.5)
+
+        self.assertEqual(removed, 5)
+        collection.find.assert_called_with(spec, fields=['_id'])
+        collection.find.return_value.sort.assert_called_with('_id', 1)
+        collection.find.return_value.sort.return_value.limit.assert_called_with(2)
+        self.assertEqual(collection.remove.call_args_list, [
+            mock.call({'$and': [spec, {'_id': {'$gte': 1, '$lte': 2}}]}),
+            mock.call({'$and': [spec, {'_id': {'$gte': 3, '$lte': 4}}]}),
+            mock.call({'$and': [spec, {'_id': {'$gte': 5, '$lte': 5}}]})])
+        # a short batch is the last one, so there is no pause after it
+        self.assertEqual(mock_sleep.call_args_list, [mock.call(0.5), mock.call(0.5)])
+
+    @mock.patch('pulp.server.db.model.reaper_base.time.sleep')
+    def test_nothing_to_remove(self, mock_sleep):
+        collection = self._collection([])
+
+        self.assertEqual(_remove_in_batches(collection, {}, 2, 0.5), 0)
+
+        self.assertFalse(collection.remove.called)
+        self.assertFalse(mock_sleep.called)
+
+
+class TestManageTTLIndex(unittest.TestCase):
+    """
+    Assert correct behavior from ReaperMixin.manage_ttl_index().
+    """
+
+    def setUp(self):
+        self.collection = mock.MagicMock()
+        self.collection.name = 'celery_taskmeta'
+        self.collection.index_information.return_value = {'_id_': {'key': [('_id', 1)]}}
+        patcher = mock.patch.object(celery_result.CeleryResult, 'get_collection',
+                                    return_value=self.collection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_no_ttl_field(self):
+        self.assertFalse(repository.RepoSyncResult.manage_ttl_index(1.0))
+
+    def test_create(self):
+        self.assertTrue(celery_result.CeleryResult.manage_ttl_index(1.0))
+
+        self.collection.create_index.assert_called_once_with([('date_done', 1)],
+                                                             expireAfterSeconds=86400)
+
+    def test_unchanged(self):
+        self.collection.index_information.return_value['date_done_1'] = {
+            'key': [('date_done', 1)], 'expireAfterSeconds': 86400}
+
+        self.assertTrue(celery_result.CeleryResult.manage_ttl_index(1.0))
+
+        self.assertFalse(self.collection.create_index.called)
+        self.assertFalse(self.collection.database.command.called)
+
+    def test_update(self):
+        self.collection.index_information.return_value['date_done_1'] = {
+            'key': [('date_done', 1)], 'expireAfterSeconds': 86400}
+
+        self.assertTrue(celery_result.CeleryResult.manage_ttl_index(2.0))
+
+        self.collection.database.command.assert_called_once_with(
+            'collMod', 'celery_taskmeta',
+            index={'keyPattern': {'date_done': 1}, 'expireAfterSeconds': 172800})
+
+    def test_replace_plain_index(self):
+        self.collection.index_information.return_value['date_done_1'] = {
+            'key': [('date_done', 1)]}
+
+        self.assertTrue(celery_result.CeleryResult.manage_ttl_index(1.0))
+
+        self.collection.drop_index.assert_called_once_with('date_done_1')
+        self.collection.create_index.assert_called_once_with([('date_done', 1)],
+                                                             expireAfterSeconds=86400)
+
+    def test_drop(self):
+        self.collection.index_information.return_value['date_done_1'] = {
+            'key': [('date_done', 1)], 'expireAfterSeconds': 86400}
+
+        self.assertFalse(celery_result.CeleryResult.manage_ttl_index(None))
+
+        self.collection.drop_index.assert_called_once_with('date_done_1')
+
+    def test_drop_absent(self):
+        self.assertFalse(celery_result.CeleryResult.manage_ttl_index(None))
+
+        self.assertFalse(self.collection.drop_index.called)
+
+
+class TestReapExpiredDocumentsSettings(unittest.TestCase):
+    """
+    Assert that reap_expired_documents() passes the batch and TTL settings on to the models.
+    """
+
+    def _config(self, mock_config, ttl_indexes):
+        mock_config.getint.return_value = 500
+        mock_config.getfloat.side_effect = lambda section, name: {'batch_pause': 0.2}.get(name, 7)
+        mock_config.getboolean.return_value = ttl_indexes
+
+    @mock.patch('pulp.server.db.reaper.pulp_config.config')
+    @mock.patch('pulp.server.db.reaper._COLLECTION_TIMEDELTAS')
+    def test_batches(self, mock_timedeltas, mock_config):
+        self._config(mock_config, False)
+        model_class = mock.MagicMock()
+        model_class.manage_ttl_index.return_value = False
+        mock_timedeltas.items.return_value = [(model_class, 'task_status_history')]
+
+        reaper.reap_expired_documents.run()
+
+        model_class.manage_ttl_index.assert_called_once_with(None)
+        model_class.reap_old_documents.assert_called_once_with(7, 500, 0.2)
+
+    @mock.patch('pulp.server.db.reaper.pulp_config.config')
+    @mock.patch('pulp.server.db.reaper._COLLECTION_TIMEDELTAS')
+    def test_ttl_index(self, mock_timedeltas, mock_config):
+        self._config(mock_config, True)
+        model_class = mock.MagicMock()
+        model_class.manage_ttl_index.return_value = True
+        mock_timedeltas.items.return_value = [(model_class, 'task_result_history')]
+
+        reaper.reap_expired_documents.run()
+
+        model_class.manage_ttl_index.assert_called_once_with(7)
+        self.assertFalse(model_class.reap_old_documents.called)
+
+
 class TestReapExpiredDocuments(base.PulpServerTests):
     """
     This test class asserts correct behavior from the reap_expired_documents() Task.
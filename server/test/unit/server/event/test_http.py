@@ -1,5 +1,8 @@
 import httplib
+import socket
+import threading
 import time
+import unittest
 
 # needed to create unserializable ID
 from bson.objectid import ObjectId as _test_objid
@@ -119,11 +122,148 @@ class TestHTTPNotifierTests(base.PulpServerTests):
         # Verify
         self.assertEqual(0, mock_create.call_count)
 
+    @mock.patch('pulp.server.event.http.time.sleep')
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_send_post_retry(self, mock_create, mock_sleep, mock_task_ser):
+        # Setup
+        mock_connection = mock.Mock()
+        mock_connection.request.side_effect = socket.error()
+        mock_create.return_value = mock_connection
+
+        # Test
+        http._send_post({'url': 'https://localhost/api/'}, 'body', {})
+
+        # Verify
+        self.assertEqual(http.ATTEMPTS, mock_connection.request.call_count)
+        self.assertEqual(http.ATTEMPTS, mock_connection.close.call_count)
+        self.assertEqual(http.ATTEMPTS - 1, mock_sleep.call_count)
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_send_post_keep_alive(self, mock_create, mock_task_ser):
+        # Setup
+        mock_connection = mock.Mock()
+        mock_response = mock.Mock()
+        mock_response.status = httplib.OK
+        mock_response.will_close = False
+        mock_connection.getresponse.return_value = mock_response
+        mock_create.return_value = mock_connection
+        connections = {}
+
+        # Test
+        http._send_post({'url': 'https://localhost/api/'}, 'body', connections)
+        http._send_post({'url': 'https://localhost/api/'}, 'body', connections)
+
+        # Verify
+        self.assertEqual(1, mock_create.call_count)
+        self.assertEqual(2, mock_connection.request.call_count)
+        self.assertEqual(connections, {('https:', 'localhost'): mock_connection})
+        self.assertFalse(mock_connection.close.called)
+
     def test_create_configuration(self, mock_task_ser):
         # Test HTTPS
         conn = http._create_connection('https', 'foo')
         self.assertTrue(isinstance(conn, httplib.HTTPSConnection))
+        self.assertEqual(conn.timeout, http.TIMEOUT)
 
         # Test HTTP
         conn = http._create_connection('http', 'foo')
         self.assertTrue(isinstance(conn, httplib.HTTPConnection))
+        self.assertEqual(conn.timeout, http.TIMEOUT)
+
+
+class TestDispatcher(unittest.TestCase):
+
+    @mock.patch('pulp.server.event.http._send_post')
+    def test_put_per_server(self, mock_send_post):
+        """
+        A server that does not respond does not delay posts to other servers.
+        """
+        hung = threading.Event()
+        posted = threading.Event()
+
+        def send_post(notifier_config, body, connections):
+            if notifier_config['url'].startswith('http://hung'):
+                hung.wait()
+            else:
+                posted.set()
+
+        mock_send_post.side_effect = send_post
+        dispatcher = http.Dispatcher(workers=1, queue_size=1)
+
+        try:
+            dispatcher.put({'url': 'http://hung/api/'}, 'body')
+            dispatcher.put({'url': 'http://hung/other/'}, 'body')
+            dispatcher.put({'url': 'http://hung/api/'}, 'dropped')
+            dispatcher.put({'url': 'https://other/api/'}, 'body')
+
+            self.assertTrue(posted.wait(5))
+        finally:
+            hung.set()
+
+        self.assertEqual(sorted(dispatcher.queues.keys()),
+                         [('http:', 'hung'), ('https:', 'other')])
+
+    def test_server(self):
+        self.assertEqual(http._server({'url': 'https://localhost/api/'}), ('https:', 'localhost'))
+        self.assertEqual(http._server({'url': '!@#$%'}), (None, '!@#$%'))
+        self.assertEqual(http._server({}), (None, None))
+
+
+class TestBatcher(unittest.TestCase):
+
+    def test_add_batch_size(self):
+        dispatcher = mock.Mock()
+        batcher = http.Batcher(dispatcher)
+        notifier_config = {'url': 'https://localhost/api/', 'batch_size': 2}
+
+        # Test
+        for n in range(3):
+            batcher.add(notifier_config, json.dumps({'n': n}))
+
+        # Verify
+        dispatcher.put.assert_called_once_with(notifier_config, '[{"n": 0},{"n": 1}]')
+        self.assertEqual(len(batcher.batches), 1)
+
+    def test_flush_batch_window(self):
+        dispatcher = mock.Mock()
+        batcher = http.Batcher(dispatcher)
+        notifier_config = {'url': 'https://localhost/api/', 'batch_window': 10}
+        batcher.add(notifier_config, '{"n": 0}')
+
+        # Test
+        batcher.flush(now=time.time())
+        self.assertFalse(dispatcher.put.called)
+        batcher.flush(now=time.time() + 10)
+
+        # Verify
+        dispatcher.put.assert_called_once_with(notifier_config, '[{"n": 0}]')
+        self.assertEqual(batcher.batches, {})
+
+    @mock.patch('pulp.server.event.http._send_post')
+    def test_shutdown(self, mock_send_post):
+        dispatcher = mock.Mock()
+        batcher = http.Batcher(dispatcher)
+        notifier_config = {'url': 'https://localhost/api/', 'batch_size': 10}
+        batcher.add(notifier_config, '{"n": 0}')
+        batcher.add(notifier_config, '{"n": 1}')
+
+        # Test
+        batcher.shutdown()
+
+        # Verify
+        mock_send_post.assert_called_once_with(notifier_config, '[{"n": 0},{"n": 1}]')
+        self.assertFalse(dispatcher.put.called)
+
+    @mock.patch('pulp.server.event.http.batcher')
+    @mock.patch('pulp.server.event.http.dispatcher')
+    def test_handle_event_batched(self, mock_dispatcher, mock_batcher):
+        notifier_config = {'url': 'https://localhost/api/', 'batch_window': 60}
+        event = mock.Mock()
+        event.data.return_value = {'k1': 'v1'}
+
+        # Test
+        http.handle_event(notifier_config, event)
+
+        # Verify
+        mock_batcher.add.assert_called_once_with(notifier_config, '{"k1": "v1"}')
+        self.assertFalse(mock_dispatcher.put.called)
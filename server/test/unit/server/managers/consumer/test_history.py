@@ -0,0 +1,128 @@
+"""
+This module contains tests for the pulp.server.managers.consumer.history module.
+"""
+from datetime import datetime
+import unittest
+
+import mock
+import pymongo
+
+from pulp.common import dateutils
+from pulp.server.compat import ObjectId
+from pulp.server.db.model.criteria import decode_continuation
+from pulp.server.exceptions import InvalidValue
+from pulp.server.managers.consumer import history
+
+
+@mock.patch('pulp.server.managers.consumer.history.ConsumerHistoryEvent.get_collection')
+class TestQuery(unittest.TestCase):
+    """
+    Tests for querying consumer history.
+    """
+
+    def setUp(self):
+        self.manager = history.ConsumerHistoryManager()
+
+    def test_filters(self, mock_get_collection):
+        """
+        The filters and the date range are compared as dates, and events are sorted by
+        timestamp and _id.
+        """
+        collection = mock_get_collection.return_value
+        cursor = collection.find.return_value
+        cursor.__iter__.return_value = iter([
+            {'_id': 1, 'timestamp': datetime(2015, 6, 1, 12, 30, 5)}])
+
+        events = self.manager.query(consumer_id='c1', event_type=history.TYPE_REPO_BOUND,
+                                    limit=10, sort='ascending', start_date='2015-06-01',
+                                    end_date='2015-06-02T10:00:00+02:00')
+
+        expected_spec = {'consumer_id': 'c1', 'type': history.TYPE_REPO_BOUND,
+                         'timestamp': {'$gte': datetime(2015, 6, 1, tzinfo=dateutils.utc_tz()),
+                                       '$lte': datetime(2015, 6, 2, 8,
+                                                        tzinfo=dateutils.utc_tz())}}
+        collection.find.assert_called_once_with(expected_spec, fields=None)
+        cursor.sort.assert_called_once_with([('timestamp', pymongo.ASCENDING),
+                                             ('_id', pymongo.ASCENDING)])
+        cursor.limit.assert_called_once_with(10)
+        self.assertEqual(events, [{'_id': 1, 'timestamp': '2015-06-01T12:30:05Z'}])
+
+    def test_fields(self, mock_get_collection):
+        """
+        The id and timestamp are always selected with the requested fields.
+        """
+        self.manager.query(fields=['type'])
+
+        fields = mock_get_collection.return_value.find.call_args[1]['fields']
+        self.assertEqual(sorted(fields), ['id', 'timestamp', 'type'])
+
+    def test_invalid(self, mock_get_collection):
+        """
+        Every invalid value is reported.
+        """
+        try:
+            self.manager.query(event_type='bogus', limit=0, sort='sideways',
+                               start_date='yesterday', fields=['_ns'])
+        except InvalidValue, e:
+            self.assertEqual(e.property_names,
+                             ['event_type', 'limit', 'sort', 'start_date', 'fields'])
+        else:
+            self.fail('InvalidValue should be raised')
+        self.assertFalse(mock_get_collection.called)
+
+    def test_continuation(self, mock_get_collection):
+        """
+        A page queried with the continuation of the previous page starts after its last event.
+        """
+        last_id = ObjectId()
+        page = [{'_id': ObjectId(), 'timestamp': '2015-06-01T12:30:06Z'},
+                {'_id': last_id, 'timestamp': '2015-06-01T12:30:05Z'}]
+        token = self.manager.continuation_token(page, 2)
+
+        self.manager.query(consumer_id='c1', limit=2, continuation=token)
+
+        timestamp = datetime(2015, 6, 1, 12, 30, 5, tzinfo=dateutils.utc_tz())
+        spec = mock_get_collection.return_value.find.call_args[0][0]
+        self.assertEqual(spec, {'$and': [
+            {'consumer_id': 'c1'},
+            {'$or': [{'timestamp': {'$lt': timestamp}},
+                     {'timestamp': timestamp, '_id': {'$lt': last_id}}]}]})
+
+    def test_continuation_other_sort(self, mock_get_collection):
+        """
+        A continuation created for one sort direction is rejected for the other.
+        """
+        page = [{'_id': ObjectId(), 'timestamp': '2015-06-01T12:30:05Z'}]
+        token = self.manager.continuation_token(page, 1, 'ascending')
+
+        self.assertRaises(InvalidValue, self.manager.query, continuation=token)
+
+
+class TestContinuationToken(unittest.TestCase):
+    """
+    Tests for creating the continuation of a page of consumer history.
+    """
+
+    def test_last_page(self):
+        """
+        There is no continuation without a limit or when the page is not full.
+        """
+        manager = history.ConsumerHistoryManager()
+        page = [{'_id': ObjectId(), 'timestamp': '2015-06-01T12:30:05Z'}]
+
+        self.assertTrue(manager.continuation_token(page, None) is None)
+        self.assertTrue(manager.continuation_token(page, 2) is None)
+
+    def test_full_page(self):
+        """
+        The continuation of a full page holds the sort values of its last event.
+        """
+        last_id = ObjectId()
+        page = [{'_id': last_id, 'timestamp': '2015-06-01T12:30:05Z'}]
+
+        token = history.ConsumerHistoryManager().continuation_token(page, 1)
+
+        self.assertEqual(decode_continuation(token),
+                         {'sort': [['timestamp', pymongo.DESCENDING], ['_id', pymongo.DESCENDING]],
+                          'values': [datetime(2015, 6, 1, 12, 30, 5, tzinfo=dateutils.utc_tz()),
+                                     last_id]})
@@ -0,0 +1,97 @@
+from uuid import uuid4
+
+from mock import patch
+
+from ....base import PulpServerTests
+from pulp.server.db.model.content import ContentCatalog, ContentDownload
+from pulp.server.managers import factory
+from pulp.server.managers.content.download import ContentDownloadManager
+
+
+TYPE_ID = 'type_a'
+UNIT_KEY = {'name': 'unit_1', 'version': '1.0', 'checksum': 'abc'}
+PATH = '/var/lib/pulp/content/type_a/unit_1'
+
+
+class TestDownloadManager(PulpServerTests):
+
+    def setUp(self):
+        super(TestDownloadManager, self).setUp()
+        ContentDownload.get_collection().remove()
+
+    def tearDown(self):
+        super(TestDownloadManager, self).tearDown()
+        ContentDownload.get_collection().remove()
+
+    def test_acquire(self):
+        owner = str(uuid4())
+        manager = ContentDownloadManager()
+        acquired = manager.acquire(owner, TYPE_ID, UNIT_KEY, PATH)
+        self.assertTrue(acquired)
+        collection = ContentDownload.get_collection()
+        entry = collection.find_one({'locator': ContentCatalog.get_locator(TYPE_ID, UNIT_KEY)})
+        self.assertEqual(entry['owner'], owner)
+        self.assertEqual(entry['type_id'], TYPE_ID)
+        self.assertEqual(entry['unit_key'], UNIT_KEY)
+        self.assertEqual(entry['path'], PATH)
+
+    def test_acquire_held(self):
+        manager = ContentDownloadManager()
+        self.assertTrue(manager.acquire('owner_1', TYPE_ID, UNIT_KEY, PATH))
+        self.assertFalse(manager.acquire('owner_2', TYPE_ID, UNIT_KEY, PATH))
+        entry = manager.find(TYPE_ID, UNIT_KEY)
+        self.assertEqual(entry['owner'], 'owner_1')
+
+    def test_acquire_abandoned(self):
+        manager = ContentDownloadManager()
+        self.assertTrue(manager.acquire('owner_1', TYPE_ID, UNIT_KEY, PATH, lease=-10))
+        self.assertTrue(manager.acquire('owner_2', TYPE_ID, UNIT_KEY, PATH))
+        collection = ContentDownload.get_collection()
+        self.assertEqual(collection.find().count(), 1)
+        entry = manager.find(TYPE_ID, UNIT_KEY)
+        self.assertEqual(entry['owner'], 'owner_2')
+
+    def test_release(self):
+        manager = ContentDownloadManager()
+        manager.acquire('owner_1', TYPE_ID, UNIT_KEY, PATH)
+        manager.release('owner_1', TYPE_ID, UNIT_KEY)
+        self.assertEqual(manager.find(TYPE_ID, UNIT_KEY), None)
+
+    def test_release_not_owner(self):
+        manager = ContentDownloadManager()
+        manager.acquire('owner_1', TYPE_ID, UNIT_KEY, PATH)
+        manager.release('owner_2', TYPE_ID, UNIT_KEY)
+        self.assertNotEqual(manager.find(TYPE_ID, UNIT_KEY), None)
+
+    def test_renew(self):
+        manager = ContentDownloadManager()
+        manager.acquire('owner_1', TYPE_ID, UNIT_KEY, PATH, lease=-10)
+        manager.renew('owner_2')
+        self.assertEqual(manager.find(TYPE_ID, UNIT_KEY), None)
+        manager.renew('owner_1')
+        self.assertEqual(manager.find(TYPE_ID, UNIT_KEY)['owner'], 'owner_1')
+
+    def test_find_expired(self):
+        manager = ContentDownloadManager()
+        manager.acquire('owner_1', TYPE_ID, UNIT_KEY, PATH, lease=-10)
+        self.assertEqual(manager.find(TYPE_ID, UNIT_KEY), None)
+
+    def test_wait_not_held(self):
+        manager = ContentDownloadManager()
+        self.assertTrue(manager.wait(TYPE_ID, UNIT_KEY, timeout=0))
+
+    @patch('pulp.server.managers.content.download.time.sleep')
+    def test_wait_released(self, fake_sleep):
+        manager = ContentDownloadManager()
+        manager.acquire('owner_1', TYPE_ID, UNIT_KEY, PATH)
+        fake_sleep.side_effect = lambda s: manager.release('owner_1', TYPE_ID, UNIT_KEY)
+        self.assertTrue(manager.wait(TYPE_ID, UNIT_KEY, timeout=10, interval=1))
+        fake_sleep.assert_called_once_with(1)
+
+    def test_wait_timeout(self):
+        manager = ContentDownloadManager()
+        manager.acquire('owner_1', TYPE_ID, UNIT_KEY, PATH)
+        self.assertFalse(manager.wait(TYPE_ID, UNIT_KEY, timeout=0))
+
+    def test_factory(self):
+        self.assertTrue(isinstance(factory.content_download_manager(), ContentDownloadManager))
@@ -14,6 +14,7 @@ from pulp.plugins.types import database as content_type_db
 from pulp.plugins.types.model import TypeDefinition
 from pulp.server import exceptions as pulp_exceptions
 from pulp.server.db import model
+from pulp.server.db.model.content import OrphanScanReport, OrphanScanUnit
 from pulp.server.db.model.repository import RepoContentUnit
 from pulp.server.managers import factory as manager_factory
 from pulp.server.managers.content.orphan import OrphanManager
@@ -101,6 +102,8 @@ class OrphanManagerTests(base.PulpServerTests):
     def tearDown(self):
         super(OrphanManagerTests, self).tearDown()
         RepoContentUnit.get_collection().remove()
+        OrphanScanReport.get_collection().remove()
+        OrphanScanUnit.get_collection().remove()
         content_type_db.clean()
         if os.path.exists(self.content_root):  # can be removed by delete operations
             shutil.rmtree(self.content_root)
@@ -203,6 +206,25 @@ class OrphanManagerGeneratorTests(OrphanManagerTests):
         orphans = list(self.orphan_manager.generate_all_orphans())
         self.assertEqual(len(orphans), 1)
 
+    def test_associated_unit_ids(self):
+        unit_1 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        unit_3 = gen_content_unit(PHONY_TYPE_2.id, self.content_root)
+        associate_content_unit_with_repo(unit_1)
+        associate_content_unit_with_repo(unit_3)
+
+        associated = self.orphan_manager.associated_unit_ids(PHONY_TYPE_1.id)
+        self.assertEqual(associated, set([unit_1['_id']]))
+
+    @patch('pulp.server.managers.content.orphan.OrphanManager.associated_unit_ids',
+           return_value=set())
+    def test_associated_since_using_generators(self, *unused):
+        unit = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        associate_content_unit_with_repo(unit)
+
+        orphans = list(self.orphan_manager.generate_orphans_by_type(PHONY_TYPE_1.id))
+        self.assertEqual(len(orphans), 0)
+
     def test_delete_one_orphan_using_generators(self):
         gen_content_unit(PHONY_TYPE_1.id, self.content_root)
         orphans = list(self.orphan_manager.generate_all_orphans())
@@ -269,6 +291,58 @@ class OrphanManagerGeneratorTests(OrphanManagerTests):
         self.assertEqual(len(orphans), 0)
         self.assertEqual(self.number_of_files_in_content_root(), 0)
 
+    def test_scan_orphans(self):
+        unit_1 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        unit_2 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        with open(unit_2['_storage_path'], 'w') as fp:
+            fp.write('1234')
+        unit_3 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        associate_content_unit_with_repo(unit_3)
+
+        self.orphan_manager.scan_orphans([PHONY_TYPE_1.id])
+
+        report = OrphanScanReport.get_collection().find_one({'content_type_id': PHONY_TYPE_1.id})
+        self.assertEqual(report['state'], OrphanScanReport.FINISHED)
+        self.assertEqual(report['count'], 2)
+        self.assertEqual(report['size'], 4)
+        scanned = OrphanScanUnit.get_collection().find({'content_type_id': PHONY_TYPE_1.id})
+        self.assertEqual(sorted(s['unit_id'] for s in scanned),
+                         sorted([unit_1['_id'], unit_2['_id']]))
+
+    def test_scan_orphans_resume(self):
+        units = [gen_content_unit(PHONY_TYPE_1.id, self.content_root) for n in range(3)]
+        units.sort(key=lambda u: u['_id'])
+        report = OrphanScanReport(PHONY_TYPE_1.id)
+        report.last_id = units[0]['_id']
+        OrphanScanReport.get_collection().insert(report)
+        OrphanScanUnit.get_collection().insert(
+            OrphanScanUnit(PHONY_TYPE_1.id, units[0]['_id'], units[0]['_storage_path'], 0))
+
+        with patch('pulp.server.managers.content.orphan.OrphanManager.disk_usage',
+                   return_value=0) as disk_usage:
+            report = self.orphan_manager.scan_orphans_by_type(PHONY_TYPE_1.id)
+
+        # only the units after the checkpoint are scanned
+        self.assertEqual(disk_usage.call_count, 2)
+        self.assertEqual(report['count'], 3)
+        self.assertEqual(report['last_id'], units[-1]['_id'])
+
+    def test_delete_scanned_orphans(self):
+        unit_1 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        unit_2 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        self.orphan_manager.scan_orphans([PHONY_TYPE_1.id])
+        # associated after the scan
+        associate_content_unit_with_repo(unit_2)
+
+        self.orphan_manager.delete_scanned_orphans()
+
+        self.assertFalse(os.path.exists(unit_1['_storage_path']))
+        self.assertTrue(os.path.exists(unit_2['_storage_path']))
+        self.assertEqual(OrphanScanReport.get_collection().find().count(), 0)
+        self.assertEqual(OrphanScanUnit.get_collection().find().count(), 0)
+        collection = content_type_db.type_units_collection(PHONY_TYPE_1.id)
+        self.assertEqual([u['_id'] for u in collection.find()], [unit_2['_id']])
+
     @patch('pulp.server.managers.content.orphan.OrphanManager.delete_orphaned_file')
     @patch('pulp.server.managers.content.orphan.model.RepositoryContentUnit.objects')
     @patch('pulp.server.managers.content.orphan.plugin_api.get_unit_model_by_id')
@@ -506,3 +580,66 @@ class TestDeleteOrphanedFile(TestCase):
         is_shared.assert_called_once_with(storage_dir, path)
         delete.assert_called_once_with(path)
         self.assertFalse(unlink_shared.called)
+
+    @patch('pulp.server.managers.content.orphan.pulp_config.config')
+    def test_delete_orphaned_files(self, config):
+        storage_dir = tempfile.mkdtemp()
+        try:
+            config.get.return_value = '/storage/pulp/dir'
+            type_dir = os.path.join(storage_dir, 'rpm')
+            paths = []
+            for name in ('a/1/f1', 'a/1/f2', 'a/2/f3', 'b/f4'):
+                path = os.path.join(type_dir, name)
+                if not os.path.exists(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                open(path, 'w').close()
+                paths.append(path)
+            kept = os.path.join(type_dir, 'b', 'kept')
+            open(kept, 'w').close()
+
+            # test
+            parent_dirs = OrphanManager.delete_orphaned_files(paths, threads=2)
+            OrphanManager.prune_empty_dirs(parent_dirs)
+
+            # validation
+            self.assertEqual(parent_dirs, set(os.path.dirname(p) for p in paths))
+            for path in paths:
+                self.assertFalse(os.path.exists(path))
+            self.assertFalse(os.path.exists(os.path.join(type_dir, 'a')))
+            self.assertTrue(os.path.exists(kept))
+            self.assertTrue(os.path.exists(type_dir))
+        finally:
+            shutil.rmtree(storage_dir)
+
+    @patch('pulp.server.managers.content.orphan.OrphanManager.prune_empty_dirs')
+    @patch('pulp.server.managers.content.orphan.OrphanManager._delete_orphaned_file')
+    @patch('pulp.server.managers.content.orphan.pulp_config.config')
+    def test_delete_orphaned_files_failed(self, config, _delete, prune):
+        """
+        A file that cannot be deleted does not stop the others from being deleted,
+        and the failure is reported once all of them have been tried.
+        """
+        paths = ['/tmp/a/f1', '/tmp/b/f2', '/tmp/c/f3', '/tmp/d/f4']
+        failed = set(['/tmp/a/f1', '/tmp/c/f3'])
+
+        def delete(storage_dir, path):
+            if path in failed:
+                raise OSError(13, 'Permission denied')
+            return True
+
+        _delete.side_effect = delete
+
+        # test
+        try:
+            OrphanManager.delete_orphaned_files(paths, threads=2)
+        except pulp_exceptions.PulpExecutionException, e:
+            self.assertTrue('2 orphaned files' in str(e))
+        else:
+            self.fail('PulpExecutionException should be raised')
+
+        # validation
+        self.assertEqual(_delete.call_count, 4)
+        prune.assert_called_once_with(set(['/tmp/b', '/tmp/d']))
+
+    def test_delete_orphaned_files_not_absolute_path(self):
+        self.assertRaises(ValueError, OrphanManager.delete_orphaned_files, ['path-1'])
@@ -7,6 +7,7 @@ import mock
 
 from pulp.server.db.connection import PulpCollection
 from pulp.server.db.model.criteria import Criteria
+from pulp.server.exceptions import InvalidValue
 from pulp.server.managers.content.query import ContentQueryManager
 from test_cud import PulpContentTests, TYPE_1_DEF, TYPE_1_UNITS, TYPE_2_DEF, TYPE_2_UNITS
 
@@ -145,3 +146,44 @@ class TestGetContentUnitIDs(unittest.TestCase):
         list(ret)
         expected_spec = {'$or': ({'a': 'foo'}, {'a': 'bar'})}
         mock_find.assert_called_once_with(expected_spec, fields=['_id'])
+
+
+@mock.patch('pulp.plugins.types.database.type_units_unit_key', return_value=['a', 'b'])
+@mock.patch('pulp.plugins.types.database.type_units_collection')
+class TestFindExistingUnits(unittest.TestCase):
+
+    def test_returns_ids_in_order(self, mock_type_collection, mock_type_unit_key):
+        mock_find = mock_type_collection.return_value.find
+        mock_find.return_value = [{'_id': 'def', 'a': 'bar', 'b': 2},
+                                  {'_id': 'abc', 'a': 'foo', 'b': 1}]
+        units = [{'type_id': 'fake_type', 'unit_key': {'a': 'foo', 'b': 1}},
+                 {'type_id': 'fake_type', 'unit_key': {'a': 'baz', 'b': 3}},
+                 {'type_id': 'fake_type', 'unit_key': {'a': 'bar', 'b': 2}},
+                 {'type_id': 'fake_type', 'unit_key': {'a': 'foo', 'b': 1}}]
+
+        ret = ContentQueryManager.find_existing_units(units)
+
+        self.assertEqual(ret, ['abc', None, 'def', 'abc'])
+        self.assertEqual(mock_find.call_count, 1)
+        self.assertEqual(len(mock_find.call_args[0][0]['$or']), 3)
+        self.assertEqual(mock_find.call_args[1], {'fields': ['_id', 'a', 'b']})
+
+    def test_skips_invalid_keys(self, mock_type_collection, mock_type_unit_key):
+        units = [{'type_id': 'fake_type', 'unit_key': {'a': 'foo'}}]
+
+        ret = ContentQueryManager.find_existing_units(units)
+
+        self.assertEqual(ret, [None])
+        self.assertFalse(mock_type_collection.return_value.find.called)
+
+    def test_unhashable_key_value(self, mock_type_collection, mock_type_unit_key):
+        units = [{'type_id': 'fake_type', 'unit_key': {'a': 'foo', 'b': [1]}}]
+
+        self.assertRaises(InvalidValue, ContentQueryManager.find_existing_units, units)
+        self.assertFalse(mock_type_collection.return_value.find.called)
+
+    def test_unknown_type(self, mock_type_collection, mock_type_unit_key):
+        mock_type_unit_key.return_value = None
+        units = [{'type_id': 'fake_type', 'unit_key': {'a': 'foo'}}]
+
+        self.assertRaises(InvalidValue, ContentQueryManager.find_existing_units, units)
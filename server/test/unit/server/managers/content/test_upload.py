@@ -1,6 +1,8 @@
 import errno
+import hashlib
 import os
 import shutil
+from StringIO import StringIO
 
 import unittest
 import mock
@@ -97,6 +99,76 @@ class ContentUploadManagerTests(base.PulpServerTests):
         except MissingResource, e:
             self.assertEqual(e.resources['upload_request'], 'foo')
 
+    def test_save_data_preallocated_out_of_order(self):
+
+        # Test
+        upload_id = self.upload_manager.initialize_upload(size=9)
+
+        uploaded_filename = self.upload_manager._upload_file_path(upload_id)
+        self.assertEqual(os.path.getsize(uploaded_filename), 9)
+
+        self.upload_manager.save_data(upload_id, 6, 'ghi')
+        self.upload_manager.save_data(upload_id, 0, 'abc')
+        self.upload_manager.save_data(upload_id, 3, 'def')
+
+        # Verify
+        self.assertEqual(self.upload_manager.read_upload(upload_id), 'abcdefghi')
+
+    def test_save_data_checksum(self):
+
+        # Test
+        upload_id = self.upload_manager.initialize_upload()
+        checksum = hashlib.sha256('abc').hexdigest()
+        self.upload_manager.save_data(upload_id, 0, 'abc', checksum=checksum)
+
+        # Verify
+        self.assertEqual(self.upload_manager.read_upload(upload_id), 'abc')
+
+    def test_save_data_bad_checksum(self):
+
+        # Test
+        upload_id = self.upload_manager.initialize_upload()
+        checksum = hashlib.sha256('xyz').hexdigest()
+        self.assertRaises(InvalidValue, self.upload_manager.save_data,
+                          upload_id, 0, 'abc', checksum=checksum)
+
+        # Verify
+        self.assertEqual(self.upload_manager.read_upload(upload_id), '')
+
+    @mock.patch('pulp.server.managers.content.upload.STREAM_BUFFER_SIZE', 4)
+    def test_save_stream(self):
+
+        # Test
+        upload_id = self.upload_manager.initialize_upload()
+        data = 'abcdefghij'
+        checksum = hashlib.sha256(data).hexdigest()
+        stream = StringIO(data + 'not part of the segment')
+        self.upload_manager.save_stream(upload_id, 0, stream, len(data), checksum=checksum)
+
+        # Verify
+        self.assertEqual(self.upload_manager.read_upload(upload_id), data)
+
+    def test_save_stream_short(self):
+
+        # Test
+        upload_id = self.upload_manager.initialize_upload()
+        self.assertRaises(InvalidValue, self.upload_manager.save_stream,
+                          upload_id, 0, StringIO('abc'), 10)
+
+    def test_save_stream_bad_checksum(self):
+
+        # Test
+        upload_id = self.upload_manager.initialize_upload()
+        checksum = hashlib.sha256('xyz').hexdigest()
+        self.assertRaises(InvalidValue, self.upload_manager.save_stream,
+                          upload_id, 0, StringIO('abc'), 3, checksum=checksum)
+
+    def test_save_stream_no_init(self):
+
+        # Test
+        self.assertRaises(MissingResource, self.upload_manager.save_stream,
+                          'foo', 0, StringIO('bar'), 3)
+
     def test_delete_upload(self):
 
         # Setup
@@ -205,6 +277,34 @@ class ContentUploadManagerTests(base.PulpServerTests):
         self.assertRaises(MissingResource, self.upload_manager.import_uploaded_unit, 'fake',
                           'mock-type', {}, {}, 'irrelevant')
 
+    @mock.patch('pulp.server.managers.content.upload.manager_factory')
+    @mock.patch.object(ContentUploadManager, 'is_valid_upload')
+    def test_import_existing_unit(self, mock_is_valid, mock_factory):
+        # Test
+        report = self.upload_manager.import_existing_unit('repo-u', 'mock-type', 'unit-1')
+
+        # Verify
+        mock_is_valid.assert_called_once_with('repo-u', 'mock-type')
+        mock_factory.content_query_manager.return_value.get_content_unit_by_id.\
+            assert_called_once_with('mock-type', 'unit-1', model_fields=['_id'])
+        mock_factory.repo_unit_association_manager.return_value.associate_unit_by_id.\
+            assert_called_once_with('repo-u', 'mock-type', 'unit-1')
+        self.assertTrue(report['success_flag'])
+
+    @mock.patch('pulp.server.managers.content.upload.manager_factory')
+    @mock.patch.object(ContentUploadManager, 'is_valid_upload')
+    def test_import_existing_unit_missing_unit(self, mock_is_valid, mock_factory):
+        query_manager = mock_factory.content_query_manager.return_value
+        query_manager.get_content_unit_by_id.side_effect = MissingResource('unit-1')
+
+        # Test
+        self.assertRaises(MissingResource, self.upload_manager.import_existing_unit,
+                          'repo-u', 'mock-type', 'unit-1')
+
+        # Verify
+        association_manager = mock_factory.repo_unit_association_manager.return_value
+        self.assertFalse(association_manager.associate_unit_by_id.called)
+
     @mock.patch('pulp.server.managers.repo.importer.model.Repository.objects')
     def test_import_uploaded_unit_importer_error(self, mock_repo_qs):
         self.importer_manager.set_importer('repo-u', 'mock-importer', {})
@@ -4,6 +4,7 @@ from .... import base
 from pulp.server.db.model.event import EventListener
 from pulp.server.event import data as event_data, notifiers
 from pulp.server.managers import factory as manager_factory
+from pulp.server.managers.event import fire
 
 
 class EventFireManagerTests(base.PulpServerTests):
@@ -18,6 +19,7 @@ class EventFireManagerTests(base.PulpServerTests):
         super(EventFireManagerTests, self).tearDown()
 
         EventListener.get_collection().remove()
+        fire.registry.invalidate()
         notifiers.reset()
 
     def test_do_fire(self):
@@ -103,6 +105,49 @@ class EventFireManagerTests(base.PulpServerTests):
         self.assertEqual({'2': '2'}, notifier_2.fire.call_args[0][0])
         self.assertEqual(event, notifier_2.fire.call_args[0][1])
 
+    def test_do_fire_cached_listeners(self):
+        # Setup
+        notifiers.NOTIFIER_FUNCTIONS.clear()
+
+        notifier_1 = mock.Mock()
+        notifiers.NOTIFIER_FUNCTIONS['notifier_1'] = notifier_1.fire
+
+        listener = self.event_manager.create(
+            'notifier_1', {}, [event_data.TYPE_REPO_SYNC_STARTED])
+        event = event_data.Event(event_data.TYPE_REPO_SYNC_STARTED, 'payload')
+        self.manager._do_fire(event)
+
+        # Test
+        with mock.patch.object(EventListener, 'get_collection') as mock_get_collection:
+            self.manager._do_fire(event)
+            self.assertFalse(mock_get_collection.called)
+
+        self.event_manager.delete(listener['_id'])
+        self.manager._do_fire(event)
+
+        # Verify
+        self.assertEqual(2, notifier_1.fire.call_count)
+
+    def test_do_fire_listeners_changed_in_other_process(self):
+        # Setup
+        notifiers.NOTIFIER_FUNCTIONS.clear()
+
+        notifier_1 = mock.Mock()
+        notifiers.NOTIFIER_FUNCTIONS['notifier_1'] = notifier_1.fire
+
+        self.event_manager.create('notifier_1', {}, [event_data.TYPE_REPO_SYNC_STARTED])
+        event = event_data.Event(event_data.TYPE_REPO_SYNC_STARTED, 'payload')
+        self.manager._do_fire(event)
+
+        # Test
+        # the listener is deleted by another process, using its own cache
+        EventListener.get_collection().remove()
+        fire.ListenerRegistry().invalidate()
+        self.manager._do_fire(event)
+
+        # Verify
+        self.assertEqual(1, notifier_1.fire.call_count)
+
     def test_fire_repo_sync_started(self):
         # Setup
         notifier = mock.Mock()
@@ -11,8 +11,10 @@ import mock
 from .... import base
 from pulp.common import dateutils
 from pulp.plugins.types import database, model
-from pulp.server.db.model.criteria import Criteria, UnitAssociationCriteria
+from pulp.server.db.model.criteria import (Criteria, UnitAssociationCriteria,
+                                           decode_continuation)
 from pulp.server.db.model.repository import RepoContentUnit
+from pulp.server.exceptions import InvalidValue
 import pulp.server.managers.content.cud as content_cud_manager
 import pulp.server.managers.factory as manager_factory
 import pulp.server.managers.repo.unit_association as association_manager
@@ -73,6 +75,117 @@ class RepoUnitAssociationQueryManagerTests(unittest.TestCase):
         ]
         self.assertEqual(return_value, expected_return_value)
 
+    def test__continuation_spec(self):
+        """
+        Test that the spec matches documents following the continuation in the sort order.
+        """
+        sort = [('name', association_query_manager.SORT_ASCENDING),
+                ('version', association_query_manager.SORT_DESCENDING),
+                ('_id', association_query_manager.SORT_ASCENDING)]
+        continuation = {'sort': [list(s) for s in sort], 'values': ['zsh', '5.0', 'unit-1']}
+
+        spec = association_query_manager.RepoUnitAssociationQueryManager._continuation_spec(
+            continuation, sort)
+
+        self.assertEqual(spec, {'$or': [
+            {'name': {'$gt': 'zsh'}},
+            {'name': 'zsh', 'version': {'$lt': '5.0'}},
+            {'name': 'zsh', 'version': None},
+            {'name': 'zsh', 'version': '5.0', '_id': {'$gt': 'unit-1'}}]})
+
+    def test__continuation_spec_missing_values(self):
+        """
+        Test that missing values are treated as sorting before all others.
+        """
+        sort = [('epoch', association_query_manager.SORT_ASCENDING),
+                ('arch', association_query_manager.SORT_DESCENDING),
+                ('_id', association_query_manager.SORT_ASCENDING)]
+        continuation = {'sort': sort, 'values': [None, None, 'unit-1']}
+
+        spec = association_query_manager.RepoUnitAssociationQueryManager._continuation_spec(
+            continuation, sort)
+
+        self.assertEqual(spec, {'$or': [
+            {'epoch': {'$ne': None}},
+            {'epoch': None, 'arch': None, '_id': {'$gt': 'unit-1'}}]})
+
+    def test__continuation_spec_different_sort(self):
+        """
+        Test that a continuation created for a different sort is rejected.
+        """
+        continuation = {'sort': [['_id', 1]], 'values': ['unit-1']}
+        sort = [('name', association_query_manager.SORT_ASCENDING), ('_id', 1)]
+
+        self.assertRaises(
+            InvalidValue,
+            association_query_manager.RepoUnitAssociationQueryManager._continuation_spec,
+            continuation, sort)
+
+    @mock.patch('pulp.server.managers.repo.unit_association_query.RepoUnitAssociationQueryManager.'
+                '_unit_associations_cursor')
+    def test_get_units_continuation_wrong_sort(self, mock_cursor):
+        """
+        Test that a continuation created for the other kind of sort is rejected.
+        """
+        manager = association_query_manager.RepoUnitAssociationQueryManager()
+        association_continuation = {'sort': [['created', -1], ['_id', 1]],
+                                    'values': ['then', 'a-1']}
+        unit_continuation = {'type_id': 'rpm', 'sort': [['_id', 1]], 'values': ['unit-1']}
+        association_sort = [('created', association_query_manager.SORT_DESCENDING)]
+
+        for criteria in (
+                UnitAssociationCriteria(continuation=association_continuation),
+                UnitAssociationCriteria(association_sort=association_sort,
+                                        continuation=unit_continuation),
+                UnitAssociationCriteria(continuation=dict(unit_continuation, type_id=None))):
+            self.assertRaises(InvalidValue, manager.get_units, 'repo-1', criteria)
+
+        self.assertFalse(mock_cursor.called)
+
+    def test_continuation_token_last_page(self):
+        """
+        Test that no token is created for a page smaller than the limit or without a limit.
+        """
+        manager = association_query_manager.RepoUnitAssociationQueryManager
+        units = [{'_id': 'a-1', 'unit_type_id': 'rpm', 'metadata': {'_id': 'unit-1'}}]
+
+        self.assertTrue(manager.continuation_token(UnitAssociationCriteria(limit=2), units) is None)
+        self.assertTrue(manager.continuation_token(UnitAssociationCriteria(), units) is None)
+
+    def test_continuation_token_association_sort(self):
+        """
+        Test that the token for association sorted units holds the association sort values.
+        """
+        manager = association_query_manager.RepoUnitAssociationQueryManager
+        criteria = UnitAssociationCriteria(
+            association_sort=[('created', association_query_manager.SORT_DESCENDING)], limit=1)
+        units = [{'_id': 'a-1', 'created': 'then', 'unit_type_id': 'rpm',
+                  'metadata': {'_id': 'unit-1'}}]
+
+        token = manager.continuation_token(criteria, units)
+
+        self.assertEqual(decode_continuation(token),
+                         {'sort': [['created', -1], ['_id', 1]], 'values': ['then', 'a-1']})
+
+    @mock.patch('pulp.server.managers.repo.unit_association_query.types_db')
+    def test_continuation_token_unit_sort(self, mock_types_db):
+        """
+        Test that the token for unit sorted units holds the type and unit key values.
+        """
+        mock_types_db.type_units_unit_key.return_value = ['name', 'checksum.sha256']
+        manager = association_query_manager.RepoUnitAssociationQueryManager
+        criteria = UnitAssociationCriteria(limit=1)
+        units = [{'_id': 'a-1', 'unit_type_id': 'rpm',
+                  'metadata': {'_id': 'unit-1', 'name': 'zsh', 'checksum': {'sha256': 'abc'}}}]
+
+        token = manager.continuation_token(criteria, units)
+
+        self.assertEqual(decode_continuation(token),
+                         {'type_id': 'rpm', 'sort': [['name', 1], ['checksum.sha256', 1],
+                                                     ['_id', 1]],
+                          'values': ['zsh', 'abc', 'unit-1']})
+        mock_types_db.type_units_unit_key.assert_called_once_with('rpm')
+
 
 class UnitAssociationQueryTests(base.PulpServerTests):
 
@@ -306,6 +419,46 @@ class UnitAssociationQueryTests(base.PulpServerTests):
         for su, au in zip(skip_units, all_units[2:]):
             self.assertEqual(su, au)
 
+    def test_get_units_continuation(self):
+        # Test
+        all_units = self.manager.get_units_across_types('repo-1')
+
+        pages = []
+        criteria = UnitAssociationCriteria(limit=2)
+        while True:
+            page = self.manager.get_units_across_types('repo-1', criteria)
+            pages.append(page)
+            token = self.manager.continuation_token(criteria, page)
+            if token is None:
+                break
+            criteria = UnitAssociationCriteria.from_client_input(
+                {'limit': 2, 'continuation': token})
+
+        # Verify
+        self.assertEqual(math.ceil(self.repo_1_count / 2.0), len(pages))
+        self.assertEqual(all_units, [u for p in pages for u in p])
+
+    def test_get_units_by_type_association_sort_continuation(self):
+        # Test
+        query = {'sort': {'association': [['created', 'descending']]}}
+        all_units = self.manager.get_units_by_type(
+            'repo-1', 'beta', UnitAssociationCriteria.from_client_input(query))
+
+        first_criteria = UnitAssociationCriteria.from_client_input(dict(query, limit=3))
+        first_page = self.manager.get_units_by_type('repo-1', 'beta', first_criteria)
+        token = self.manager.continuation_token(first_criteria, first_page)
+
+        query = {'sort': {'association': [['created', 'descending']]}, 'limit': 3,
+                 'continuation': token}
+        second_criteria = UnitAssociationCriteria.from_client_input(query)
+        second_page = self.manager.get_units_by_type('repo-1', 'beta', second_criteria)
+
+        # Verify
+        self.assertEqual(len(self.units['beta']), len(all_units))
+        self.assertEqual(all_units[:3], first_page)
+        self.assertEqual(all_units[3:], second_page)
+        self.assertTrue(self.manager.continuation_token(second_criteria, second_page) is None)
+
     def test_get_units_filter_created(self):
         # Test
         after_criteria = UnitAssociationCriteria(
@@ -178,6 +178,55 @@ class TestGetEnabled(unittest.TestCase):
         mock_get_collection.assert_called_once_with()
 
 
+class TestGetChangedSince(unittest.TestCase):
+    @mock.patch('pulp.server.db.model.dispatch.ScheduledCall.get_collection')
+    def test_query(self, mock_get_collection):
+        mock_get_collection.return_value.query.return_value = SCHEDULES
+
+        now = time.time()
+        ret = list(utils.get_changed_since(now))
+
+        criteria = mock_get_collection.return_value.query.call_args[0][0]
+        self.assertTrue(isinstance(criteria, Criteria))
+        # disabled schedules must be included so they can be removed
+        self.assertEqual(criteria.filters, {'last_updated': {'$gt': now}})
+        self.assertEqual(len(ret), 3)
+
+
+class TestGetEnabledSummary(unittest.TestCase):
+    @mock.patch('pulp.server.db.model.dispatch.ScheduledCall.get_collection')
+    def test_summary(self, mock_get_collection):
+        mock_aggregate = mock_get_collection.return_value.aggregate
+        mock_aggregate.return_value = iter([{'_id': None, 'count': 2, 'last_updated': 5.0}])
+
+        ret = utils.get_enabled_summary()
+
+        self.assertEqual(ret, (2, 5.0))
+        pipeline = mock_aggregate.call_args[0][0]
+        self.assertEqual(pipeline[0], {'$match': {'enabled': True}})
+        self.assertEqual(mock_aggregate.call_args[1], {'cursor': {}})
+
+    @mock.patch('pulp.server.db.model.dispatch.ScheduledCall.get_collection')
+    def test_no_enabled_schedules(self, mock_get_collection):
+        mock_get_collection.return_value.aggregate.return_value = iter([])
+
+        self.assertEqual(utils.get_enabled_summary(), (0, 0))
+
+
+class TestGetEnabledIds(unittest.TestCase):
+    @mock.patch('pulp.server.db.model.dispatch.ScheduledCall.get_collection')
+    def test_ids(self, mock_get_collection):
+        schedule_id = ObjectId()
+        mock_get_collection.return_value.query.return_value = [{'_id': schedule_id}]
+
+        ret = utils.get_enabled_ids()
+
+        self.assertEqual(ret, set([str(schedule_id)]))
+        criteria = mock_get_collection.return_value.query.call_args[0][0]
+        self.assertEqual(criteria.filters, {'enabled': True})
+        self.assertEqual(criteria.fields, ['_id'])
+
+
 class TestDelete(unittest.TestCase):
     schedule_id = str(ObjectId())
 
@@ -511,3 +560,18 @@ SCHEDULES = [
         u'total_run_count': 1087,
     },
 ]
+
+
+class TestValidateUpdatedScheduleOptions(unittest.TestCase):
+    def test_valid_jitter(self):
+        for jitter in (None, 0, 600):
+            utils.validate_updated_schedule_options({'jitter': jitter})
+
+    def test_invalid_jitter(self):
+        for jitter in (-1, '600', 1.5):
+            try:
+                utils.validate_updated_schedule_options({'jitter': jitter})
+            except exceptions.InvalidValue, e:
+                self.assertEqual(e.property_names, ['jitter'])
+            else:
+                self.fail('InvalidValue not raised for %r' % jitter)
@@ -0,0 +1,197 @@
+import gzip
+import json
+import unittest
+import zlib
+from StringIO import StringIO
+
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+import mock
+
+from pulp.server.webservices.middleware import compression
+
+
+CONTENT = json.dumps([{'id': 'unit-%d' % i, 'checksum': 'abc' * 10} for i in range(100)])
+
+
+class TestNegotiateEncoding(unittest.TestCase):
+    """
+    Tests for choosing the content coding from an Accept-Encoding header.
+    """
+
+    def test_negotiate_encoding(self):
+        """
+        The coding with the highest quality wins, gzip is preferred on a tie, and codings with a
+        quality of zero are never chosen.
+        """
+        for header, expected in (('', None),
+                                 ('identity', None),
+                                 ('gzip', 'gzip'),
+                                 ('deflate', 'deflate'),
+                                 ('deflate, gzip', 'gzip'),
+                                 ('gzip;q=0.5, deflate', 'deflate'),
+                                 ('GZIP; Q=0.8', 'gzip'),
+                                 ('gzip;q=0, deflate;q=0', None),
+                                 ('gzip;q=bogus, deflate', 'deflate'),
+                                 ('*', 'gzip'),
+                                 ('*, gzip;q=0', 'deflate')):
+            self.assertEqual(compression.negotiate_encoding(header), expected, header)
+
+
+@mock.patch('pulp.server.webservices.middleware.compression.config')
+class TestCompressionMiddleware(unittest.TestCase):
+    """
+    Tests for the response compression middleware.
+    """
+
+    def _middleware(self, mock_config, level=6, min_size=200):
+        settings = {'response_compression_level': level,
+                    'response_compression_min_size': min_size}
+        mock_config.getint.side_effect = lambda section, name: settings[name]
+        return compression.CompressionMiddleware()
+
+    def _request(self, accept_encoding='gzip, deflate'):
+        request = mock.MagicMock()
+        request.META = {'HTTP_ACCEPT_ENCODING': accept_encoding}
+        return request
+
+    def test_gzip(self, mock_config):
+        """
+        A large response is gzip compressed and its entity tag becomes weak.
+        """
+        response = HttpResponse(CONTENT, content_type='application/json')
+        response['ETag'] = '"abc"'
+        response = self._middleware(mock_config).process_response(self._request(), response)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertTrue(len(response.content) < len(CONTENT))
+        self.assertEqual(gzip.GzipFile(fileobj=StringIO(response.content)).read(), CONTENT)
+
+    def test_deflate(self, mock_config):
+        """
+        Deflate is used when it is the only coding the client accepts.
+        """
+        response = HttpResponse(CONTENT, content_type='application/json')
+        response = self._middleware(mock_config, level=9).process_response(
+            self._request('deflate'), response)
+
+        self.assertEqual(response['Content-Encoding'], 'deflate')
+        self.assertEqual(zlib.decompress(response.content), CONTENT)
+
+    def test_not_accepted(self, mock_config):
+        """
+        The response is not compressed if the client does not accept a supported coding.
+        """
+        response = HttpResponse(CONTENT, content_type='application/json')
+        response['ETag'] = '"abc"'
+        response = self._middleware(mock_config).process_response(
+            self._request('identity'), response)
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], '"abc"')
+        self.assertEqual(response.content, CONTENT)
+
+    def test_small(self, mock_config):
+        """
+        Responses below the minimum size are not compressed.
+        """
+        response = HttpResponse(CONTENT, content_type='application/json')
+        response['ETag'] = '"abc"'
+        response = self._middleware(mock_config, min_size=len(CONTENT) + 1).process_response(
+            self._request(), response)
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertEqual(response.content, CONTENT)
+
+    def test_disabled(self, mock_config):
+        """
+        A compression level of 0 disables the middleware.
+        """
+        response = HttpResponse(CONTENT, content_type='application/json')
+        response = self._middleware(mock_config, level=0).process_response(
+            self._request(), response)
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+        self.assertEqual(response.content, CONTENT)
+
+    def test_not_modified(self, mock_config):
+        """
+        Not modified responses have no body to compress, but carry the same weak entity tag as
+        the compressed response the client cached.
+        """
+        response = HttpResponseNotModified()
+        response['ETag'] = '"abc"'
+        response = self._middleware(mock_config, min_size=0).process_response(
+            self._request(), response)
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+
+    def test_not_modified_not_accepted(self, mock_config):
+        """
+        The entity tag of a not modified response stays strong if the client does not accept a
+        supported coding, or compression is disabled.
+        """
+        for accept_encoding, level in (('identity', 6), ('gzip', 0)):
+            response = HttpResponseNotModified()
+            response['ETag'] = '"abc"'
+            response = self._middleware(mock_config, level=level).process_response(
+                self._request(accept_encoding), response)
+
+            self.assertEqual(response['ETag'], '"abc"')
+
+    def test_already_encoded(self, mock_config):
+        """
+        A response that already has a content coding is left alone.
+        """
+        response = HttpResponse('x' * 1000, content_type='application/octet-stream')
+        response['Content-Encoding'] = 'br'
+        response = self._middleware(mock_config).process_response(self._request(), response)
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response.content, 'x' * 1000)
+
+    def test_incompressible(self, mock_config):
+        """
+        The original content is kept if compressing does not make it smaller.
+        """
+        content = zlib.compress(CONTENT)
+        response = HttpResponse(content, content_type='application/octet-stream')
+        response = self._middleware(mock_config, min_size=0).process_response(
+            self._request(), response)
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, content)
+
+    def test_streaming(self, mock_config):
+        """
+        Streaming responses are compressed as they are written.
+        """
+        chunks = [CONTENT[i:i + 100] for i in range(0, len(CONTENT), 100)]
+        response = StreamingHttpResponse(iter(chunks), content_type='application/json')
+        response = self._middleware(mock_config).process_response(self._request(), response)
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        compressed = ''.join(response.streaming_content)
+        self.assertEqual(gzip.GzipFile(fileobj=StringIO(compressed)).read(), CONTENT)
+
+    def test_streaming_small(self, mock_config):
+        """
+        A stream shorter than the minimum size is sent as it is, including the chunks that were
+        read to find that out.
+        """
+        chunks = ['[1, ', '2, ', '3]']
+        response = StreamingHttpResponse(iter(chunks), content_type='application/json')
+        response = self._middleware(mock_config).process_response(self._request(), response)
+
+        self.assertTrue(response.streaming)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(''.join(response.streaming_content), '[1, 2, 3]')
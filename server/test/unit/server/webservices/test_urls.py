@@ -77,6 +77,22 @@ class TestDjangoContentUrls(unittest.TestCase):
         url_name = 'content_orphan_collection'
         assert_url_match(url, url_name)
 
+    def test_match_content_orphan_scan_collection(self):
+        """
+        Test url matching for content_orphan_scan_collection.
+        """
+        url = '/v2/content/orphan_scans/'
+        url_name = 'content_orphan_scan_collection'
+        assert_url_match(url, url_name)
+
+    def test_match_content_orphan_scan_reclaim(self):
+        """
+        Test url matching for content_orphan_scan_reclaim.
+        """
+        url = '/v2/content/orphan_scans/actions/reclaim/'
+        url_name = 'content_orphan_scan_reclaim'
+        assert_url_match(url, url_name)
+
     def test_match_content_units_collection(self):
         """
         Test the url matching for content_units_collection.
@@ -133,6 +149,14 @@ class TestDjangoContentUrls(unittest.TestCase):
         url_name = 'content_actions_delete_orphans'
         assert_url_match(url, url_name)
 
+    def test_match_content_actions_find_existing_units(self):
+        """
+        Test url matching for content_actions_find_existing_units.
+        """
+        url = '/v2/content/actions/find_existing_units/'
+        url_name = 'content_actions_find_existing_units'
+        assert_url_match(url, url_name)
+
     def test_match_content_orphan_resource(self):
         """
         Test url matching for content_orphan_resource.
@@ -559,6 +583,14 @@ class TestDjangoTasksUrls(unittest.TestCase):
         url_name = 'task_search'
         assert_url_match(url, url_name)
 
+    def test_match_task_actions_status(self):
+        """
+        Test the matching for task_actions_status.
+        """
+        url = '/v2/tasks/actions/status/'
+        url_name = 'task_actions_status'
+        assert_url_match(url, url_name)
+
 
 class TestDjangoRolesUrls(unittest.TestCase):
     """
@@ -416,7 +416,7 @@ class TestConsumerSearchView(unittest.TestCase):
         Ensure that the ConsumerSearchView has the correct class attributes.
         """
         self.assertEqual(ConsumerSearchView.response_builder,
-                         util.generate_json_response_with_pulp_encoder)
+                         util.generate_json_streaming_response_with_pulp_encoder)
         self.assertEqual(ConsumerSearchView.optional_bool_fields, ('details', 'bindings'))
         self.assertTrue(isinstance(ConsumerSearchView.manager, query.ConsumerQueryManager))
 
@@ -479,7 +479,7 @@ class TestConsumerBindingSearchView(unittest.TestCase):
         Ensure that the ConsumerBindingSearchView has the correct class attributes.
         """
         self.assertEqual(ConsumerBindingSearchView.response_builder,
-                         util.generate_json_response_with_pulp_encoder)
+                         util.generate_json_streaming_response_with_pulp_encoder)
         self.assertTrue(isinstance(ConsumerBindingSearchView.manager, bind.BindManager))
 
     @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
@@ -891,7 +891,8 @@ class TestConsumerHistoryView(unittest.TestCase):
         mock_history.return_value.query.assert_called_once_with(sort='descending', event_type=None,
                                                                 end_date=None, start_date=None,
                                                                 consumer_id='test-consumer',
-                                                                limit=None)
+                                                                limit=None, continuation=None,
+                                                                fields=None)
         mock_resp.assert_called_once_with({'mock': 'some-history'})
         self.assertTrue(response is mock_resp.return_value)
 
@@ -915,7 +916,8 @@ class TestConsumerHistoryView(unittest.TestCase):
         mock_history.return_value.query.assert_called_once_with(sort='descending', limit=2,
                                                                 event_type='registered',
                                                                 end_date=None, start_date=None,
-                                                                consumer_id='test-consumer')
+                                                                consumer_id='test-consumer',
+                                                                continuation=None, fields=None)
         mock_resp.assert_called_once_with({'mock': 'some-history'})
         self.assertTrue(response is mock_resp.return_value)
 
@@ -939,7 +941,8 @@ class TestConsumerHistoryView(unittest.TestCase):
         mock_history.return_value.query.assert_called_once_with(sort='descending', limit=None,
                                                                 event_type=None,
                                                                 end_date=None, start_date=None,
-                                                                consumer_id='test-consumer')
+                                                                consumer_id='test-consumer',
+                                                                continuation=None, fields=None)
         mock_resp.assert_called_once_with([])
         self.assertTrue(response is mock_resp.return_value)
 
@@ -965,6 +968,34 @@ class TestConsumerHistoryView(unittest.TestCase):
         self.assertEqual(response.http_status_code, 400)
         self.assertEqual(response.error_data['property_names'], ['limit'])
 
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch(
+        'pulp.server.webservices.views.consumers.generate_json_response_with_pulp_encoder')
+    @mock.patch('pulp.server.webservices.views.consumers.factory.consumer_manager')
+    @mock.patch('pulp.server.webservices.views.consumers.factory.consumer_history_manager')
+    def test_consumer_history_paged(self, mock_history, mock_consumer, mock_resp):
+        """
+        Test that the fields and continuation are passed to the query, and that the token for
+        the next page is returned in a header.
+        """
+        mock_history.return_value.query.return_value = [{'type': 'repo_bound'}]
+        mock_history.return_value.continuation_token.return_value = 'next-token'
+        request = mock.MagicMock()
+        request.GET = {'limit': '1', 'continuation': 'token', 'fields': 'type, details'}
+        consumer_history = ConsumerHistoryView()
+        response = consumer_history.get(request, 'test-consumer')
+
+        mock_history.return_value.query.assert_called_once_with(sort='descending', limit=1,
+                                                                event_type=None,
+                                                                end_date=None, start_date=None,
+                                                                consumer_id='test-consumer',
+                                                                continuation='token',
+                                                                fields=['type', 'details'])
+        mock_history.return_value.continuation_token.assert_called_once_with(
+            [{'type': 'repo_bound'}], 1, 'descending')
+        response.__setitem__.assert_called_once_with(util.CONTINUATION_HEADER, 'next-token')
+
 
 class TestConsumerProfilesView(unittest.TestCase):
     """
@@ -1053,7 +1084,7 @@ class TestConsumerProfileSearchView(unittest.TestCase):
         Ensure that the ConsumerProfileSearchView has the correct class attributes.
         """
         self.assertEqual(ConsumerProfileSearchView.response_builder,
-                         util.generate_json_response_with_pulp_encoder)
+                         util.generate_json_streaming_response_with_pulp_encoder)
         self.assertTrue(isinstance(ConsumerProfileSearchView.manager, profile.ProfileManager))
 
 
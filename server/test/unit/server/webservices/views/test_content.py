@@ -7,7 +7,7 @@ from django.http import HttpResponseBadRequest, HttpResponseNotFound
 
 from base import assert_auth_CREATE, assert_auth_DELETE, assert_auth_READ, assert_auth_UPDATE
 from pulp.server import constants
-from pulp.server.exceptions import InvalidValue, MissingResource, OperationPostponed
+from pulp.server.exceptions import InvalidValue, MissingResource, MissingValue, OperationPostponed
 from pulp.server.webservices.views.content import (
     CatalogResourceView,
     ContentSourceCollectionActionView,
@@ -19,8 +19,11 @@ from pulp.server.webservices.views.content import (
     ContentUnitSearch,
     ContentUnitUserMetadataResourceView,
     DeleteOrphansActionView,
+    ExistingUnitsActionView,
     OrphanCollectionView,
     OrphanResourceView,
+    OrphanScanCollectionView,
+    OrphanScanReclaimActionView,
     OrphanTypeSubCollectionView,
     UploadResourceView,
     UploadsCollectionView,
@@ -213,6 +216,55 @@ class TestOrphanResourceView(unittest.TestCase):
         mock_orphan.return_value.get_orphan.assert_called_once_with('mock_type', 'mock_id')
 
 
+class TestExistingUnitsActionView(unittest.TestCase):
+    """
+    Tests for the view that finds units already stored on the server.
+    """
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.content.generate_json_response')
+    @mock.patch('pulp.server.webservices.views.content.content_query')
+    def test_post(self, mock_query, mock_resp):
+        """
+        The view should return the ids of the units found by the query manager.
+        """
+        units = [{'type_id': 'mock-type', 'unit_key': {'a': 1}},
+                 {'type_id': 'mock-type', 'unit_key': {'a': 2}}]
+        find = mock_query.ContentQueryManager.find_existing_units
+        find.return_value = ['unit-1', None]
+        request = mock.MagicMock()
+        request.body = json.dumps({'units': units})
+
+        response = ExistingUnitsActionView().post(request)
+
+        find.assert_called_once_with(units)
+        mock_resp.assert_called_once_with(['unit-1', None])
+        self.assertTrue(response is mock_resp.return_value)
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    def test_post_missing_units(self):
+        """
+        The view should require the list of units.
+        """
+        request = mock.MagicMock()
+        request.body = json.dumps({})
+
+        self.assertRaises(MissingValue, ExistingUnitsActionView().post, request)
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    def test_post_invalid_unit(self):
+        """
+        The view should require a type_id and unit_key for each unit.
+        """
+        request = mock.MagicMock()
+        request.body = json.dumps({'units': [{'type_id': 'mock-type'}]})
+
+        self.assertRaises(InvalidValue, ExistingUnitsActionView().post, request)
+
+
 class TestDeleteOrphansActionView(unittest.TestCase):
     """
     Tests for the Delete Orphans Action view, deprecated in 2.4.
@@ -262,6 +314,86 @@ class TestDeleteOrphansActionView(unittest.TestCase):
         )
 
 
+class TestOrphanScanCollectionView(unittest.TestCase):
+    """
+    Tests for views of orphan scans.
+    """
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.content.generate_json_response_with_pulp_encoder')
+    @mock.patch('pulp.server.webservices.views.content.factory')
+    def test_get_orphan_scans(self, mock_factory, mock_resp):
+        """
+        Orphan scan collection should create a response from the list of scan reports.
+        """
+        reports = [{'content_type_id': 'mock_type', 'count': 1, 'size': 10}]
+        mock_factory.content_orphan_manager.return_value.orphan_scan_reports.return_value = reports
+        request = mock.MagicMock()
+
+        response = OrphanScanCollectionView().get(request)
+
+        mock_resp.assert_called_once_with(reports)
+        self.assertTrue(response is mock_resp.return_value)
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_CREATE())
+    @mock.patch('pulp.server.webservices.views.content.content_orphan')
+    @mock.patch('pulp.server.webservices.views.content.tags')
+    def test_post_orphan_scans(self, mock_tags, mock_orphan_manager):
+        """
+        Posting to the orphan scan collection should dispatch a scan_orphans task.
+        """
+        request = mock.MagicMock()
+        request.body = json.dumps({'content_types': ['mock_type']})
+        mock_tags.action_tag.return_value = 'mock_action_tag'
+        mock_tags.resource_tag.return_value = 'mock_resource_tag'
+
+        self.assertRaises(OperationPostponed, OrphanScanCollectionView().post, request)
+
+        mock_orphan_manager.scan_orphans.apply_async.assert_called_once_with(
+            [['mock_type']], tags=['mock_action_tag', 'mock_resource_tag']
+        )
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_CREATE())
+    @mock.patch('pulp.server.webservices.views.content.content_orphan')
+    def test_post_orphan_scans_invalid_types(self, mock_orphan_manager):
+        """
+        Content types must be a list.
+        """
+        request = mock.MagicMock()
+        request.body = json.dumps({'content_types': 'mock_type'})
+
+        self.assertRaises(InvalidValue, OrphanScanCollectionView().post, request)
+        self.assertFalse(mock_orphan_manager.scan_orphans.apply_async.called)
+
+
+class TestOrphanScanReclaimActionView(unittest.TestCase):
+    """
+    Tests for the orphan scan reclaim action view.
+    """
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_DELETE())
+    @mock.patch('pulp.server.webservices.views.content.content_orphan')
+    @mock.patch('pulp.server.webservices.views.content.tags')
+    def test_post_reclaim(self, mock_tags, mock_orphan_manager):
+        """
+        Reclaim should dispatch a delete_scanned_orphans task for all content types.
+        """
+        request = mock.MagicMock()
+        request.body = None
+        mock_tags.action_tag.return_value = 'mock_action_tag'
+        mock_tags.resource_tag.return_value = 'mock_resource_tag'
+
+        self.assertRaises(OperationPostponed, OrphanScanReclaimActionView().post, request)
+
+        mock_orphan_manager.delete_scanned_orphans.apply_async.assert_called_once_with(
+            [None], tags=['mock_action_tag', 'mock_resource_tag']
+        )
+
+
 class TestCatalogResourceView(unittest.TestCase):
     """
     Tests for the catalog resource view.
@@ -327,8 +459,8 @@ class TestContentUnitSearch(unittest.TestCase):
         content_search = ContentUnitSearch()
         mock_query = mock.MagicMock()
         mock_search = mock.MagicMock(return_value=['result_1', 'result_2'])
-        serialized_results = content_search.get_results(mock_query, mock_search, {},
-                                                        type_id='mock_type')
+        serialized_results = list(content_search.get_results(mock_query, mock_search, {},
+                                                             type_id='mock_type'))
         mock_process.assert_has_calls([mock.call('result_1', 'mock_type'),
                                        mock.call('result_2', 'mock_type')])
         self.assertEqual(serialized_results, [mock_process.return_value, mock_process.return_value])
@@ -343,14 +475,35 @@ class TestContentUnitSearch(unittest.TestCase):
         content_search = ContentUnitSearch()
         mock_query = mock.MagicMock()
         mock_search = mock.MagicMock(return_value=['result_1', 'result_2'])
-        serialized_results = content_search.get_results(
+        mock_add_repo.side_effect = lambda units, type_id: units
+        serialized_results = list(content_search.get_results(
             mock_query, mock_search, {'include_repos': True}, type_id='mock_type'
-        )
+        ))
         mock_process.assert_has_calls([mock.call('result_1', 'mock_type'),
                                        mock.call('result_2', 'mock_type')])
         self.assertEqual(serialized_results, [mock_process.return_value, mock_process.return_value])
         mock_add_repo.assert_called_once_with([mock_process(), mock_process()], 'mock_type')
 
+    @mock.patch('pulp.server.webservices.views.content.REPO_MEMBERSHIP_BATCH_SIZE', 2)
+    @mock.patch('pulp.server.webservices.views.content.ContentUnitSearch._add_repo_memberships')
+    @mock.patch('pulp.server.webservices.views.content._process_content_unit')
+    def test_get_results_with_repos_batched(self, mock_process, mock_add_repo):
+        """
+        Repo memberships should be looked up for a batch of units at a time.
+        """
+        mock_process.side_effect = lambda unit, type_id: unit
+        mock_add_repo.side_effect = lambda units, type_id: units
+        mock_search = mock.MagicMock(return_value=['unit_1', 'unit_2', 'unit_3'])
+
+        serialized_results = list(ContentUnitSearch().get_results(
+            mock.MagicMock(), mock_search, {'include_repos': True}, type_id='mock_type'
+        ))
+
+        self.assertEqual(serialized_results, ['unit_1', 'unit_2', 'unit_3'])
+        self.assertEqual(mock_add_repo.call_args_list,
+                         [mock.call(['unit_1', 'unit_2'], 'mock_type'),
+                          mock.call(['unit_3'], 'mock_type')])
+
 
 class TestContentUnitResourceView(unittest.TestCase):
     """
@@ -578,12 +731,49 @@ class TestUploadsCollectionView(unittest.TestCase):
         content_types_view = UploadsCollectionView()
         response = content_types_view.post(request)
 
-        self.assertTrue(mock_upload_manager.initialize_upload.called)
+        mock_upload_manager.initialize_upload.assert_called_once_with(size=None)
 
         mock_resp.assert_called_once_with({'upload_id': 'mock_id', '_href': '/mock/path/'})
         mock_redirect.assert_called_once_with(mock_resp.return_value, '/mock/path/')
         self.assertTrue(response is mock_redirect.return_value)
 
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_CREATE())
+    @mock.patch('pulp.server.webservices.views.content.generate_redirect_response')
+    @mock.patch('pulp.server.webservices.views.content.generate_json_response')
+    @mock.patch('pulp.server.webservices.views.content.reverse')
+    @mock.patch('pulp.server.webservices.views.content.factory')
+    def test_post_uploads_collection_view_size(self, mock_factory, mock_reverse, mock_resp,
+                                               mock_redirect):
+        """
+        View post should pass the size of the file to be uploaded to the manager.
+        """
+        mock_upload_manager = mock.MagicMock()
+        mock_upload_manager.initialize_upload.return_value = 'mock_id'
+        mock_factory.content_upload_manager.return_value = mock_upload_manager
+
+        request = mock.MagicMock()
+        request.body = json.dumps({'size': 1024})
+        mock_reverse.return_value = '/mock/path/'
+
+        content_types_view = UploadsCollectionView()
+        content_types_view.post(request)
+
+        mock_upload_manager.initialize_upload.assert_called_once_with(size=1024)
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_CREATE())
+    @mock.patch('pulp.server.webservices.views.content.factory')
+    def test_post_uploads_collection_view_bad_size(self, mock_factory):
+        """
+        View post should reject a size that is not a non-negative integer.
+        """
+        request = mock.MagicMock()
+        request.body = json.dumps({'size': -1})
+
+        content_types_view = UploadsCollectionView()
+        self.assertRaises(InvalidValue, content_types_view.post, request)
+
 
 class TestUploadSegmentResourceView(unittest.TestCase):
     """
@@ -601,15 +791,53 @@ class TestUploadSegmentResourceView(unittest.TestCase):
         mock_upload_manager = mock.MagicMock()
         mock_factory.content_upload_manager.return_value = mock_upload_manager
         request = mock.MagicMock()
-        request.body = 'upload these bits'
+        request.META = {'CONTENT_LENGTH': '17'}
+        request.GET = {}
 
         upload_segment_resource = UploadSegmentResourceView()
         response = upload_segment_resource.put(request, 'mock_id', 4)
 
-        mock_upload_manager.save_data.assert_called_once_with('mock_id', 4, 'upload these bits')
+        mock_upload_manager.save_stream.assert_called_once_with('mock_id', 4, request, 17,
+                                                                checksum=None)
         mock_resp.assert_called_once_with(None)
         self.assertTrue(response is mock_resp.return_value)
 
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_UPDATE())
+    @mock.patch('pulp.server.webservices.views.content.generate_json_response')
+    @mock.patch('pulp.server.webservices.views.content.factory')
+    def test_put_upload_segment_resource_checksum(self, mock_factory, mock_resp):
+        """
+        Test the UploadSegmentResourceView passes the segment checksum to the manager
+        """
+        mock_upload_manager = mock.MagicMock()
+        mock_factory.content_upload_manager.return_value = mock_upload_manager
+        request = mock.MagicMock()
+        request.META = {'CONTENT_LENGTH': '17'}
+        request.GET = {'checksum': 'abc123'}
+
+        upload_segment_resource = UploadSegmentResourceView()
+        upload_segment_resource.put(request, 'mock_id', 4)
+
+        mock_upload_manager.save_stream.assert_called_once_with('mock_id', 4, request, 17,
+                                                                checksum='abc123')
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_UPDATE())
+    @mock.patch('pulp.server.webservices.views.content.factory')
+    def test_put_upload_segment_resource_bad_content_length(self, mock_factory):
+        """
+        Test the UploadSegmentResourceView with an invalid Content-Length header
+        """
+        request = mock.MagicMock()
+        request.META = {'CONTENT_LENGTH': 'invalid'}
+
+        upload_segment_resource = UploadSegmentResourceView()
+
+        self.assertRaises(InvalidValue, upload_segment_resource.put,
+                          request, 'mock_id', 4)
+        self.assertFalse(mock_factory.content_upload_manager.return_value.save_stream.called)
+
     @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
                 new=assert_auth_UPDATE())
     @mock.patch('pulp.server.webservices.views.content.factory')
@@ -16,8 +16,9 @@ from pulp.server.db import model
 from pulp.server.managers.repo import distributor
 from pulp.server.webservices.views import repositories, util, search
 from pulp.server.webservices.views.repositories import(
-    ContentApplicabilityRegenerationView, HistoryView, RepoAssociate, RepoDistributorResourceView,
-    RepoDistributorsView, RepoDistributorsSearchView, RepoImportUpload, RepoImporterResourceView,
+    CONTINUATION_HEADER, ContentApplicabilityRegenerationView, HistoryView, RepoAssociate,
+    RepoDistributorResourceView, RepoDistributorsView, RepoDistributorsSearchView, RepoImportUpload,
+    RepoImporterResourceView,
     RepoImportersView, RepoPublish, RepoPublishHistory, RepoPublishScheduleResourceView,
     RepoPublishSchedulesView, RepoResourceView, RepoSearch, RepoSync, RepoSyncHistory,
     RepoSyncScheduleResourceView, RepoSyncSchedulesView, RepoUnassociate, RepoUnitSearch, ReposView
@@ -188,11 +189,59 @@ class TestValidateRepoImporterExistance(unittest.TestCase):
         mock_imp_manager.get_importer.assert_called_once_with('some_repo')
 
 
+class TestRepoRevisions(unittest.TestCase):
+    """
+    Tests for the functions that return the revisions of repositories.
+    """
+
+    @mock.patch('pulp.server.webservices.views.repositories.model')
+    def test__repos_revision(self, mock_model):
+        """
+        The revision of every repository is returned, sorted by repository id.
+        """
+        repo_b = mock.MagicMock(repo_id='b', revision=3)
+        repo_a = mock.MagicMock(repo_id='a', revision=7)
+        mock_model.Repository.objects.only.return_value = [repo_b, repo_a]
+        result = repositories._repos_revision(mock.MagicMock())
+        mock_model.Repository.objects.only.assert_called_once_with('repo_id', 'revision')
+        self.assertEqual(result, [('a', 7), ('b', 3)])
+
+    @mock.patch('pulp.server.webservices.views.repositories.model')
+    def test__repo_revision(self, mock_model):
+        """
+        The revision of the requested repository is returned.
+        """
+        mock_qs = mock_model.Repository.objects.return_value
+        mock_qs.only.return_value.first.return_value = mock.MagicMock(revision=4)
+        self.assertEqual(repositories._repo_revision(mock.MagicMock(), 'repo'), 4)
+        mock_model.Repository.objects.assert_called_once_with(repo_id='repo')
+        mock_qs.only.assert_called_once_with('revision')
+
+    @mock.patch('pulp.server.webservices.views.repositories.model')
+    def test__repo_revision_missing(self, mock_model):
+        """
+        None is returned for a repository that does not exist, so the view can raise a 404.
+        """
+        mock_qs = mock_model.Repository.objects.return_value
+        mock_qs.only.return_value.first.return_value = None
+        self.assertTrue(repositories._repo_revision(mock.MagicMock(), 'repo') is None)
+
+
 class TestReposView(unittest.TestCase):
     """
     Tests for ReposView.
     """
 
+    def setUp(self):
+        """
+        Conditional GET handling is tested with the util module, so give every response the same
+        entity tag here.
+        """
+        for name, value in (('generate_etag', '"etag"'), ('etag_matches', False)):
+            patcher = mock.patch('pulp.server.webservices.views.util.' + name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
     @mock.patch(
         'pulp.server.webservices.views.repositories.generate_json_response_with_pulp_encoder')
     @mock.patch('pulp.server.webservices.views.repositories._merge_related_objects')
@@ -434,6 +483,16 @@ class TestRepoResourceView(unittest.TestCase):
     Tests for RepoResoureceView.
     """
 
+    def setUp(self):
+        """
+        Conditional GET handling is tested with the util module, so give every response the same
+        entity tag here.
+        """
+        for name, value in (('generate_etag', '"etag"'), ('etag_matches', False)):
+            patcher = mock.patch('pulp.server.webservices.views.util.' + name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
     @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
                 new=assert_auth_READ())
     @mock.patch('pulp.server.webservices.views.repositories.serializers.Repository')
@@ -748,7 +807,7 @@ class TestRepoSearch(unittest.TestCase):
         self.assertEqual(repo_search.model, model.Repository)
         self.assertEqual(repo_search.optional_bool_fields, ('details', 'importers', 'distributors'))
         self.assertEqual(repo_search.response_builder,
-                         util.generate_json_response_with_pulp_encoder)
+                         util.generate_json_streaming_response_with_pulp_encoder)
 
     @mock.patch('pulp.server.webservices.views.repositories._process_repos')
     def test_get_results(self, mock_process):
@@ -770,7 +829,8 @@ class TestRepoUnitSearch(unittest.TestCase):
     """
 
     @mock.patch(
-        'pulp.server.webservices.views.repositories.generate_json_response_with_pulp_encoder')
+        'pulp.server.webservices.views.repositories.'
+        'generate_json_streaming_response_with_pulp_encoder')
     @mock.patch('pulp.server.webservices.views.repositories.manager_factory.'
                 'repo_unit_association_query_manager')
     @mock.patch('pulp.server.webservices.views.repositories.UnitAssociationCriteria')
@@ -790,7 +850,8 @@ class TestRepoUnitSearch(unittest.TestCase):
         mock_resp.assert_called_once_with(mock_uqm().get_units_by_type.return_value)
 
     @mock.patch(
-        'pulp.server.webservices.views.repositories.generate_json_response_with_pulp_encoder')
+        'pulp.server.webservices.views.repositories.'
+        'generate_json_streaming_response_with_pulp_encoder')
     @mock.patch('pulp.server.webservices.views.repositories.manager_factory.'
                 'repo_unit_association_query_manager')
     @mock.patch('pulp.server.webservices.views.repositories.UnitAssociationCriteria')
@@ -808,6 +869,48 @@ class TestRepoUnitSearch(unittest.TestCase):
         mock_uqm().get_units_across_types.assert_called_once_with('mock_repo', criteria=criteria)
         mock_resp.assert_called_once_with(mock_uqm().get_units_across_types.return_value)
 
+    @mock.patch('pulp.server.webservices.views.repositories.'
+                'generate_json_streaming_response_with_pulp_encoder')
+    @mock.patch('pulp.server.webservices.views.repositories.manager_factory.'
+                'repo_unit_association_query_manager')
+    @mock.patch('pulp.server.webservices.views.repositories.UnitAssociationCriteria')
+    @mock.patch('pulp.server.webservices.views.repositories.model.Repository.objects')
+    def test__generate_response_continuation(self, mock_repo_qs, mock_crit, mock_uqm,
+                                             mock_resp):
+        """
+        Test that the continuation token for the next page is returned in a header.
+        """
+        criteria = mock_crit.from_client_input.return_value
+        criteria.type_ids = ['one_type']
+        mock_uqm().continuation_token.return_value = 'mock_token'
+        response = mock.MagicMock()
+        mock_resp.return_value = response
+
+        RepoUnitSearch._generate_response('mock_q', {}, repo_id='mock_repo')
+
+        units = mock_uqm().get_units_by_type.return_value
+        mock_uqm().continuation_token.assert_called_once_with(criteria, units)
+        response.__setitem__.assert_called_once_with(CONTINUATION_HEADER, 'mock_token')
+
+    @mock.patch('pulp.server.webservices.views.repositories.'
+                'generate_json_streaming_response_with_pulp_encoder')
+    @mock.patch('pulp.server.webservices.views.repositories.manager_factory.'
+                'repo_unit_association_query_manager')
+    @mock.patch('pulp.server.webservices.views.repositories.UnitAssociationCriteria')
+    @mock.patch('pulp.server.webservices.views.repositories.model.Repository.objects')
+    def test__generate_response_last_page(self, mock_repo_qs, mock_crit, mock_uqm, mock_resp):
+        """
+        Test that no continuation header is returned for the last page.
+        """
+        mock_crit.from_client_input.return_value.type_ids = ['one_type']
+        mock_uqm().continuation_token.return_value = None
+        response = mock.MagicMock()
+        mock_resp.return_value = response
+
+        RepoUnitSearch._generate_response('mock_q', {}, repo_id='mock_repo')
+
+        self.assertFalse(response.__setitem__.called)
+
 
 class TestRepoImportersView(unittest.TestCase):
     """
@@ -1335,7 +1438,7 @@ class TestRepoDistributorsSearchView(unittest.TestCase):
         self.assertTrue(isinstance(RepoDistributorsSearchView.manager,
                                    distributor.RepoDistributorManager))
         self.assertEqual(RepoDistributorsSearchView.response_builder,
-                         util.generate_json_response_with_pulp_encoder)
+                         util.generate_json_streaming_response_with_pulp_encoder)
 
 
 class TestRepoDistributorResourceView(unittest.TestCase):
@@ -2161,6 +2264,61 @@ class TestRepoImportUpload(unittest.TestCase):
         )
         self.assertEqual(response.http_status_code, 202)
 
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_UPDATE())
+    @mock.patch('pulp.server.webservices.views.repositories.tags')
+    @mock.patch('pulp.server.webservices.views.repositories.import_uploaded_unit')
+    @mock.patch('pulp.server.webservices.views.repositories.import_existing_unit')
+    def test_post_existing_unit(self, mock_import_existing, mock_import, mock_tags):
+        """
+        Test that a task associating the existing unit is created when a unit_id is specified.
+        """
+
+        mock_request = mock.MagicMock()
+        mock_request.body = json.dumps({'unit_id': 'mock_unit', 'unit_type_id': 'mock_type',
+                                        'unit_key': 'mock_key', 'unit_metadata': None,
+                                        'override_config': {}})
+        repo_import = RepoImportUpload()
+
+        try:
+            repo_import.post(mock_request, 'mock_repo')
+        except pulp_exceptions.OperationPostponed, response:
+            pass
+        else:
+            raise AssertionError('OperationPostponed should be raise for an import task')
+
+        task_tags = [mock_tags.resource_tag(), mock_tags.action_tag()]
+        mock_import_existing.apply_async_with_reservation.assert_called_once_with(
+            mock_tags.RESOURCE_REPOSITORY_TYPE, 'mock_repo',
+            ['mock_repo', 'mock_type', 'mock_unit'],
+            tags=task_tags
+        )
+        self.assertFalse(mock_import.apply_async_with_reservation.called)
+        self.assertEqual(response.http_status_code, 202)
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_UPDATE())
+    @mock.patch('pulp.server.webservices.views.repositories.import_existing_unit')
+    def test_post_existing_unit_with_metadata(self, mock_import_existing):
+        """
+        Test that a unit_id is rejected with metadata or configuration for the importer.
+        """
+
+        mock_request = mock.MagicMock()
+        mock_request.body = json.dumps({'unit_id': 'mock_unit', 'unit_type_id': 'mock_type',
+                                        'unit_metadata': {'a': 1}, 'override_config': {}})
+        repo_import = RepoImportUpload()
+
+        try:
+            repo_import.post(mock_request, 'mock_repo')
+        except pulp_exceptions.InvalidValue, response:
+            pass
+        else:
+            raise AssertionError('InvalidValue should be raised for ignored unit metadata.')
+
+        self.assertEqual(response.property_names, ['unit_id', 'unit_metadata'])
+        self.assertFalse(mock_import_existing.apply_async_with_reservation.called)
+
     @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
                 new=assert_auth_UPDATE())
     def test_post_missing_required_params(self):
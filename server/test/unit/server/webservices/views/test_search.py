@@ -5,6 +5,7 @@ import unittest
 
 import mock
 from django import http
+from mongoengine.queryset import QuerySet
 
 from base import assert_auth_READ
 from pulp.server import exceptions
@@ -35,8 +36,8 @@ class TestSearchView(unittest.TestCase):
                                side_effect=FakeSearchView._generate_response) as _generate_response:
             results = view.get(request)
 
-        self.assertEqual(type(results), http.HttpResponse)
-        self.assertEqual(results.content, '["big money", "bigger money"]')
+        self.assertEqual(type(results), http.StreamingHttpResponse)
+        self.assertEqual(''.join(results.streaming_content), '["big money", "bigger money"]')
         self.assertEqual(results.status_code, 200)
 
         _generate_response.assert_called_once_with(
@@ -65,8 +66,8 @@ class TestSearchView(unittest.TestCase):
                                side_effect=FakeSearchView._generate_response) as _generate_response:
             results = view.get(request)
 
-        self.assertEqual(type(results), http.HttpResponse)
-        self.assertEqual(results.content, '["big money", "bigger money"]')
+        self.assertEqual(type(results), http.StreamingHttpResponse)
+        self.assertEqual(''.join(results.streaming_content), '["big money", "bigger money"]')
         self.assertEqual(results.status_code, 200)
         # This is actually a bug, but the intention of this Django port was to behave exactly like
         # The webpy handlers did, bugs included. When #312 is fixed, the tests below should fail,
@@ -108,8 +109,8 @@ class TestSearchView(unittest.TestCase):
                                side_effect=FakeSearchView._generate_response) as _generate_response:
             results = view.post(request)
 
-        self.assertEqual(type(results), http.HttpResponse)
-        self.assertEqual(results.content, '["big money", "bigger money"]')
+        self.assertEqual(type(results), http.StreamingHttpResponse)
+        self.assertEqual(''.join(results.streaming_content), '["big money", "bigger money"]')
         self.assertEqual(results.status_code, 200)
         _generate_response.assert_called_once_with({'filters': {'money': {'$gt': 1000000}}}, {})
 
@@ -142,8 +143,8 @@ class TestSearchView(unittest.TestCase):
 
         results = FakeSearchView._generate_response(query, {})
 
-        self.assertEqual(type(results), http.HttpResponse)
-        self.assertEqual(results.content, '["big money", "bigger money"]')
+        self.assertEqual(type(results), http.StreamingHttpResponse)
+        self.assertEqual(''.join(results.streaming_content), '["big money", "bigger money"]')
         self.assertEqual(results.status_code, 200)
         self.assertEqual(
             FakeSearchView.model.objects.find_by_criteria.mock_calls[0][1][0]['fields'], None)
@@ -186,8 +187,8 @@ class TestSearchView(unittest.TestCase):
 
         results = FakeSearchView._generate_response(query, {})
 
-        self.assertEqual(type(results), http.HttpResponse)
-        self.assertEqual(results.content, '["big money", "bigger money"]')
+        self.assertEqual(type(results), http.StreamingHttpResponse)
+        self.assertEqual(''.join(results.streaming_content), '["big money", "bigger money"]')
         self.assertEqual(results.status_code, 200)
         self.assertEqual(
             FakeSearchView.manager.find_by_criteria.mock_calls[0][1][0]['fields'], None)
@@ -208,8 +209,8 @@ class TestSearchView(unittest.TestCase):
 
         results = FakeSearchView._generate_response(query, {})
 
-        self.assertEqual(type(results), http.HttpResponse)
-        self.assertEqual(results.content, '["big money", "bigger money"]')
+        self.assertEqual(type(results), http.StreamingHttpResponse)
+        self.assertEqual(''.join(results.streaming_content), '["big money", "bigger money"]')
         self.assertEqual(results.status_code, 200)
         self.assertEqual(
             FakeSearchView.model.objects.find_by_criteria.mock_calls[0][1][0]['fields'],
@@ -231,8 +232,8 @@ class TestSearchView(unittest.TestCase):
 
         results = FakeSearchView._generate_response(query, {})
 
-        self.assertEqual(type(results), http.HttpResponse)
-        self.assertEqual(results.content, '["big money", "bigger money"]')
+        self.assertEqual(type(results), http.StreamingHttpResponse)
+        self.assertEqual(''.join(results.streaming_content), '["big money", "bigger money"]')
         self.assertEqual(results.status_code, 200)
         self.assertEqual(
             FakeSearchView.model.objects.find_by_criteria.mock_calls[0][1][0]['fields'],
@@ -255,8 +256,8 @@ class TestSearchView(unittest.TestCase):
 
         results = FakeSearchView._generate_response(query, {})
 
-        self.assertEqual(type(results), http.HttpResponse)
-        self.assertEqual(results.content, '["biggest money", "unreal money"]')
+        self.assertEqual(type(results), http.StreamingHttpResponse)
+        self.assertEqual(''.join(results.streaming_content), '["biggest money", "unreal money"]')
         self.assertEqual(results.status_code, 200)
         self.assertEqual(
             FakeSearchView.model.objects.find_by_criteria.mock_calls[0][1][0]['fields'], None)
@@ -266,6 +267,53 @@ class TestSearchView(unittest.TestCase):
         self.assertEqual([c[1][0] for c in FakeSearchView.serializer.mock_calls],
                          ['big money', 'bigger money'])
 
+    def test_get_results_no_cache(self):
+        """
+        Test that MongoEngine query sets are iterated without caching their documents.
+        """
+        class FakeSearchView(search.SearchView):
+            model = mock.MagicMock()
+
+        query_set = mock.MagicMock(spec=QuerySet)
+        query_set.no_cache.return_value = ['big money']
+        search_method = mock.MagicMock(return_value=query_set)
+
+        results = FakeSearchView.get_results('query', search_method, {})
+
+        self.assertEqual(results, ['big money'])
+
+
+class TestSearchViewErrors(unittest.TestCase):
+    """
+    Test that errors from a search are reported with an error status.
+    """
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    def test_bad_query(self):
+        """
+        A query that fails once the results are iterated still results in a 400 response.
+        """
+        class FakeSearchView(search.SearchView):
+            model = mock.MagicMock()
+
+        def results():
+            raise exceptions.InvalidValue(['filters'])
+            yield
+
+        FakeSearchView.model.objects.find_by_criteria.return_value = results()
+        request = mock.MagicMock()
+        request.GET = {'filters': '{"name": {"$bogus": 1}}'}
+
+        try:
+            FakeSearchView().get(request)
+        except exceptions.InvalidValue, response:
+            pass
+        else:
+            raise AssertionError('InvalidValue should be raised before the response is returned')
+
+        self.assertEqual(response.http_status_code, 400)
+
 
 class TestParseArgs(unittest.TestCase):
     class FakeSearchView(search.SearchView):
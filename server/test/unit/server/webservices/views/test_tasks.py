@@ -1,6 +1,8 @@
 """
 This module contains tests for the pulp.server.webservices.views.tasks module.
 """
+import json
+
 import mock
 
 from mongoengine.queryset import DoesNotExist
@@ -9,10 +11,11 @@ from .base import assert_auth_DELETE, assert_auth_READ
 from pulp.common.compat import unittest
 from pulp.server import exceptions as pulp_exceptions
 from pulp.server.db import model
-from pulp.server.exceptions import MissingResource
+from pulp.server.exceptions import InvalidValue, MissingResource, MissingValue
 from pulp.server.webservices.views import util
 from pulp.server.webservices.views.tasks import (TaskCollectionView, TaskResourceView,
-                                                 TaskSearchView, task_serializer)
+                                                 TaskSearchView, TaskStatusView,
+                                                 task_serializer)
 
 
 @mock.patch('pulp.server.webservices.views.tasks.serial_dispatch')
@@ -45,7 +48,7 @@ class TestTaskSearchView(unittest.TestCase):
         Ensure that the TaskSearchView class has the correct class attributes.
         """
         self.assertEqual(TaskSearchView.response_builder,
-                         util.generate_json_response_with_pulp_encoder)
+                         util.generate_json_streaming_response_with_pulp_encoder)
         self.assertEqual(TaskSearchView.model, model.TaskStatus)
         self.assertEqual(TaskSearchView.serializer, task_serializer)
 
@@ -59,7 +62,8 @@ class TestTaskCollection(unittest.TestCase):
                 new=assert_auth_READ())
     @mock.patch('pulp.server.webservices.views.tasks.task_serializer')
     @mock.patch('pulp.server.webservices.views.tasks.TaskStatus')
-    @mock.patch('pulp.server.webservices.views.tasks.generate_json_response_with_pulp_encoder')
+    @mock.patch(
+        'pulp.server.webservices.views.tasks.generate_json_streaming_response_with_pulp_encoder')
     def test_get_task_collection(self, mock_resp, mock_task_status, mock_task_serializer):
         """
         Test get task_collection with tags.
@@ -67,14 +71,16 @@ class TestTaskCollection(unittest.TestCase):
 
         mock_request = mock.MagicMock()
         mock_request.GET.getlist.return_value = ['mock_tag_1', 'mock_tag_2']
-        mock_task_status.objects.return_value = ['mock_1', 'mock_2']
+        mock_task_status.objects.return_value.no_cache.return_value = ['mock_1', 'mock_2']
         mock_task_serializer.side_effect = lambda x: x
 
         task_collection = TaskCollectionView()
         response = task_collection.get(mock_request)
+        serialized_tasks = list(mock_resp.call_args[0][0])
 
         mock_task_status.objects.assert_called_once_with(tags__all=['mock_tag_1', 'mock_tag_2'])
-        mock_resp.assert_called_once_with(['mock_1', 'mock_2'])
+        self.assertEqual(mock_resp.call_count, 1)
+        self.assertEqual(serialized_tasks, ['mock_1', 'mock_2'])
         mock_task_serializer.assert_has_calls([mock.call('mock_1'), mock.call('mock_2')])
         self.assertTrue(response is mock_resp.return_value)
 
@@ -82,7 +88,8 @@ class TestTaskCollection(unittest.TestCase):
                 new=assert_auth_READ())
     @mock.patch('pulp.server.webservices.views.tasks.task_serializer')
     @mock.patch('pulp.server.webservices.views.tasks.TaskStatus')
-    @mock.patch('pulp.server.webservices.views.tasks.generate_json_response_with_pulp_encoder')
+    @mock.patch(
+        'pulp.server.webservices.views.tasks.generate_json_streaming_response_with_pulp_encoder')
     def test_get_task_collection_no_tags(self, mock_resp, mock_task_status, mock_task_serializer):
         """
         Test get task_collection with no tags.
@@ -90,14 +97,16 @@ class TestTaskCollection(unittest.TestCase):
 
         mock_request = mock.MagicMock()
         mock_request.GET.getlist.return_value = []
-        mock_task_status.objects.return_value = ['mock_1', 'mock_2']
+        mock_task_status.objects.return_value.no_cache.return_value = ['mock_1', 'mock_2']
         mock_task_serializer.side_effect = lambda x: x
 
         task_collection = TaskCollectionView()
         response = task_collection.get(mock_request)
+        serialized_tasks = list(mock_resp.call_args[0][0])
 
         mock_task_status.objects.assert_called_once_with()
-        mock_resp.assert_called_once_with(['mock_1', 'mock_2'])
+        self.assertEqual(mock_resp.call_count, 1)
+        self.assertEqual(serialized_tasks, ['mock_1', 'mock_2'])
         mock_task_serializer.assert_has_calls([mock.call('mock_1'), mock.call('mock_2')])
         self.assertTrue(response is mock_resp.return_value)
 
@@ -202,3 +211,182 @@ class TestTaskResource(unittest.TestCase):
         mock_task.cancel.assert_called_once_with('mock_task_id')
         mock_resp.assert_called_once_with(None)
         self.assertTrue(response is mock_resp.return_value)
+
+
+class _QuerySet(list):
+    """
+    List of tasks standing in for a mongoengine queryset.
+    """
+
+    def only(self, *fields):
+        return self
+
+
+class TestTaskStatusView(unittest.TestCase):
+    """
+    Tests for the view that returns the status of many tasks at once.
+    """
+
+    @staticmethod
+    def _task(task_id, state):
+        task = mock.MagicMock()
+        task.task_id = task_id
+        task.state = state
+        return task
+
+    @staticmethod
+    def _request(body):
+        request = mock.MagicMock()
+        request.body = json.dumps(body)
+        return request
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.tasks.time')
+    @mock.patch('pulp.server.webservices.views.tasks.task_serializer')
+    @mock.patch('pulp.server.webservices.views.tasks.TaskStatus')
+    @mock.patch('pulp.server.webservices.views.tasks.generate_json_response_with_pulp_encoder')
+    def test_post(self, mock_resp, mock_task_status, mock_task_serial, mock_time):
+        """
+        Without a timeout, the tasks are returned in the requested order without waiting.
+        """
+        tasks = [self._task('1', 'running'), self._task('2', 'waiting')]
+        mock_task_status.objects.return_value = _QuerySet(tasks)
+        mock_task_serial.side_effect = lambda task: {'task_id': task.task_id}
+
+        response = TaskStatusView().post(self._request({'task_ids': ['2', '1']}))
+
+        mock_resp.assert_called_once_with({'tasks': [{'task_id': '2'}, {'task_id': '1'}],
+                                           'missing_task_ids': []})
+        self.assertTrue(response is mock_resp.return_value)
+        self.assertFalse(mock_time.sleep.called)
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.tasks.time')
+    @mock.patch('pulp.server.webservices.views.tasks.task_serializer')
+    @mock.patch('pulp.server.webservices.views.tasks.TaskStatus')
+    @mock.patch('pulp.server.webservices.views.tasks.generate_json_response_with_pulp_encoder')
+    def test_post_long_poll_state_change(self, mock_resp, mock_task_status, mock_task_serial,
+                                         mock_time):
+        """
+        With a timeout, the view should wait until a task's state differs from the known one.
+        """
+        mock_time.time.return_value = 100
+        mock_task_status.objects.side_effect = [
+            _QuerySet([self._task('1', 'running')]),
+            _QuerySet([self._task('1', 'running')]),
+            _QuerySet([self._task('1', 'finished')]),
+            _QuerySet([self._task('1', 'finished')]),
+        ]
+        mock_task_serial.side_effect = lambda task: {'state': task.state}
+        body = {'task_ids': ['1'], 'states': {'1': 'running'}, 'timeout': 10}
+
+        TaskStatusView().post(self._request(body))
+
+        self.assertEqual(mock_time.sleep.call_count, 2)
+        mock_resp.assert_called_once_with({'tasks': [{'state': 'finished'}],
+                                           'missing_task_ids': []})
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.tasks.time')
+    @mock.patch('pulp.server.webservices.views.tasks.task_serializer')
+    @mock.patch('pulp.server.webservices.views.tasks.TaskStatus')
+    @mock.patch('pulp.server.webservices.views.tasks.generate_json_response_with_pulp_encoder')
+    def test_post_long_poll_known_state_differs(self, mock_resp, mock_task_status,
+                                                mock_task_serial, mock_time):
+        """
+        The view should return at once if a task already differs from the caller's state.
+        """
+        mock_task_status.objects.return_value = _QuerySet([self._task('1', 'running')])
+        mock_task_serial.side_effect = lambda task: {'state': task.state}
+        body = {'task_ids': ['1'], 'states': {'1': 'waiting'}, 'timeout': 10}
+
+        TaskStatusView().post(self._request(body))
+
+        self.assertFalse(mock_time.sleep.called)
+        mock_resp.assert_called_once_with({'tasks': [{'state': 'running'}], 'missing_task_ids': []})
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.tasks.MAX_LONG_POLL_TIMEOUT', 1)
+    @mock.patch('pulp.server.webservices.views.tasks.time')
+    @mock.patch('pulp.server.webservices.views.tasks.task_serializer')
+    @mock.patch('pulp.server.webservices.views.tasks.TaskStatus')
+    @mock.patch('pulp.server.webservices.views.tasks.generate_json_response_with_pulp_encoder')
+    def test_post_long_poll_timeout(self, mock_resp, mock_task_status, mock_task_serial,
+                                    mock_time):
+        """
+        The view should stop waiting once the timeout, capped at the maximum, has passed.
+        """
+        mock_time.time.side_effect = [100, 100, 101]
+        mock_task_status.objects.return_value = _QuerySet([self._task('1', 'running')])
+        mock_task_serial.side_effect = lambda task: {'state': task.state}
+        body = {'task_ids': ['1'], 'timeout': 60}
+
+        TaskStatusView().post(self._request(body))
+
+        self.assertEqual(mock_time.sleep.call_count, 1)
+        mock_resp.assert_called_once_with({'tasks': [{'state': 'running'}], 'missing_task_ids': []})
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.tasks.task_serializer')
+    @mock.patch('pulp.server.webservices.views.tasks.TaskStatus')
+    @mock.patch('pulp.server.webservices.views.tasks.generate_json_response_with_pulp_encoder')
+    def test_post_missing_task(self, mock_resp, mock_task_status, mock_task_serial):
+        """
+        Tasks that do not exist should be listed while the others are still returned.
+        """
+        mock_task_status.objects.return_value = _QuerySet([self._task('1', 'running')])
+        mock_task_serial.side_effect = lambda task: {'task_id': task.task_id}
+
+        TaskStatusView().post(self._request({'task_ids': ['1', '2']}))
+
+        mock_resp.assert_called_once_with({'tasks': [{'task_id': '1'}],
+                                           'missing_task_ids': ['2']})
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.tasks.time')
+    @mock.patch('pulp.server.webservices.views.tasks.task_serializer')
+    @mock.patch('pulp.server.webservices.views.tasks.TaskStatus')
+    @mock.patch('pulp.server.webservices.views.tasks.generate_json_response_with_pulp_encoder')
+    def test_post_long_poll_task_deleted(self, mock_resp, mock_task_status, mock_task_serial,
+                                         mock_time):
+        """
+        A task deleted while the view waits should end the wait and be listed as missing.
+        """
+        mock_time.time.return_value = 100
+        mock_task_status.objects.side_effect = [
+            _QuerySet([self._task('1', 'running'), self._task('2', 'running')]),
+            _QuerySet([self._task('1', 'running')]),
+            _QuerySet([self._task('1', 'running')]),
+        ]
+        mock_task_serial.side_effect = lambda task: {'task_id': task.task_id}
+        body = {'task_ids': ['1', '2'], 'timeout': 10}
+
+        TaskStatusView().post(self._request(body))
+
+        self.assertEqual(mock_time.sleep.call_count, 1)
+        mock_resp.assert_called_once_with({'tasks': [{'task_id': '1'}],
+                                           'missing_task_ids': ['2']})
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    def test_post_missing_task_ids(self):
+        """
+        The view should require the list of task IDs.
+        """
+        self.assertRaises(MissingValue, TaskStatusView().post, self._request({}))
+
+    @mock.patch('pulp.server.webservices.views.decorators._verify_auth',
+                new=assert_auth_READ())
+    def test_post_invalid_timeout(self):
+        """
+        The view should reject a timeout that is not a non-negative number.
+        """
+        for timeout in (-1, 'soon', True):
+            request = self._request({'task_ids': ['1'], 'timeout': timeout})
+            self.assertRaises(InvalidValue, TaskStatusView().post, request)
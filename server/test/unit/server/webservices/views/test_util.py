@@ -3,7 +3,7 @@ import json
 import mock
 import unittest
 
-from django.http import HttpResponse, HttpResponseNotFound
+from django.http import HttpResponse, HttpResponseNotFound, StreamingHttpResponse
 
 from pulp.server.exceptions import InputEncodingError, PulpCodedValidationException
 from pulp.server.webservices.views import util
@@ -58,6 +58,55 @@ class TestResponseGenerators(unittest.TestCase):
         util.generate_json_response_with_pulp_encoder(test_content)
         mock_json.dumps.assert_called_once_with(test_content, default=pulp_json_encoder)
 
+    def test_generate_json_streaming_response(self):
+        """
+        Make sure that the streamed content is the same JSON array json.dumps would create.
+        """
+        test_content = [{'foo': 'bar'}, 1, None]
+        response = util.generate_json_streaming_response(iter(test_content))
+        self.assertTrue(isinstance(response, StreamingHttpResponse))
+        self.assertEqual(response.status_code, httplib.OK)
+        self.assertEqual(response._headers.get('content-type'),
+                         ('Content-Type', 'application/json; charset=utf-8'))
+        self.assertEqual(''.join(response.streaming_content), json.dumps(test_content))
+
+    def test_generate_json_streaming_response_empty(self):
+        """
+        Make sure that an empty iterable is streamed as an empty JSON array.
+        """
+        response = util.generate_json_streaming_response(iter([]))
+        self.assertEqual(''.join(response.streaming_content), '[]')
+
+    def test_generate_json_streaming_response_error(self):
+        """
+        Make sure that an error raised by the first elements is raised before the response is
+        returned, so it can still be reported with an error status.
+        """
+        def content():
+            raise ValueError('bad query')
+            yield
+
+        self.assertRaises(ValueError, util.generate_json_streaming_response, content())
+
+    @mock.patch('pulp.server.webservices.views.util.STREAMING_CHUNK_SIZE', 10)
+    def test_generate_json_streaming_response_chunks(self):
+        """
+        Make sure that elements are written in chunks as they are serialized.
+        """
+        test_content = ['a' * 8, 'b' * 8, 'c']
+        chunks = list(util.generate_json_streaming_response(test_content).streaming_content)
+        self.assertEqual(chunks, ['["aaaaaaaa"', ', "bbbbbbbb"', ', "c"]'])
+
+    @mock.patch('pulp.server.webservices.views.util.json')
+    def test_generate_json_streaming_response_with_pulp_encoder(self, mock_json):
+        """
+        Ensure that the shortcut function uses the specified encoder for each element.
+        """
+        mock_json.dumps.return_value = '{}'
+        response = util.generate_json_streaming_response_with_pulp_encoder([{'foo': 'bar'}])
+        list(response.streaming_content)
+        mock_json.dumps.assert_called_once_with({'foo': 'bar'}, default=pulp_json_encoder)
+
     @mock.patch('pulp.server.webservices.views.util.iri_to_uri')
     def test_generate_redirect_response(self, mock_iri_to_uri):
         """
@@ -197,3 +246,182 @@ class TestPageNotFound(unittest.TestCase):
         returned_obj = page_not_found(mock.Mock())
         mock_generate_json_response.assert_called_once_with()
         self.assertTrue(returned_obj is mock_generate_json_response.return_value)
+
+
+class TestEntityTags(unittest.TestCase):
+    """
+    Tests for building and matching entity tags.
+    """
+
+    def test_generate_etag(self):
+        """
+        The tag is quoted, stable for equal values and different for different values.
+        """
+        etag = util.generate_etag('/v2/repositories/', [('repo', 1)])
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+        self.assertEqual(etag, util.generate_etag('/v2/repositories/', [('repo', 1)]))
+        self.assertNotEqual(etag, util.generate_etag('/v2/repositories/', [('repo', 2)]))
+
+    def test_etag_matches(self):
+        """
+        Any of the tags in If-None-Match may match, including weak tags and the wildcard.
+        """
+        request = mock.MagicMock()
+        for header, expected in ((None, False), ('"other"', False), ('"other", "abc"', True),
+                                 ('W/"abc"', True), ('*', True)):
+            request.META = {} if header is None else {'HTTP_IF_NONE_MATCH': header}
+            self.assertEqual(util.etag_matches(request, '"abc"'), expected)
+
+    def test_generate_not_modified_response(self):
+        """
+        The response has no content and repeats the entity tag.
+        """
+        response = util.generate_not_modified_response('"abc"')
+        self.assertEqual(response.status_code, httplib.NOT_MODIFIED)
+        self.assertEqual(response['ETag'], '"abc"')
+        self.assertEqual(response.content, '')
+
+
+class TestResponseCache(unittest.TestCase):
+    """
+    Tests for the process local response cache.
+    """
+
+    @mock.patch('pulp.server.webservices.views.util.time')
+    def test_get_expired(self, mock_time):
+        """
+        Entries are returned until their time to live has passed.
+        """
+        cache = util.ResponseCache()
+        mock_time.time.return_value = 100
+        cache.put('/key/', '"abc"', '[]', 'application/json', 5)
+        mock_time.time.return_value = 104
+        self.assertEqual(cache.get('/key/'), ('"abc"', '[]', 'application/json'))
+        mock_time.time.return_value = 105
+        self.assertTrue(cache.get('/key/') is None)
+        self.assertTrue(cache.get('/other/') is None)
+
+    @mock.patch('pulp.server.webservices.views.util.time')
+    def test_put_evicts(self, mock_time):
+        """
+        A full cache drops its expired entries first, and everything if none have expired.
+        """
+        cache = util.ResponseCache(max_entries=2)
+        mock_time.time.return_value = 100
+        cache.put('/a/', '"a"', 'a', 'text/plain', 1)
+        cache.put('/b/', '"b"', 'b', 'text/plain', 10)
+        mock_time.time.return_value = 102
+        cache.put('/c/', '"c"', 'c', 'text/plain', 10)
+        self.assertTrue(cache.get('/a/') is None)
+        self.assertEqual(cache.get('/b/'), ('"b"', 'b', 'text/plain'))
+        cache.put('/d/', '"d"', 'd', 'text/plain', 10)
+        self.assertTrue(cache.get('/b/') is None)
+        self.assertTrue(cache.get('/c/') is None)
+        self.assertEqual(cache.get('/d/'), ('"d"', 'd', 'text/plain'))
+
+
+class TestConditionalGet(unittest.TestCase):
+    """
+    Tests for the conditional_get view decorator.
+    """
+
+    def setUp(self):
+        util.response_cache.clear()
+        self.view = mock.MagicMock(__name__='get')
+        self.view.return_value = HttpResponse('[1, 2]', content_type='application/json')
+        self.request = mock.MagicMock()
+        self.request.get_full_path.return_value = '/v2/repositories/?details=true'
+        self.request.META = {}
+
+    def tearDown(self):
+        util.response_cache.clear()
+
+    def _get(self, version=None, *args):
+        return util.conditional_get(version)(self.view)('self', self.request, *args)
+
+    @mock.patch('pulp.server.webservices.views.util.config')
+    def test_version_sets_etag(self, mock_config):
+        """
+        Without If-None-Match the view runs and its response is tagged with the version.
+        """
+        mock_config.getfloat.return_value = 0
+        version = mock.MagicMock(return_value=3)
+        response = self._get(version, 'repo')
+        version.assert_called_once_with(self.request, 'repo')
+        self.view.assert_called_once_with('self', self.request, 'repo')
+        self.assertTrue(response is self.view.return_value)
+        self.assertEqual(response['ETag'],
+                         util.generate_etag('/v2/repositories/?details=true', 3))
+        mock_config.getfloat.assert_called_once_with('server', 'response_cache_ttl')
+
+    @mock.patch('pulp.server.webservices.views.util.config')
+    def test_version_not_modified(self, mock_config):
+        """
+        A matching If-None-Match is answered with 304 without running the view.
+        """
+        mock_config.getfloat.return_value = 0
+        etag = util.generate_etag('/v2/repositories/?details=true', 3)
+        self.request.META['HTTP_IF_NONE_MATCH'] = etag
+        response = self._get(mock.MagicMock(return_value=3))
+        self.assertEqual(response.status_code, httplib.NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(self.view.called)
+
+    @mock.patch('pulp.server.webservices.views.util.config')
+    def test_version_unknown(self, mock_config):
+        """
+        When the version cannot be determined the view decides the response.
+        """
+        mock_config.getfloat.return_value = 0
+        self.view.return_value = HttpResponseNotFound()
+        self.request.META['HTTP_IF_NONE_MATCH'] = '*'
+        response = self._get(mock.MagicMock(return_value=None))
+        self.assertEqual(response.status_code, httplib.NOT_FOUND)
+        self.assertFalse(response.has_header('ETag'))
+
+    @mock.patch('pulp.server.webservices.views.util.config')
+    def test_content_etag(self, mock_config):
+        """
+        Without a version function the tag is a digest of the body.
+        """
+        mock_config.getfloat.return_value = 0
+        etag = util.generate_etag('/v2/repositories/?details=true', '[1, 2]')
+        self.assertEqual(self._get()['ETag'], etag)
+
+        self.request.META['HTTP_IF_NONE_MATCH'] = etag
+        response = self._get()
+        self.assertEqual(response.status_code, httplib.NOT_MODIFIED)
+        self.assertEqual(self.view.call_count, 2)
+
+    @mock.patch('pulp.server.webservices.views.util.config')
+    def test_streaming_response_not_tagged(self, mock_config):
+        """
+        Streaming responses are passed through unchanged.
+        """
+        mock_config.getfloat.return_value = 0
+        self.view.return_value = StreamingHttpResponse(iter(['[]']))
+        response = self._get()
+        self.assertTrue(response is self.view.return_value)
+        self.assertFalse(response.has_header('ETag'))
+
+    @mock.patch('pulp.server.webservices.views.util.config')
+    def test_cached(self, mock_config):
+        """
+        With a time to live, later requests are served from the cache without running the version
+        function or the view.
+        """
+        mock_config.getfloat.return_value = 5
+        version = mock.MagicMock(return_value=3)
+        first = self._get(version)
+
+        second = self._get(version)
+        self.assertEqual(second.content, '[1, 2]')
+        self.assertEqual(second['Content-Type'], 'application/json')
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        self.request.META['HTTP_IF_NONE_MATCH'] = first['ETag']
+        third = self._get(version)
+        self.assertEqual(third.status_code, httplib.NOT_MODIFIED)
+
+        self.assertEqual(version.call_count, 1)
+        self.assertEqual(self.view.call_count, 1)